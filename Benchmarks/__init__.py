@@ -0,0 +1,5 @@
+"""
+⏱️ Benchmarks
+Scripts de medição de desempenho do pipeline. Cada módulo pode ser executado com
+`python -m Benchmarks.<nome>` a partir da raiz do projeto.
+"""
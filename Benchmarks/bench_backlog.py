@@ -0,0 +1,85 @@
+"""
+⏱️ Benchmark do processamento de backlog
+Gera uma pasta de ZIPs sintéticos (exportação do Orthanc), processa-a com o
+`BacklogProcessor` com 1 worker e com `--workers` workers, repete a execução para conferir
+que tudo é pulado (retomada) e, depois de atualizar um ZIP e corromper outro, confere que
+só esses dois são reprocessados — e que o corrompido aparece na lista de falhas.
+
+Deve ser executado da raiz do projeto (usa `Users/`); o usuário temporário `Benchmark` é
+removido ao final. Em uma máquina com uma CPU só, os workers não trazem ganho.
+
+Uso: `python -m Benchmarks.bench_backlog [--archives 12] [--images 6] [--workers 4]`
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+os.environ.setdefault("ARCHIVES_PATH", "")
+
+from Benchmarks.synthetic_dicom import make_study
+from Pipeline import BacklogProcessor
+
+BENCH_USER = "Benchmark"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark do processamento de backlog de ZIPs")
+    parser.add_argument("--archives", type=int, default=12)
+    parser.add_argument("--images", type=int, default=6, help="imagens por ZIP (variando ±50%%)")
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    if not os.path.exists("Users/users.json"):
+        raise SystemExit("Execute a partir da raiz do projeto (Users/users.json não encontrado)")
+    import main as pipeline
+
+    pipeline.OPENAI_API_KEY = None
+    os.environ["METRICS_TRACE_PATH"] = ""
+    os.environ["CATALOG_PATH"] = ""
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        zip_dir = tmp / "ZIPS"
+        zip_dir.mkdir()
+        print(f"🧪 Gerando {args.archives} ZIPs sintéticos...")
+        for i in range(args.archives):
+            n_images = max(1, args.images // 2 + i % (args.images + 1))
+            paths = make_study(tmp / f"s{i}", n_images=n_images, rgb=i % 2 == 0, compressed=i % 3 != 0, prefix=f"B{i}")
+            with zipfile.ZipFile(zip_dir / f"BENCH BACKLOG {i:03d}.zip", "w") as archive:
+                for k, path in enumerate(paths):
+                    archive.write(path, f"20250604101010 BENCH BACKLOG {i:03d}/20250604/US/IM{k:04d}.dcm")
+
+        def run(label: str, workers: int) -> dict:
+            processor = BacklogProcessor(pipeline.Extract_Convert_Img, BENCH_USER, zip_dir=str(zip_dir),
+                                         workers=workers, work_root=str(tmp / "work"), log_path=str(tmp / "log.txt"))
+            print(f"\n── {label}")
+            return processor.run()
+
+        rows = []
+        try:
+            rows.append(("1 worker", run("1 worker", 1)))
+            shutil.rmtree(os.path.join("Users", BENCH_USER))
+            rows.append((f"{args.workers} workers", run(f"{args.workers} workers", args.workers)))
+            rows.append(("retomada", run("retomada (nada a fazer)", args.workers)))
+
+            time.sleep(0.01)
+            os.utime(zip_dir / "BENCH BACKLOG 000.zip")
+            (zip_dir / "BENCH BACKLOG 999.zip").write_bytes(b"PK\x03\x04 corrompido")
+            rows.append(("1 novo + 1 ruim", run("um ZIP reexportado e um corrompido", args.workers)))
+        finally:
+            shutil.rmtree(os.path.join("Users", BENCH_USER), ignore_errors=True)
+
+    print(f"\n{'execução':<18}{'proc.':>7}{'pulados':>9}{'falhas':>8}{'tempo':>9}{'arq/min':>9}{'img/s':>8}")
+    for label, s in rows:
+        print(f"{label:<18}{s['processed']:7d}{s['skipped']:9d}{len(s['failed']):8d}{s['seconds']:8.1f}s"
+              f"{s['archives_per_min']:9.1f}{s['images_per_s']:8.1f}")
+    print(f"CPUs: {os.cpu_count()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+⏱️ Benchmark do catálogo de pacientes
+1. Percorrer pastas vs catálogo: monta `--folders` pastas de paciente (com `findings.json`
+   e PDF) e compara a busca de laudos por prefixo do nome percorrendo
+   `Users/<usuário>/Patients` com a mesma busca no catálogo, após o `backfill`.
+2. Escala: grava `--records` registros sintéticos (nomes acentuados, vários usuários,
+   datas espalhadas) e mede p50/p99 das consultas por prefixo do nome, StudyInstanceUID,
+   intervalo de datas e usuário + prefixo.
+
+Tudo é feito em uma pasta temporária.
+
+Uso: `python -m Benchmarks.bench_catalog [--records 1000000] [--folders 5000] [--queries 200]`
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from Pipeline.catalog import PatientCatalog, name_key
+
+FIRST = ["José", "João", "Maria", "Ana", "Antônio", "Francisco", "Luíza", "Márcia", "Paulo", "Lúcia",
+         "Carlos", "Fernanda", "Sérgio", "Cecília", "Raimundo", "Patrícia", "Otávio", "Inês"]
+LAST = ["Silva", "Santos", "Oliveira", "Souza", "Lima", "Pereira", "Ferreira", "Costa", "Rodrigues",
+        "Almeida", "Nascimento", "Araújo", "Gonçalves", "Conceição", "Ribeiro", "Simões"]
+USERS = ["Anders", "Clinica Norte", "Clinica Sul", "Hospital Centro"]
+
+
+def _name(rng: random.Random) -> str:
+    return f"{rng.choice(FIRST)} {rng.choice(FIRST)} {rng.choice(LAST)} {rng.choice(LAST)} {rng.randrange(10**4):04d}"
+
+
+def _date(rng: random.Random) -> str:
+    return f"{rng.randrange(2015, 2026)}{rng.randrange(1, 13):02d}{rng.randrange(1, 29):02d}"
+
+
+def _percentiles(samples: list[float]) -> tuple[float, float]:
+    samples = sorted(samples)
+    return statistics.median(samples) * 1e3, samples[int(len(samples) * 0.99) - 1] * 1e3
+
+
+def _timed(func, args_list) -> tuple[list[float], int]:
+    samples, found = [], 0
+    for args in args_list:
+        start = time.perf_counter()
+        found += len(func(*args))
+        samples.append(time.perf_counter() - start)
+    return samples, found
+
+
+def _walk_search(users_dir: str, prefix: str) -> list[str]:
+    # O que havia antes: listar as pastas de cada usuário e abrir os achados de cada uma
+    key, found = name_key(prefix), []
+    for user in os.listdir(users_dir):
+        patients = os.path.join(users_dir, user, "Patients")
+        for folder in os.listdir(patients):
+            try:
+                with open(os.path.join(patients, folder, "Report", "findings.json"), encoding="utf-8") as f:
+                    patient = json.load(f)["study"]["patient"]
+            except (OSError, ValueError, KeyError):
+                patient = folder
+            if name_key(patient).startswith(key) and os.path.exists(os.path.join(patients, folder, "Report", f"{folder}.pdf")):
+                found.append(folder)
+    return found
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Catálogo indexado vs percorrer pastas")
+    parser.add_argument("--records", type=int, default=1_000_000)
+    parser.add_argument("--folders", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+    rng = random.Random(42)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+
+        # 1. Pastas em disco
+        users_dir = tmp / "Users"
+        print(f"🧪 Gerando {args.folders} pastas de paciente...")
+        for i in range(args.folders):
+            name = _name(rng)
+            folder = name_key(name)
+            report = users_dir / USERS[i % len(USERS)] / "Patients" / folder / "Report"
+            report.mkdir(parents=True, exist_ok=True)
+            (report / "findings.json").write_text(json.dumps({"study": {
+                "patient": name, "date": _date(rng), "study_uid": f"1.2.826.0.1.{i}"}}), encoding="utf-8")
+            (report / f"{folder}.pdf").write_bytes(b"%PDF-1.4\n")
+            (report.parent / "Images").mkdir()
+
+        small = PatientCatalog(str(tmp / "folders.db"))
+        start = time.perf_counter()
+        backfilled = small.backfill(str(users_dir))
+        backfill_seconds = time.perf_counter() - start
+        prefixes = [(f"{rng.choice(FIRST)} {rng.choice(FIRST)}",) for _ in range(20)]
+        walk, walk_found = _timed(lambda p: _walk_search(str(users_dir), p), prefixes)
+        indexed, indexed_found = _timed(lambda p: small.search(name=p, limit=10**6), prefixes)
+        small.close()
+
+        # 2. Escala
+        print(f"🧪 Gravando {args.records:,} registros sintéticos...")
+        catalog = PatientCatalog(str(tmp / "catalog.db"))
+        start = time.perf_counter()
+        batch = []
+        for i in range(args.records):
+            batch.append({"user": USERS[i % len(USERS)], "folder": f"F{i:07d}", "patient": _name(rng),
+                          "study_uid": f"1.2.826.0.2.{i}", "study_date": _date(rng), "images": rng.randrange(1, 40),
+                          "pdf": f"Users/x/Patients/F{i:07d}/Report/F{i:07d}.pdf", "processed_at": 1.7e9 + i})
+            if len(batch) == 50_000:
+                catalog.record_many(batch)
+                batch.clear()
+        if batch:
+            catalog.record_many(batch)
+        insert_seconds = time.perf_counter() - start
+
+        n = args.queries
+        queries = {
+            "prefixo (3 letras)": (lambda p: catalog.search(name=p), [(rng.choice(FIRST)[:3],) for _ in range(n)]),
+            "prefixo (nome)": (lambda p: catalog.search(name=p),
+                               [(f"{rng.choice(FIRST)} {rng.choice(FIRST)} {rng.choice(LAST)}",) for _ in range(n)]),
+            "StudyInstanceUID": (lambda u: catalog.search(study_uid=u),
+                                 [(f"1.2.826.0.2.{rng.randrange(args.records)}",) for _ in range(n)]),
+            "intervalo (1 mês)": (lambda d: catalog.search(date_from=d, date_to=d[:6] + "31"),
+                                  [(f"{rng.randrange(2015, 2026)}{rng.randrange(1, 13):02d}01",) for _ in range(n)]),
+            "usuário + prefixo": (lambda u, p: catalog.search(name=p, user=u),
+                                  [(rng.choice(USERS), rng.choice(FIRST)) for _ in range(n)]),
+            "prefixo + intervalo": (lambda p, d: catalog.search(name=p, date_from=d),
+                                    [(rng.choice(FIRST), f"{rng.randrange(2015, 2026)}0101") for _ in range(n)]),
+        }
+        results = {label: _timed(func, params) for label, (func, params) in queries.items()}
+        catalog.close()
+        size = sum(p.stat().st_size for p in tmp.glob("catalog.db*"))
+
+    print(f"\n{args.folders} pastas: backfill {backfill_seconds:.2f}s ({backfilled / backfill_seconds:.0f} pastas/s)")
+    print(f"{'busca por prefixo':<22}{'p50':>10}{'p99':>10}{'encontrados':>13}")
+    for label, (samples, found) in (("percorrer pastas", (walk, walk_found)), ("catálogo", (indexed, indexed_found))):
+        p50, p99 = _percentiles(samples)
+        print(f"{label:<22}{p50:8.2f}ms{p99:8.2f}ms{found:13d}")
+
+    print(f"\n{args.records:,} registros: gravação {insert_seconds:.1f}s "
+          f"({args.records / insert_seconds:,.0f}/s), banco {size / 1024**2:.0f} MB (limite de 100 linhas por consulta)")
+    print(f"{'consulta':<22}{'p50':>10}{'p99':>10}{'linhas':>10}")
+    for label, (samples, found) in results.items():
+        p50, p99 = _percentiles(samples)
+        print(f"{label:<22}{p50:8.2f}ms{p99:8.2f}ms{found / n:10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+⏱️ Benchmark da deduplicação de quadros
+Gera um estudo sintético com várias vistas, cada uma salva algumas vezes com pequenas
+variações de ruído (duplicados) e algumas com medidas diferentes na tela (que devem
+ser mantidas), e mostra o tempo do `FrameDeduplicator` e as chamadas de OCR e bytes
+economizados.
+
+Uso: `python -m Benchmarks.bench_dedup [n_vistas] [copias_por_vista]`
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from DicomManager.dedup import FrameDeduplicator
+
+
+def make_study(folder: Path, n_views: int, copies: int, size: tuple[int, int] = (1024, 768)) -> int:
+    """
+    Cria `n_views × copies` quadros quase idênticos e, para cada vista, um quadro
+    extra com medida diferente. Retorna o número de quadros distintos esperado.
+    """
+    rng = np.random.default_rng(1)
+    try:
+        font = ImageFont.load_default(size=24)
+    except TypeError:
+        font = ImageFont.load_default()
+    index = 0
+    for view in range(n_views):
+        base = rng.gamma(1.5, 40, size=(size[1], size[0]))
+        for copy in range(copies + 1):
+            frame = base + rng.normal(0, 2, size=base.shape)
+            img = Image.fromarray(np.stack([frame.clip(0, 255).astype(np.uint8)] * 3, axis=-1), "RGB")
+            draw = ImageDraw.Draw(img)
+            draw.rectangle((0, 0, 300, 160), fill=(0, 0, 0))
+            measure = 1.0 + view / 10 + (0.37 if copy == copies else 0.0)
+            draw.text((16, 16), f"D1 {measure:.2f} cm", fill=(255, 255, 255), font=font)
+            img.save(folder / f"img{index:04d}.jpeg", "JPEG", quality=95)
+            index += 1
+    return n_views * 2
+
+
+def main(n_views: int = 10, copies: int = 4) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = Path(tmp)
+        expected = make_study(folder, n_views, copies)
+        paths = sorted(folder.glob("*.jpeg"))
+
+        start = time.perf_counter()
+        representatives, report = FrameDeduplicator().deduplicate(paths)
+        elapsed = time.perf_counter() - start
+
+        print(f"{report['frames']} quadros -> {report['clusters']} grupos (esperado {expected}) "
+              f"em {elapsed * 1000:.0f} ms ({elapsed * 1000 / len(paths):.1f} ms/quadro)")
+        print(f"Chamadas de OCR economizadas: {report['calls_saved']} | "
+              f"bytes economizados: {report['bytes_saved'] / 1024:.0f} KB")
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 10,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 4,
+    )
@@ -0,0 +1,83 @@
+"""
+⏱️ Benchmark de memória da leitura dos DICOMs
+Converte DICOMs grandes sem compressão (com uma tag privada volumosa, como as gravadas
+por alguns aparelhos) com leitura completa e com leitura adiada + `np.memmap`, medindo
+o pico de memória residente (RSS) e o tempo de cada modo em um processo separado.
+
+Uso: `python -m Benchmarks.bench_dicom_memory [n_arquivos] [lado_px]`
+"""
+
+import contextlib
+import io
+import multiprocessing
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pydicom
+
+from Benchmarks.synthetic_dicom import make_us_image
+
+PRIVATE_BLOB_MB = 16
+
+
+def _make_files(folder: Path, n_files: int, side: int) -> None:
+    for i in range(n_files):
+        path = make_us_image(folder / f"BIG{i:03d}.dcm", rows=side, cols=side, rgb=True, seed=i)
+        ds = pydicom.dcmread(path)
+        block = ds.private_block(0x0099, "SYNTHETIC VENDOR", create=True)
+        block.add_new(0x01, "OB", bytes(PRIVATE_BLOB_MB * 1024 * 1024))
+        ds.save_as(path, enforce_file_format=True)
+
+
+def _peak_rss_mb() -> float:
+    # VmHWM é zerado no exec; ru_maxrss herda o pico do processo pai no Linux
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _worker(dcm_dir: str, images_dir: str, lazy: bool, queue) -> None:
+    from DicomManager.DICOM import DICOM2JPEG
+
+    baseline = _peak_rss_mb()
+    conv = DICOM2JPEG(dcm_dir, images_dir, lazy_pixels=lazy)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        conv.converter()
+    elapsed = time.perf_counter() - start
+    queue.put((elapsed, baseline, _peak_rss_mb()))
+
+
+def main(n_files: int = 8, side: int = 2048) -> None:
+    ctx = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as tmp:
+        dcm_dir = Path(tmp) / "Dicoms"
+        dcm_dir.mkdir()
+        _make_files(dcm_dir, n_files, side)
+        size = sum(p.stat().st_size for p in dcm_dir.glob("*.dcm")) / n_files / 1e6
+
+        print(f"\n{n_files} arquivos {side}x{side} RGB sem compressão ({size:.1f} MB cada, "
+              f"{PRIVATE_BLOB_MB} MB de tag privada)")
+        print(f"{'modo':<22}{'tempo':>8}{'RSS base':>11}{'RSS pico':>11}{'acréscimo':>11}")
+        for lazy, label in ((False, "leitura completa"), (True, "adiada + memmap")):
+            queue = ctx.Queue()
+            proc = ctx.Process(target=_worker, args=(str(dcm_dir), str(Path(tmp) / f"Images_{lazy}"), lazy, queue))
+            proc.start()
+            elapsed, baseline, peak = queue.get()
+            proc.join()
+            print(f"{label:<22}{elapsed:7.2f}s{baseline:9.0f}MB{peak:9.0f}MB{peak - baseline:9.0f}MB")
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 8,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 2048,
+    )
@@ -0,0 +1,59 @@
+"""
+⏱️ Benchmark do caminho sem recompressão do DICOM2JPEG
+Converte estudos sintéticos com e sem JPEG Baseline encapsulado usando o perfil padrão
+(decodifica, realça e recomprime em q99) e o perfil "raw" (grava o quadro JPEG original
+quando possível), medindo tempo, tamanho gerado e fidelidade (PSNR) em relação aos
+pixels do DICOM.
+
+Uso: `python -m Benchmarks.bench_dicom_passthrough [n_imagens]`
+"""
+
+import contextlib
+import io
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pydicom
+from PIL import Image
+
+from DicomManager.DICOM import DICOM2JPEG
+from Benchmarks.synthetic_dicom import make_study
+
+
+def _psnr(a: np.ndarray, b: np.ndarray) -> float:
+    mse = np.mean((a.astype(np.float64) - b.astype(np.float64)) ** 2)
+    return float("inf") if mse == 0 else 10 * np.log10(255 ** 2 / mse)
+
+
+def main(n_images: int = 24) -> None:
+    print(f"\n{n_images} imagens 600x800 RGB por estudo")
+    print(f"{'fonte':<14}{'perfil':<10}{'tempo':>9}{'ms/img':>9}{'MB':>8}{'PSNR dB':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for compressed in (False, True):
+            source = "JPEG encaps." if compressed else "sem compr."
+            dcm_dir = Path(tmp) / f"Dicoms_{compressed}"
+            paths = make_study(dcm_dir, n_images=n_images, compressed=compressed)
+            reference = {p.stem: pydicom.dcmread(p).pixel_array for p in paths}
+
+            for profile in (None, "raw"):
+                images_dir = Path(tmp) / f"Images_{compressed}_{profile}"
+                conv = DICOM2JPEG(str(dcm_dir), str(images_dir), profile=profile)
+                start = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    conv.converter()
+                elapsed = time.perf_counter() - start
+
+                outputs = sorted(images_dir.glob("*.jpeg"))
+                size = sum(p.stat().st_size for p in outputs)
+                psnr = np.mean([
+                    _psnr(np.asarray(Image.open(p).convert("RGB")), reference[p.stem]) for p in outputs
+                ])
+                print(f"{source:<14}{profile or 'padrão':<10}{elapsed:8.2f}s{elapsed / n_images * 1000:9.1f}"
+                      f"{size / 1e6:8.2f}{psnr:10.1f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 24)
@@ -0,0 +1,241 @@
+"""
+⏱️ Benchmark ponta a ponta do pipeline
+Executa o caminho completo de produção — webhook `OnStableStudy` → `StudyIngestor`
+(download das instâncias) → `Convert_Report` (conversão DICOM→JPEG, PDF de imagens,
+achados do SR, laudo com IA e PDF do laudo) — contra um PACS simulado
+(`FakeOrthancServer`) e um modelo simulado (`FakeOpenAIServer`), sem PACS real nem
+chave de API.
+
+Os estudos sintéticos variam entre monocromáticos e RGB, com e sem JPEG encapsulado,
+com cines e com SR. O resultado traz percentis de latência por etapa e ponta a ponta,
+pacientes por hora, pico de memória (RSS) e bytes em disco, e é gravado em JSON
+(`Benchmarks/results/e2e-<commit>.json`) para comparação entre commits com `--compare`.
+
+Deve ser executado da raiz do projeto (usa `Users/` e `Dicoms/`); o usuário temporário
+`Benchmark` é removido ao final.
+
+Uso: `python -m Benchmarks.bench_e2e [--patients 12] [--images 8] [--llm-latency 0.5]
+[--orthanc-latency 0.005] [--gap 0] [--out arquivo.json] [--compare base.json]`
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from pyorthanc import Orthanc
+
+from Benchmarks.fake_openai import FakeOpenAIServer
+from Benchmarks.fake_orthanc import FakeOrthancServer
+from Benchmarks.synthetic_dicom import make_study
+from Pipeline import IngestState, OrthancPool, StudyEventQueue, StudyIngestor, WebhookServer
+
+BENCH_USER = "Benchmark"
+BENCH_AET = "BENCH_AET"
+STAGES = ("download", "convert", "images_pdf", "sr_harvest", "ai_report", "report_pdf", "end_to_end")
+
+
+def _percentiles(values: list[float]) -> dict:
+    if not values:
+        return {}
+    ordered = sorted(values)
+
+    def pick(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 4)
+
+    return {"n": len(ordered), "p50": pick(0.5), "p90": pick(0.9), "p99": pick(0.99), "max": round(ordered[-1], 4)}
+
+
+def _peak_rss_mb() -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def _tree_bytes(path: Path) -> int:
+    return sum(p.stat().st_size for p in path.rglob("*") if p.is_file()) if path.exists() else 0
+
+
+def _commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _studies(root: Path, n_patients: int, n_images: int) -> list[tuple[list, str, dict]]:
+    studies = []
+    for i in range(n_patients):
+        variant = {"rgb": i % 2 == 0, "compressed": i % 3 != 0, "cines": 1 if i % 4 == 0 else 0, "with_sr": i % 2 == 1}
+        paths = make_study(root / f"p{i:03d}", n_images=n_images, prefix=f"P{i:03d}", **variant)
+        studies.append((paths, f"BENCH E2E {i:03d}", variant))
+    return studies
+
+
+def _instrument(timings: dict) -> None:
+    """Envolve as etapas chamadas por `main.Convert_Report` com medição de tempo."""
+    import DicomManager
+    import OCR
+    import PDFMAKER
+
+    def timed(stage: str, func):
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                timings[stage].append(time.perf_counter() - start)
+        return wrapper
+
+    class TimedDICOM2JPEG(DicomManager.DICOM2JPEG):
+        converter = timed("convert", DicomManager.DICOM2JPEG.converter)
+
+    class TimedSRHarvester(DicomManager.SRHarvester):
+        harvest = timed("sr_harvest", DicomManager.SRHarvester.harvest)
+
+    # `main` importa os subsistemas dentro das funções, a partir dos pacotes
+    DicomManager.DICOM2JPEG = TimedDICOM2JPEG
+    DicomManager.SRHarvester = TimedSRHarvester
+    PDFMAKER.MkPDF = timed("images_pdf", PDFMAKER.MkPDF)
+    OCR.process_patient_with_ai = timed("ai_report", OCR.process_patient_with_ai)
+    OCR.markdown_to_pdf = timed("report_pdf", OCR.markdown_to_pdf)
+
+
+def run(args) -> dict:
+    import main as pipeline
+
+    timings: dict[str, list[float]] = defaultdict(list)
+    _instrument(timings)
+    pipeline.OPENAI_API_KEY = "sk-fake"
+    os.environ.setdefault("AI_CACHE", "0")
+    # Sem traces no arquivo real de `Users/`
+    os.environ["METRICS_TRACE_PATH"] = ""
+    os.environ["CATALOG_PATH"] = ""
+
+    users = {BENCH_USER: {"AET": BENCH_AET, "patients": [], "patients_names": []}}
+    done: dict[str, float] = {}
+    sync_start = {}
+
+    def process(user: str, name: str, paths: list) -> None:
+        timings["download"].append(time.perf_counter() - sync_start["t"])
+        pipeline.process_study(user, name, paths)
+        done[name] = time.monotonic()
+
+    with contextlib.ExitStack() as stack:
+        tmp = Path(stack.enter_context(tempfile.TemporaryDirectory()))
+        print(f"🧪 Gerando {args.patients} estudos sintéticos...")
+        studies = _studies(tmp, args.patients, args.images)
+        input_bytes = sum(os.path.getsize(p) for paths, _, _ in studies for p in paths)
+
+        llm = stack.enter_context(FakeOpenAIServer(latency=args.llm_latency))
+        os.environ["OPENAI_BASE_URL"] = llm.base_url
+        events = StudyEventQueue()
+        webhook = stack.enter_context(WebhookServer(events, port=0))
+        pacs = stack.enter_context(FakeOrthancServer(webhook_url=webhook.url, latency=args.orthanc_latency))
+        pool = stack.enter_context(OrthancPool(pacs.url, max_concurrency=8))
+        ingestor = StudyIngestor(Orthanc(pacs.url), users, process, IngestState(None), work_dir="Dicoms", pool=pool)
+        sync_study = ingestor.sync_study
+
+        def timed_sync(study: dict) -> bool:
+            sync_start["t"] = time.perf_counter()
+            return sync_study(study)
+
+        ingestor.sync_study = timed_sync
+        stop = threading.Event()
+        print(f"🏥 Enviando estudos ao PACS simulado (LLM {args.llm_latency:.2f}s, Orthanc {args.orthanc_latency * 1000:.0f} ms)...")
+        # A saída do pipeline (threads do ingestor e do webhook) é descartada durante a medição
+        with contextlib.redirect_stdout(io.StringIO()):
+            worker = threading.Thread(target=ingestor.run, args=(events, stop), daemon=True)
+            worker.start()
+            time.sleep(0.5)
+
+            start = time.monotonic()
+            ids = []
+            for paths, name, _ in studies:
+                ids.append((name, pacs.add_study(paths, name, aet=BENCH_AET)[1]))
+                time.sleep(args.gap)
+            while len(done) < len(ids):
+                time.sleep(0.05)
+            elapsed = time.monotonic() - start
+            stop.set()
+            worker.join()
+
+        timings["end_to_end"] = [done[name] - pacs.stable_at[study] for name, study in ids]
+        output = Path("Users", BENCH_USER)
+        return {
+            "commit": _commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "config": {k: v for k, v in vars(args).items() if k not in ("out", "compare")},
+            "stages": {stage: _percentiles(timings[stage]) for stage in STAGES},
+            "patients_per_hour": round(len(ids) / elapsed * 3600, 1),
+            "wall_s": round(elapsed, 2),
+            "peak_rss_mb": round(_peak_rss_mb(), 1),
+            "disk_bytes": {
+                "input_dicom": input_bytes,
+                "images": sum(_tree_bytes(d / "Images") for d in (output / "Patients").iterdir()),
+                "reports": sum(_tree_bytes(d / "Report") for d in (output / "Patients").iterdir()),
+            },
+            "orthanc": {"requests": sum(pacs.requests.values()), "bytes_sent": pacs.bytes_sent},
+            "llm": {"requests": llm.requests, "request_bytes": llm.request_bytes},
+        }
+
+
+def _print(result: dict, baseline: dict | None) -> None:
+    print(f"\ncommit {result['commit']}  {result['wall_s']}s  {result['patients_per_hour']} pacientes/h  "
+          f"pico RSS {result['peak_rss_mb']} MB")
+    print(f"{'etapa':<12}{'p50':>9}{'p90':>9}{'p99':>9}{'máx':>9}" + (f"{'Δp50':>10}" if baseline else ""))
+    for stage, stats in result["stages"].items():
+        if not stats:
+            continue
+        line = f"{stage:<12}" + "".join(f"{stats[k]:8.3f}s" for k in ("p50", "p90", "p99", "max"))
+        base = (baseline or {}).get("stages", {}).get(stage)
+        if base:
+            line += f"{(stats['p50'] / base['p50'] - 1) * 100 if base['p50'] else 0:+9.1f}%"
+        print(line)
+    disk = result["disk_bytes"]
+    print(f"disco: DICOM {disk['input_dicom'] / 1e6:.1f} MB, imagens {disk['images'] / 1e6:.1f} MB, "
+          f"laudos {disk['reports'] / 1e6:.1f} MB")
+    if baseline:
+        print(f"vs {baseline['commit']}: pacientes/h {baseline['patients_per_hour']} -> {result['patients_per_hour']}, "
+              f"pico RSS {baseline['peak_rss_mb']} -> {result['peak_rss_mb']} MB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark ponta a ponta do pipeline Dicom-PDF")
+    parser.add_argument("--patients", type=int, default=12)
+    parser.add_argument("--images", type=int, default=8, help="imagens por estudo")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="latência do modelo simulado (s)")
+    parser.add_argument("--orthanc-latency", type=float, default=0.005, help="latência do PACS simulado (s)")
+    parser.add_argument("--gap", type=float, default=0.0, help="intervalo entre a chegada dos estudos (s)")
+    parser.add_argument("--out", help="arquivo JSON de resultado (padrão Benchmarks/results/e2e-<commit>.json)")
+    parser.add_argument("--compare", help="JSON de uma execução anterior para comparação")
+    args = parser.parse_args()
+
+    if not os.path.exists("Users/users.json"):
+        raise SystemExit("Execute a partir da raiz do projeto (Users/users.json não encontrado)")
+    try:
+        result = run(args)
+    finally:
+        shutil.rmtree(os.path.join("Users", BENCH_USER), ignore_errors=True)
+
+    baseline = json.loads(Path(args.compare).read_text()) if args.compare else None
+    _print(result, baseline)
+    out = Path(args.out or f"Benchmarks/results/e2e-{result['commit']}.json")
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(result, indent=2))
+    print(f"💾 Resultado gravado em {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+⏱️ Benchmark do transporte de quadros entre os workers de conversão e o processo principal
+Converte um estudo sintético de `--frames` quadros (RGB sem compressão) em série e com
+`--workers` processos, com os quadros decodificados voltando serializados pelo pool
+(`transport="pickle"`) e pelo anel de memória compartilhada (`transport="shm"`). Cada modo
+roda em um processo separado; são medidos o tempo total, a CPU do processo principal e dos
+workers, o pico de RSS do processo principal e os bytes por quadro enviados pelo pool.
+Os JPEGs dos três modos são comparados byte a byte.
+
+Uso: `python -m Benchmarks.bench_frame_transport [--frames 200] [--rows 600] [--cols 800] [--workers 2]`
+"""
+
+import argparse
+import contextlib
+import hashlib
+import io
+import multiprocessing
+import pickle
+import resource
+import tempfile
+import time
+from pathlib import Path
+
+from PIL import Image
+
+from Benchmarks.synthetic_dicom import make_study
+
+
+def _peak_rss_mb() -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def _worker(dcm_dir: str, images_dir: str, workers: int, transport: str, queue) -> None:
+    from DicomManager.DICOM import DICOM2JPEG
+
+    conv = DICOM2JPEG(dcm_dir, images_dir, workers=workers, transport=transport)
+    cpu_before = time.process_time()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        conv.converter()
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpu_before
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    queue.put((elapsed, cpu, children.ru_utime + children.ru_stime, _peak_rss_mb()))
+
+
+def _digests(folder: Path) -> dict[str, str]:
+    return {p.name: hashlib.sha256(p.read_bytes()).hexdigest() for p in sorted(folder.glob("*.jpeg"))}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Quadros serializados vs memória compartilhada")
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--rows", type=int, default=600)
+    parser.add_argument("--cols", type=int, default=800)
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+
+    # Bytes que cada quadro decodificado ocupa no pool, em cada transporte
+    sample = Image.new("RGB", (args.cols, args.rows))
+    pipe_bytes = {
+        "série": 0,
+        "pickle": len(pickle.dumps({"mode": "decode", "image": sample})),
+        "shm": len(pickle.dumps({"mode": "decode", "slot": 0, "size": (args.rows, args.cols)})),
+    }
+
+    ctx = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        dcm_dir = tmp / "Dicoms"
+        print(f"🧪 Gerando {args.frames} quadros {args.cols}x{args.rows} RGB sem compressão...")
+        make_study(dcm_dir, n_images=args.frames, rgb=True, rows=args.rows, cols=args.cols)
+
+        rows, digests = [], {}
+        for label, workers, transport in (("série", 0, "shm"), ("pickle", args.workers, "pickle"),
+                                          ("shm", args.workers, "shm")):
+            images = tmp / f"Images-{label}"
+            queue = ctx.Queue()
+            proc = ctx.Process(target=_worker, args=(str(dcm_dir), str(images), workers, transport, queue))
+            proc.start()
+            rows.append((label, *queue.get()))
+            proc.join()
+            digests[label] = _digests(images)
+
+    print(f"\n{args.frames} quadros, {args.workers} workers")
+    print(f"{'transporte':<12}{'tempo':>8}{'quadros/s':>11}{'CPU princ.':>12}{'CPU workers':>13}"
+          f"{'RSS princ.':>12}{'pool/quadro':>13}")
+    for label, elapsed, cpu, cpu_children, peak in rows:
+        print(f"{label:<12}{elapsed:7.2f}s{args.frames / elapsed:11.1f}{cpu:11.2f}s{cpu_children:12.2f}s"
+              f"{peak:10.0f}MB{pipe_bytes[label] / 1024:11.1f}KB")
+    same = len(digests["série"]) == args.frames and digests["série"] == digests["pickle"] == digests["shm"]
+    print(("✅ JPEGs idênticos" if same else "❌ JPEGs diferentes") + " nos três modos")
+
+
+if __name__ == "__main__":
+    main()
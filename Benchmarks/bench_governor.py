@@ -0,0 +1,140 @@
+"""
+⏱️ Teste de estresse do ResourceGovernor
+Processa um backlog misto — ZIPs com quadros grandes de 16 bits sem compressão (que a
+conversão normaliza em `float64`) e ZIPs pequenos de ultrassom comprimido — com até
+`--workers` processos, sem governador de memória e com o teto `--limit`. Uma thread mede o
+RSS do processo e dos workers a cada 20 ms e o pico é comparado ao teto.
+
+Deve ser executado da raiz do projeto (usa `Users/`); o usuário temporário `Benchmark` é
+removido ao final.
+
+Uso: `python -m Benchmarks.bench_governor [--large 4] [--small 8] [--side 3072] [--limit 1G] [--workers 4]`
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import threading
+import zipfile
+from pathlib import Path
+
+import numpy as np
+import pydicom
+
+os.environ.setdefault("ARCHIVES_PATH", "")
+
+from Benchmarks.synthetic_dicom import make_study, make_us_image
+from Pipeline import BacklogProcessor
+from Pipeline.governor import ResourceGovernor, estimate_zip, parse_size, tree_rss
+
+BENCH_USER = "Benchmark"
+MB = 1024**2
+
+
+def _make_zip(path: Path, name: str, dicoms: list[Path]) -> None:
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED, compresslevel=1) as archive:
+        for k, dicom in enumerate(dicoms):
+            archive.write(dicom, f"20250604101010 {name}/20250604/CT/IM{k:04d}.dcm")
+
+
+def _make_large(folder: Path, side: int, n_images: int, seed: int) -> list[Path]:
+    # Quadros monocromáticos de 12 bits em 16 bits alocados, sem compressão
+    folder.mkdir()
+    paths = []
+    for i in range(n_images):
+        path = make_us_image(folder / f"L{seed}{i:03d}.dcm", rows=side, cols=side, rgb=False, seed=seed * 10 + i)
+        ds = pydicom.dcmread(path)
+        pixels = ds.pixel_array.astype(np.uint16) * 16
+        ds.BitsAllocated, ds.BitsStored, ds.HighBit = 16, 12, 11
+        ds.PixelData = pixels.tobytes()
+        ds.save_as(path, enforce_file_format=True)
+        paths.append(path)
+    return paths
+
+
+class _Sampler(threading.Thread):
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.peak = 0
+        self.done = threading.Event()
+
+    def run(self):
+        while not self.done.wait(0.02):
+            self.peak = max(self.peak, tree_rss() or 0)
+
+
+def _run(zip_dir: Path, tmp: Path, governor: ResourceGovernor) -> tuple[dict, int]:
+    import main as pipeline
+
+    sampler = _Sampler()
+    sampler.start()
+    with contextlib.redirect_stdout(io.StringIO()):
+        summary = BacklogProcessor(pipeline.Extract_Convert_Img, BENCH_USER, zip_dir=str(zip_dir),
+                                   work_root=str(tmp / "work"), log_path=None, governor=governor).run()
+    sampler.done.set()
+    sampler.join()
+    shutil.rmtree(os.path.join("Users", BENCH_USER), ignore_errors=True)
+    return summary, sampler.peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Teste de estresse do teto de memória do backlog")
+    parser.add_argument("--large", type=int, default=4, help="ZIPs com quadros grandes de 16 bits")
+    parser.add_argument("--small", type=int, default=8, help="ZIPs pequenos comprimidos")
+    parser.add_argument("--side", type=int, default=3072, help="lado dos quadros grandes, em pixels")
+    parser.add_argument("--limit", default="1G", help="teto de memória do processo e dos workers")
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    if not os.path.exists("Users/users.json"):
+        raise SystemExit("Execute a partir da raiz do projeto (Users/users.json não encontrado)")
+    import main as pipeline
+
+    pipeline.OPENAI_API_KEY = None
+    os.environ["METRICS_TRACE_PATH"] = ""
+    os.environ["CATALOG_PATH"] = ""
+    limit = parse_size(args.limit)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        zip_dir = tmp / "ZIPS"
+        zip_dir.mkdir()
+        print(f"🧪 Gerando {args.large} ZIPs grandes ({args.side}x{args.side}, 16 bits) e {args.small} pequenos...")
+        for i in range(args.large):
+            _make_zip(zip_dir / f"LARGE {i:02d}.zip", f"BENCH LARGE {i:02d}", _make_large(tmp / f"l{i}", args.side, 2, i))
+        for i in range(args.small):
+            dicoms = make_study(tmp / f"s{i}", n_images=3, rgb=True, compressed=True, prefix=f"S{i}")
+            _make_zip(zip_dir / f"SMALL {i:02d}.zip", f"BENCH SMALL {i:02d}", dicoms)
+        large = estimate_zip(str(zip_dir / "LARGE 00.zip"))
+        small = estimate_zip(str(zip_dir / "SMALL 00.zip"))
+        print(f"   estimativa por job: grande {large / MB:.0f} MB, pequeno {small / MB:.0f} MB")
+
+        rows = []
+        try:
+            # Sem governador de memória: todos os workers disponíveis desde o início
+            ungoverned = ResourceGovernor(memory_limit=0, max_workers=args.workers)
+            ungoverned.adapt = lambda queued: ungoverned.target
+            print(f"── sem teto, {args.workers} workers")
+            rows.append(("sem teto", *_run(zip_dir, tmp, ungoverned)))
+
+            governor = ResourceGovernor(memory_limit=limit, max_workers=args.workers)
+            print(f"── teto de {limit / MB:.0f} MB, até {args.workers} workers")
+            rows.append((f"teto {limit / MB:.0f} MB", *_run(zip_dir, tmp, governor)))
+        finally:
+            shutil.rmtree(os.path.join("Users", BENCH_USER), ignore_errors=True)
+
+    print(f"\n{'execução':<16}{'tempo':>8}{'falhas':>8}{'conc. máx':>11}{'RSS pico':>11}{'teto':>9}  escala")
+    for label, summary, peak in rows:
+        g = summary["governor"]
+        ceiling = f"{g['memory_limit'] / MB:.0f}MB" if g["memory_limit"] else "-"
+        print(f"{label:<16}{summary['seconds']:7.1f}s{len(summary['failed']):8d}{g['peak_concurrency']:11d}"
+              f"{peak / MB:9.0f}MB{ceiling:>9}  {g['scale']}")
+    peak = rows[-1][2]
+    print(("✅ teto respeitado" if peak <= limit else "❌ teto excedido") + f": pico {peak / MB:.0f} MB de {limit / MB:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
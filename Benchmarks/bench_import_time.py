@@ -0,0 +1,130 @@
+"""
+⏱️ Benchmark do tempo de importação por comando
+Executa cada ponto de entrada de `cli.py` (e o `import main`) em um processo novo com
+`python -X importtime` e resume o tempo total de importação, o número de módulos
+carregados e quais subsistemas pesados (pyorthanc, openai, reportlab, pydicom, NumPy,
+PIL, httpx) cada comando carregou.
+
+Os comandos rodam de verdade: `convert-zip` sobre um ZIP sintético, `build-pdf` e
+`ai-report` (modelo simulado) sobre o paciente gerado — na raiz do projeto, com o usuário
+temporário `Benchmark`, removido ao final — e `monitor` contra o PACS simulado até a
+primeira reconciliação, em uma pasta temporária com cópia de `Users/users.json` (o estado
+da ingestão não toca o `Users/` real). O resultado é gravado em
+`Benchmarks/results/import-<commit>.json`.
+
+Uso: `python -m Benchmarks.bench_import_time [--compare base.json]`
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+from Benchmarks.fake_openai import FakeOpenAIServer
+from Benchmarks.fake_orthanc import FakeOrthancServer
+from Benchmarks.synthetic_dicom import make_study
+
+ROOT = Path(__file__).resolve().parent.parent
+HEAVY = ("pyorthanc", "httpx", "openai", "reportlab", "pydicom", "numpy", "PIL")
+PATIENT = "BENCH IMPORT"
+
+
+def _parse(stderr: str) -> dict:
+    total, modules, loaded = 0, 0, set()
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        modules += 1
+        if not name[1:].startswith(" "):
+            total += int(cumulative)
+        loaded.add(name.strip())
+    return {"import_ms": round(total / 1000, 1), "modules": modules, "heavy": [m for m in HEAVY if m in loaded]}
+
+
+def _run(argv: list[str], cwd: Path, env: dict, until: str | None = None) -> dict:
+    command = [sys.executable, "-X", "importtime", *argv]
+    if until is None:
+        result = subprocess.run(command, cwd=cwd, env=env, capture_output=True, text=True, timeout=300)
+        if result.returncode:
+            raise RuntimeError(f"{argv} falhou:\n{result.stdout[-2000:]}\n{result.stderr[-2000:]}")
+        return _parse(result.stderr)
+
+    # Processos de longa duração (monitor): encerrados ao imprimir `until`
+    stderr_path = Path(tempfile.mkstemp(suffix=".txt")[1])
+    with open(stderr_path, "w") as stderr:
+        process = subprocess.Popen(command, cwd=cwd, env=env, stdout=subprocess.PIPE, stderr=stderr, text=True)
+        deadline = time.monotonic() + 60
+        for line in process.stdout:
+            if until in line or time.monotonic() > deadline:
+                break
+        process.terminate()
+        process.wait(timeout=10)
+    result = _parse(stderr_path.read_text())
+    stderr_path.unlink()
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Tempo de importação de cada comando do cli.py")
+    parser.add_argument("--out", help="arquivo JSON de resultado (padrão Benchmarks/results/import-<commit>.json)")
+    parser.add_argument("--compare", help="JSON de uma execução anterior para comparação")
+    args = parser.parse_args()
+
+    cli = str(ROOT / "cli.py")
+    zip_path = ROOT / "ZIPS" / f"{PATIENT}.zip"
+    with tempfile.TemporaryDirectory() as tmp, FakeOpenAIServer(latency=0.0) as llm, FakeOrthancServer() as pacs:
+        tmp = Path(tmp)
+        work = tmp / "work"
+        (work / "Users").mkdir(parents=True)
+        shutil.copy(ROOT / "Users" / "users.json", work / "Users" / "users.json")
+        paths = make_study(tmp / "study", n_images=4, compressed=True, prefix="I")
+        zip_path.parent.mkdir(exist_ok=True)
+        with zipfile.ZipFile(zip_path, "w") as archive:
+            for i, path in enumerate(paths):
+                archive.write(path, f"20250604101010 {PATIENT}/20250604/US/IM{i:04d}.dcm")
+
+        env = {**os.environ, "PYTHONPATH": str(ROOT), "OPENAI_API_KEY": "", "METRICS_TRACE_PATH": "",
+               "CATALOG_PATH": "", "ARCHIVES_PATH": "", "PYTHONDONTWRITEBYTECODE": "1"}
+        ai_env = {**env, "OPENAI_API_KEY": "sk-fake", "OPENAI_BASE_URL": llm.base_url, "AI_CACHE": "0"}
+        monitor_env = {**env, "ORTHANC_URL": pacs.url, "ORTHANC_WEBHOOK_PORT": "0", "METRICS_PORT": "0",
+                       "PYTHONUNBUFFERED": "1"}
+
+        try:
+            # Uma execução descartada aquece o cache de bytecode e de disco
+            _run(["-c", "import main, cli"], ROOT, env)
+            cases = {
+                "import main": _run(["-c", "import main"], ROOT, env),
+                "cli --help": _run([cli, "--help"], ROOT, env),
+                "convert-zip": _run([cli, "convert-zip", zip_path.name, "--user", "Benchmark"], ROOT, env),
+                "build-pdf": _run([cli, "build-pdf", PATIENT, "--user", "Benchmark"], ROOT, env),
+                "ai-report": _run([cli, "ai-report", PATIENT, "--user", "Benchmark"], ROOT, ai_env),
+                "monitor": _run([cli, "monitor"], work, monitor_env, until="Reconciliação:"),
+            }
+        finally:
+            zip_path.unlink(missing_ok=True)
+            shutil.rmtree(ROOT / "Users" / "Benchmark", ignore_errors=True)
+
+    commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                            cwd=ROOT).stdout.strip() or "unknown"
+    baseline = json.loads(Path(args.compare).read_text())["commands"] if args.compare else {}
+    print(f"\n{'comando':<14}{'import':>10}{'módulos':>9}{'Δ':>9}   subsistemas pesados")
+    for name, data in cases.items():
+        base = baseline.get(name)
+        delta = f"{(data['import_ms'] / base['import_ms'] - 1) * 100:+8.0f}%" if base else ""
+        print(f"{name:<14}{data['import_ms']:8.0f}ms{data['modules']:9d}{delta:>9}   {', '.join(data['heavy']) or '-'}")
+
+    out = Path(args.out or ROOT / "Benchmarks" / "results" / f"import-{commit}.json")
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps({"commit": commit, "commands": cases}, indent=2))
+    print(f"💾 Resultado gravado em {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+⏱️ Benchmark da ingestão incremental por estudo
+Simula a vida de um paciente no PACS — primeiro exame, instâncias extras chegando
+depois do primeiro processamento e um exame de retorno — e compara os bytes baixados
+pelo `StudyIngestor` (apenas instâncias novas) com o download do arquivo completo do
+paciente que a versão por paciente exigiria para se atualizar. Confere também que as
+imagens de cada pasta de estudo acompanham as instâncias recebidas.
+
+Deve ser executado da raiz do projeto (usa `Users/` e `Dicoms/`); o usuário temporário
+`Benchmark` é removido ao final.
+
+Uso: `python -m Benchmarks.bench_incremental`
+"""
+
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from pyorthanc import Orthanc
+
+from Benchmarks.fake_orthanc import FakeOrthancServer
+from Benchmarks.synthetic_dicom import make_study
+from Pipeline import IngestState, StudyIngestor
+
+BENCH_USER = "Benchmark"
+BENCH_AET = "BENCH_AET"
+
+
+def _wait_stable(pacs: FakeOrthancServer, study_id: str, since: float) -> None:
+    while pacs.stable_at.get(study_id, 0) <= since:
+        time.sleep(0.01)
+
+
+def main() -> None:
+    if not os.path.exists("Users/users.json"):
+        raise SystemExit("Execute a partir da raiz do projeto (Users/users.json não encontrado)")
+    import main as pipeline
+
+    pipeline.OPENAI_API_KEY = None
+    # Sem traces no arquivo real de `Users/`
+    os.environ["METRICS_TRACE_PATH"] = ""
+    os.environ["CATALOG_PATH"] = ""
+    users = {BENCH_USER: {"AET": BENCH_AET, "patients": [], "patients_names": []}}
+    patients_dir = Path("Users", BENCH_USER, "Patients")
+
+    def process(user: str, name: str, paths: list) -> None:
+        with contextlib.redirect_stdout(io.StringIO()):
+            pipeline.process_study(user, name, paths)
+
+    with tempfile.TemporaryDirectory() as tmp, FakeOrthancServer() as pacs:
+        tmp = Path(tmp)
+        ingestor = StudyIngestor(
+            Orthanc(pacs.url), users, process, IngestState(None), work_dir="Dicoms",
+        )
+        first = make_study(tmp / "exam1", n_images=12, compressed=True, prefix="A")
+        extra = make_study(tmp / "extra", n_images=2, compressed=True, prefix="B")
+        follow_up = make_study(tmp / "exam2", n_images=4, compressed=True, prefix="C")
+
+        patient: dict = {}
+
+        def step(label: str, paths: list, add) -> None:
+            since = time.monotonic()
+            study_id = add()
+            _wait_stable(pacs, study_id, since)
+
+            before = ingestor.bytes_downloaded
+            with contextlib.redirect_stdout(io.StringIO()):
+                ingestor.reconcile()
+            downloaded = ingestor.bytes_downloaded - before
+            new_bytes = sum(os.path.getsize(p) for p in paths)
+            legacy = len(pacs.archive([s for s, d in pacs.studies.items() if d["ParentPatient"] == patient["id"]]))
+            images = {d.name: len(list((d / "Images").glob("*.jpeg"))) for d in sorted(patients_dir.iterdir())}
+            print(f"{label:<30}{new_bytes / 1e6:9.2f}{downloaded / 1e6:12.2f}{legacy / 1e6:13.2f}"
+                  f"{downloaded / new_bytes:9.2f}   {images}")
+
+        def add_first_exam() -> str:
+            patient["id"], patient["study"] = pacs.add_study(first, "BENCH INCREMENTAL", aet=BENCH_AET)
+            return patient["study"]
+
+        def add_extra_instances() -> str:
+            pacs.add_instances(patient["study"], extra)
+            return patient["study"]
+
+        def add_follow_up() -> str:
+            return pacs.add_study(follow_up, "BENCH INCREMENTAL", aet=BENCH_AET,
+                                  patient_id=patient["id"], study_date="20251020")[1]
+
+        print(f"\n{'evento':<30}{'novo MB':>9}{'baixado MB':>12}{'ZIP pac. MB':>13}{'razão':>9}   imagens por pasta")
+        try:
+            step("1º exame (12 imagens)", first, add_first_exam)
+            step("+2 instâncias no 1º exame", extra, add_extra_instances)
+            step("exame de retorno (4 imagens)", follow_up, add_follow_up)
+        finally:
+            shutil.rmtree(os.path.join("Users", BENCH_USER), ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+⏱️ Benchmark de latência da ingestão
+Mede o tempo entre o estudo ficar estável no PACS e o início do processamento / o PDF
+ser gravado, com o monitor por consulta periódica (intervalo de 10 s, como o laço
+antigo) e com o webhook `OnStableStudy`, usando o `FakeOrthancServer` e o processamento real do `main.py`.
+Também conta as requisições feitas ao PACS em cada modo.
+
+Deve ser executado da raiz do projeto (usa `Users/` e `Dicoms/`); o usuário temporário
+`Benchmark` é removido ao final.
+
+Uso: `python -m Benchmarks.bench_ingest_latency [n_estudos] [intervalo_entre_estudos_s]`
+"""
+
+import contextlib
+import io
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from pyorthanc import Orthanc
+
+from Benchmarks.fake_orthanc import FakeOrthancServer
+from Benchmarks.synthetic_dicom import make_study
+from Pipeline import StudyEventQueue, StudyIngestor, WebhookServer
+
+BENCH_USER = "Benchmark"
+BENCH_AET = "BENCH_AET"
+
+
+def _run(mode: str, studies: list, gap: float) -> tuple[list, list, dict]:
+    import main
+
+    main.OPENAI_API_KEY = None
+    # Sem traces no arquivo real de `Users/`
+    os.environ["METRICS_TRACE_PATH"] = ""
+    os.environ["CATALOG_PATH"] = ""
+    users = {BENCH_USER: {"AET": BENCH_AET, "patients": [], "patients_names": []}}
+    started: dict[str, float] = {}
+    done: dict[str, float] = {}
+    events = StudyEventQueue() if mode == "webhook" else None
+
+    def process(user: str, name: str, paths: list) -> None:
+        started[name] = time.monotonic()
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = main.process_study(user, name, paths)
+        if result and os.path.exists(result):
+            done[name] = time.monotonic()
+
+    with contextlib.ExitStack() as stack:
+        webhook_url = None
+        if events is not None:
+            webhook_url = stack.enter_context(WebhookServer(events, port=0)).url
+        pacs = stack.enter_context(FakeOrthancServer(webhook_url=webhook_url))
+        client = Orthanc(pacs.url)
+        ingestor = StudyIngestor(
+            client, users, process, work_dir="Dicoms",
+            reconcile_interval=300.0 if events is not None else 10.0,
+        )
+        stop = threading.Event()
+        with contextlib.redirect_stdout(io.StringIO()):
+            worker = threading.Thread(target=ingestor.run, args=(events, stop), daemon=True)
+            worker.start()
+            time.sleep(0.5)
+
+            ids = []
+            for paths, name in studies:
+                ids.append((name, pacs.add_study(paths, name, aet=BENCH_AET)[1]))
+                time.sleep(gap)
+            while len(done) < len(ids):
+                time.sleep(0.05)
+            stop.set()
+            worker.join()
+
+        waits = [started[name] - pacs.stable_at[study] for name, study in ids]
+        latencies = [done[name] - pacs.stable_at[study] for name, study in ids]
+        return waits, latencies, dict(pacs.requests)
+
+
+def main(n_studies: int = 3, gap: float = 10.0) -> None:
+    if not os.path.exists("Users/users.json"):
+        raise SystemExit("Execute a partir da raiz do projeto (Users/users.json não encontrado)")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        studies = [
+            (make_study(Path(tmp) / f"s{i}", n_images=8, rgb=True, compressed=True), f"BENCH PACIENTE {i:02d}")
+            for i in range(n_studies)
+        ]
+        print(f"\n{n_studies} estudos de 8 imagens, um a cada {gap:.1f}s")
+        print(f"{'modo':<26}{'espera média':>14}{'até o PDF (média)':>19}{'máx':>8}{'req. PACS':>11}")
+        try:
+            for mode, label in (("polling", "consulta a cada 10 s"), ("webhook", "webhook OnStableStudy")):
+                waits, latencies, requests = _run(mode, studies, gap)
+                print(f"{label:<26}{statistics.mean(waits):13.2f}s{statistics.mean(latencies):18.2f}s"
+                      f"{max(latencies):7.2f}s{sum(requests.values()):11d}")
+        finally:
+            shutil.rmtree(os.path.join("Users", BENCH_USER), ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 3,
+        float(sys.argv[2]) if len(sys.argv) > 2 else 10.0,
+    )
@@ -0,0 +1,42 @@
+"""
+⏱️ Benchmark do parser markdown dos laudos
+Mede a vazão de `parse_markdown` e da renderização completa em PDF para laudos de
+tamanho crescente. O tempo por KB deve se manter estável conforme o documento cresce,
+evidenciando o custo linear do parser.
+
+Uso: `python -m Benchmarks.bench_markdown_ast [repeticoes]`
+"""
+
+import sys
+import time
+
+from OCR.markdown_ast import parse_markdown
+from OCR.markdown_to_pdf import ReportRenderer
+from Benchmarks.samples import SAMPLE_REPORT, SAMPLE_STRUCTURED
+
+
+def _best_of(func, repeats: int) -> float:
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(repeats: int = 5) -> None:
+    renderer = ReportRenderer(cache_size=0)
+    unit = SAMPLE_REPORT + SAMPLE_STRUCTURED
+
+    print(f"{'cópias':>7} {'KB':>8} {'parse ms':>9} {'parse MB/s':>11} {'pdf ms':>9} {'µs/KB parse':>12}")
+    for copies in (1, 4, 16, 64, 256):
+        document = unit * copies
+        size_kb = len(document.encode('utf-8')) / 1024
+        parse_s = _best_of(lambda: parse_markdown(document), repeats)
+        pdf_s = _best_of(lambda: renderer.render(document), 1 if copies > 16 else repeats)
+        print(f"{copies:>7} {size_kb:>8.1f} {parse_s * 1000:>9.2f} {size_kb / 1024 / parse_s:>11.2f} "
+              f"{pdf_s * 1000:>9.1f} {parse_s * 1e6 / size_kb:>12.1f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
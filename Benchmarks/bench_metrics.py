@@ -0,0 +1,103 @@
+"""
+⏱️ Benchmark da instrumentação por etapa
+Processa alguns estudos sintéticos pelo caminho do monitor (`StudyIngestor` contra o PACS
+simulado, com laudo pelo modelo simulado), lê o `GET /metrics` do `MetricsServer` e o
+trace JSON lines de cada estudo, e mede o custo de um `stage()` vazio em relação à
+conversão de uma imagem.
+
+Deve ser executado da raiz do projeto (usa `Users/` e `Dicoms/`); o usuário temporário
+`Benchmark` é removido ao final.
+
+Uso: `python -m Benchmarks.bench_metrics`
+"""
+
+import contextlib
+import io
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+import urllib.request
+from pathlib import Path
+
+from pyorthanc import Orthanc
+
+from Benchmarks.fake_openai import FakeOpenAIServer
+from Benchmarks.fake_orthanc import FakeOrthancServer
+from Benchmarks.synthetic_dicom import make_study
+from Pipeline import METRICS, IngestState, MetricsServer, StudyIngestor, stage
+
+BENCH_USER = "Benchmark"
+BENCH_AET = "BENCH_AET"
+N = 100_000
+
+
+def _span_overhead() -> float:
+    start = time.perf_counter()
+    for _ in range(N):
+        with stage("bench_overhead"):
+            pass
+    return (time.perf_counter() - start) / N
+
+
+def main() -> None:
+    if not os.path.exists("Users/users.json"):
+        raise SystemExit("Execute a partir da raiz do projeto (Users/users.json não encontrado)")
+    import main as pipeline
+
+    pipeline.OPENAI_API_KEY = "sk-fake"
+    os.environ.setdefault("AI_CACHE", "0")
+    users = {BENCH_USER: {"AET": BENCH_AET, "patients": [], "patients_names": []}}
+
+    with contextlib.ExitStack() as stack:
+        tmp = Path(stack.enter_context(tempfile.TemporaryDirectory()))
+        os.environ["METRICS_TRACE_PATH"] = str(tmp / "traces.jsonl")
+        os.environ["CATALOG_PATH"] = ""
+        llm = stack.enter_context(FakeOpenAIServer(latency=0.05))
+        os.environ["OPENAI_BASE_URL"] = llm.base_url
+        pacs = stack.enter_context(FakeOrthancServer())
+        server = stack.enter_context(MetricsServer(port=0))
+        ingestor = StudyIngestor(Orthanc(pacs.url), users, pipeline.process_study, IngestState(None),
+                                 work_dir="Dicoms")
+        for i in range(3):
+            paths = make_study(tmp / f"p{i}", n_images=6, rgb=i % 2 == 0, compressed=i != 1, prefix=f"M{i}")
+            pacs.add_study(paths, f"BENCH METRICS {i}", aet=BENCH_AET)
+        time.sleep(0.2)
+
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                ingestor.reconcile()
+            text = urllib.request.urlopen(server.url, timeout=5).read().decode("utf-8")
+            traces = [json.loads(line) for line in (tmp / "traces.jsonl").read_text().splitlines()]
+        finally:
+            shutil.rmtree(os.path.join("Users", BENCH_USER), ignore_errors=True)
+
+    def value(name: str, stage_name: str) -> float:
+        match = re.search(rf'^dicompdf_{name}{{stage="{stage_name}"}} (\S+)$', text, re.M)
+        return float(match.group(1)) if match else 0.0
+
+    stages = sorted(set(re.findall(r'dicompdf_stage_seconds_count{stage="([^"]+)"}', text)))
+    print(f"\n/metrics ({len(text.splitlines())} linhas)")
+    print(f"{'etapa':<12}{'n':>6}{'média':>10}{'bytes':>12}{'itens':>8}{'erros':>7}")
+    for name in stages:
+        count = value("stage_seconds_count", name)
+        mean = value("stage_seconds_sum", name) / count if count else 0.0
+        print(f"{name:<12}{count:6.0f}{mean:9.3f}s{value('stage_bytes_total', name):12.0f}"
+              f"{value('stage_items_total', name):8.0f}{value('stage_errors_total', name):7.0f}")
+
+    print(f"\ntraces: {len(traces)} linhas")
+    for record in traces:
+        totals = ", ".join(f"{k} {v:.2f}s" for k, v in record["totals"].items())
+        print(f"  {record['patient']}: {record['seconds']:.2f}s ({len(record['stages'])} etapas) — {totals}")
+
+    overhead = _span_overhead()
+    convert = METRICS.snapshot()["convert"]
+    per_image = convert["sum"] / convert["count"]
+    print(f"\ncusto de um stage(): {overhead * 1e6:.2f} µs "
+          f"({overhead / per_image * 100:.3f}% de uma conversão de {per_image * 1000:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
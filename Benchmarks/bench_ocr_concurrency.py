@@ -0,0 +1,51 @@
+"""
+⏱️ Benchmark de concorrência do OCR
+Executa `GPTVision.process_patient_images` sobre um estudo sintético contra o
+`FakeOpenAIServer` com latência simulada, variando o limite de requisições simultâneas.
+
+Uso: `python -m Benchmarks.bench_ocr_concurrency [n_imagens] [latencia_s]`
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from PIL import Image
+
+from OCR.gpt_ocr import GPTVision
+from Benchmarks.fake_openai import FakeOpenAIServer
+
+
+def make_study(folder: Path, n_images: int, size: tuple[int, int] = (320, 240)) -> None:
+    """Gera `n_images` JPEGs pequenos numerados em `folder`."""
+    for i in range(n_images):
+        Image.new("RGB", size, (i % 256, 64, 128)).save(folder / f"img{i:04d}.jpeg", "JPEG")
+
+
+def main(n_images: int = 40, latency: float = 0.5) -> None:
+    with tempfile.TemporaryDirectory() as tmp, FakeOpenAIServer(latency=latency) as server:
+        folder = Path(tmp)
+        make_study(folder, n_images)
+        n_batches = -(-n_images // 4)
+        print(f"{n_images} imagens, {n_batches} lotes, latência {latency:.2f}s por chamada")
+        print(f"{'em voo':>7} {'tempo s':>8} {'speedup':>8} {'pico':>5}")
+
+        baseline = None
+        for in_flight in (1, 2, 4, 8, n_batches):
+            server.max_concurrent = 0
+            ocr = GPTVision("sk-fake", base_url=server.base_url, max_in_flight=in_flight)
+            start = time.perf_counter()
+            ocr.process_patient_images(str(folder))
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            expected = "\n".join(f"OCR de {min(4, n_images - i)} imagens" for i in range(0, n_images, 4)) + "\n"
+            assert ocr.text == expected, "resultados fora de ordem"
+            print(f"{in_flight:>7} {elapsed:>8.2f} {baseline / elapsed:>8.2f} {server.max_concurrent:>5}")
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 40,
+        float(sys.argv[2]) if len(sys.argv) > 2 else 0.5,
+    )
@@ -0,0 +1,108 @@
+"""
+⏱️ Benchmark do preparo de imagens para o OCR
+Compara o caminho original (JPEG q99 enviado sem alterações) com o preparo de
+`OCR/image_prep.py` em bytes por requisição e latência contra o `FakeOpenAIServer`
+com banda de subida simulada.
+
+A verificação de acurácia lê o texto das imagens originais e preparadas com o
+Tesseract (`pytesseract`, opcional) e compara com o texto esperado. Além do conjunto
+sintético, uma pasta de fixtures reais pode ser informada: cada imagem deve ter um
+`.txt` ao lado com os trechos esperados, um por linha.
+
+Uso: `python -m Benchmarks.bench_ocr_payload [pasta_fixtures]`
+"""
+
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from OCR.gpt_ocr import GPTVision
+from OCR.image_prep import prepare_ocr_image
+from Benchmarks.fake_openai import FakeOpenAIServer
+
+UPLINK_BYTES_PER_S = 2.5e6  # ~20 Mbit/s
+PROFILES = {
+    "original": {},
+    "1536/q85": {"max_edge": 1536, "quality": 85},
+    "1024/q80": {"max_edge": 1024, "quality": 80},
+    "768/q70": {"max_edge": 768, "quality": 70},
+}
+
+
+def make_fixtures(folder: Path, n_images: int = 8, size: tuple[int, int] = (1552, 1164)) -> None:
+    """
+    Gera imagens semelhantes a telas de ultrassom: speckle em um setor central e
+    medidas em texto no canto, salvas como JPEG q99 com um `.txt` de gabarito.
+    """
+    rng = np.random.default_rng(0)
+    try:
+        font = ImageFont.load_default(size=28)
+    except TypeError:
+        font = ImageFont.load_default()
+    for i in range(n_images):
+        speckle = rng.gamma(1.5, 40, size=(size[1], size[0])).clip(0, 255).astype(np.uint8)
+        img = Image.fromarray(np.stack([speckle] * 3, axis=-1), "RGB")
+        draw = ImageDraw.Draw(img)
+        draw.rectangle((0, 0, 420, size[1]), fill=(0, 0, 0))
+        lines = [
+            f"D{j + 1} {random.Random(i * 10 + j).uniform(0.2, 9.9):.2f} cm" for j in range(3)
+        ] + ["Freq 4.7 MHz", "Gn 42", "DR 66"]
+        for j, line in enumerate(lines):
+            draw.text((20, 40 + j * 44), line, fill=(255, 255, 255), font=font)
+        path = folder / f"img{i:04d}.jpeg"
+        img.save(path, "JPEG", quality=99)
+        path.with_suffix(".txt").write_text("\n".join(lines), encoding="utf-8")
+
+
+def _accuracy(folder: Path, settings: dict) -> float | None:
+    try:
+        import pytesseract
+    except ImportError:
+        return None
+    import io
+
+    found = total = 0
+    for image_path in sorted(folder.glob("*.jpeg")):
+        expected = image_path.with_suffix(".txt")
+        if not expected.exists():
+            continue
+        data = prepare_ocr_image(str(image_path), **settings) if settings else image_path.read_bytes()
+        text = pytesseract.image_to_string(Image.open(io.BytesIO(data)))
+        for line in expected.read_text(encoding="utf-8").splitlines():
+            total += 1
+            found += line.strip() in text
+    return found / total if total else None
+
+
+def main(fixtures: str | None = None) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = Path(fixtures) if fixtures else Path(tmp)
+        if not fixtures:
+            make_fixtures(folder)
+        n_images = len(list(folder.glob("*.jpeg")))
+        print(f"{n_images} imagens, subida simulada de {UPLINK_BYTES_PER_S / 1e6:.1f} MB/s")
+        print(f"{'perfil':>10} {'KB/req':>9} {'KB total':>9} {'tempo s':>8} {'acurácia':>9}")
+
+        for label, settings in PROFILES.items():
+            with FakeOpenAIServer(latency=0.2, upload_bytes_per_s=UPLINK_BYTES_PER_S) as server:
+                ocr = GPTVision("sk-fake", base_url=server.base_url, max_in_flight=1, image_settings=settings)
+                start = time.perf_counter()
+                ocr.process_patient_images(str(folder))
+                elapsed = time.perf_counter() - start
+                per_request = server.request_bytes / max(server.requests, 1) / 1024
+            accuracy = _accuracy(folder, settings)
+            accuracy_text = f"{accuracy:.0%}" if accuracy is not None else "n/d"
+            print(f"{label:>10} {per_request:>9.1f} {server.request_bytes / 1024:>9.1f} "
+                  f"{elapsed:>8.2f} {accuracy_text:>9}")
+
+        if accuracy is None:
+            print("Acurácia não verificada: instale `pytesseract` e o Tesseract para comparar o texto lido.")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else None)
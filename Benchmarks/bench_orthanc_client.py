@@ -0,0 +1,67 @@
+"""
+⏱️ Benchmark do cliente Orthanc concorrente
+Compara o cliente síncrono (`pyorthanc.Orthanc`, uma requisição por vez) com o
+`OrthancPool` (conexões keep-alive e requisições simultâneas) contra o
+`FakeOrthancServer` com latência simulada: consulta de tags de 500 pacientes e
+download de um estudo de 200 instâncias.
+
+Uso: `python -m Benchmarks.bench_orthanc_client [latencia_ms] [concorrencia]`
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from pyorthanc import Orthanc
+
+from Benchmarks.fake_orthanc import FakeOrthancServer
+from Benchmarks.synthetic_dicom import make_us_image
+from Pipeline import OrthancPool
+
+N_PATIENTS = 500
+N_INSTANCES = 200
+
+
+def main(latency_ms: float = 20.0, concurrency: int = 16) -> None:
+    with tempfile.TemporaryDirectory() as tmp, FakeOrthancServer(latency=latency_ms / 1000) as pacs:
+        tmp = Path(tmp)
+        patients = [pacs.add_study([], f"PACIENTE {i:03d}")[0] for i in range(N_PATIENTS)]
+        instance = make_us_image(tmp / "instance.dcm", rows=480, cols=640, compressed=True)
+        _, study = pacs.add_study([instance] * N_INSTANCES, "ESTUDO GRANDE")
+        time.sleep(0.2)
+
+        client = Orthanc(pacs.url)
+        instance_ids = [i["ID"] for i in client.get_studies_id_instances(study)]
+        size = len(client.get_instances_id_file(instance_ids[0]))
+
+        print(f"\nlatência {latency_ms:.0f} ms por requisição, concorrência {concurrency}")
+        print(f"{'tarefa':<34}{'serial':>9}{'pool':>9}{'ganho':>8}")
+
+        start = time.perf_counter()
+        serial_tags = {p: client.get_patients_id_shared_tags(p) for p in patients}
+        serial = time.perf_counter() - start
+        with OrthancPool(pacs.url, max_concurrency=concurrency) as pool:
+            start = time.perf_counter()
+            pooled_tags = pool.shared_tags(patients)
+            pooled = time.perf_counter() - start
+            assert pooled_tags == serial_tags
+            print(f"{f'tags de {N_PATIENTS} pacientes':<34}{serial:8.2f}s{pooled:8.2f}s{serial / pooled:7.1f}x")
+
+            start = time.perf_counter()
+            for k, instance_id in enumerate(instance_ids):
+                (tmp / f"s{k}.dcm").write_bytes(client.get_instances_id_file(instance_id))
+            serial = time.perf_counter() - start
+            start = time.perf_counter()
+            total = pool.download_instances(instance_ids, [tmp / f"p{k}.dcm" for k in range(len(instance_ids))])
+            pooled = time.perf_counter() - start
+            label = f"{N_INSTANCES} instâncias ({total / 1e6:.1f} MB)"
+            print(f"{label:<34}{serial:8.2f}s{pooled:8.2f}s{serial / pooled:7.1f}x")
+        print(f"máximo de requisições simultâneas no PACS: {pacs.max_concurrent} (instância de {size / 1024:.0f} KB)")
+
+
+if __name__ == "__main__":
+    main(
+        float(sys.argv[1]) if len(sys.argv) > 1 else 20.0,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 16,
+    )
@@ -0,0 +1,127 @@
+"""
+⏱️ Benchmark da pirâmide de prévias
+Converte um estudo sintético (`--images` imagens `--rows`x`--cols` RGB) de três formas:
+
+1. só o JPEG completo (sem `previews_path`);
+2. completo + prévia + miniatura + folha de contato na mesma passada;
+3. só o completo e, depois, uma passada separada que reabre os JPEGs q99 de `Images/`
+   para gerar os mesmos derivados (o que uma interface teria de fazer sem a pirâmide).
+
+Repete para o perfil "raw" com JPEG encapsulado (derivados por decodificação reduzida).
+Também mostra o tamanho médio de cada nível e o PDF de imagens com e sem `PDF_PREVIEWS`.
+A pasta `Users/Benchmark` é removida ao final.
+
+Uso: `python -m Benchmarks.bench_previews [--images 24] [--rows 768] [--cols 1024] [--repeat 3]`
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+os.environ.setdefault("METRICS_TRACE_PATH", "")
+
+from PIL import Image
+
+from Benchmarks.synthetic_dicom import make_study
+from DicomManager.DICOM import DICOM2JPEG
+
+USER = "Benchmark"
+FOLDER = "BENCH PREVIEWS"
+
+
+def _convert(dcm_dir: Path, out: Path, profile: str | None, previews: bool) -> float:
+    shutil.rmtree(out, ignore_errors=True)
+    conv = DICOM2JPEG(str(dcm_dir), str(out / "Images"), profile=profile,
+                      previews_path=str(out / "Previews") if previews else None)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        conv.converter()
+    return time.perf_counter() - start
+
+
+def _separate_pass(out: Path) -> float:
+    # Derivados gerados depois, a partir dos JPEGs completos já gravados
+    conv = DICOM2JPEG("", str(out / "Images"), previews_path=str(out / "Previews"))
+    start = time.perf_counter()
+    for name in sorted(os.listdir(out / "Images")):
+        with Image.open(out / "Images" / name) as img:
+            img.draft(img.mode, conv._fit(img.size, conv.PYRAMID[0][1]))
+            conv.write_previews(img, name.replace(".jpeg", ".dcm"))
+    conv.contact_sheet()
+    return time.perf_counter() - start
+
+
+def _sizes(out: Path) -> dict:
+    sizes = {"full": [p.stat().st_size for p in (out / "Images").glob("*.jpeg")]}
+    for level, _ in DICOM2JPEG.PYRAMID:
+        sizes[level] = [p.stat().st_size for p in (out / "Previews").glob(f"*.{level}.jpeg")]
+    sizes["sheet"] = [(out / "Previews" / DICOM2JPEG.SHEET_NAME).stat().st_size]
+    return sizes
+
+
+def _pdf_sizes(out: Path) -> tuple[int, int]:
+    from PDFMAKER import MkPDF
+
+    patient = Path("Users", USER, "Patients", FOLDER)
+    try:
+        shutil.rmtree(patient, ignore_errors=True)
+        (patient / "Report").mkdir(parents=True)
+        shutil.copytree(out / "Images", patient / "Images")
+        shutil.copytree(out / "Previews", patient / "Previews")
+        pdf = patient / "Report" / f"{FOLDER}.pdf"
+        sizes = []
+        for previews in (False, True):
+            with contextlib.redirect_stdout(io.StringIO()):
+                MkPDF(USER, FOLDER, previews=previews)
+            sizes.append(pdf.stat().st_size)
+        return sizes[0], sizes[1]
+    finally:
+        shutil.rmtree(Path("Users", USER), ignore_errors=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Custo da pirâmide de prévias na conversão vs passada separada")
+    parser.add_argument("--images", type=int, default=24)
+    parser.add_argument("--rows", type=int, default=768)
+    parser.add_argument("--cols", type=int, default=1024)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    n = args.images
+
+    print(f"\n{n} imagens {args.cols}x{args.rows} RGB; melhor de {args.repeat}")
+    print(f"{'fonte/perfil':<24}{'só completo':>13}{'mesma passada':>15}{'+ms/img':>9}"
+          f"{'passada separada':>18}{'ms/img':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        for compressed, profile in ((False, None), (True, "raw")):
+            dcm_dir = tmp / f"Dicoms_{compressed}"
+            make_study(dcm_dir, n_images=n, rows=args.rows, cols=args.cols, compressed=compressed)
+            out = tmp / f"out_{compressed}"
+            plain = min(_convert(dcm_dir, out, profile, False) for _ in range(args.repeat))
+            separate = []
+            for _ in range(args.repeat):
+                _convert(dcm_dir, out, profile, False)
+                separate.append(_separate_pass(out))
+            separate = min(separate)
+            fused = min(_convert(dcm_dir, out, profile, True) for _ in range(args.repeat))
+            label = ("JPEG encaps., raw" if compressed else "sem compr., padrão")
+            print(f"{label:<24}{plain:12.2f}s{fused:14.2f}s{(fused - plain) / n * 1e3:9.1f}"
+                  f"{separate:17.2f}s{separate / n * 1e3:8.1f}")
+            if not compressed:
+                sizes = _sizes(out)
+                pdf_full, pdf_preview = _pdf_sizes(out)
+
+    print(f"\n{'nível':<10}{'KB médio':>10}")
+    for level, values in sizes.items():
+        print(f"{level:<10}{sum(values) / len(values) / 1024:10.1f}")
+    print(f"\nPDF de imagens: {pdf_full / 1024**2:.2f} MB com os completos, "
+          f"{pdf_preview / 1024**2:.2f} MB com PDF_PREVIEWS=1")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+⏱️ Benchmark do perfil sob demanda
+Processa estudos sintéticos pelo `StudyIngestor` com o perfil desligado e depois ligado
+apenas para um paciente pelo arquivo de controle (como no monitor em execução), mostra
+os arquivos gravados (`.pstats` por etapa e `.folded`) e as funções mais caras da
+conversão, e mede o custo de um `stage()` com o perfil desligado.
+
+Deve ser executado da raiz do projeto (usa `Users/` e `Dicoms/`); o usuário temporário
+`Benchmark` é removido ao final.
+
+Uso: `python -m Benchmarks.bench_profiling`
+"""
+
+import contextlib
+import io
+import json
+import os
+import pstats
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from pyorthanc import Orthanc
+
+from Benchmarks.fake_orthanc import FakeOrthancServer
+from Benchmarks.synthetic_dicom import make_study
+from Pipeline import PROFILER, IngestState, StudyIngestor, stage, trace
+
+BENCH_USER = "Benchmark"
+BENCH_AET = "BENCH_AET"
+N = 100_000
+
+
+def _span_cost() -> float:
+    with trace(path=""):
+        start = time.perf_counter()
+        for _ in range(N):
+            with stage("bench_overhead"):
+                pass
+        return (time.perf_counter() - start) / N
+
+
+def main() -> None:
+    if not os.path.exists("Users/users.json"):
+        raise SystemExit("Execute a partir da raiz do projeto (Users/users.json não encontrado)")
+    import main as pipeline
+
+    pipeline.OPENAI_API_KEY = None
+    users = {BENCH_USER: {"AET": BENCH_AET, "patients": [], "patients_names": []}}
+
+    with contextlib.ExitStack() as stack:
+        tmp = Path(stack.enter_context(tempfile.TemporaryDirectory()))
+        os.environ["METRICS_TRACE_PATH"] = ""
+        os.environ["CATALOG_PATH"] = ""
+        PROFILER.output_dir = str(tmp / "Profiles")
+        PROFILER.control_path = str(tmp / "profile.json")
+        pacs = stack.enter_context(FakeOrthancServer())
+        ingestor = StudyIngestor(Orthanc(pacs.url), users, pipeline.process_study, IngestState(None),
+                                 work_dir="Dicoms")
+
+        def run(name: str) -> float:
+            paths = make_study(tmp / name, n_images=8, rgb=True, compressed=False, with_sr=True, prefix=name[-3:])
+            pacs.add_study(paths, name, aet=BENCH_AET)
+            while not pacs.stable_at:
+                time.sleep(0.01)
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                ingestor.reconcile()
+            pacs.stable_at.clear()
+            return time.perf_counter() - start
+
+        try:
+            disabled_cost = _span_cost()
+            off = run("BENCH PROFILE OFF")
+            Path(PROFILER.control_path).write_text(json.dumps({"patients": ["BENCH PROFILE ON"]}))
+            PROFILER._next_check = 0.0
+            on = run("BENCH PROFILE ON")
+            other = run("BENCH PROFILE OTHER")
+        finally:
+            shutil.rmtree(os.path.join("Users", BENCH_USER), ignore_errors=True)
+
+        files = sorted(Path(PROFILER.output_dir).rglob("*.*"))
+        print(f"\n{'paciente':<22}{'perfil':>8}{'tempo':>9}")
+        print(f"{'BENCH PROFILE OFF':<22}{'não':>8}{off:8.2f}s")
+        print(f"{'BENCH PROFILE ON':<22}{'sim':>8}{on:8.2f}s")
+        print(f"{'BENCH PROFILE OTHER':<22}{'não':>8}{other:8.2f}s")
+        print(f"\narquivos gravados ({len(files)}):")
+        for path in files:
+            print(f"  {path.relative_to(PROFILER.output_dir)}  {path.stat().st_size / 1024:.1f} KB")
+
+        convert = next((p for p in files if p.name.endswith("-convert.pstats")), None)
+        if convert:
+            print("\nfunções mais caras da conversão (tempo acumulado):")
+            stats = pstats.Stats(str(convert), stream=io.StringIO())
+            rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)
+            for (filename, line, func), (_, calls, tt, ct, _) in rows[:8]:
+                print(f"  {ct:7.3f}s {calls:6d}x  {Path(filename).name}:{line}({func})")
+        folded = next((p for p in files if p.suffix == ".folded"), None)
+        if folded:
+            lines = folded.read_text().splitlines()
+            by_stage: dict[str, int] = {}
+            for line in lines:
+                stack, count = line.rsplit(" ", 1)
+                by_stage[stack.split(";")[0]] = by_stage.get(stack.split(";")[0], 0) + int(count)
+            print(f"\npilhas amostradas por etapa: {by_stage}")
+
+    print(f"\ncusto de um stage() com o perfil desligado: {disabled_cost * 1e6:.2f} µs")
+
+
+if __name__ == "__main__":
+    main()
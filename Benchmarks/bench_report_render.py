@@ -0,0 +1,41 @@
+"""
+⏱️ Benchmark de renderização de laudos
+Compara o tempo por laudo com o renderizador construído a cada chamada (frio),
+com o `ReportRenderer` compartilhado do processo (quente) e com o cache de PDFs
+renderizados do renderizador (cache).
+
+Uso: `python -m Benchmarks.bench_report_render [n_laudos]`
+"""
+
+import statistics
+import sys
+import time
+
+from OCR.markdown_to_pdf import ReportRenderer
+from Benchmarks.samples import SAMPLE_REPORT
+
+
+def _timed(render) -> float:
+    start = time.perf_counter()
+    render()
+    return (time.perf_counter() - start) * 1000
+
+
+def main(n: int = 200) -> None:
+    renderer = ReportRenderer(cache_size=0)
+    cached_renderer = ReportRenderer()
+    cold, warm, cached = [], [], []
+    # Alterna as medições para que ruído do sistema afete os modos igualmente
+    for _ in range(n):
+        cold.append(_timed(lambda: ReportRenderer(cache_size=0).render(SAMPLE_REPORT)))
+        warm.append(_timed(lambda: renderer.render(SAMPLE_REPORT)))
+        cached.append(_timed(lambda: cached_renderer.render(SAMPLE_REPORT)))
+
+    for label, timings in (("frio", cold), ("quente", warm), ("cache", cached)):
+        print(f"{label:>7}: média {statistics.mean(timings):.2f} ms | "
+              f"mediana {statistics.median(timings):.2f} ms | "
+              f"p95 {sorted(timings)[int(0.95 * (n - 1))]:.2f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
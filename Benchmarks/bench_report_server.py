@@ -0,0 +1,175 @@
+"""
+⏱️ Benchmark do serviço de laudos
+Monta `Users/Benchmark/Patients/BENCH REPORT SERVER` (imagens sintéticas, PDF gerado pelo
+`MkPDF` e um arquivo de `--big-mb` MB em `Report/`) e, com o `ReportServer` ligado ao
+`main.rebuild_patient`, mede:
+
+1. Download frio do PDF vs revalidação com `If-None-Match` (304): latência e bytes.
+2. `Range` com os últimos 64 KB do arquivo grande.
+3. Download completo do arquivo grande: vazão e crescimento do pico de RSS do processo.
+4. `--concurrent` POSTs simultâneos de regeneração do mesmo paciente: jobs executados e
+   tempo total vs o mesmo número de regenerações em sequência.
+
+A pasta de teste é removida ao final.
+
+Uso: `python -m Benchmarks.bench_report_server [--images 12] [--big-mb 200] [--requests 200] [--concurrent 20]`
+"""
+
+import argparse
+import contextlib
+import http.client
+import io
+import json
+import os
+import shutil
+import statistics
+import threading
+import time
+from pathlib import Path
+from urllib.parse import quote
+
+os.environ.setdefault("METRICS_TRACE_PATH", "")
+os.environ.setdefault("CATALOG_PATH", "")
+
+import numpy as np
+from PIL import Image
+
+from Pipeline.governor import peak_rss, reset_peak_rss
+from Pipeline.report_server import ReportServer
+
+USER = "Benchmark"
+FOLDER = "BENCH REPORT SERVER"
+
+
+def _build(args) -> Path:
+    patient = Path("Users", USER, "Patients", FOLDER)
+    images = patient / "Images"
+    images.mkdir(parents=True, exist_ok=True)
+    (patient / "Report").mkdir(exist_ok=True)
+    rng = np.random.default_rng(7)
+    for i in range(args.images):
+        pixels = rng.integers(0, 255, (480, 640, 3), dtype=np.uint8)
+        Image.fromarray(pixels).save(images / f"IM{i:04d}.jpeg", "JPEG", quality=90)
+    with open(patient / "Report" / "BIG.pdf", "wb") as f:
+        block = os.urandom(1024 * 1024)
+        for _ in range(args.big_mb):
+            f.write(block)
+    return patient
+
+
+def _get(conn, path: str, headers: dict | None = None, sink: bool = False) -> tuple[int, dict, int]:
+    conn.request("GET", path, headers=headers or {})
+    response = conn.getresponse()
+    size = 0
+    if sink:
+        while chunk := response.read(256 * 1024):
+            size += len(chunk)
+    else:
+        size = len(response.read())
+    return response.status, dict(response.getheaders()), size
+
+
+def _median_ms(samples: list[float]) -> float:
+    return statistics.median(samples) * 1e3
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serviço de laudos: cache, Range, streaming e regeneração")
+    parser.add_argument("--images", type=int, default=12)
+    parser.add_argument("--big-mb", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrent", type=int, default=20)
+    args = parser.parse_args()
+
+    from main import rebuild_patient
+
+    patient = _build(args)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            rebuild_patient(USER, FOLDER)
+        with ReportServer(rebuild_patient, users_dir="Users", port=0) as server:
+            conn = http.client.HTTPConnection(server.host, server.port)
+            base = f"/files/{quote(USER)}/{quote(FOLDER)}/Report"
+            pdf = f"{base}/{quote(FOLDER)}.pdf"
+
+            # 1. Frio vs 304
+            cold, cold_bytes, tag = [], 0, None
+            for _ in range(args.requests):
+                start = time.perf_counter()
+                status, headers, size = _get(conn, pdf)
+                cold.append(time.perf_counter() - start)
+                cold_bytes, tag = size, headers["ETag"]
+            warm, warm_status = [], set()
+            for _ in range(args.requests):
+                start = time.perf_counter()
+                status, _, size = _get(conn, pdf, {"If-None-Match": tag})
+                warm.append(time.perf_counter() - start)
+                warm_status.add((status, size))
+
+            # 2. Range do fim do arquivo grande
+            big = f"{base}/BIG.pdf"
+            status, headers, size = _get(conn, big, {"Range": "bytes=-65536"})
+            with open(patient / "Report" / "BIG.pdf", "rb") as f:
+                f.seek(-65536, os.SEEK_END)
+                tail = f.read()
+            conn.request("GET", big, headers={"Range": "bytes=-65536"})
+            range_ok = status == 206 and size == 65536 and conn.getresponse().read() == tail
+
+            # 3. Streaming completo
+            reset_peak_rss()
+            rss_before = peak_rss()
+            start = time.perf_counter()
+            status, _, streamed = _get(conn, big, sink=True)
+            stream_seconds = time.perf_counter() - start
+            rss_delta = (peak_rss() - rss_before) if rss_before else None
+            conn.close()
+
+            # 4. Regenerações simultâneas do mesmo paciente
+            with contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                for _ in range(3):
+                    rebuild_patient(USER, FOLDER)
+                single = (time.perf_counter() - start) / 3
+
+                results = []
+                barrier = threading.Barrier(args.concurrent)
+
+                def regenerate():
+                    c = http.client.HTTPConnection(server.host, server.port, timeout=120)
+                    barrier.wait()
+                    c.request("POST", f"/patients/{quote(USER)}/{quote(FOLDER)}/regenerate")
+                    response = c.getresponse()
+                    results.append((response.status, json.loads(response.read())))
+                    c.close()
+
+                jobs_before = server.jobs_started
+                start = time.perf_counter()
+                threads = [threading.Thread(target=regenerate) for _ in range(args.concurrent)]
+                for t in threads:
+                    t.start()
+                for t in threads:
+                    t.join()
+                burst = time.perf_counter() - start
+                jobs = server.jobs_started - jobs_before
+            shared = sum(1 for _, body in results if body.get("shared"))
+            all_ok = all(status == 200 for status, _ in results)
+    finally:
+        shutil.rmtree(patient, ignore_errors=True)
+        with contextlib.suppress(OSError):
+            os.rmdir(Path("Users", USER, "Patients"))
+            os.rmdir(Path("Users", USER))
+
+    print(f"\n{'PDF de imagens':<26}{'p50':>10}{'bytes':>12}")
+    print(f"{'GET frio':<26}{_median_ms(cold):8.2f}ms{cold_bytes:12,d}")
+    print(f"{'If-None-Match (304)':<26}{_median_ms(warm):8.2f}ms{sorted(warm_status)[0][1]:12,d}")
+    print(("✅" if warm_status == {(304, 0)} else "❌") + f" revalidações: {sorted(warm_status)}")
+    print(("✅" if range_ok else "❌") + " Range bytes=-65536: 206 com os últimos 64 KB")
+    print(f"streaming {streamed / 1024**2:.0f} MB: {stream_seconds:.2f}s ({streamed / 1024**2 / stream_seconds:.0f} MB/s), "
+          + (f"pico de RSS +{rss_delta / 1024**2:.1f} MB" if rss_delta is not None else "pico de RSS indisponível"))
+    print(f"\n{args.concurrent} regenerações simultâneas: {jobs} job(s) executado(s), {shared} compartilhada(s), "
+          f"{burst:.2f}s vs {single * args.concurrent:.2f}s em sequência ({single:.2f}s cada)")
+    print(("✅" if all_ok and jobs == 1 else "❌") + " todas as respostas 200 com um único job")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+⏱️ Benchmark das políticas de retenção
+Monta, em uma pasta temporária, um armazenamento com ZIPs já processados e pendentes,
+DICOMs esquecidos por jobs interrompidos e pastas de imagens de pacientes com idades
+variadas, e aplica as políticas:
+
+- `zips`: `delete_processed` (os pendentes devem permanecer);
+- `dicoms`: padrão (mais de 1 dia);
+- `images`: `max_age_days` 365 e recompressão para qualidade 85 após 30 dias.
+
+Mede o tempo da varredura, o espaço liberado, a economia e o PSNR da recompressão, e o
+tempo de uma segunda varredura (nada a fazer; imagens já recomprimidas são puladas).
+
+Uso: `python -m Benchmarks.bench_retention [--zips 200] [--patients 40] [--images 4]`
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from Pipeline.backlog import LEDGER
+from Pipeline.retention import DAY, StorageSweeper, load_policies
+
+USER = "Benchmark"
+
+
+def _age(path: Path, days: float) -> None:
+    t = time.time() - days * DAY
+    os.utime(path, (t, t))
+
+
+def _image(path: Path, seed: int) -> None:
+    # Ultrassom sintético: gradiente com ruído (ruído não comprime bem, como o speckle)
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:600, 0:800]
+    base = (np.sin(x / 40 + seed) * 60 + np.cos(y / 55) * 50 + 110)[..., None].repeat(3, axis=2)
+    pixels = np.clip(base + rng.normal(0, 12, base.shape), 0, 255).astype(np.uint8)
+    Image.fromarray(pixels).save(path, "JPEG", quality=99)
+
+
+def _psnr(a: np.ndarray, b: np.ndarray) -> float:
+    mse = np.mean((a.astype(np.float64) - b.astype(np.float64)) ** 2)
+    return float("inf") if mse == 0 else 10 * np.log10(255**2 / mse)
+
+
+def _build(args) -> dict:
+    patients = Path("Users", USER, "Patients")
+    Path("ZIPS").mkdir()
+    payload = os.urandom(256 * 1024)
+    for i in range(args.zips):
+        name = f"BENCH RET {i:04d}"
+        zip_path = Path("ZIPS", f"{name}.zip")
+        with zipfile.ZipFile(zip_path, "w") as archive:
+            archive.writestr(f"20250604101010 {name}/20250604/US/IM0000.dcm", payload)
+        _age(zip_path, 2)
+        # 90% já processados (registrados no ArchiveLedger, com o PDF gerado)
+        if i % 10:
+            report = patients / name / "Report"
+            report.mkdir(parents=True)
+            (report / f"{name}.pdf").write_bytes(b"%PDF-1.4\n")
+            LEDGER.record(str(zip_path), USER, str(report / f"{name}.pdf"))
+
+    stale = Path("Dicoms", "backlog", "job-0001")
+    stale.mkdir(parents=True)
+    for i in range(50):
+        (stale / f"IM{i:04d}.dcm").write_bytes(payload)
+        _age(stale / f"IM{i:04d}.dcm", 3)
+    for i in range(5):
+        (Path("Dicoms") / f"NEW{i:04d}.dcm").write_bytes(payload)
+
+    old_images = []
+    for p in range(args.patients):
+        images = patients / f"BENCH IMG {p:04d}" / "Images"
+        images.mkdir(parents=True)
+        # 1/8 com mais de um ano, metade do resto com mais de 30 dias
+        days = 400 if p % 8 == 0 else (60 if p % 2 else 5)
+        for k in range(args.images):
+            path = images / f"IM{k:04d}.jpeg"
+            _image(path, p * 100 + k)
+            _age(path, days)
+            if days == 60:
+                old_images.append((path, np.asarray(Image.open(path).convert("RGB"))))
+    return {"old_images": old_images}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Varredura das políticas de retenção")
+    parser.add_argument("--zips", type=int, default=200)
+    parser.add_argument("--patients", type=int, default=40)
+    parser.add_argument("--images", type=int, default=4)
+    args = parser.parse_args()
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            print(f"🧪 Gerando {args.zips} ZIPs, 55 DICOMs e {args.patients}x{args.images} imagens...")
+            built = _build(args)
+            policies = load_policies("")
+            policies["zips"]["delete_processed"] = True
+            policies["images"].update(max_age_days=365, recompress_after_days=30, recompress_quality=85)
+            sweeper = StorageSweeper(policies)
+
+            with contextlib.redirect_stdout(io.StringIO()):
+                sweeper.scan()
+            before = sweeper.usage()
+            with contextlib.redirect_stdout(io.StringIO()):
+                report = sweeper.sweep()
+            with contextlib.redirect_stdout(io.StringIO()):
+                again = sweeper.sweep()
+
+            remaining_zips = sorted(os.listdir("ZIPS"))
+            pending_kept = remaining_zips == [f"BENCH RET {i:04d}.zip" for i in range(0, args.zips, 10)]
+            psnr = [_psnr(pixels, np.asarray(Image.open(path).convert("RGB"))) for path, pixels in built["old_images"]]
+            aged = all(time.time() - path.stat().st_mtime > 59 * DAY for path, _ in built["old_images"])
+            index_bytes = Path("Users", "storage_index.json").stat().st_size
+        finally:
+            os.chdir(cwd)
+
+    print(f"\n{'artefato':<10}{'antes':>12}{'depois':>12}")
+    for kind in ("zips", "dicoms", "images"):
+        print(f"{kind:<10}{before[kind]['bytes'] / 1024**2:10.1f}MB{report['usage'][kind]['bytes'] / 1024**2:10.1f}MB")
+    print(StorageSweeper.format_report(report))
+    print(f"varredura: {report['seconds']:.2f}s; segunda varredura: {again['seconds']:.2f}s "
+          f"({sum(again['removed'].values())} removidos, {again['recompressed']} recomprimidas)")
+    print(f"recompressão q99→q85: PSNR médio {np.mean(psnr):.1f} dB, mínimo {min(psnr):.1f} dB")
+    print(f"índice: {index_bytes / 1024:.1f} KB")
+    print(("✅" if pending_kept else "❌") + f" ZIPs pendentes preservados ({len(remaining_zips)})")
+    print(("✅" if aged else "❌") + " datas de modificação preservadas na recompressão")
+
+
+if __name__ == "__main__":
+    main()
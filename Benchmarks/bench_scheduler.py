@@ -0,0 +1,48 @@
+"""
+⏱️ Benchmark do agendador de chamadas aos modelos
+Processa um estudo sintético contra o `FakeOpenAIServer` injetando respostas 429
+(com `Retry-After`) e 5xx, e mostra que todas as chamadas terminam com sucesso,
+quanto tempo foi gasto em backoff e as métricas do `RequestScheduler`.
+
+Uso: `python -m Benchmarks.bench_scheduler [n_imagens] [taxa_de_falhas] [rpm]`
+"""
+
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from OCR.gpt_ocr import GPTReport, GPTVision
+from OCR.scheduler import RequestScheduler
+from Benchmarks.fake_openai import FakeOpenAIServer
+from Benchmarks.bench_ocr_concurrency import make_study
+
+
+def main(n_images: int = 40, fault_rate: float = 0.3, rpm: float = 0) -> None:
+    scheduler = RequestScheduler(requests_per_minute=rpm, max_retries=8, base_delay=0.05, max_delay=2.0)
+    with tempfile.TemporaryDirectory() as tmp, \
+            FakeOpenAIServer(latency=0.05, faults=[429, 500], fault_rate=fault_rate, retry_after=0.2) as server:
+        folder = Path(tmp)
+        make_study(folder, n_images)
+
+        start = time.perf_counter()
+        ocr = GPTVision("sk-fake", base_url=server.base_url, max_in_flight=4, scheduler=scheduler)
+        ocr.process_patient_images(str(folder))
+        report = GPTReport("sk-fake", base_url=server.base_url, scheduler=scheduler)
+        report_text = report.generate_report(ocr.text)
+        elapsed = time.perf_counter() - start
+
+        n_batches = -(-n_images // 4)
+        assert ocr.text.count("OCR de") == n_batches, "lotes perdidos"
+        assert report_text, "laudo vazio"
+        print(f"Concluído em {elapsed:.2f}s; respostas do servidor: {server.status_counts}")
+        print(json.dumps(scheduler.metrics(), indent=2))
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 40,
+        float(sys.argv[2]) if len(sys.argv) > 2 else 0.3,
+        float(sys.argv[3]) if len(sys.argv) > 3 else 0,
+    )
@@ -0,0 +1,52 @@
+"""
+⏱️ Benchmark da extração de achados do SR
+Compara a latência por paciente do caminho via OCR (imagens convertidas enviadas ao
+modelo de visão + laudo) com o caminho via SR (leitura dos cabeçalhos + laudo), contra
+o `FakeOpenAIServer` com latência simulada.
+
+Uso: `python -m Benchmarks.bench_sr_harvest [n_imagens] [latencia_s]`
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from DicomManager.DICOM import DICOM2JPEG
+from DicomManager.sr import SRHarvester
+from OCR.gpt_ocr import GPTReport, GPTVision
+from Benchmarks.fake_openai import FakeOpenAIServer
+from Benchmarks.synthetic_dicom import make_study
+
+
+def main(n_images: int = 16, latency: float = 0.5) -> None:
+    with tempfile.TemporaryDirectory() as tmp, FakeOpenAIServer(latency=latency) as server:
+        dcm_dir, images_dir = Path(tmp) / "Dicoms", Path(tmp) / "Images"
+        make_study(dcm_dir, n_images=n_images, with_sr=True)
+        DICOM2JPEG(str(dcm_dir), str(images_dir)).converter()
+
+        start = time.perf_counter()
+        ocr = GPTVision("sk-fake", base_url=server.base_url, max_in_flight=4)
+        ocr.process_patient_images(str(images_dir))
+        GPTReport("sk-fake", base_url=server.base_url).generate_report(ocr.text)
+        ocr_time = time.perf_counter() - start
+        ocr_calls = server.requests
+
+        start = time.perf_counter()
+        findings = SRHarvester(str(dcm_dir)).harvest()
+        harvest_time = time.perf_counter() - start
+        GPTReport("sk-fake", base_url=server.base_url).generate_report(SRHarvester.to_text(findings))
+        sr_time = time.perf_counter() - start
+        sr_calls = server.requests - ocr_calls
+
+        print(f"\n{n_images} imagens, latência {latency:.2f}s por chamada")
+        print(f"  via OCR: {ocr_time:6.2f}s ({ocr_calls} chamadas)")
+        print(f"  via SR : {sr_time:6.2f}s ({sr_calls} chamada; leitura dos cabeçalhos {harvest_time * 1000:.0f} ms, "
+              f"{len(findings['measurements'])} medidas, completo={findings['complete']})")
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 16,
+        float(sys.argv[2]) if len(sys.argv) > 2 else 0.5,
+    )
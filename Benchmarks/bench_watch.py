@@ -0,0 +1,145 @@
+"""
+⏱️ Benchmark da ingestão por pasta observada
+Copia ZIPs sintéticos para uma pasta observada como faria um cliente SMB lento (gravação em
+blocos ao longo de `--copy-seconds`), metade direto com o nome final e metade com nome
+temporário renomeado ao fim, e mede para o `FolderWatcher` com inotify e com consulta
+periódica:
+
+- detecção: do fechamento do arquivo até o início do processamento;
+- fechamento → PDF: do fechamento até o PDF gravado (o que a etapa `file_to_pdf` registra).
+
+Para comparação, conta quantas cópias uma espera fixa de 1s após o arquivo aparecer (o
+`time.sleep(1)` da versão antiga do monitor) teria aberto ainda incompletas.
+
+Deve ser executado da raiz do projeto (usa `Users/`); o usuário temporário `Benchmark` é
+removido ao final.
+
+Uso: `python -m Benchmarks.bench_watch [--archives 4] [--copy-seconds 2] [--poll-interval 2]`
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+import zipfile
+from pathlib import Path
+
+os.environ.setdefault("ARCHIVES_PATH", "")
+
+from Benchmarks.synthetic_dicom import make_study
+from Pipeline import FolderWatcher
+
+BENCH_USER = "Benchmark"
+
+
+def _copy_slowly(src: Path, dst: Path, seconds: float, rename: bool) -> tuple[float, bool]:
+    # Grava em 10 blocos; devolve o instante do fechamento e se o ZIP estava válido 1s após aparecer
+    data = src.read_bytes()
+    target = dst.with_name(dst.name + ".part") if rename else dst
+    chunk = len(data) // 10 + 1
+    appeared = time.time()
+    naive_ok = None
+    with open(target, "wb") as f:
+        for i in range(0, len(data), chunk):
+            f.write(data[i:i + chunk])
+            f.flush()
+            time.sleep(seconds / 10)
+            if naive_ok is None and not rename and time.time() - appeared >= 1.0:
+                naive_ok = zipfile.is_zipfile(target)
+    if rename:
+        os.rename(target, dst)
+    closed = time.time()
+    return closed, naive_ok is not False
+
+
+def _scenario(label: str, use_inotify: bool, zips: list[Path], args, tmp: Path) -> dict:
+    import main as pipeline
+
+    drop = tmp / f"drop-{label}"
+    drop.mkdir()
+    started: dict[str, float] = {}
+
+    def process(file, user, **kwargs):
+        started[file] = time.time()
+        return pipeline.Extract_Convert_Img(file, user, **kwargs)
+
+    watcher = FolderWatcher(str(drop), poll_interval=args.poll_interval, use_inotify=use_inotify).start()
+    stop = threading.Event()
+    consumer = threading.Thread(target=watcher.run, args=(process, BENCH_USER),
+                                kwargs={"work_dir": str(tmp / f"work-{label}"), "stop": stop}, daemon=True)
+    consumer.start()
+
+    detect, to_pdf, naive_partial = [], [], 0
+    for i, src in enumerate(zips):
+        rename = i % 2 == 1
+        closed, naive_ok = _copy_slowly(src, drop / src.name, args.copy_seconds, rename)
+        naive_partial += not naive_ok
+        pdf = Path("Users", BENCH_USER, "Patients", f"BENCH WATCH {i:03d}", "Report", f"BENCH WATCH {i:03d}.pdf")
+        deadline = time.time() + 120
+        while not (pdf.exists() and pdf.stat().st_mtime >= closed) and time.time() < deadline:
+            time.sleep(0.05)
+        if src.name not in started:
+            raise SystemExit(f"❌ {label}: {src.name} não foi processado")
+        detect.append(started[src.name] - closed)
+        to_pdf.append(pdf.stat().st_mtime - closed)
+
+    stop.set()
+    consumer.join()
+    watcher.stop()
+    return {"backend": watcher.backend, "detect": detect, "to_pdf": to_pdf, "naive_partial": naive_partial}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Latência da ingestão por pasta observada")
+    parser.add_argument("--archives", type=int, default=4)
+    parser.add_argument("--images", type=int, default=4)
+    parser.add_argument("--copy-seconds", type=float, default=2.0, help="duração de cada cópia simulada")
+    parser.add_argument("--poll-interval", type=float, default=2.0)
+    args = parser.parse_args()
+
+    if not os.path.exists("Users/users.json"):
+        raise SystemExit("Execute a partir da raiz do projeto (Users/users.json não encontrado)")
+    import main as pipeline
+
+    pipeline.OPENAI_API_KEY = None
+    os.environ["METRICS_TRACE_PATH"] = ""
+    os.environ["CATALOG_PATH"] = ""
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        zips = []
+        for i in range(args.archives):
+            paths = make_study(tmp / f"s{i}", n_images=args.images, compressed=True, prefix=f"W{i}")
+            zips.append(tmp / f"BENCH WATCH {i:03d}.zip")
+            with zipfile.ZipFile(zips[-1], "w") as archive:
+                for k, path in enumerate(paths):
+                    archive.write(path, f"20250604101010 BENCH WATCH {i:03d}/20250604/US/IM{k:04d}.dcm")
+
+        rows = {}
+        try:
+            for label, use_inotify in (("inotify", True), ("polling", False)):
+                print(f"── {label}")
+                with contextlib.redirect_stdout(io.StringIO()):
+                    rows[label] = _scenario(label, use_inotify, zips, args, tmp)
+                shutil.rmtree(os.path.join("Users", BENCH_USER), ignore_errors=True)
+        finally:
+            shutil.rmtree(os.path.join("Users", BENCH_USER), ignore_errors=True)
+
+    print(f"\n{args.archives} ZIPs copiados em {args.copy_seconds:.1f}s cada (metade renomeada ao fim), "
+          f"consulta a cada {args.poll_interval:.1f}s")
+    print(f"{'modo':<10}{'detecção p50':>14}{'máx':>8}{'fech.→PDF p50':>16}{'máx':>8}")
+    for label, r in rows.items():
+        print(f"{label:<10}{statistics.median(r['detect']):13.2f}s{max(r['detect']):7.2f}s"
+              f"{statistics.median(r['to_pdf']):15.2f}s{max(r['to_pdf']):7.2f}s")
+    partial = rows["inotify"]["naive_partial"]
+    direct = (args.archives + 1) // 2
+    print(f"espera fixa de 1s: {partial}/{direct} cópias diretas ainda incompletas ao serem abertas")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+🤖 Fake OpenAI Server
+Servidor HTTP local compatível com o endpoint `/v1/chat/completions` da OpenAI, usado
+pelos benchmarks para simular a latência dos modelos sem chave de API nem custo.
+
+### 💡 Example
+>>> with FakeOpenAIServer(latency=0.5) as server:
+...     ocr = GPTVision("sk-test", base_url=server.base_url)
+"""
+
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeOpenAIServer:
+    """
+    ### 🤖 FakeOpenAIServer
+    Servidor de chat completions que responde após `latency` segundos e, opcionalmente,
+    injeta falhas (429 e 5xx) para exercitar o `RequestScheduler`.
+
+    ### 🖥️ Parameters
+        - `latency` (`float`): Atraso fixo de cada resposta, em segundos.
+        - `faults` (`list[int] | None`): Status HTTP devolvidos, em ordem, pelas primeiras requisições
+          (200 para uma resposta normal).
+        - `fault_rate` (`float`): Probabilidade de uma requisição posterior falhar com 429, 500, 502 ou 503.
+        - `retry_after` (`float | None`): Valor do cabeçalho `Retry-After` enviado nas respostas 429.
+        - `upload_bytes_per_s` (`float`): Banda de subida simulada; acrescenta `tamanho / banda` segundos
+          à latência de cada requisição (0 desativa).
+        - `host` (`str`): Interface de escuta.
+        - `port` (`int`): Porta de escuta (0 escolhe uma porta livre).
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        faults: list[int] | None = None,
+        fault_rate: float = 0.0,
+        retry_after: float | None = None,
+        upload_bytes_per_s: float = 0.0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        self.latency = latency
+        self.faults = list(faults or [])
+        self.fault_rate = fault_rate
+        self.retry_after = retry_after
+        self.upload_bytes_per_s = upload_bytes_per_s
+        self.status_counts: dict[int, int] = {}
+        self.requests = 0
+        self.request_bytes = 0
+        self.max_concurrent = 0
+        self._active = 0
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = self.rfile.read(length)
+                with server._lock:
+                    server.requests += 1
+                    server.request_bytes += length
+                    server._active += 1
+                    server.max_concurrent = max(server.max_concurrent, server._active)
+                try:
+                    payload = json.loads(body or b"{}")
+                    status, headers, response = server.respond(payload)
+                    upload = length / server.upload_bytes_per_s if server.upload_bytes_per_s else 0.0
+                    time.sleep(server.latency + upload)
+                finally:
+                    with server._lock:
+                        server._active -= 1
+
+                data = json.dumps(response).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+    def respond(self, payload: dict) -> tuple[int, dict, dict]:
+        """
+        ### 📨 respond
+        Monta a resposta para um pedido de chat completion. O texto devolvido indica o
+        número de imagens recebidas, permitindo conferir a ordem dos lotes.
+        """
+        with self._lock:
+            if self.faults:
+                status = self.faults.pop(0)
+            elif random.random() < self.fault_rate:
+                status = random.choice((429, 500, 502, 503))
+            else:
+                status = 200
+            self.status_counts[status] = self.status_counts.get(status, 0) + 1
+        if status != 200:
+            headers = {}
+            if status == 429 and self.retry_after is not None:
+                headers["Retry-After"] = str(self.retry_after)
+            error = {"error": {"message": f"Falha injetada ({status})", "type": "fake_error", "code": status}}
+            return status, headers, error
+
+        user_content = payload.get("messages", [{}])[-1].get("content", "")
+        if isinstance(user_content, list):
+            n_images = sum(1 for part in user_content if part.get("type") == "image_url")
+            text = f"OCR de {n_images} imagens"
+        else:
+            text = f"# Laudo\n\n{len(user_content)} caracteres de achados"
+        response = {
+            "id": f"chatcmpl-fake-{self.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": payload.get("model", "fake"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": text},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 1000, "completion_tokens": 100, "total_tokens": 1100},
+        }
+        return 200, {}, response
+
+    def start(self) -> "FakeOpenAIServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> "FakeOpenAIServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
@@ -0,0 +1,278 @@
+"""
+🏥 Fake Orthanc Server
+Servidor HTTP local que imita as rotas do Orthanc usadas pelo pipeline (`/patients`,
+`/patients/{id}/shared-tags`, `/patients/{id}/archive`, `/studies`, `/studies/{id}`,
+`/studies/{id}/instances`, `/studies/{id}/archive`, `/instances/{id}/file`) e, como o
+script Lua `OnStableStudy`, notifica um webhook quando cada estudo fica estável.
+
+### 💡 Example
+>>> with FakeOrthancServer(webhook_url=server.url, stable_age=1.0) as pacs:
+...     pacs.add_study(make_study(tmp / "p1"), "PACIENTE UM", aet="YOUR_AET_TITLE")
+...     client = Orthanc(pacs.url)
+"""
+
+import hashlib
+import io
+import json
+import threading
+import time
+import urllib.request
+import uuid
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+
+class _Server(ThreadingHTTPServer):
+    # Fila de conexões maior que o padrão (5) para os testes com muitos clientes simultâneos
+    request_queue_size = 128
+    daemon_threads = True
+
+
+def _orthanc_id() -> str:
+    # Mesmo formato dos IDs do Orthanc (SHA-1 em cinco grupos de 8 dígitos)
+    digest = hashlib.sha1(uuid.uuid4().bytes).hexdigest()
+    return "-".join(digest[i:i + 8] for i in range(0, 40, 8))
+
+
+class FakeOrthancServer:
+    """
+    ### 🏥 FakeOrthancServer
+    PACS simulado em memória, com pacientes, estudos e instâncias. Os arquivos ZIP seguem
+    o formato esperado pelo `Unzipper` (pasta `"<timestamp> <nome>"`). Estudos só aparecem
+    nas rotas `/studies` depois de estáveis; `bytes_sent` soma os bytes enviados.
+
+    ### 🖥️ Parameters
+        - `webhook_url` (`str | None`): URL chamada com `{"ID": study_id}` quando o estudo fica estável.
+        - `stable_age` (`float`): Segundos entre a chegada do estudo e sua estabilidade.
+        - `list_before_stable` (`bool`): Lista o paciente em `/patients` antes de o estudo ficar estável,
+          como o Orthanc real (False lista apenas estudos estáveis).
+        - `latency` (`float`): Atraso de cada resposta, em segundos (simula rede e disco do PACS).
+        - `host` (`str`): Interface de escuta.
+        - `port` (`int`): Porta de escuta (0 escolhe uma porta livre).
+    """
+
+    def __init__(
+        self,
+        webhook_url: str | None = None,
+        stable_age: float = 0.0,
+        list_before_stable: bool = False,
+        latency: float = 0.0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        self.webhook_url = webhook_url
+        self.stable_age = stable_age
+        self.list_before_stable = list_before_stable
+        self.latency = latency
+        self.max_concurrent = 0
+        self._active = 0
+        self.patients: dict[str, dict] = {}
+        self.studies: dict[str, dict] = {}
+        self.instances: dict[str, bytes] = {}
+        self.stable_at: dict[str, float] = {}
+        self.requests: dict[str, int] = {}
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+        self.httpd = _Server((host, port), self._handler())
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def archive(self, study_ids: list[str]) -> bytes:
+        """
+        ### 🗜️ archive
+        Monta o ZIP dos estudos informados, como `GET /patients/{id}/archive`.
+        """
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED) as archive:
+            for study_id in study_ids:
+                study = self.studies[study_id]
+                folder = f"{study['Folder']}/{study['MainDicomTags']['StudyDate']}"
+                for i, instance_id in enumerate(study["Instances"]):
+                    archive.writestr(f"{folder}/US/IM{i:04d}.dcm", self.instances[instance_id])
+        return buffer.getvalue()
+
+    def add_study(
+        self,
+        dcm_paths: list,
+        patient_name: str,
+        aet: str = "YOUR_AET_TITLE",
+        patient_id: str | None = None,
+        study_date: str = "20250604",
+    ) -> tuple[str, str]:
+        """
+        ### ➕ add_study
+        Recebe os arquivos de um novo estudo e agenda sua estabilidade. Com `patient_id`,
+        o estudo é acrescentado a um paciente existente (novo exame do mesmo paciente).
+
+        ### 🔄 Returns
+            - `tuple[str, str]`: IDs Orthanc do paciente e do estudo.
+        """
+        study_id = _orthanc_id()
+        with self._lock:
+            if patient_id is None:
+                patient_id = _orthanc_id()
+                self.patients[patient_id] = {
+                    "tags": {
+                        "0008,0080": {"Name": "InstitutionName", "Type": "String", "Value": aet},
+                        "0010,0010": {"Name": "PatientName", "Type": "String", "Value": patient_name},
+                        "0020,000d": {"Name": "StudyInstanceUID", "Type": "String", "Value": study_id},
+                    },
+                    "listed": self.list_before_stable,
+                }
+            self.studies[study_id] = {
+                "ID": study_id,
+                "ParentPatient": patient_id,
+                "IsStable": False,
+                "LastUpdate": "",
+                "MainDicomTags": {"StudyDate": study_date, "StudyInstanceUID": study_id},
+                "PatientMainDicomTags": {"PatientName": patient_name},
+                "Folder": f"{time.strftime('%Y%m%d%H%M%S')} {patient_name}",
+                "Instances": [],
+            }
+        self.add_instances(study_id, dcm_paths)
+        return patient_id, study_id
+
+    def add_instances(self, study_id: str, dcm_paths: list) -> list[str]:
+        """
+        ### ➕ add_instances
+        Acrescenta instâncias a um estudo existente; ele volta a ficar instável e é
+        notificado de novo após `stable_age` segundos.
+
+        ### 🔄 Returns
+            - `list[str]`: IDs Orthanc das novas instâncias.
+        """
+        ids = []
+        with self._lock:
+            study = self.studies[study_id]
+            for path in dcm_paths:
+                instance_id = _orthanc_id()
+                self.instances[instance_id] = Path(path).read_bytes()
+                study["Instances"].append(instance_id)
+                ids.append(instance_id)
+            study["IsStable"] = False
+            study["LastUpdate"] = time.strftime("%Y%m%dT%H%M%S") + f".{time.monotonic_ns()}"
+        threading.Timer(self.stable_age, self._stabilize, args=(study_id,)).start()
+        return ids
+
+    def _stabilize(self, study_id: str) -> None:
+        with self._lock:
+            study = self.studies[study_id]
+            study["IsStable"] = True
+            self.patients[study["ParentPatient"]]["listed"] = True
+            self.stable_at[study_id] = time.monotonic()
+        if self.webhook_url:
+            request = urllib.request.Request(
+                self.webhook_url,
+                data=json.dumps({"ID": study_id}).encode("utf-8"),
+                headers={"Content-Type": "application/json"},
+            )
+            try:
+                urllib.request.urlopen(request, timeout=5).read()
+            except OSError as e:
+                print(f"[AVISO] Webhook falhou para {study_id}: {e}")
+
+    def _count(self, route: str) -> None:
+        with self._lock:
+            self.requests[route] = self.requests.get(route, 0) + 1
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Sem isso, cabeçalho e corpo em escritas separadas somam ~40 ms (Nagle + ACK atrasado)
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, data: bytes, content_type: str) -> None:
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+                with server._lock:
+                    server.bytes_sent += len(data)
+
+            def _json(self, payload) -> None:
+                self._send(200, json.dumps(payload).encode("utf-8"), "application/json")
+
+            def _study(self, study: dict) -> dict:
+                return {k: v for k, v in study.items() if k not in ("Folder", "Instances")}
+
+            def do_GET(self):
+                with server._lock:
+                    server._active += 1
+                    server.max_concurrent = max(server.max_concurrent, server._active)
+                try:
+                    time.sleep(server.latency)
+                    self._route()
+                finally:
+                    with server._lock:
+                        server._active -= 1
+
+            def _route(self):
+                path, _, query = self.path.partition("?")
+                parts = path.strip("/").split("/")
+                with server._lock:
+                    patients = dict(server.patients)
+                    studies = {sid: dict(s) for sid, s in server.studies.items() if s["IsStable"]}
+
+                if parts == ["patients"]:
+                    server._count("/patients")
+                    self._json([pid for pid, p in patients.items() if p["listed"]])
+                elif len(parts) == 3 and parts[0] == "patients" and parts[1] in patients:
+                    server._count(f"/patients/{{id}}/{parts[2]}")
+                    if parts[2] == "shared-tags":
+                        self._json(patients[parts[1]]["tags"])
+                    elif parts[2] == "archive":
+                        ids = [sid for sid, s in studies.items() if s["ParentPatient"] == parts[1]]
+                        self._send(200, server.archive(ids), "application/zip")
+                    else:
+                        self._send(404, b"{}", "application/json")
+                elif parts == ["studies"]:
+                    server._count("/studies")
+                    if "expand" in query:
+                        self._json([self._study(s) for s in studies.values()])
+                    else:
+                        self._json(list(studies))
+                elif len(parts) >= 2 and parts[0] == "studies" and parts[1] in studies:
+                    study = studies[parts[1]]
+                    route = "/studies/{id}" + ("/" + "/".join(parts[2:]) if len(parts) > 2 else "")
+                    server._count(route)
+                    if len(parts) == 2:
+                        self._json(self._study(study))
+                    elif parts[2:] == ["instances"]:
+                        self._json([{"ID": iid, "ParentStudy": parts[1]} for iid in study["Instances"]])
+                    elif parts[2:] == ["archive"]:
+                        self._send(200, server.archive([parts[1]]), "application/zip")
+                    else:
+                        self._send(404, b"{}", "application/json")
+                elif len(parts) == 3 and parts[0] == "instances" and parts[2] == "file" and parts[1] in server.instances:
+                    server._count("/instances/{id}/file")
+                    self._send(200, server.instances[parts[1]], "application/dicom")
+                else:
+                    self._send(404, b"{}", "application/json")
+
+        return Handler
+
+    def start(self) -> "FakeOrthancServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> "FakeOrthancServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
@@ -0,0 +1,46 @@
+"""
+🧾 Amostras compartilhadas pelos benchmarks.
+"""
+
+SAMPLE_REPORT = """# Ultrassonografia Abdominal Total
+
+## Descrição Técnica:
+
+Exame realizado com transdutor convexo de 3,5 MHz e linear de 7,5 MHz, em modo bidimensional e Doppler colorido, conforme necessário.
+
+## Achados Sonográficos:
+
+**Fígado:** apresenta dimensões normais, contornos regulares e ecotextura homogênea. A ecogenicidade do parênquima é compatível com o padrão habitual, sem evidências de lesões focais ou difusas.
+
+**Vesícula Biliar e Vias Biliares:** possui forma piriforme, paredes finas e conteúdo anecoico. Não foram identificados cálculos ou espessamento parietal.
+
+**Pâncreas:** foi visualizado com contornos regulares, dimensões normais e ecotextura homogênea.
+
+**Baço:** apresenta dimensões normais, contornos regulares e ecotextura homogênea.
+
+**Rins:** Os rins direito e esquerdo possuem dimensões normais, contornos regulares e relação córtico-medular preservada.
+
+## Impressão Diagnóstica:
+
+Exame ultrassonográfico abdominal dentro dos limites da normalidade.
+
+## Diagnóstico Diferencial:
+
+Não se aplica neste caso.
+"""
+
+SAMPLE_STRUCTURED = """
+## Medidas
+
+| Estrutura | Medida | Observação |
+|---|---|---|
+| Nódulo 1 | 0,57 × 0,44 cm | **hipoecoico**, contornos *regulares* |
+| Nódulo 2 | 0,48 cm | diâmetro único |
+
+- Transdutor: ***linear*** 5–12 MHz (LN5-12)
+- Frequência: 4,7 MHz
+- Profundidade: 5,0–6,0 cm
+
+1. Correlacionar com mamografia
+2. Controle ultrassonográfico em **6 meses**
+"""
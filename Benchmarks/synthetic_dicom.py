@@ -0,0 +1,210 @@
+"""
+🧪 Synthetic DICOM Generator
+Gera estudos de ultrassom sintéticos para os benchmarks: imagens monocromáticas ou
+RGB, sem compressão ou com JPEG Baseline encapsulado, cines multiframe e Structured
+Reports com medidas, todos com os cabeçalhos de aparelho e calibração usados pelo pipeline.
+
+### 💡 Example
+>>> make_study("Dicoms", n_images=12, rgb=True, compressed=True, with_sr=True)
+"""
+
+from __future__ import annotations
+
+import io
+import os
+from pathlib import Path
+
+import numpy as np
+from PIL import Image, ImageDraw
+from pydicom.dataset import Dataset, FileMetaDataset
+from pydicom.encaps import encapsulate
+from pydicom.sequence import Sequence
+from pydicom.uid import ExplicitVRLittleEndian, JPEGBaseline8Bit, generate_uid
+
+US_IMAGE_STORAGE = "1.2.840.10008.5.1.4.1.1.6.1"
+US_MULTIFRAME_STORAGE = "1.2.840.10008.5.1.4.1.1.3.1"
+COMPREHENSIVE_SR_STORAGE = "1.2.840.10008.5.1.4.1.1.88.33"
+
+
+def _base_dataset(sop_class: str, study: dict, modality: str, transfer_syntax: str) -> Dataset:
+    meta = FileMetaDataset()
+    meta.MediaStorageSOPClassUID = sop_class
+    meta.MediaStorageSOPInstanceUID = generate_uid()
+    meta.TransferSyntaxUID = transfer_syntax
+
+    ds = Dataset()
+    ds.file_meta = meta
+    ds.SOPClassUID = sop_class
+    ds.SOPInstanceUID = meta.MediaStorageSOPInstanceUID
+    ds.Modality = modality
+    ds.PatientName = study.get("patient_name", "SINTETICO^PACIENTE")
+    ds.PatientID = study.get("patient_id", "SYN0001")
+    ds.StudyInstanceUID = study.get("study_uid") or generate_uid()
+    ds.SeriesInstanceUID = study.get("series_uid") or generate_uid()
+    ds.StudyDate = study.get("study_date", "20250604")
+    ds.StudyDescription = study.get("study_description", "Ultrassonografia de mama")
+    ds.ReferringPhysicianName = study.get("physician", "ANDERSON^BRUM")
+    ds.InstitutionName = study.get("aet", "YOUR_AET_TITLE")
+    ds.Manufacturer = "SAMSUNG MEDISON"
+    ds.ManufacturerModelName = "HM70 EVO"
+    return ds
+
+
+def _frame(rows: int, cols: int, rgb: bool, rng: np.random.Generator, label: str) -> np.ndarray:
+    speckle = rng.gamma(1.5, 40, size=(rows, cols)).clip(0, 255).astype(np.uint8)
+    img = Image.fromarray(np.stack([speckle] * 3, axis=-1) if rgb else speckle)
+    draw = ImageDraw.Draw(img)
+    draw.rectangle((0, 0, min(220, cols), min(60, rows)), fill=0)
+    draw.text((8, 8), label, fill=(255, 255, 0) if rgb else 255)
+    return np.asarray(img)
+
+
+def make_us_image(
+    path: str | Path,
+    study: dict | None = None,
+    rows: int = 600,
+    cols: int = 800,
+    rgb: bool = True,
+    frames: int = 1,
+    compressed: bool = False,
+    seed: int = 0,
+) -> Path:
+    """
+    ### 🖼️ make_us_image
+    Grava uma imagem (ou cine, quando `frames` > 1) de ultrassom sintética.
+
+    ### 🖥️ Parameters
+        - `path` (`str | Path`): Arquivo de saída.
+        - `study` (`dict | None`): Dados comuns do estudo (`patient_name`, `patient_id`, `study_uid`...).
+        - `rows`, `cols` (`int`): Dimensões do quadro.
+        - `rgb` (`bool`): RGB (True) ou MONOCHROME2 (False).
+        - `frames` (`int`): Número de quadros.
+        - `compressed` (`bool`): Encapsula cada quadro como JPEG Baseline.
+        - `seed` (`int`): Semente do ruído speckle.
+    """
+    study = study or {}
+    rng = np.random.default_rng(seed)
+    sop_class = US_MULTIFRAME_STORAGE if frames > 1 else US_IMAGE_STORAGE
+    ds = _base_dataset(sop_class, study, "US", JPEGBaseline8Bit if compressed else ExplicitVRLittleEndian)
+
+    ds.Rows, ds.Columns = rows, cols
+    ds.SamplesPerPixel = 3 if rgb else 1
+    ds.BitsAllocated, ds.BitsStored, ds.HighBit = 8, 8, 7
+    ds.PixelRepresentation = 0
+    ds.ImageType = ["ORIGINAL", "PRIMARY"]
+    ds.TransducerData = ["LN5-12", "linear"]
+    if rgb:
+        ds.PlanarConfiguration = 0
+    if frames > 1:
+        ds.NumberOfFrames = frames
+        ds.ImageType = ["ORIGINAL", "PRIMARY", "MOTION"]
+
+    region = Dataset()
+    region.RegionSpatialFormat = 1
+    region.RegionDataType = 1
+    region.RegionLocationMinX0, region.RegionLocationMinY0 = 0, 0
+    region.RegionLocationMaxX1, region.RegionLocationMaxY1 = cols - 1, rows - 1
+    region.PhysicalUnitsXDirection = region.PhysicalUnitsYDirection = 3  # cm
+    region.PhysicalDeltaX = region.PhysicalDeltaY = 0.0075
+    region.TransducerFrequency = 4700  # kHz
+    ds.SequenceOfUltrasoundRegions = Sequence([region])
+
+    pixel_frames = [_frame(rows, cols, rgb, rng, f"D1 {1 + seed / 10:.2f} cm F{i}") for i in range(frames)]
+    if compressed:
+        encoded = []
+        for frame in pixel_frames:
+            buffer = io.BytesIO()
+            Image.fromarray(frame).save(buffer, "JPEG", quality=90)
+            encoded.append(buffer.getvalue())
+        ds.PhotometricInterpretation = "YBR_FULL_422" if rgb else "MONOCHROME2"
+        ds.PixelData = encapsulate(encoded)
+        ds["PixelData"].VR = "OB"
+        ds.LossyImageCompression = "01"
+    else:
+        ds.PhotometricInterpretation = "RGB" if rgb else "MONOCHROME2"
+        ds.PixelData = np.stack(pixel_frames).tobytes()
+
+    path = Path(path)
+    ds.save_as(path, enforce_file_format=True)
+    return path
+
+
+def _code(value: str, scheme: str, meaning: str) -> Dataset:
+    item = Dataset()
+    item.CodeValue, item.CodingSchemeDesignator, item.CodeMeaning = value, scheme, meaning
+    return item
+
+
+def make_sr(path: str | Path, study: dict | None = None, measurements: list[tuple[str, float, str]] | None = None) -> Path:
+    """
+    ### 🧾 make_sr
+    Grava um Comprehensive SR com um contêiner de achados e uma medida `NUM` por item de
+    `measurements` (`(nome, valor, unidade UCUM)`).
+    """
+    study = study or {}
+    measurements = measurements or [("Nódulo - Comprimento", 0.57, "cm"), ("Nódulo - Altura", 0.44, "cm"),
+                                    ("Nódulo - Largura", 0.48, "cm")]
+    ds = _base_dataset(COMPREHENSIVE_SR_STORAGE, study, "SR", ExplicitVRLittleEndian)
+    ds.ValueType = "CONTAINER"
+    ds.ConceptNameCodeSequence = Sequence([_code("125100", "DCM", "Vascular Ultrasound Procedure Report")])
+    ds.ContinuityOfContent = "SEPARATE"
+
+    items = []
+    for name, value, unit in measurements:
+        num = Dataset()
+        num.RelationshipType = "CONTAINS"
+        num.ValueType = "NUM"
+        num.ConceptNameCodeSequence = Sequence([_code("G-D7FE", "SRT", name)])
+        measured = Dataset()
+        measured.NumericValue = f"{value:g}"
+        measured.MeasurementUnitsCodeSequence = Sequence([_code(unit, "UCUM", unit)])
+        num.MeasuredValueSequence = Sequence([measured])
+        items.append(num)
+
+    container = Dataset()
+    container.RelationshipType = "CONTAINS"
+    container.ValueType = "CONTAINER"
+    container.ConceptNameCodeSequence = Sequence([_code("121070", "DCM", "Findings")])
+    container.ContinuityOfContent = "SEPARATE"
+    container.ContentSequence = Sequence(items)
+    ds.ContentSequence = Sequence([container])
+
+    path = Path(path)
+    ds.save_as(path, enforce_file_format=True)
+    return path
+
+
+def make_study(
+    folder: str | Path,
+    n_images: int = 8,
+    rgb: bool = True,
+    compressed: bool = False,
+    rows: int = 600,
+    cols: int = 800,
+    cines: int = 0,
+    with_sr: bool = False,
+    study: dict | None = None,
+    prefix: str = "IMG",
+) -> list[Path]:
+    """
+    ### 🗂️ make_study
+    Gera um estudo completo em `folder`: `n_images` imagens, `cines` cines de 10 quadros
+    e, opcionalmente, um SR. Retorna os caminhos criados.
+    """
+    folder = Path(folder)
+    os.makedirs(folder, exist_ok=True)
+    study = dict(study or {})
+    study.setdefault("study_uid", generate_uid())
+    study.setdefault("series_uid", generate_uid())
+    paths = [
+        make_us_image(folder / f"{prefix}{i:04d}.dcm", study, rows, cols, rgb, 1, compressed, seed=i)
+        for i in range(n_images)
+    ]
+    paths += [
+        make_us_image(folder / f"{prefix}C{i:03d}.dcm", study, rows, cols, rgb, 10, compressed, seed=100 + i)
+        for i in range(cines)
+    ]
+    if with_sr:
+        paths.append(make_sr(folder / f"{prefix}SR.dcm", study))
+    return paths
+
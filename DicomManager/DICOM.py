@@ -1,14 +1,25 @@
 from __future__ import annotations
 
+import io
+import math
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
 from typing import Union
 
 import numpy as np
 import pydicom
+from pydicom.encaps import generate_frames
 from pydicom.pixel_data_handlers.util import apply_modality_lut, apply_voi_lut
 from PIL import Image, ImageEnhance
 
+from Pipeline.metrics import METRICS, stage
+
+from .frames import FrameRing
+from .sr import SRHarvester
+
 
 class DICOM2JPEG:
     """
@@ -29,8 +40,38 @@ class DICOM2JPEG:
         Exemplo: {'brightness': 1.2, 'color': 1.0, 'contrast': 1.8, 'sharpness': 1.5}
     jpeg_quality : int
         Qualidade do JPEG (0-100).
+    profile      : str | None
+        Perfil de conversão. "raw" desliga realces e gamma; nesse caso (ou sempre que
+        realces e gamma forem identidade) DICOMs com JPEG Baseline encapsulado têm o
+        quadro original gravado diretamente, sem decodificar nem recomprimir.
+    lazy_pixels  : bool
+        Lê os DICOMs com carregamento adiado (`defer_size`) e, para pixel data nativo
+        sem compressão, mapeia a região do PixelData em memória (`np.memmap`) em vez de
+        copiá-la para um objeto bytes.
+    workers      : int | None
+        Processos de conversão (padrão: variável `DICOM_WORKERS`, 0 = serial no processo atual).
+    transport    : str
+        Como os quadros decodificados voltam dos workers: "shm" (anel em memória
+        compartilhada, ver `FrameRing`) ou "pickle" (serializados pelo pool).
+    ring_slots   : int | None
+        Slots do anel de memória compartilhada (padrão: 2 × workers).
+    previews_path : str | None
+        Pasta dos tamanhos derivados de cada imagem (`<nome>.preview.jpeg`, `<nome>.thumb.jpeg`,
+        ver `PYRAMID`) e da folha de contato do estudo (`contact_sheet.jpeg`). São gerados a
+        partir da imagem já decodificada, na mesma passada. None desativa.
     """
 
+    JPEG_BASELINE = "1.2.840.10008.1.2.4.50"
+    PASSTHROUGH_PHOTOMETRIC = ("MONOCHROME2", "YBR_FULL_422", "YBR_FULL")
+    IDENTITY_ENHANCEMENTS = {'brightness': 1.0, 'color': 1.0, 'contrast': 1.0, 'sharpness': 1.0}
+    DEFER_SIZE = "64 KB"
+    # Tamanhos derivados (nome, maior lado em pixels), do maior para o menor: cada nível é
+    # reduzido a partir do anterior. O tamanho "full" é o próprio JPEG de `jpeg_path`.
+    PYRAMID = (("preview", 800), ("thumb", 256))
+    PREVIEW_QUALITY = 85
+    SHEET_COLUMNS = 6
+    SHEET_NAME = "contact_sheet.jpeg"
+
     def __init__(
         self,
         dcm_path: str,
@@ -38,7 +79,16 @@ class DICOM2JPEG:
         black_gamma: float = 0.75,
         enhancements: dict | None = None,
         jpeg_quality: int = 99,
+        profile: str | None = None,
+        lazy_pixels: bool = True,
+        workers: int | None = None,
+        transport: str = "shm",
+        ring_slots: int | None = None,
+        previews_path: str | None = None,
     ):
+        if profile == "raw":
+            black_gamma = 1.0
+            enhancements = dict(self.IDENTITY_ENHANCEMENTS)
         self.dcm_path = dcm_path
         self.jpeg_path = jpeg_path
         self.black_gamma = black_gamma
@@ -49,8 +99,55 @@ class DICOM2JPEG:
             'sharpness': 1.5,
         }
         self.jpeg_quality = jpeg_quality
+        self.lazy_pixels = lazy_pixels
+        self.workers = int(os.getenv("DICOM_WORKERS", "0") or 0) if workers is None else workers
+        if transport not in ("shm", "pickle"):
+            raise ValueError(f"transport inválido: {transport!r} (use 'shm' ou 'pickle')")
+        self.transport = transport
+        self.ring_slots = ring_slots
+        self.previews_path = previews_path
+
+    @property
+    def passthrough(self) -> bool:
+        """
+        ### ⏩ passthrough
+        True quando realces e gamma são identidade, ou seja, quando os quadros JPEG
+        encapsulados podem ser gravados sem decodificação.
+        """
+        return self.black_gamma == 1.0 and all(v == 1.0 for v in self.enhancements.values())
 
+    @classmethod
+    def encapsulated_jpeg(cls, ds: pydicom.Dataset) -> bytes | None:
+        """
+        ### 📦 encapsulated_jpeg
+        Retorna os bytes do quadro JPEG Baseline encapsulado no PixelData quando ele pode
+        ser usado sem processamento: quadro único de 8 bits, MONOCHROME2 sem LUTs de
+        modalidade/VOI ou YBR (o fluxo JPEG já traz a conversão de cor). MONOCHROME1
+        precisaria ser invertido e é sempre decodificado.
 
+        ### 🔄 Returns
+        - `bytes | None`: Fluxo JPEG completo, ou None se o dataset exigir decodificação.
+        """
+        meta = getattr(ds, 'file_meta', None)
+        if meta is None or meta.get('TransferSyntaxUID') != cls.JPEG_BASELINE:
+            return None
+        if int(ds.get('NumberOfFrames', 1) or 1) != 1 or ds.get('BitsAllocated', 8) != 8:
+            return None
+
+        photo = str(ds.get('PhotometricInterpretation', '')).upper()
+        if photo not in cls.PASSTHROUGH_PHOTOMETRIC:
+            return None
+        if photo == 'MONOCHROME2' and any(
+            keyword in ds for keyword in ('RescaleSlope', 'RescaleIntercept', 'WindowCenter', 'VOILUTSequence')
+        ):
+            return None
+
+        frame = next(generate_frames(ds.PixelData, number_of_frames=1), b'')
+        # Fragmentos podem ter um byte de preenchimento após o marcador EOI
+        frame = frame.rstrip(b'\x00')
+        if not frame.startswith(b'\xff\xd8') or not frame.endswith(b'\xff\xd9'):
+            return None
+        return frame
 
     @staticmethod
     def is_video_dicom(path: Union[str, Path]) -> bool:
@@ -123,12 +220,212 @@ class DICOM2JPEG:
             lut *= len(img.getbands())
         return img.point(lut)
 
+    @staticmethod
+    def memmap_pixels(ds: pydicom.Dataset, path: Union[str, Path]) -> np.ndarray | None:
+        """
+        ### 🗺️ memmap_pixels
+        Mapeia em memória o PixelData nativo (sem compressão, little endian) de um dataset
+        lido com `defer_size`, sem carregar os bytes do elemento. Os quadros são lidos
+        direto do cache de páginas do sistema operacional.
+
+        ### 🖥️ Parameters
+        - `ds` (`pydicom.Dataset`): Dataset lido com `defer_size` (PixelData ainda adiado).
+        - `path` (`Union[str, Path]`): Arquivo de onde o dataset foi lido.
+
+        ### 🔄 Returns
+        - `np.ndarray | None`: Array somente leitura `(linhas, colunas[, amostras])`, ou None
+          quando o dataset não se encaixa (compressão, big endian, cor não RGB, multiframe,
+          BitsStored diferente de BitsAllocated...).
+
+        ### 💡 Example
+        >>> ds = pydicom.dcmread("image.dcm", defer_size="64 KB")
+        >>> pixels = DICOM2JPEG.memmap_pixels(ds, "image.dcm")
+        """
+        meta = getattr(ds, 'file_meta', None)
+        syntax = meta.get('TransferSyntaxUID') if meta is not None else None
+        if syntax is None or syntax.is_compressed or not syntax.is_little_endian:
+            return None
+        if int(ds.get('NumberOfFrames', 1) or 1) != 1:
+            return None
+
+        photo = str(ds.get('PhotometricInterpretation', '')).upper()
+        samples = int(ds.get('SamplesPerPixel', 1))
+        bits = int(ds.get('BitsAllocated', 0))
+        if photo not in ('RGB', 'MONOCHROME1', 'MONOCHROME2') or bits not in (8, 16):
+            return None
+        if samples == 3 and bits != 8:
+            return None
+        if int(ds.get('BitsStored', bits)) != bits:
+            # Menos bits armazenados que alocados: os bits altos podem ter lixo (sem sinal) ou
+            # pedir extensão de sinal (com sinal); o pydicom trata os dois casos
+            return None
+
+        try:
+            elem = ds.get_item('PixelData', keep_deferred=True)
+        except TypeError:
+            # pydicom < 3 não expõe o elemento adiado
+            return None
+        offset = getattr(elem, 'value_tell', None)
+        if offset is None or getattr(elem, 'value', None) is not None:
+            return None
+
+        rows, cols = int(ds.Rows), int(ds.Columns)
+        if bits == 8:
+            dtype = np.uint8
+        else:
+            dtype = np.dtype('<i2') if ds.get('PixelRepresentation', 0) else np.dtype('<u2')
+        count = rows * cols * samples
+        if elem.length < count * np.dtype(dtype).itemsize:
+            return None
+
+        pixels = np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=(count,))
+        if samples == 1:
+            return pixels.reshape(rows, cols)
+        if ds.get('PlanarConfiguration', 0) == 1:
+            return pixels.reshape(samples, rows, cols).transpose(1, 2, 0)
+        return pixels.reshape(rows, cols, samples)
+
+    def render(self, ds: pydicom.Dataset, path: Union[str, Path]) -> Image.Image:
+        """
+        ### 🎨 render
+        Decodifica o pixel data e aplica os realces e a correção de gamma configurados.
+
+        ### 🔄 Returns
+        - `Image.Image`: Imagem RGB de 8 bits pronta para gravar.
+        """
+        # Converter para PIL Image
+        pixels = self.memmap_pixels(ds, path) if self.lazy_pixels else None
+        img = self._dicom_to_pil(ds, pixels)
+        del pixels
+
+        # Aplicar realces opcionais
+        if self.enhancements.get('brightness', 1.0) != 1.0:
+            img = ImageEnhance.Brightness(img).enhance(self.enhancements['brightness'])
+        if self.enhancements.get('color', 1.0) != 1.0:
+            img = ImageEnhance.Color(img).enhance(self.enhancements['color'])
+        if self.enhancements.get('contrast', 1.0) != 1.0:
+            img = ImageEnhance.Contrast(img).enhance(self.enhancements['contrast'])
+        if self.enhancements.get('sharpness', 1.0) != 1.0:
+            img = ImageEnhance.Sharpness(img).enhance(self.enhancements['sharpness'])
+
+        # Correção de gamma para nível de preto mais claro
+        if self.black_gamma != 1.0:
+            img = self.gamma_correction(img, self.black_gamma)
+        return img
+
+    def _convert_file(self, file: str, emit=None) -> dict:
+        # Converte um arquivo; com `emit`, a imagem processada é entregue a ele (workers) em vez de gravada
+        path = os.path.join(self.dcm_path, file)
+
+        # Verificar se é vídeo/multiframe
+        if self.is_video_dicom(path):
+            return {"mode": "skip", "reason": "Arquivo de vídeo/multiframe"}
+
+        # Carregar dataset DICOM; com lazy_pixels os elementos grandes (PixelData,
+        # tags privadas) só são lidos do disco se forem acessados
+        ds = pydicom.dcmread(path, defer_size=self.DEFER_SIZE if self.lazy_pixels else None)
+
+        # Pular arquivos SR (Structured Report) e demais objetos sem imagem;
+        # as medidas dos SR são aproveitadas pelo SRHarvester
+        if SRHarvester.is_structured_report(ds) or 'PixelData' not in ds:
+            return {"mode": "skip", "reason": "Structured Report / sem pixel data"}
+
+        output_path = os.path.join(self.jpeg_path, self.output_name(file))
+
+        # Sem realces: gravar o JPEG encapsulado original, sem nova geração de perda
+        frame = self.encapsulated_jpeg(ds) if self.passthrough else None
+        if frame is not None:
+            with open(output_path, 'wb') as f:
+                f.write(frame)
+            result = {"mode": "passthrough", "bytes": len(frame)}
+            if self.previews_path:
+                # Decodificação reduzida (escala DCT 1/2..1/8): só o necessário para o maior derivado
+                img = Image.open(io.BytesIO(frame))
+                img.draft(img.mode, self._fit(img.size, self.PYRAMID[0][1]))
+                result["preview_bytes"] = self.write_previews(img, file)
+            return result
+
+        img = self.render(ds, path)
+        # Derivados a partir dos pixels já processados, antes de a imagem sair do processo
+        previews = {"preview_bytes": self.write_previews(img, file)} if self.previews_path else {}
+        if emit is not None:
+            return {"mode": "decode", **emit(img), **previews}
+
+        # Salvar como JPEG
+        img.save(output_path, 'JPEG', quality=self.jpeg_quality)
+        return {"mode": "decode", "bytes": os.path.getsize(output_path), **previews}
+
+    @staticmethod
+    def _fit(size: tuple[int, int], side: int) -> tuple[int, int]:
+        # Dimensões com o maior lado limitado a `side`, mantendo a proporção (nunca amplia)
+        scale = min(1.0, side / max(size))
+        return max(1, round(size[0] * scale)), max(1, round(size[1] * scale))
+
+    def write_previews(self, img: Image.Image, file: str) -> int:
+        """
+        ### 🔻 write_previews
+        Grava os tamanhos derivados (`PYRAMID`) de uma imagem já decodificada em
+        `previews_path`, reduzindo cada nível a partir do anterior.
+
+        ### 🔄 Returns
+        - `int`: Bytes gravados.
+        """
+        os.makedirs(self.previews_path, exist_ok=True)
+        stem = os.path.splitext(self.output_name(file))[0]
+        written = 0
+        for level, side in self.PYRAMID:
+            size = self._fit(img.size, side)
+            if size != img.size:
+                img = img.resize(size, Image.Resampling.LANCZOS, reducing_gap=2.0)
+            path = os.path.join(self.previews_path, f"{stem}.{level}.jpeg")
+            img.save(path, 'JPEG', quality=self.PREVIEW_QUALITY)
+            written += os.path.getsize(path)
+        return written
+
+    def contact_sheet(self) -> str | None:
+        """
+        ### 🗂️ contact_sheet
+        Monta a folha de contato do estudo (`SHEET_NAME`) com as miniaturas de
+        `previews_path`, em ordem de nome e `SHEET_COLUMNS` colunas. Usa só as miniaturas,
+        sem decodificar as imagens completas, e inclui as de conversões anteriores da pasta.
+
+        ### 🔄 Returns
+        - `str | None`: Caminho da folha, ou None se não houver miniaturas.
+        """
+        level, side = self.PYRAMID[-1]
+        suffix = f".{level}.jpeg"
+        thumbs = sorted(f for f in os.listdir(self.previews_path) if f.endswith(suffix))
+        if not thumbs:
+            return None
+        gap = 4
+        columns = min(self.SHEET_COLUMNS, len(thumbs))
+        rows = math.ceil(len(thumbs) / columns)
+        sheet = Image.new("RGB", (columns * (side + gap) + gap, rows * (side + gap) + gap))
+        for i, name in enumerate(thumbs):
+            with Image.open(os.path.join(self.previews_path, name)) as thumb:
+                # Centraliza cada miniatura na sua célula
+                x = gap + (i % columns) * (side + gap) + (side - thumb.width) // 2
+                y = gap + (i // columns) * (side + gap) + (side - thumb.height) // 2
+                sheet.paste(thumb.convert("RGB"), (x, y))
+        path = os.path.join(self.previews_path, self.SHEET_NAME)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        sheet.save(tmp_path, 'JPEG', quality=self.PREVIEW_QUALITY)
+        os.replace(tmp_path, path)
+        return path
+
+    @staticmethod
+    def output_name(file: str) -> str:
+        return file.replace('.dcm', '.jpeg')
+
     def converter(self) -> bool:
         """
         ### 🔄 Converte arquivos DICOM para JPEG
 
         Percorre a pasta DICOM e converte cada arquivo para JPEG mantendo resolução.
-        Aplica realces e correções de gamma conforme configurado.
+        Aplica realces e correções de gamma conforme configurado. Com `workers` > 1 a
+        decodificação e os realces rodam em processos separados (ver `_convert_parallel`).
+        Com `previews_path`, grava também os tamanhos derivados de cada imagem e, ao fim,
+        a folha de contato do estudo.
 
         ### 🔄 Returns
         - `bool`: True se pelo menos um arquivo foi convertido com sucesso, False caso contrário.
@@ -146,75 +443,141 @@ class DICOM2JPEG:
 
         os.makedirs(self.jpeg_path, exist_ok=True)
 
-        files_processed = 0
-        files_converted = 0
+        files = [file for file in os.listdir(self.dcm_path) if file.lower().endswith('.dcm')]
+        if self.workers > 1 and len(files) > 1:
+            results = self._convert_parallel(files)
+        else:
+            results = self._convert_serial(files)
 
-        for file in os.listdir(self.dcm_path):
-            if not file.lower().endswith('.dcm'):
-                continue
+        files_converted = sum(1 for r in results if r["mode"] in ("decode", "passthrough"))
+        files_passthrough = sum(1 for r in results if r["mode"] == "passthrough")
+        print(f"Conversão concluída: {files_converted}/{len(files)} arquivos convertidos "
+              f"({files_passthrough} sem recompressão)")
+        if self.previews_path and files_converted:
+            try:
+                with stage("contact_sheet") as span:
+                    sheet = self.contact_sheet()
+                    span["bytes"] = os.path.getsize(sheet) if sheet else 0
+                print(f"[OK] Folha de contato: {sheet}")
+            except Exception as e:
+                print(f"[AVISO] Erro ao montar a folha de contato: {e}")
+        return files_converted > 0
 
-            path = os.path.join(self.dcm_path, file)
-            files_processed += 1
+    def _report(self, result: dict) -> None:
+        file, mode = result["file"], result["mode"]
+        if mode == "skip":
+            print(f"[SKIP] {result['reason']}: {file}")
+        elif mode == "passthrough":
+            print(f"[OK] Copiado (JPEG original): {file} -> {self.output_name(file)}")
+        elif mode == "decode":
+            print(f"[OK] Convertido: {file} -> {self.output_name(file)}")
+        else:
+            print(f'[ERRO] {file}: {result["error"]}')
 
+    def _frame_bytes(self, files: list[str]) -> int:
+        # Maior quadro do estudo pelos cabeçalhos (Rows × Columns), para dimensionar o anel
+        largest = 0
+        for file in files:
             try:
-                # Verificar se é vídeo/multiframe
-                if self.is_video_dicom(path):
-                    print(f"[SKIP] Arquivo de vídeo/multiframe: {file}")
-                    continue
-
-                # Pular arquivos SR (Structured Report)
-                if file.startswith('SR'):
-                    print(f"[SKIP] Structured Report: {file}")
-                    continue
-
-                # Carregar dataset DICOM
-                ds = pydicom.dcmread(path)
-
-                # Converter para PIL Image
-                img = self._dicom_to_pil(ds)
-
-                # Aplicar realces opcionais
-                if self.enhancements.get('brightness', 1.0) != 1.0:
-                    img = ImageEnhance.Brightness(img).enhance(self.enhancements['brightness'])
-                if self.enhancements.get('color', 1.0) != 1.0:
-                    img = ImageEnhance.Color(img).enhance(self.enhancements['color'])
-                if self.enhancements.get('contrast', 1.0) != 1.0:
-                    img = ImageEnhance.Contrast(img).enhance(self.enhancements['contrast'])
-                if self.enhancements.get('sharpness', 1.0) != 1.0:
-                    img = ImageEnhance.Sharpness(img).enhance(self.enhancements['sharpness'])
-
-                # Correção de gamma para nível de preto mais claro
-                if self.black_gamma != 1.0:
-                    img = self.gamma_correction(img, self.black_gamma)
-
-                # Salvar como JPEG
-                output = file.replace('.dcm', '.jpeg')
-                output_path = os.path.join(self.jpeg_path, output)
-                img.save(output_path, 'JPEG', quality=self.jpeg_quality)
-
-                files_converted += 1
-                print(f"[OK] Convertido: {file} -> {output}")
+                ds = pydicom.dcmread(os.path.join(self.dcm_path, file), stop_before_pixels=True)
+                largest = max(largest, FrameRing.slot_size(int(ds.get('Rows', 0) or 0), int(ds.get('Columns', 0) or 0)))
+            except Exception:
+                continue
+        return largest
 
+    def _convert_serial(self, files: list[str]) -> list[dict]:
+        results = []
+        for file in files:
+            try:
+                with stage("convert", file=file) as span:
+                    result = self._convert_file(file)
+                    span.update(mode=result["mode"], items=int(result["mode"] != "skip"),
+                                bytes=result.get("bytes", 0))
             except Exception as e:
-                print(f'[ERRO] {file}: {e}')
-                continue
+                result = {"mode": "error", "error": str(e)}
+            result["file"] = file
+            self._report(result)
+            results.append(result)
+        return results
 
-        print(f"Conversão concluída: {files_converted}/{files_processed} arquivos convertidos")
-        return files_converted > 0
+    def _convert_parallel(self, files: list[str]) -> list[dict]:
+        """
+        ### 🧵 Conversão em processos
 
+        Distribui os arquivos entre `workers` processos, que decodificam e aplicam os realces.
+        Com `transport="shm"` cada worker grava os pixels processados uma única vez em um
+        slot do `FrameRing` (memória compartilhada, slots dimensionados pelos cabeçalhos) e
+        este processo grava o JPEG lendo o slot sem cópia; com `"pickle"` (ou se a memória
+        compartilhada não comportar o anel) a imagem volta serializada pelo pool.
+        O JPEG é gravado aqui, para que o PDF e o OCR encontrem os arquivos de sempre.
+
+        Se um worker morrer (`BrokenProcessPool`, por exemplo por falta de memória), os quadros
+        já gravados são mantidos e os arquivos restantes são convertidos neste processo, um a um.
+        """
+        ring = None
+        if self.transport == "shm":
+            slot_bytes = self._frame_bytes(files)
+            try:
+                ring = FrameRing.create(slot_bytes, slots=self.ring_slots or 2 * self.workers) if slot_bytes else None
+            except OSError as e:
+                print(f"[AVISO] Memória compartilhada indisponível ({e}); quadros serão serializados")
+
+        results = []
+        unfinished = []
+        try:
+            with ProcessPoolExecutor(
+                max_workers=min(self.workers, len(files)),
+                initializer=_init_worker,
+                initargs=(self, ring.spec if ring else None),
+            ) as executor:
+                futures = {executor.submit(_convert_in_worker, file): file for file in files}
+                for future in as_completed(futures):
+                    try:
+                        result = future.result()
+                    except BrokenProcessPool:
+                        unfinished.append(futures[future])
+                        continue
+                    error = result["mode"] == "error"
+                    try:
+                        if result["mode"] == "decode":
+                            output_path = os.path.join(self.jpeg_path, self.output_name(result["file"]))
+                            if "slot" in result:
+                                img = ring.image(result["slot"], result["size"])
+                                try:
+                                    img.save(output_path, 'JPEG', quality=self.jpeg_quality)
+                                finally:
+                                    del img
+                                    ring.release(result.pop("slot"))
+                            else:
+                                result.pop("image").save(output_path, 'JPEG', quality=self.jpeg_quality)
+                            result["bytes"] = os.path.getsize(output_path)
+                    except Exception as e:
+                        result.update(mode="error", error=str(e))
+                        error = True
+                    METRICS.record("convert", result.pop("seconds"), error=error, file=result["file"],
+                                   mode=result["mode"], items=int(result["mode"] in ("decode", "passthrough")),
+                                   bytes=result.get("bytes", 0))
+                    self._report(result)
+                    results.append(result)
+        finally:
+            if ring is not None:
+                ring.close()
+        if unfinished:
+            print(f"[AVISO] Um worker da conversão morreu; convertendo {len(unfinished)} arquivo(s) neste processo")
+            results += self._convert_serial(sorted(unfinished))
+        return results
 
     @classmethod
-    def eliminate_dcm(cls) -> None:
+    def eliminate_dcm(cls, dcm_dir: str = "Dicoms") -> None:
         """
         ### 🧹 Remove arquivos DICOM temporários
 
-        Apaga todos os arquivos .dcm da pasta Dicoms de forma segura,
+        Apaga todos os arquivos .dcm da pasta `dcm_dir` (padrão `Dicoms`) de forma segura,
         com tratamento de erros para arquivos em uso.
 
         ### 💡 Example
         >>> DICOM2JPEG.eliminate_dcm()
         """
-        dcm_dir = "Dicoms"
         if not os.path.exists(dcm_dir):
             print(f"[INFO] Diretório {dcm_dir} não existe")
             return
@@ -247,17 +610,17 @@ class DICOM2JPEG:
         print(f"[INFO] Limpeza DICOM: {files_removed} removidos, {files_failed} falharam")
 
     @classmethod
-    def eliminate_jpeg(cls) -> None:
+    def eliminate_jpeg(cls, images_dir: str = "Images") -> None:
         """
         ### 🧹 Remove arquivos JPEG temporários
 
-        Apaga todos os arquivos .jpeg/.jpg da pasta Images de forma segura,
-        com tratamento de erros para arquivos em uso.
+        Apaga todos os arquivos .jpeg/.jpg da pasta `images_dir` (padrão `Images`) de forma segura,
+        com tratamento de erros para arquivos em uso. A retenção das imagens dos pacientes
+        é feita pelo `Pipeline.retention.StorageSweeper`.
 
         ### 💡 Example
         >>> DICOM2JPEG.eliminate_jpeg()
         """
-        images_dir = "Images"
         if not os.path.exists(images_dir):
             print(f"[INFO] Diretório {images_dir} não existe")
             return
@@ -289,7 +652,7 @@ class DICOM2JPEG:
         print(f"[INFO] Limpeza JPEG: {files_removed} removidos, {files_failed} falharam")
 
     @classmethod
-    def eliminate_all(cls) -> None:
+    def eliminate_all(cls, dcm_dir: str = "Dicoms", images_dir: str = "Images") -> None:
         """
         ### 🧹 Remove todos os arquivos temporários
 
@@ -299,12 +662,12 @@ class DICOM2JPEG:
         >>> DICOM2JPEG.eliminate_all()
         """
         print("[INFO] Iniciando limpeza completa...")
-        cls.eliminate_dcm()
-        cls.eliminate_jpeg()
+        cls.eliminate_dcm(dcm_dir)
+        cls.eliminate_jpeg(images_dir)
         print("[INFO] Limpeza completa finalizada")
 
     @staticmethod
-    def _dicom_to_pil(ds: pydicom.Dataset) -> Image.Image:
+    def _dicom_to_pil(ds: pydicom.Dataset, pixel_array: np.ndarray | None = None) -> Image.Image:
         """
         ### 🖼️ Converte Dataset DICOM em PIL.Image RGB de 8 bits
 
@@ -314,6 +677,8 @@ class DICOM2JPEG:
 
         ### 🖥️ Parameters
         - `ds` (`pydicom.Dataset`): Dataset DICOM com pixel data válido.
+        - `pixel_array` (`np.ndarray | None`): Pixels já obtidos (por exemplo, via `memmap_pixels`);
+          se None, usa `ds.pixel_array`.
 
         ### 🔄 Returns
         - `Image.Image`: Imagem PIL no modo RGB, 8 bits por canal.
@@ -326,7 +691,8 @@ class DICOM2JPEG:
 
         # Obter pixel array (pydicom 3.0+ já converte YBR→RGB automaticamente)
         try:
-            pixel_array = ds.pixel_array
+            if pixel_array is None:
+                pixel_array = ds.pixel_array
         except Exception as e:
             raise ValueError(f"Erro ao obter pixel data: {e}")
 
@@ -382,6 +748,39 @@ class DICOM2JPEG:
             raise ValueError(f"Número de samples per pixel não suportado: {samples_per_pixel}")
 
 
+# Estado dos processos de conversão (definido pelo initializer do pool)
+_worker_converter: DICOM2JPEG | None = None
+_worker_ring: FrameRing | None = None
+
+
+def _init_worker(converter: DICOM2JPEG, ring_spec: tuple | None) -> None:
+    global _worker_converter, _worker_ring
+    _worker_converter = converter
+    _worker_ring = FrameRing.attach(*ring_spec) if ring_spec else None
+
+
+def _convert_in_worker(file: str) -> dict:
+    # Executa no worker: grava o quadro processado no anel (ou devolve a imagem, no modo pickle)
+    started = time.perf_counter()
+
+    def emit(img: Image.Image) -> dict:
+        if _worker_ring is None:
+            return {"image": img if img.mode == "RGB" else img.convert("RGB")}
+        slot = _worker_ring.acquire()
+        try:
+            return {"slot": slot, "size": _worker_ring.write(slot, img)}
+        except BaseException:
+            _worker_ring.release(slot)
+            raise
+
+    try:
+        result = _worker_converter._convert_file(file, emit=emit)
+    except Exception as e:
+        result = {"mode": "error", "error": str(e)}
+    result.update(file=file, seconds=time.perf_counter() - started)
+    return result
+
+
 # Exemplo de uso:
 # if __name__ == '__main__':
 #     conv = DICOM2JPEG('dicoms', 'imagens', black_gamma=0.8)
@@ -1,4 +1,24 @@
-from .DICOM import DICOM2JPEG
-from .unzip import Unzipper
+from importlib import import_module
 
-__all__ = ["DICOM2JPEG", "Unzipper"]
\ No newline at end of file
+# Carregamento sob demanda: `from DicomManager import Unzipper` não importa pydicom/NumPy/PIL
+_EXPORTS = {
+    "DICOM2JPEG": ".DICOM",
+    "Unzipper": ".unzip",
+    "FrameDeduplicator": ".dedup",
+    "SRHarvester": ".sr",
+    "FrameRing": ".frames",
+}
+
+__all__ = ["DICOM2JPEG", "Unzipper", "FrameDeduplicator", "SRHarvester", "FrameRing"]
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import Union
+
+import numpy as np
+from PIL import Image
+
+
+class FrameDeduplicator:
+    """
+    ### 🪞 FrameDeduplicator
+    Agrupa quadros quase idênticos (mesma janela salva várias vezes pelo operador)
+    para que apenas um representante de cada grupo siga para o OCR ou para o PDF.
+
+    Cada imagem é reduzida uma única vez a uma miniatura em tons de cinza; a partir
+    dela são calculados um hash de diferenças (dHash) e a própria miniatura. Dois quadros
+    são considerados duplicados quando a distância de Hamming entre os hashes **e** a
+    maior diferença absoluta entre pixels das miniaturas ficam abaixo dos limites. O hash
+    é um filtro grosseiro e tolerante ao speckle; a diferença máxima de pixels evita unir
+    quadros da mesma janela que só diferem nas medidas escritas na tela.
+
+    Na miniatura, um texto pequeno (ex.: "D1 2.31 cm" vs "D1 2.81 cm") se dilui a poucos
+    níveis de cinza. Por isso os pares aprovados ainda são comparados em uma versão de
+    `detail_size` pixels, em que os traços do texto e dos cursores sobrevivem: uma diferença
+    acima de `max_detail_diff` mantém os dois quadros. As versões detalhadas são calculadas
+    apenas para os candidatos e guardadas só para os representantes.
+    Todas as comparações são vetorizadas com NumPy.
+
+    ### 🖥️ Parameters
+    - `max_hamming` (`int`): Distância máxima entre hashes (de `hash_size²` bits).
+    - `max_pixel_diff` (`float`): Maior diferença absoluta tolerada entre pixels das miniaturas (0-255).
+    - `hash_size` (`int`): Lado do dHash (gera `hash_size²` bits).
+    - `thumb_size` (`int`): Lado da miniatura usada na diferença de pixels.
+    - `max_detail_diff` (`float`): Maior diferença absoluta tolerada na versão detalhada (0-255).
+    - `detail_size` (`int`): Lado da versão detalhada (0 desativa a verificação).
+
+    ### 💡 Example
+    >>> dedup = FrameDeduplicator(max_hamming=24, max_pixel_diff=12, max_detail_diff=32)
+    >>> representatives, report = dedup.deduplicate(sorted(Path("Images").glob("*.jpeg")))
+    >>> print(report["frames_skipped"])
+    """
+
+    def __init__(
+        self,
+        max_hamming: int = 24,
+        max_pixel_diff: float = 12,
+        hash_size: int = 16,
+        thumb_size: int = 128,
+        max_detail_diff: float = 32,
+        detail_size: int = 512,
+    ):
+        self.max_hamming = max_hamming
+        self.max_pixel_diff = max_pixel_diff
+        self.hash_size = hash_size
+        self.thumb_size = thumb_size
+        self.max_detail_diff = max_detail_diff
+        self.detail_size = detail_size
+
+    @classmethod
+    def from_env(cls) -> "FrameDeduplicator":
+        """
+        ### ⚙️ from_env
+        Cria o deduplicador com limites de `DEDUP_MAX_HAMMING`, `DEDUP_MAX_PIXEL_DIFF` e
+        `DEDUP_MAX_DETAIL_DIFF`.
+        """
+        return cls(
+            max_hamming=int(os.getenv("DEDUP_MAX_HAMMING", "24")),
+            max_pixel_diff=float(os.getenv("DEDUP_MAX_PIXEL_DIFF", "12")),
+            max_detail_diff=float(os.getenv("DEDUP_MAX_DETAIL_DIFF", "32")),
+        )
+
+    def _signature(self, path: Union[str, Path]) -> tuple[np.ndarray, np.ndarray]:
+        with Image.open(path) as img:
+            # draft() deixa o decodificador JPEG reduzir a imagem durante a leitura
+            img.draft("L", (self.thumb_size * 2, self.thumb_size * 2))
+            gray = img.convert("L")
+            thumb = np.asarray(gray.resize((self.thumb_size, self.thumb_size), Image.BILINEAR), dtype=np.float32)
+            small = np.asarray(gray.resize((self.hash_size + 1, self.hash_size), Image.BILINEAR), dtype=np.int16)
+        bits = (small[:, 1:] > small[:, :-1]).ravel()
+        return bits, thumb
+
+    def _detail(self, path: Union[str, Path]) -> np.ndarray:
+        with Image.open(path) as img:
+            img.draft("L", (self.detail_size * 2, self.detail_size * 2))
+            gray = img.convert("L").resize((self.detail_size, self.detail_size), Image.BILINEAR)
+        return np.asarray(gray, dtype=np.int16)
+
+    def signatures(self, paths: list) -> tuple[np.ndarray, np.ndarray]:
+        """
+        ### #️⃣ signatures
+        Calcula os hashes (`N × hash_size²` booleanos) e miniaturas (`N × thumb × thumb`).
+        """
+        n = len(paths)
+        bits = np.zeros((n, self.hash_size * self.hash_size), dtype=bool)
+        thumbs = np.zeros((n, self.thumb_size, self.thumb_size), dtype=np.float32)
+        for i, path in enumerate(paths):
+            bits[i], thumbs[i] = self._signature(path)
+        return bits, thumbs
+
+    def cluster(self, paths: list) -> list[list]:
+        """
+        ### 🧩 cluster
+        Agrupa os quadros em ordem: cada quadro entra no primeiro grupo cujo
+        representante seja seu duplicado, ou inicia um novo grupo.
+
+        ### 🔄 Returns
+        - `list[list]`: Grupos de caminhos; o primeiro de cada grupo é o representante.
+        """
+        if not paths:
+            return []
+        bits, thumbs = self.signatures(paths)
+        packed = np.packbits(bits, axis=1)
+
+        rep_index: list[int] = []
+        clusters: list[list] = []
+        details: dict[int, np.ndarray] = {}
+        for i in range(len(paths)):
+            joined = False
+            detail = None
+            if rep_index:
+                reps = np.asarray(rep_index)
+                hamming = np.unpackbits(packed[reps] ^ packed[i], axis=1).sum(axis=1)
+                candidates = reps[hamming <= self.max_hamming]
+                if candidates.size:
+                    diffs = np.abs(thumbs[candidates] - thumbs[i]).max(axis=(1, 2))
+                    for rep in candidates[diffs <= self.max_pixel_diff]:
+                        rep = int(rep)
+                        if self.detail_size:
+                            # Texto e cursores: só a versão detalhada distingue medidas diferentes
+                            if detail is None:
+                                detail = self._detail(paths[i])
+                            if rep not in details:
+                                details[rep] = self._detail(paths[rep])
+                            if np.abs(details[rep] - detail).max() > self.max_detail_diff:
+                                continue
+                        clusters[rep_index.index(rep)].append(paths[i])
+                        joined = True
+                        break
+            if joined:
+                continue
+            rep_index.append(i)
+            clusters.append([paths[i]])
+            if detail is not None:
+                details[i] = detail
+        return clusters
+
+    def deduplicate(self, paths: list, batch_size: int = 4) -> tuple[list, dict]:
+        """
+        ### 🪞 deduplicate
+        Retorna os representantes de cada grupo (na ordem original) e um relatório
+        com quadros, grupos, chamadas de OCR e bytes de arquivo economizados.
+
+        ### 🖥️ Parameters
+        - `paths` (`list`): Caminhos das imagens do estudo.
+        - `batch_size` (`int`): Imagens por chamada de OCR, para estimar as chamadas economizadas.
+        """
+        clusters = self.cluster(paths)
+        representatives = [group[0] for group in clusters]
+        skipped = [path for group in clusters for path in group[1:]]
+        report = {
+            "frames": len(paths),
+            "clusters": len(clusters),
+            "frames_skipped": len(skipped),
+            "calls_saved": -(-len(paths) // batch_size) - (-(-len(representatives) // batch_size)),
+            "bytes_saved": sum(os.path.getsize(path) for path in skipped),
+        }
+        return representatives, report
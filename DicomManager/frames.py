@@ -0,0 +1,135 @@
+"""
+🧵 Shared-memory Frame Ring
+Transporte de quadros entre os processos de conversão e o processo principal sem serializar
+pixels: um anel de buffers `uint8` pré-alocados em `multiprocessing.shared_memory`, cada um
+com espaço para o maior quadro do estudo (Rows × Columns lidos dos cabeçalhos) em RGBX.
+
+O worker obtém um slot livre (bloqueando enquanto o anel está cheio, o que limita a memória
+em trânsito), grava os pixels processados uma única vez e devolve apenas `(slot, tamanho)`.
+O processo principal abre o slot como uma `PIL.Image` apoiada no próprio buffer (RGBX é um
+dos modos que o Pillow mapeia sem cópia), grava o JPEG e devolve o slot ao anel.
+
+### 💡 Example
+>>> ring = FrameRing.create(slot_bytes=FrameRing.slot_size(600, 800), slots=4)
+>>> slot = ring.acquire()                      # no worker (via FrameRing.attach(*ring.spec))
+>>> ring.array(slot, (600, 800))[..., :3] = pixels
+>>> ring.image(slot, (600, 800)).save("out.jpeg")  # no processo principal, sem cópia
+>>> ring.release(slot)
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+from multiprocessing import shared_memory
+
+import numpy as np
+from PIL import Image
+
+# Bytes por pixel no anel: RGBX (o Pillow só mapeia buffers externos sem cópia em modos de 1 ou 4 bytes)
+CHANNELS = 4
+
+
+class FrameRing:
+    """
+    ### 🧵 FrameRing
+    Anel de `slots` buffers de `slot_bytes` bytes em memória compartilhada, com uma fila de
+    slots livres compartilhada entre os processos.
+
+    ### 🖥️ Parameters
+        - `shm` (`SharedMemory`): Bloco de memória compartilhada com todos os slots.
+        - `slot_bytes` (`int`): Tamanho de cada slot.
+        - `slots` (`int`): Número de slots.
+        - `free` (`multiprocessing.Queue`): Fila de índices de slots livres.
+        - `owner` (`bool`): Processo que criou o anel (responsável por `unlink`).
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, slot_bytes: int, slots: int, free, owner: bool = False):
+        self.shm = shm
+        self.slot_bytes = slot_bytes
+        self.slots = slots
+        self.free = free
+        self.owner = owner
+
+    @staticmethod
+    def slot_size(rows: int, cols: int) -> int:
+        return rows * cols * CHANNELS
+
+    @classmethod
+    def create(cls, slot_bytes: int, slots: int, context=None) -> "FrameRing":
+        """
+        ### 🏗️ create
+        Aloca o anel. Levanta `OSError` se a memória compartilhada não comportar o anel
+        (por exemplo, o `/dev/shm` de 64 MB padrão dos contêineres Docker).
+        """
+        context = context or multiprocessing.get_context()
+        shm = shared_memory.SharedMemory(create=True, size=max(1, slot_bytes * slots))
+        try:
+            # Toca cada página: falha aqui, e não no meio da conversão, se o /dev/shm for pequeno
+            np.ndarray((shm.size,), np.uint8, buffer=shm.buf)[::4096] = 0
+        except BaseException:
+            shm.close()
+            shm.unlink()
+            raise
+        free = context.Queue()
+        for slot in range(slots):
+            free.put(slot)
+        return cls(shm, slot_bytes, slots, free, owner=True)
+
+    @property
+    def spec(self) -> tuple:
+        """Argumentos de `attach` para os workers (passados no `initializer` do pool)."""
+        return self.shm.name, self.slot_bytes, self.slots, self.free
+
+    @classmethod
+    def attach(cls, name: str, slot_bytes: int, slots: int, free) -> "FrameRing":
+        return cls(shared_memory.SharedMemory(name=name), slot_bytes, slots, free)
+
+    def acquire(self, timeout: float | None = None) -> int:
+        """
+        ### 📥 acquire
+        Retorna um slot livre, esperando enquanto o anel está cheio.
+        """
+        return self.free.get(timeout=timeout)
+
+    def release(self, slot: int) -> None:
+        self.free.put(slot)
+
+    def array(self, slot: int, size: tuple[int, int]) -> np.ndarray:
+        """
+        ### 🔢 array
+        Visão NumPy `(rows, cols, 4)` do slot, sobre a memória compartilhada.
+        """
+        rows, cols = size
+        return np.ndarray((rows, cols, CHANNELS), np.uint8, buffer=self.shm.buf, offset=slot * self.slot_bytes)
+
+    def write(self, slot: int, img: Image.Image) -> tuple[int, int]:
+        """
+        ### ✍️ write
+        Grava uma imagem RGB no slot e retorna `(rows, cols)`.
+        """
+        size = (img.height, img.width)
+        if self.slot_size(*size) > self.slot_bytes:
+            raise ValueError(f"Quadro {img.width}x{img.height} maior que o slot ({self.slot_bytes} bytes)")
+        # convert() copiaria a imagem mesmo já estando em RGB
+        self.array(slot, size)[..., :3] = np.asarray(img if img.mode == "RGB" else img.convert("RGB"))
+        return size
+
+    def image(self, slot: int, size: tuple[int, int]) -> Image.Image:
+        """
+        ### 🖼️ image
+        `PIL.Image` RGBX somente leitura apoiada no slot (sem cópia). Deve ser descartada
+        antes de `release`.
+        """
+        rows, cols = size
+        offset = slot * self.slot_bytes
+        view = self.shm.buf[offset:offset + self.slot_size(rows, cols)]
+        return Image.frombuffer("RGBX", (cols, rows), view, "raw", "RGBX", 0, 1)
+
+    def close(self) -> None:
+        try:
+            self.shm.close()
+        finally:
+            # Removido mesmo se uma visão ainda aberta impedir o `close` (BufferError)
+            if self.owner:
+                self.shm.unlink()
+                self.free.close()
@@ -0,0 +1,295 @@
+from __future__ import annotations
+
+import json
+import math
+import os
+from pathlib import Path
+from typing import Union
+
+import pydicom
+from pydicom.multival import MultiValue
+
+
+class SRHarvester:
+    """
+    ### 🧾 SRHarvester
+    Extrai medidas de Structured Reports (SR) e dados técnicos dos cabeçalhos DICOM de
+    um estudo, gerando um documento estruturado de achados que pode alimentar o
+    `GPTReport` diretamente, sem depender do OCR das imagens.
+
+    São lidos apenas os cabeçalhos (`stop_before_pixels`) de cada arquivo:
+    - SR: a árvore `ContentSequence` é percorrida recursivamente; itens `NUM` viram
+      medidas (com unidade e o caminho de contêineres), `TEXT` e `CODE` viram observações.
+    - Imagens: fabricante, modelo, dados do transdutor e frequência / calibração das
+      regiões de ultrassom (`SequenceOfUltrasoundRegions`).
+
+    ### 🖥️ Parameters
+    - `dcm_path` (`str | Path`): Pasta com os arquivos DICOM do estudo.
+
+    ### 💡 Example
+    >>> findings = SRHarvester("Dicoms").harvest()
+    >>> findings["complete"]
+    True
+    >>> print(SRHarvester.to_text(findings))
+    """
+
+    SR_SOP_PREFIX = "1.2.840.10008.5.1.4.1.1.88."
+
+    def __init__(self, dcm_path: Union[str, Path]):
+        self.dcm_path = dcm_path
+
+    @classmethod
+    def is_structured_report(cls, ds: pydicom.Dataset) -> bool:
+        """
+        ### 🧾 is_structured_report
+        Indica se o dataset é um Structured Report (pela modalidade ou SOP Class).
+        """
+        return ds.get("Modality", "") == "SR" or str(ds.get("SOPClassUID", "")).startswith(cls.SR_SOP_PREFIX)
+
+    @staticmethod
+    def _meaning(item: pydicom.Dataset, keyword: str = "ConceptNameCodeSequence") -> str:
+        sequence = item.get(keyword)
+        if sequence:
+            return str(sequence[0].get("CodeMeaning", "")).strip()
+        return ""
+
+    def _walk(self, items, path: list[str], findings: dict, sop_uid: str = "") -> None:
+        for item in items or []:
+            value_type = item.get("ValueType", "")
+            name = self._meaning(item)
+
+            if value_type == "NUM":
+                measured = item.get("MeasuredValueSequence")
+                number = None
+                if measured:
+                    value = measured[0]
+                    try:
+                        number = float(value.NumericValue)
+                    except (AttributeError, TypeError, ValueError):
+                        # Item sem valor ou com valor malformado: ignorado, o restante do SR vale
+                        print(f"[AVISO] Medida sem valor numérico válido ignorada: {name or '?'}")
+                if number is not None and math.isfinite(number):
+                    units = value.get("MeasurementUnitsCodeSequence")
+                    unit = ""
+                    if units:
+                        unit = str(units[0].get("CodeValue", "") or units[0].get("CodeMeaning", ""))
+                    findings["measurements"].append({
+                        "name": name,
+                        "value": number,
+                        "unit": unit,
+                        "context": " / ".join(path),
+                        "sop_uid": sop_uid,
+                    })
+            elif value_type == "TEXT" and item.get("TextValue"):
+                findings["observations"].append({"name": name, "value": str(item.TextValue),
+                                                 "context": " / ".join(path), "sop_uid": sop_uid})
+            elif value_type == "CODE":
+                code = self._meaning(item, "ConceptCodeSequence")
+                if code:
+                    findings["observations"].append({"name": name, "value": code,
+                                                     "context": " / ".join(path), "sop_uid": sop_uid})
+
+            children = item.get("ContentSequence")
+            if children:
+                self._walk(children, path + [name] if value_type == "CONTAINER" and name else path, findings, sop_uid)
+
+    def _harvest_header(self, ds: pydicom.Dataset, findings: dict) -> None:
+        study = findings["study"]
+        for keyword, key in (
+            ("PatientName", "patient"),
+            ("StudyDate", "date"),
+            ("StudyDescription", "exam"),
+            ("ReferringPhysicianName", "physician"),
+            ("StudyInstanceUID", "study_uid"),
+        ):
+            if not study.get(key) and ds.get(keyword):
+                study[key] = str(ds.get(keyword)).replace("^", " ").strip()
+
+        technique = findings["technique"]
+        for keyword, key in (
+            ("Manufacturer", "manufacturer"),
+            ("ManufacturerModelName", "model"),
+            ("TransducerData", "transducer"),
+            ("TransducerType", "transducer_type"),
+        ):
+            value = ds.get(keyword)
+            if value:
+                text = "\\".join(str(v) for v in value) if isinstance(value, MultiValue) else str(value)
+                technique.setdefault(key, text.strip())
+
+        for region in ds.get("SequenceOfUltrasoundRegions") or []:
+            calibration = {
+                "physical_delta_x": float(region.get("PhysicalDeltaX", 0) or 0),
+                "physical_delta_y": float(region.get("PhysicalDeltaY", 0) or 0),
+                "physical_units_x": int(region.get("PhysicalUnitsXDirection", 0) or 0),
+                "physical_units_y": int(region.get("PhysicalUnitsYDirection", 0) or 0),
+            }
+            frequency = region.get("TransducerFrequency")
+            if frequency:
+                # TransducerFrequency é armazenada em kHz
+                technique.setdefault("frequency_mhz", round(float(frequency) / 1000, 2))
+            if calibration not in findings["regions"]:
+                findings["regions"].append(calibration)
+
+    def harvest(self) -> dict:
+        """
+        ### 🌾 harvest
+        Lê os cabeçalhos de todos os DICOM da pasta e monta o documento de achados.
+
+        ### 🔄 Returns
+        - `dict`: Chaves `study`, `technique`, `regions`, `measurements`, `observations`
+          (cada item com o `sop_uid` do SR de origem), `sr_instances`, `sr_uids` e `complete`
+          (ver `is_complete`).
+        """
+        findings = {
+            "study": {},
+            "technique": {},
+            "regions": [],
+            "measurements": [],
+            "observations": [],
+            "sr_instances": 0,
+            "sr_uids": [],
+            "complete": False,
+        }
+        if not os.path.exists(self.dcm_path):
+            return findings
+
+        for file in sorted(os.listdir(self.dcm_path)):
+            if not file.lower().endswith('.dcm'):
+                continue
+            path = os.path.join(self.dcm_path, file)
+            try:
+                ds = pydicom.dcmread(path, stop_before_pixels=True)
+            except Exception as e:
+                print(f"[AVISO] Cabeçalho ilegível {file}: {e}")
+                continue
+
+            self._harvest_header(ds, findings)
+            if self.is_structured_report(ds):
+                sop_uid = str(ds.get("SOPInstanceUID", ""))
+                findings["sr_instances"] += 1
+                findings["sr_uids"].append(sop_uid)
+                self._walk(ds.get("ContentSequence"), [], findings, sop_uid)
+
+        findings["complete"] = self.is_complete(findings)
+        return findings
+
+    @staticmethod
+    def is_complete(findings: dict, min_measurements: int | None = None,
+                    required_groups: list[str] | None = None) -> bool:
+        """
+        ### ✅ is_complete
+        Indica se os achados bastam para dispensar o OCR das imagens: há SR, ao menos
+        `min_measurements` medidas e uma medida em cada grupo de `required_groups`
+        (contêiner do SR, ex.: "Fígado"). Com menos que isso o OCR é executado e os
+        achados do SR entram como complemento.
+
+        ### 🖥️ Parameters
+        - `findings` (`dict`): Documento de achados (ver `harvest`).
+        - `min_measurements` (`int | None`): Padrão `SR_MIN_MEASUREMENTS` ou 3.
+        - `required_groups` (`list[str] | None`): Padrão `SR_REQUIRED_GROUPS` (nomes separados
+          por vírgula; vazio não exige grupos).
+        """
+        if min_measurements is None:
+            min_measurements = int(os.getenv("SR_MIN_MEASUREMENTS", "3"))
+        if required_groups is None:
+            required_groups = [g for g in os.getenv("SR_REQUIRED_GROUPS", "").split(",") if g.strip()]
+        measurements = findings.get("measurements", [])
+        if findings.get("sr_instances", 0) <= 0 or not measurements or len(measurements) < min_measurements:
+            return False
+        groups = {part.strip().casefold() for m in measurements for part in m.get("context", "").split(" / ")}
+        return all(group.strip().casefold() in groups for group in required_groups)
+
+    @classmethod
+    def merge(cls, previous: dict, findings: dict) -> dict:
+        """
+        ### 🔗 merge
+        Combina os achados de uma conversão incremental (apenas as instâncias novas) com
+        os já gravados para o estudo. Medidas e observações são agrupadas pelo SR de origem
+        (`sop_uid`): um SR reenviado substitui o anterior, os demais são mantidos. Dados do
+        estudo e da técnica já conhecidos prevalecem; os ausentes são completados.
+
+        ### 🔄 Returns
+        - `dict`: Novo documento de achados.
+        """
+        replaced = set(findings.get("sr_uids", []))
+        merged = {
+            "study": {**findings.get("study", {}), **previous.get("study", {})},
+            "technique": {**findings.get("technique", {}), **previous.get("technique", {})},
+            "regions": list(previous.get("regions", [])),
+            "sr_uids": [uid for uid in previous.get("sr_uids", []) if uid not in replaced] + list(findings.get("sr_uids", [])),
+        }
+        merged["regions"] += [r for r in findings.get("regions", []) if r not in merged["regions"]]
+        for key in ("measurements", "observations"):
+            merged[key] = [item for item in previous.get(key, []) if item.get("sop_uid") not in replaced] + list(findings.get(key, []))
+        # Arquivos anteriores ao `sr_uids` não têm a lista: contam como SR não identificados
+        untracked = previous.get("sr_instances", 0) - len(previous.get("sr_uids", []))
+        merged["sr_instances"] = max(0, untracked) + len(merged["sr_uids"])
+        merged["complete"] = cls.is_complete(merged)
+        return merged
+
+    @classmethod
+    def update(cls, findings: dict, json_path: Union[str, Path]) -> dict:
+        """
+        ### 🔄 update
+        Mescla `findings` (ver `merge`) ao arquivo de achados já existente em `json_path`,
+        se houver, e grava o resultado.
+
+        ### 🔄 Returns
+        - `dict`: Achados gravados.
+        """
+        try:
+            with open(json_path, "r", encoding="utf-8") as f:
+                findings = cls.merge(json.load(f), findings)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            print(f"[AVISO] Achados anteriores ilegíveis, substituídos: {e}")
+        cls.save(findings, json_path)
+        return findings
+
+    @staticmethod
+    def to_text(findings: dict) -> str:
+        """
+        ### 📝 to_text
+        Formata os achados no mesmo formato de texto produzido pelo OCR (dados do exame,
+        técnica e achados), pronto para ser enviado ao `GPTReport`.
+        """
+        study = findings.get("study", {})
+        technique = findings.get("technique", {})
+        lines = []
+        for key, label in (("patient", "Paciente"), ("date", "Data do exame"), ("exam", "Exame"),
+                           ("physician", "Médico responsável")):
+            if study.get(key):
+                lines.append(f"{label}: {study[key]}")
+
+        technique_lines = []
+        device = " ".join(v for v in (technique.get("manufacturer"), technique.get("model")) if v)
+        if device:
+            technique_lines.append(f"• Aparelho: {device}")
+        if technique.get("transducer"):
+            technique_lines.append(f"• Transdutor: {technique['transducer']}")
+        if technique.get("frequency_mhz"):
+            technique_lines.append(f"• Frequência: {str(technique['frequency_mhz']).replace('.', ',')} MHz")
+        if technique_lines:
+            lines += ["", "Técnica"] + technique_lines
+
+        if findings.get("measurements") or findings.get("observations"):
+            lines += ["", "Achados"]
+            for m in findings.get("measurements", []):
+                context = f"{m['context']} — " if m.get("context") else ""
+                value = f"{m['value']:g}".replace(".", ",")
+                lines.append(f"– {context}{m['name']}: {value} {m['unit']}".rstrip())
+            for o in findings.get("observations", []):
+                context = f"{o['context']} — " if o.get("context") else ""
+                lines.append(f"– {context}{o['name']}: {o['value']}")
+        return "\n".join(lines)
+
+    @staticmethod
+    def save(findings: dict, json_path: Union[str, Path]) -> None:
+        """
+        ### 💾 save
+        Grava o documento de achados em JSON.
+        """
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(findings, f, ensure_ascii=False, indent=2)
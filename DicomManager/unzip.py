@@ -18,6 +18,8 @@ class Unzipper:
 
     ### 🖥️ Parameters
     - `path` (`str`): Caminho para o arquivo ZIP contendo imagens DICOM.
+    - `dst_dir` (`str | None`): Pasta de destino dos DICOMs (padrão `Dicoms/` no diretório atual). O ZIP é
+      extraído dentro dela, de modo que extrações simultâneas em pastas diferentes não se misturam.
 
     ### 💡 Example
 
@@ -26,14 +28,14 @@ class Unzipper:
     >>> print(unzipper.name)  # Nome do paciente extraído
     """
 
-    def __init__(self, path: str) -> None:
+    def __init__(self, path: str, dst_dir: str | None = None) -> None:
         if not os.path.exists(path):
             raise FileNotFoundError(f"Arquivo ZIP não encontrado: {path}")
 
         self.zip_path = path
         self.path = zipfile.ZipFile(path)
         self.name = self.path.namelist()[0].split("/")[0]
-        self.dst_dir = os.path.join(os.getcwd(), "Dicoms")
+        self.dst_dir = dst_dir or os.path.join(os.getcwd(), "Dicoms")
 
         # Criar diretório de destino se não existir
         os.makedirs(self.dst_dir, exist_ok=True)
@@ -51,7 +53,7 @@ class Unzipper:
         """
         try:
             # Extrair todos os arquivos
-            self.path.extractall()
+            self.path.extractall(self.dst_dir)
             members = self.path.namelist()
             name = self.name
 
@@ -61,7 +63,7 @@ class Unzipper:
             for i, member in enumerate(members):
                 if member.endswith('.dcm'):
                     # Caminho do arquivo extraído
-                    src_file = os.path.join(".", member)
+                    src_file = os.path.join(self.dst_dir, member)
 
                     if os.path.exists(src_file):
                         # Nome do arquivo de destino
@@ -74,9 +76,10 @@ class Unzipper:
                         print(f"Arquivo não encontrado: {src_file}")
 
             # Limpar diretório temporário
-            if os.path.exists(name) and os.path.isdir(name):
-                shutil.rmtree(name)
-                print(f"Diretório temporário removido: {name}")
+            extracted = os.path.join(self.dst_dir, name)
+            if os.path.isdir(extracted):
+                shutil.rmtree(extracted)
+                print(f"Diretório temporário removido: {extracted}")
 
             # Fechar arquivo ZIP
             self.path.close()
@@ -92,8 +95,9 @@ class Unzipper:
             try:
                 if hasattr(self, 'path') and self.path:
                     self.path.close()
-                if os.path.exists(self.name) and os.path.isdir(self.name):
-                    shutil.rmtree(self.name)
+                extracted = os.path.join(self.dst_dir, self.name)
+                if os.path.isdir(extracted):
+                    shutil.rmtree(extracted)
             except:
                 pass
 
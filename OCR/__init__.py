@@ -1,4 +1,30 @@
-from .gpt_ocr import process_patient_with_ai
-from .markdown_to_pdf import markdown_to_pdf
+from importlib import import_module
 
-__all__ = ['process_patient_with_ai', 'markdown_to_pdf']
+# Carregamento sob demanda: `markdown_to_pdf` não importa o cliente openai
+_EXPORTS = {
+    "process_patient_with_ai": ".gpt_ocr",
+    "markdown_to_pdf": ".markdown_to_pdf",
+    "ReportRenderer": ".markdown_to_pdf",
+    "get_renderer": ".markdown_to_pdf",
+    "RequestScheduler": ".scheduler",
+    "ModelCallError": ".scheduler",
+    "DeadlineExceeded": ".scheduler",
+    "get_scheduler": ".scheduler",
+}
+
+__all__ = [
+    'process_patient_with_ai', 'markdown_to_pdf', 'ReportRenderer', 'get_renderer',
+    'RequestScheduler', 'ModelCallError', 'DeadlineExceeded', 'get_scheduler',
+]
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,174 @@
+"""
+🗃️ AI Result Cache
+Cache persistente em disco para as respostas dos modelos. As chaves são hashes do
+conteúdo enviado (bytes das imagens do lote ou texto do OCR), do modelo e da versão
+do prompt, de forma que reprocessar um paciente idêntico — por exemplo, após uma
+falha no meio do processamento — não repete nenhuma chamada.
+
+O tamanho total é limitado: ao ultrapassar o limite, as entradas usadas há mais
+tempo são removidas.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import tempfile
+import threading
+import time
+
+
+def make_key(*parts: str | bytes) -> str:
+    """
+    ### 🔑 make_key
+    Gera a chave SHA-256 de uma sequência de partes (texto ou bytes), sem ambiguidade
+    entre partes concatenadas.
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        data = part.encode("utf-8") if isinstance(part, str) else part
+        digest.update(len(data).to_bytes(8, "big"))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+def hash_files(paths: list) -> str:
+    """
+    ### #️⃣ hash_files
+    Calcula o SHA-256 do conteúdo de uma lista de arquivos, na ordem informada.
+    """
+    digest = hashlib.sha256()
+    for path in paths:
+        file_digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                file_digest.update(chunk)
+        digest.update(file_digest.digest())
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    ### 🗃️ ResultCache
+    Cache de textos em disco, um arquivo por chave, com remoção das entradas menos
+    usadas recentemente quando o total passa de `max_bytes`.
+
+    ### 🖥️ Parameters
+        - `directory` (`str`): Pasta onde as entradas são gravadas.
+        - `max_bytes` (`int`): Tamanho máximo somado das entradas.
+
+    ### 💡 Example
+    >>> cache = ResultCache("Cache/ai", max_bytes=512 * 1024 * 1024)
+    >>> key = make_key("ocr", image_hash, "o4-mini", prompt_version)
+    >>> text = cache.get(key)
+    >>> if text is None:
+    ...     cache.put(key, call_model())
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 512 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: dict[str, tuple[int, float]] = {}
+        self._stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+        os.makedirs(directory, exist_ok=True)
+        # Índice em memória montado uma única vez a partir da pasta
+        with os.scandir(directory) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.endswith(".txt"):
+                    stat = entry.stat()
+                    self._entries[entry.name[:-4]] = (stat.st_size, stat.st_mtime)
+        self._total = sum(size for size, _ in self._entries.values())
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.txt")
+
+    def get(self, key: str) -> str | None:
+        """
+        ### 📖 get
+        Retorna o texto armazenado para `key`, ou None quando não existe.
+        """
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                value = f.read()
+        except FileNotFoundError:
+            with self._lock:
+                self._stats["misses"] += 1
+                self._entries.pop(key, None)
+            return None
+
+        now = time.time()
+        try:
+            os.utime(path, (now, now))
+        except OSError:
+            pass
+        with self._lock:
+            self._stats["hits"] += 1
+            if key in self._entries:
+                self._entries[key] = (self._entries[key][0], now)
+        return value
+
+    def put(self, key: str, value: str) -> None:
+        """
+        ### 💾 put
+        Grava `value` para `key` de forma atômica e aplica o limite de tamanho.
+        """
+        data = value.encode("utf-8")
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, self._path(key))
+
+        with self._lock:
+            previous = self._entries.get(key)
+            if previous:
+                self._total -= previous[0]
+            self._entries[key] = (len(data), time.time())
+            self._total += len(data)
+            self._stats["writes"] += 1
+            if self._total > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        # Remove até 90% do limite para não repetir a ordenação a cada gravação
+        target = self.max_bytes * 0.9
+        for key, (size, _) in sorted(self._entries.items(), key=lambda item: item[1][1]):
+            if self._total <= target:
+                break
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+            del self._entries[key]
+            self._total -= size
+            self._stats["evictions"] += 1
+
+    def stats(self) -> dict:
+        """
+        ### 📊 stats
+        Retorna acertos, faltas, gravações, remoções, número de entradas e bytes ocupados.
+        """
+        with self._lock:
+            return {**self._stats, "entries": len(self._entries), "bytes": self._total}
+
+
+_cache: ResultCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> ResultCache:
+    """
+    ### ♻️ get_cache
+    Retorna o cache compartilhado do processo, configurado por `AI_CACHE_DIR`
+    (padrão `Cache/ai`) e `AI_CACHE_MAX_MB` (padrão 512).
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResultCache(
+                    os.getenv("AI_CACHE_DIR", os.path.join(os.getcwd(), "Cache", "ai")),
+                    max_bytes=int(float(os.getenv("AI_CACHE_MAX_MB", "512")) * 1024 * 1024),
+                )
+    return _cache
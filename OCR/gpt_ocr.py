@@ -6,10 +6,25 @@ Identifica achados ultrassonográficos, medidas e observações relevantes de ca
 """
 
 import base64
+import contextvars
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import TYPE_CHECKING
 from openai import OpenAI
 import os
 
+from Pipeline.metrics import stage
+
+from .cache import ResultCache, get_cache, hash_files, make_key
+from .image_prep import ocr_image_settings, prepare_ocr_image
+from .scheduler import ModelCallError, RequestScheduler, estimate_tokens, get_scheduler
+
+if TYPE_CHECKING:
+    # Apenas para anotações: o dedup (NumPy) só é carregado com `OCR_DEDUP=1`
+    from DicomManager.dedup import FrameDeduplicator
+
 LAUDO_PROMPT = """
 As a specialist in medical diagnostic ultrasound responsible for writing professional reports, carefully follow these guidelines. Always consider the type of examination performed and the anatomical structures evaluated. Use appropriate ultrasound terminology to describe the findings in each structure, including echogenicity, echo texture, acoustic enhancement or attenuation, contours, and shapes. Each organ or structure examined should have its own paragraph, describing the characteristics found in detail. If there is a change suggestive of a pathology, describe it in the findings only through its ultrasound patterns (for example, increased liver echogenicity with posterior beam attenuation, without directly mentioning "stenosis"), reserving the nominal mention of this condition for the Diagnostic Impression.
 
@@ -103,6 +118,47 @@ if the user !!!did not!! provide any information about the !!!gallbladder!!, ret
 
 """
 
+OCR_PROMPT = """
+                                    Voce recebera um texto que é um OCR de achados de ultrassom.
+
+            REGRAS IMPORTANTES:
+            1. Analise as  imagens dentro do contexto médico
+            2. NÃO mencione que está analisando imagens específicas
+            3. Organize o texto de forma fluida e profissional, sem repetir informações
+
+            Abaixo segue um template para que você possa usar como referência para o texto.:
+
+            <EXAMPLE>
+    Paciente: Clarice Padilha
+    Data do exame: 04-06-2025
+    Exame: Ultrassonografia de mama
+    Médico responsável: M.D. Anderson Brum Anderson
+
+    Técnica
+    • Aparelho: HM70 EVO
+    • Transdutor: linear 5–12 MHz (LN5-12)
+    • Frequência: 4,7 MHz
+    • Profundidade: 5,0–6,0 cm
+    • Ganho: 33–42
+    • Índice mecânico (MQ): Q/2
+    • Persistência (P): 100%
+
+    Achados
+    Foi identificada imagem nodular hipoecoica em topografia mamária, com as seguintes medidas obtidas em diferentes planos:
+    – 0,57 × 0,44 cm (relação de aspecto 1,30)
+    – 0,48 cm (diâmetro único)
+    – 0,82 cm (diâmetro único)
+
+    =
+            </EXAMPLE>
+
+            Lembre-se: texto limpo, sem referências a arquivos, sem repetições, e sem informacoes diagnosticas.
+            """
+
+# Versions derived from the prompt text: editing a prompt invalidates its cached results
+LAUDO_PROMPT_VERSION = make_key(LAUDO_PROMPT)[:12]
+OCR_PROMPT_VERSION = make_key(OCR_PROMPT)[:12]
+
 
 class GPTVision:
     """
@@ -111,12 +167,19 @@ class GPTVision:
 
     ### 🖥️ Parameters
         - `api_key` (`str`): The OpenAI API key used for authentication and access to GPT-4o Vision.
+        - `base_url` (`str | None`): Optional OpenAI-compatible endpoint (defaults to the official API).
+        - `max_in_flight` (`int`): Maximum number of OCR batch requests sent concurrently (1 keeps the calls serial).
+        - `scheduler` (`RequestScheduler | None`): Rate limiter/retry engine for the calls (defaults to the shared one).
+        - `image_settings` (`dict | None`): `max_edge`/`quality`/`crop` used to shrink images before upload
+          (defaults to the `OCR_MAX_EDGE`, `OCR_JPEG_QUALITY` and `OCR_CROP` env vars; `{}` sends the files untouched).
+        - `cache` (`ResultCache | None`): On-disk cache of OCR results keyed by image bytes, model and prompt version.
+        - `deduplicator` (`FrameDeduplicator | None`): When set, only one frame per cluster of near-identical frames is OCRed.
 
     ### 🔄 Returns
         - `GPTVision`: An instance of the GPTVision class, ready to process images.
 
     ### ⚠️ Raises
-        - `openai.OpenAIError`: If there is an error communicating with the OpenAI API during OCR operations.
+        - `ModelCallError`: If an OCR call still fails after the scheduler retries (or the patient deadline passes).
         - `FileNotFoundError`: If the specified image file does not exist.
         - `OSError`: If there is an error opening or processing the image file.
 
@@ -127,22 +190,46 @@ class GPTVision:
     'Fígado: dimensões normais, contornos regulares...'
     """
 
-    def __init__(self, api_key: str):
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str | None = None,
+        max_in_flight: int = 1,
+        scheduler: RequestScheduler | None = None,
+        image_settings: dict | None = None,
+        cache: ResultCache | None = None,
+        deduplicator: "FrameDeduplicator | None" = None,
+    ):
         """
         🗝️ __init__
         Initializes the GPTVision class by setting up the OpenAI client for subsequent OCR operations using the provided API key. This method prepares the instance for image processing and communication with the OpenAI API.
 
         ### 🖥️ Parameters
             - `api_key` (`str`): The OpenAI API key required for authenticating requests to the OpenAI service.
+            - `base_url` (`str | None`): Optional OpenAI-compatible endpoint.
+            - `max_in_flight` (`int`): Maximum number of concurrent OCR batch requests.
+            - `scheduler` (`RequestScheduler | None`): Rate limiter/retry engine for the calls.
+            - `image_settings` (`dict | None`): Upload preparation settings (see `prepare_ocr_image`).
+            - `cache` (`ResultCache | None`): On-disk cache of OCR results (None disables caching).
+            - `deduplicator` (`FrameDeduplicator | None`): Near-duplicate frame filter (None sends every frame).
         """
-        self.client = OpenAI(api_key=api_key)
+        # Retries are handled by the scheduler, not by the SDK
+        self.client = OpenAI(api_key=api_key, base_url=base_url, max_retries=0)
         self.model = "o4-mini"
+        self.image_settings = ocr_image_settings() if image_settings is None else image_settings
+        self.cache = cache
+        self.deduplicator = deduplicator
+        self.dedup_report: dict | None = None
+        self.max_in_flight = max(1, max_in_flight)
+        self.scheduler = scheduler or get_scheduler()
+        self.deadline: float | None = None
         self.text = ""
 
     def _encode_image(self, image_path: str) -> str:
         """
         ### 🔐 _encode_image
         Internal method to encode image in base64 format for API transmission.
+        The image is cropped/downscaled/re-encoded per `image_settings` before encoding.
 
         ### 🖥️ Parameters
             - `image_path` (`str`): Path to the image file to be encoded.
@@ -150,13 +237,49 @@ class GPTVision:
         ### 🔄 Returns
             - `str`: Base64 encoded string representation of the image.
         """
+        if self.image_settings:
+            return base64.b64encode(prepare_ocr_image(image_path, **self.image_settings)).decode('utf-8')
         with open(image_path, "rb") as image_file:
             return base64.b64encode(image_file.read()).decode('utf-8')
 
+    def _api_call(self, content: list[dict] | dict) -> str:
+        """
+        ### 📡 _api_call
+        Sends one OCR request with the given image content to the vision model.
+
+        ### 🖥️ Parameters
+            - `content` (`list[dict] | dict`): Image content entries of the user message.
+
+        ### 🔄 Returns
+            - `str`: Text returned by the model.
+        """
+        # Prepare message for o4-mini
+        messages = [
+            {
+                "role": "system",
+                "content": OCR_PROMPT
+            },
+            {
+                "role": "user",
+                "content": content
+            }
+        ]
+        response = self.scheduler.call(
+            lambda: self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                reasoning_effort="high"
+            ),
+            estimated_tokens=estimate_tokens(messages),
+            deadline=self.deadline,
+        )
+        return response.choices[0].message.content.strip()
+
     def extract_text_from_image(self, image_path: str | list[str]) -> str:
         """
         ### 📝 extract_text_from_image
         Extracts text and measurements from a single ultrasound image using GPT-4o Vision.
+        When a cache is configured, byte-identical batches are answered from it without calling the model.
 
         ### 🖥️ Parameters
             - `image_path` (`str`): Path to the image file to be processed.
@@ -164,6 +287,25 @@ class GPTVision:
         ### 🔄 Returns
             - `str`: Extracted text from the image, or empty string if processing fails.
         """
+        key = None
+        if self.cache is not None:
+            paths = [image_path] if isinstance(image_path, (str, Path)) else image_path
+            settings = repr(sorted(self.image_settings.items()))
+            key = make_key("ocr", hash_files(paths), self.model, OCR_PROMPT_VERSION, settings)
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        text = self._extract_text(image_path)
+        if key is not None and text:
+            self.cache.put(key, text)
+        return text
+
+    def _extract_text(self, image_path: str | list[str]) -> str:
+        """
+        ### 📝 _extract_text
+        Builds the image content for `image_path` and calls the model (no caching).
+        """
         try:
             content = []
             lenght = 0
@@ -192,81 +334,30 @@ class GPTVision:
                         }
                     })
 
-            # API call
-            def _api_call(content: list[dict] | dict) -> str:
-                try:
-                    # Prepare message for o4-mini
-                    response = self.client.chat.completions.create(
-                        model="o4-mini",
-                        messages=[
-                            {
-                                "role": "system",
-                                "content": """
-                                    Voce recebera um texto que é um OCR de achados de ultrassom.
-
-            REGRAS IMPORTANTES:
-            1. Analise as  imagens dentro do contexto médico
-            2. NÃO mencione que está analisando imagens específicas
-            3. Organize o texto de forma fluida e profissional, sem repetir informações
-
-            Abaixo segue um template para que você possa usar como referência para o texto.:
-
-            <EXAMPLE>
-    Paciente: Clarice Padilha
-    Data do exame: 04-06-2025
-    Exame: Ultrassonografia de mama
-    Médico responsável: M.D. Anderson Brum Anderson
-
-    Técnica
-    • Aparelho: HM70 EVO
-    • Transdutor: linear 5–12 MHz (LN5-12)
-    • Frequência: 4,7 MHz
-    • Profundidade: 5,0–6,0 cm
-    • Ganho: 33–42
-    • Índice mecânico (MQ): Q/2
-    • Persistência (P): 100%
-
-    Achados
-    Foi identificada imagem nodular hipoecoica em topografia mamária, com as seguintes medidas obtidas em diferentes planos:
-    – 0,57 × 0,44 cm (relação de aspecto 1,30)
-    – 0,48 cm (diâmetro único)
-    – 0,82 cm (diâmetro único)
-
-    =
-            </EXAMPLE>
-
-            Lembre-se: texto limpo, sem referências a arquivos, sem repetições, e sem informacoes diagnosticas.
-            """
-                            },
-                            {
-                                "role": "user",
-                                "content": content
-                            }
-                        ],
-                        reasoning_effort="high"
-                    )
-                    return response.choices[0].message.content.strip()
-                except Exception as e:
-                    raise e
-
             # Call the API
             if lenght <5:
-                return _api_call(content) # If there are less than 5 images, call the API with the content
+                return self._api_call(content) # If there are less than 5 images, call the API with the content
             else:
-                api1 = _api_call(content[:4]) # If there are more than 5 images, call the API with the first 4 images and concatenate the results
-                api2 = _api_call(content[4:]) # Call the API with the remaining images and concatenate the results
+                api1 = self._api_call(content[:4]) # If there are more than 5 images, call the API with the first 4 images and concatenate the results
+                api2 = self._api_call(content[4:]) # Call the API with the remaining images and concatenate the results
                 return api1 + api2 # Return the concatenated text
+        except ModelCallError:
+            raise
         except Exception as e:
             print(f"Error: {e}")
             return ""
 
-    def process_patient_images(self, images_folder: str) -> None:
+    def process_patient_images(self, images_folder: str, max_in_flight: int | None = None) -> None:
         """
         ### 🔄 process_patient_images
         Processes all images in a patient folder and accumulates the extracted text.
+        Batches of 4 images are sent concurrently, up to `max_in_flight` requests at a time, and the
+        extracted texts are appended in image order regardless of which request finishes first.
+        With a deduplicator, near-identical frames are dropped first and the savings are kept in `dedup_report`.
 
         ### 🖥️ Parameters
             - `images_folder` (`str`): Path to the folder containing patient images.
+            - `max_in_flight` (`int | None`): Overrides the instance concurrency limit for this call.
         """
         try:
             images_path = Path(images_folder)
@@ -277,15 +368,42 @@ class GPTVision:
                 list(images_path.glob("*.jpg"))
             )
 
-            print(f"Processing {len(image_files)} images...")
             bacth_size = 4
-            for i in range(0, len(image_files), bacth_size):
-                batch = image_files[i:i+bacth_size]
-                print(f"Processing image {i}/{len(image_files)}/{bacth_size}:")
-                text = self.extract_text_from_image(batch)
-                if text:  # Check if text is not empty
-                    self.text += text + "\n"
+            if self.deduplicator is not None and image_files:
+                image_files, self.dedup_report = self.deduplicator.deduplicate(image_files, batch_size=bacth_size)
+                print(f"🪞 Dedup: {self.dedup_report['frames']} frames -> {self.dedup_report['clusters']} "
+                      f"({self.dedup_report['calls_saved']} calls and "
+                      f"{self.dedup_report['bytes_saved'] / 1024:.1f} KB saved)")
 
+            print(f"Processing {len(image_files)} images...")
+            batches = [image_files[i:i+bacth_size] for i in range(0, len(image_files), bacth_size)]
+            workers = max(1, min(max_in_flight or self.max_in_flight, len(batches) or 1))
+
+            def _process_batch(index: int) -> str:
+                print(f"Processing image {index * bacth_size}/{len(image_files)}/{bacth_size}:")
+                with stage("ocr_batch", items=len(batches[index])) as span:
+                    span["bytes"] = sum(os.path.getsize(image) for image in batches[index])
+                    return self.extract_text_from_image(batches[index])
+
+            # Cada lote roda em uma cópia do contexto, para entrar no trace do paciente;
+            # os resultados são lidos na ordem dos lotes
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [
+                    executor.submit(contextvars.copy_context().run, _process_batch, index)
+                    for index in range(len(batches))
+                ]
+                try:
+                    for future in futures:
+                        text = future.result()
+                        if text:  # Check if text is not empty
+                            self.text += text + "\n"
+                except ModelCallError:
+                    # Um lote falhou: os lotes ainda na fila não são enviados (nem pagos)
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    raise
+
+        except ModelCallError:
+            raise
         except Exception as e:
             print(f"Error: {e}")
 
@@ -298,18 +416,33 @@ class GPTReport:
 
     ### 🖥️ Parameters
         - `api_key` (`str`): The OpenAI API key used for authentication and access to GPT-4o.
+        - `base_url` (`str | None`): Optional OpenAI-compatible endpoint (defaults to the official API).
+        - `scheduler` (`RequestScheduler | None`): Rate limiter/retry engine for the calls (defaults to the shared one).
+        - `cache` (`ResultCache | None`): On-disk cache of reports keyed by OCR text, model and prompt version.
     """
 
-    def __init__(self, api_key: str):
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str | None = None,
+        scheduler: RequestScheduler | None = None,
+        cache: ResultCache | None = None,
+    ):
         """
         ### 🗝️ __init__
         Initializes the GPTReport class for generating medical reports.
 
         ### 🖥️ Parameters
             - `api_key` (`str`): The OpenAI API key required for authenticating requests to the OpenAI service.
+            - `base_url` (`str | None`): Optional OpenAI-compatible endpoint.
+            - `scheduler` (`RequestScheduler | None`): Rate limiter/retry engine for the calls.
+            - `cache` (`ResultCache | None`): On-disk cache of generated reports (None disables caching).
         """
-        self.client = OpenAI(api_key=api_key)
+        self.client = OpenAI(api_key=api_key, base_url=base_url, max_retries=0)
         self.model = "o3"  # ou "o3" quando disponível
+        self.scheduler = scheduler or get_scheduler()
+        self.cache = cache
+        self.deadline: float | None = None
         self.generated_report = ""
 
     def generate_report(self, ocr_text: str) -> str:
@@ -322,59 +455,147 @@ class GPTReport:
 
         ### 🔄 Returns
             - `str`: Generated medical report in markdown format.
+
+        ### ⚠️ Raises
+            - `ModelCallError`: If the call still fails after the scheduler retries (or the deadline passes).
         """
+        key = None
+        if self.cache is not None:
+            key = make_key("report", make_key(ocr_text), self.model, LAUDO_PROMPT_VERSION)
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": LAUDO_PROMPT
-                    },
-                    {
-                        "role": "user",
-                        "content": ocr_text
-                    }
-                ],
-                reasoning_effort="medium"
+            messages = [
+                {
+                    "role": "system",
+                    "content": LAUDO_PROMPT
+                },
+                {
+                    "role": "user",
+                    "content": ocr_text
+                }
+            ]
+            response = self.scheduler.call(
+                lambda: self.client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    reasoning_effort="medium"
+                ),
+                estimated_tokens=estimate_tokens(messages),
+                deadline=self.deadline,
             )
-            return response.choices[0].message.content
+            report_text = response.choices[0].message.content
+            if key is not None and report_text:
+                self.cache.put(key, report_text)
+            return report_text
+        except ModelCallError:
+            raise
         except Exception as e:
             print(f"Error: {str(e)}")
             return ""
 
 
-def process_patient_with_ai(patient_name: str, api_key: str) -> None:
+def process_patient_with_ai(
+    patient_name: str,
+    api_key: str,
+    user: str = "Anders",
+    base_url: str | None = None,
+    max_in_flight: int | None = None,
+    deadline_s: float | None = None,
+    cache: ResultCache | None = None,
+    dedup: bool | None = None,
+    findings: dict | None = None,
+    users_dir: str | None = None,
+) -> None:
     """
     ### 🏥 process_patient_with_ai
     Processes a complete patient: OCR + Report Generation.
 
     ### 🖥️ Parameters
-        - `patient_folder` (`str`): Path to the patient folder.
+        - `patient_name` (`str`): Name of the patient folder.
         - `api_key` (`str`): OpenAI API key.
+        - `user` (`str`): User that owns the patient folder.
+        - `base_url` (`str | None`): Optional OpenAI-compatible endpoint (env `OPENAI_BASE_URL` is honored by the client).
+        - `max_in_flight` (`int | None`): Concurrent OCR requests; defaults to env `OCR_MAX_IN_FLIGHT` or 4.
+        - `deadline_s` (`float | None`): Time budget for all model calls of this patient; defaults to env
+          `AI_PATIENT_DEADLINE` or 900 seconds.
+        - `cache` (`ResultCache | None`): OCR/report cache; defaults to the shared on-disk cache unless
+          env `AI_CACHE=0`.
+        - `dedup` (`bool | None`): Skip near-identical frames before OCR; defaults to env `OCR_DEDUP` (off; `1`
+          enables). A skipped frame never reaches the model, so a measurement only on that frame is lost.
+        - `findings` (`dict | None`): Structured findings from `SRHarvester`; defaults to `Report/findings.json`
+          when present. A complete SR skips the vision calls entirely (unless env `SR_SKIP_OCR=0`); otherwise the
+          header data is sent to the report model together with the OCR text.
+        - `users_dir` (`str | None`): `Users` folder holding the patient; defaults to `Users/` in the current directory.
 
     ### 🔄 Returns
         - `None`: The function does not return a value.
+
+    ### ⚠️ Raises
+        - `ModelCallError`: If OCR or report generation fails after retries; no report file is written.
     """
-    patient_path = os.path.join(os.getcwd(), "Users", "Anders", "Patients", patient_name)
+    if max_in_flight is None:
+        max_in_flight = int(os.getenv("OCR_MAX_IN_FLIGHT", "4"))
+    if deadline_s is None:
+        deadline_s = float(os.getenv("AI_PATIENT_DEADLINE", "900"))
+    deadline = time.monotonic() + deadline_s
+    if cache is None and os.getenv("AI_CACHE", "1") != "0":
+        cache = get_cache()
+    if dedup is None:
+        dedup = os.getenv("OCR_DEDUP", "0") == "1"
+    patient_path = os.path.join(users_dir or os.path.join(os.getcwd(), "Users"), user, "Patients", patient_name)
     images_folder = os.path.join(patient_path, "Images")
     report_folder = os.path.join(patient_path, "Report")
     os.makedirs(report_folder, exist_ok=True)
     report_file = os.path.join(report_folder, f"{patient_name}.md")
+    findings_file = os.path.join(report_folder, "findings.json")
+    if findings is None and os.path.exists(findings_file):
+        with open(findings_file, 'r', encoding='utf-8') as f:
+            findings = json.load(f)
 
     print(f"\n=== Processing patient: {patient_name} ===")
 
-    # Etapa 1: OCR com GPT-4o
-    print("\n1. OCRing images...")
-    ocr = GPTVision(api_key)
-    ocr.process_patient_images(str(images_folder))
+    # Etapa 1: OCR com GPT-4o (dispensado quando o SR já traz as medidas)
+    findings_text = ""
+    if findings:
+        # pydicom só é carregado quando há achados do SR para formatar
+        from DicomManager.sr import SRHarvester
+        findings_text = SRHarvester.to_text(findings)
+    if findings and findings.get("complete") and os.getenv("SR_SKIP_OCR", "1") != "0":
+        print("\n1. Structured Report complete, skipping OCR...")
+        input_text = findings_text
+    else:
+        print("\n1. OCRing images...")
+        deduplicator = None
+        if dedup:
+            from DicomManager.dedup import FrameDeduplicator
+            deduplicator = FrameDeduplicator.from_env()
+        ocr = GPTVision(
+            api_key,
+            base_url=base_url,
+            max_in_flight=max_in_flight,
+            cache=cache,
+            deduplicator=deduplicator,
+        )
+        ocr.deadline = deadline
+        ocr.process_patient_images(str(images_folder))
+        input_text = f"{findings_text}\n\n{ocr.text}" if findings_text else ocr.text
     # Etapa 2: Gerar laudo com o3
-    report = GPTReport(api_key)
+    report = GPTReport(api_key, base_url=base_url, cache=cache)
+    report.deadline = deadline
     print("\n2. Generating medical report...")
-    report_text = report.generate_report(ocr.text)
+    with stage("report", items=1) as span:
+        report_text = report.generate_report(input_text)
+        span["bytes"] = len(report_text.encode("utf-8")) if report_text else 0
+    if not report_text:
+        raise ModelCallError("The model returned an empty report")
     with open(report_file, 'w', encoding='utf-8') as f:
         f.write(report_text)
 
+    if cache is not None:
+        print(f"🗃️ AI cache: {cache.stats()}")
     print(f"\n✅ Process complete! Report saved in: {report_file}")
 
 
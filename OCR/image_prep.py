@@ -0,0 +1,92 @@
+"""
+🗜️ OCR Image Preparation
+Prepara as imagens enviadas ao modelo de visão. O OCR só precisa ler o texto das
+medidas e anotações da tela do aparelho, então a imagem pode ser recortada para a
+região de interesse, reduzida e recomprimida com qualidade menor que a dos JPEGs
+de arquivo (q99), diminuindo o corpo das requisições e os tokens de entrada.
+
+O modelo de visão reduz internamente imagens em alta resolução para no máximo
+2048 px no maior lado e 768 px no menor, então reduzir até esse tamanho não
+descarta informação que o modelo usaria.
+"""
+
+from __future__ import annotations
+
+import io
+import os
+
+from PIL import Image
+
+DEFAULT_MAX_EDGE = 1536
+DEFAULT_QUALITY = 85
+
+
+def parse_crop(value: str | None) -> tuple[float, float, float, float] | None:
+    """
+    ### ✂️ parse_crop
+    Converte o texto `"esquerda,topo,direita,base"` (frações de 0 a 1) em uma tupla de recorte.
+
+    ### 🔄 Returns
+        - `tuple | None`: Recorte normalizado, ou None se o valor estiver vazio.
+
+    ### ⚠️ Raises
+        - `ValueError`: Se o texto não tiver quatro frações válidas.
+    """
+    if not value:
+        return None
+    parts = tuple(float(part) for part in value.split(","))
+    if len(parts) != 4 or not (0 <= parts[0] < parts[2] <= 1 and 0 <= parts[1] < parts[3] <= 1):
+        raise ValueError(f"Recorte inválido: {value!r}")
+    return parts
+
+
+def prepare_ocr_image(
+    image_path: str,
+    max_edge: int = DEFAULT_MAX_EDGE,
+    quality: int = DEFAULT_QUALITY,
+    crop: tuple[float, float, float, float] | None = None,
+) -> bytes:
+    """
+    ### 🗜️ prepare_ocr_image
+    Recorta, reduz e recomprime uma imagem para envio ao OCR.
+
+    ### 🖥️ Parameters
+        - `image_path` (`str`): Caminho da imagem original.
+        - `max_edge` (`int`): Tamanho máximo do maior lado, em pixels (0 mantém o tamanho).
+        - `quality` (`int`): Qualidade do JPEG reencodado (1-95).
+        - `crop` (`tuple | None`): Região `(esquerda, topo, direita, base)` em frações da imagem.
+
+    ### 🔄 Returns
+        - `bytes`: JPEG pronto para codificação em base64.
+
+    ### 💡 Example
+    >>> data = prepare_ocr_image("Images/img0001.jpeg", max_edge=1280, quality=80)
+    """
+    with Image.open(image_path) as img:
+        img = img.convert("RGB")
+        if crop:
+            width, height = img.size
+            img = img.crop((
+                round(crop[0] * width),
+                round(crop[1] * height),
+                round(crop[2] * width),
+                round(crop[3] * height),
+            ))
+        if max_edge and max(img.size) > max_edge:
+            img.thumbnail((max_edge, max_edge), Image.LANCZOS)
+
+        buffer = io.BytesIO()
+        img.save(buffer, "JPEG", quality=quality, optimize=True)
+        return buffer.getvalue()
+
+
+def ocr_image_settings() -> dict:
+    """
+    ### ⚙️ ocr_image_settings
+    Lê a configuração de preparo das variáveis `OCR_MAX_EDGE`, `OCR_JPEG_QUALITY` e `OCR_CROP`.
+    """
+    return {
+        "max_edge": int(os.getenv("OCR_MAX_EDGE", str(DEFAULT_MAX_EDGE))),
+        "quality": int(os.getenv("OCR_JPEG_QUALITY", str(DEFAULT_QUALITY))),
+        "crop": parse_crop(os.getenv("OCR_CROP")),
+    }
@@ -0,0 +1,241 @@
+"""
+🌳 Markdown AST Module
+Tokenizador e parser de markdown em passagem única para os laudos gerados pela IA.
+Produz uma lista de blocos (títulos, parágrafos, listas, tabelas e separadores) cujo
+texto inline já está convertido para a marcação aceita pelo `Paragraph` do ReportLab.
+
+Suporta o subconjunto de markdown que os modelos emitem nos laudos:
+- Títulos `#` a `######`
+- Negrito (`**`/`__`), itálico (`*`/`_`) e código inline, inclusive aninhados
+- Listas com marcadores (`-`, `*`, `+`, `•`) e numeradas (`1.`/`1)`)
+- Tabelas no formato GFM (`| a | b |` seguido de `|---|---|`)
+- Separadores horizontais (`---`)
+
+Todo o processamento é linear no tamanho do documento: cada linha é visitada uma vez
+e cada caractere do texto inline é examinado um número constante de vezes.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+
+_HEADING = re.compile(r'^(#{1,6})\s+(.*?)\s*#*\s*$')
+_BULLET = re.compile(r'^[-*+•]\s+(.*)$')
+_ORDERED = re.compile(r'^\d{1,9}[.)]\s+(.*)$')
+_TABLE_SEPARATOR = re.compile(r'^\|?\s*:?-{2,}:?\s*(\|\s*:?-{2,}:?\s*)*\|?$')
+_RULE = re.compile(r'^([-*_])(\s*\1){2,}$')
+
+_TAGS = {
+    '**': ('<b>', '</b>'),
+    '__': ('<b>', '</b>'),
+    '*': ('<i>', '</i>'),
+    '_': ('<i>', '</i>'),
+}
+
+
+@dataclass
+class Block:
+    """
+    ### 🧱 Block
+    Nó do documento markdown.
+
+    ### 🖥️ Parameters
+        - `kind` (`str`): `heading`, `paragraph`, `bullet_list`, `ordered_list`, `table` ou `rule`.
+        - `text` (`str`): Marcação inline já convertida (títulos e parágrafos).
+        - `level` (`int`): Nível do título (1 a 6).
+        - `items` (`list[str]`): Itens das listas, já convertidos.
+        - `rows` (`list[list[str]]`): Linhas da tabela; a primeira é o cabeçalho.
+    """
+    kind: str
+    text: str = ""
+    level: int = 0
+    items: list[str] = field(default_factory=list)
+    rows: list[list[str]] = field(default_factory=list)
+
+
+def _escape(text: str) -> str:
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+
+def render_inline(text: str) -> str:
+    """
+    ### ✒️ render_inline
+    Converte ênfases markdown de uma linha em tags `<b>`, `<i>` e `<font>`.
+
+    Delimitadores são casados com uma pilha: ao fechar um delimitador, os que foram
+    abertos depois dele e ficaram sem par voltam a ser texto literal. Delimitadores
+    sem par ao final também são mantidos como texto.
+
+    ### 🖥️ Parameters
+        - `text` (`str`): Texto markdown inline.
+
+    ### 🔄 Returns
+        - `str`: Texto com marcação do ReportLab.
+
+    ### 💡 Example
+    >>> render_inline("**Fígado:** *normal* e **baço** normal")
+    '<b>Fígado:</b> <i>normal</i> e <b>baço</b> normal'
+    """
+    out: list[str] = []
+    stack: list[tuple[str, int]] = []
+    open_count = dict.fromkeys(_TAGS, 0)
+    n = len(text)
+    i = 0
+    buf_start = 0
+    run_end = 0
+    can_open = can_close = False
+
+    while i < n:
+        ch = text[i]
+
+        if ch == '`':
+            end = text.find('`', i + 1)
+            if end == -1:
+                i += 1
+                continue
+            out.append(_escape(text[buf_start:i]))
+            out.append(f'<font face="Courier">{_escape(text[i + 1:end])}</font>')
+            i = end + 1
+            buf_start = i
+            continue
+
+        if ch not in '*_':
+            i += 1
+            continue
+
+        if i >= run_end:
+            # Abertura/fechamento decidido pela sequência inteira de delimitadores (`***`)
+            run_start = i
+            run_end = i
+            while run_end < n and text[run_end] == ch:
+                run_end += 1
+            prev_ch = text[run_start - 1] if run_start > 0 else ' '
+            next_ch = text[run_end] if run_end < n else ' '
+            can_open = not next_ch.isspace()
+            can_close = not prev_ch.isspace()
+            if ch == '_':
+                # Sublinhado dentro de palavras (ex.: nomes_de_arquivo) não é ênfase
+                can_open = can_open and not prev_ch.isalnum()
+                can_close = can_close and not next_ch.isalnum()
+
+        marker = ch * 2 if run_end - i >= 2 else ch
+        if len(marker) == 2 and can_close and (
+            (run_end - i >= 3 and stack and stack[-1][0] == ch)
+            or (not open_count[marker] and open_count[ch])
+        ):
+            # Em `***texto***` o itálico interno fecha antes do negrito, e em `*texto**`
+            # só o itálico tem par
+            marker = ch
+        end = i + len(marker)
+
+        if can_close and open_count[marker]:
+            out.append(_escape(text[buf_start:i]))
+            while stack:
+                open_marker, index = stack.pop()
+                open_count[open_marker] -= 1
+                if open_marker == marker:
+                    out[index] = _TAGS[marker][0]
+                    break
+                out[index] = open_marker
+            out.append(_TAGS[marker][1])
+        elif can_open:
+            out.append(_escape(text[buf_start:i]))
+            stack.append((marker, len(out)))
+            open_count[marker] += 1
+            out.append(marker)
+        else:
+            i = end
+            continue
+
+        i = end
+        buf_start = i
+
+    out.append(_escape(text[buf_start:]))
+    return ''.join(out)
+
+
+def _split_row(line: str) -> list[str]:
+    line = line.strip()
+    if line.startswith('|'):
+        line = line[1:]
+    if line.endswith('|'):
+        line = line[:-1]
+    return [render_inline(cell.strip()) for cell in line.split('|')]
+
+
+def parse_markdown(md_content: str) -> list[Block]:
+    """
+    ### 🌳 parse_markdown
+    Converte o documento markdown em uma lista de blocos em uma única passagem.
+
+    Linhas consecutivas de texto formam um único parágrafo, preservando as quebras
+    de linha (o modelo costuma listar campos como "Paciente:"/"Exame:" em linhas seguidas).
+
+    ### 🖥️ Parameters
+        - `md_content` (`str`): Documento markdown completo.
+
+    ### 🔄 Returns
+        - `list[Block]`: Blocos na ordem em que aparecem no documento.
+    """
+    blocks: list[Block] = []
+    lines = md_content.splitlines()
+    paragraph: list[str] = []
+    n = len(lines)
+    i = 0
+
+    def flush_paragraph() -> None:
+        if paragraph:
+            blocks.append(Block('paragraph', text='<br/>'.join(paragraph)))
+            paragraph.clear()
+
+    while i < n:
+        line = lines[i].strip()
+
+        if not line:
+            flush_paragraph()
+            i += 1
+            continue
+
+        heading = _HEADING.match(line)
+        if heading:
+            flush_paragraph()
+            blocks.append(Block('heading', text=render_inline(heading.group(2)), level=len(heading.group(1))))
+            i += 1
+            continue
+
+        if _RULE.match(line):
+            flush_paragraph()
+            blocks.append(Block('rule'))
+            i += 1
+            continue
+
+        if line.startswith('|') and i + 1 < n and _TABLE_SEPARATOR.match(lines[i + 1].strip()):
+            flush_paragraph()
+            rows = [_split_row(line)]
+            i += 2
+            while i < n and lines[i].strip().startswith('|'):
+                rows.append(_split_row(lines[i]))
+                i += 1
+            blocks.append(Block('table', rows=rows))
+            continue
+
+        for kind, pattern in (('bullet_list', _BULLET), ('ordered_list', _ORDERED)):
+            item = pattern.match(line)
+            if item:
+                flush_paragraph()
+                if not blocks or blocks[-1].kind != kind:
+                    blocks.append(Block(kind))
+                blocks[-1].items.append(render_inline(item.group(1)))
+                break
+        else:
+            if blocks and blocks[-1].kind in ('bullet_list', 'ordered_list') and not paragraph \
+                    and lines[i].startswith((' ', '\t')):
+                # Continuação indentada do último item da lista
+                blocks[-1].items[-1] += ' ' + render_inline(line)
+            else:
+                paragraph.append(render_inline(line))
+        i += 1
+
+    flush_paragraph()
+    return blocks
@@ -1,84 +1,245 @@
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
 from pathlib import Path
-from pyorthanc.retrieve import os
+from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.platypus import (
+    BaseDocTemplate, Frame, HRFlowable, ListFlowable, ListItem, PageTemplate, Paragraph, Spacer, Table, TableStyle
+)
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle, StyleSheet1
 from reportlab.lib.units import cm
 from reportlab.lib.enums import TA_JUSTIFY, TA_CENTER
-import markdown2
+
+from .markdown_ast import parse_markdown
+
+
+class ReportRenderer:
+    """
+    ### 🖨️ ReportRenderer
+    Renderizador de laudos markdown em PDF. Estilos e templates de página do ReportLab
+    são construídos uma única vez na criação do objeto e reaproveitados a cada laudo,
+    evitando repetir esse trabalho no monitor de longa duração.
+
+    Os PDFs renderizados ficam em um cache LRU indexado pelo hash do markdown, de forma
+    que reprocessar um laudo idêntico não repete o build do documento.
+
+    ### 🖥️ Parameters
+        - `pagesize` (`tuple`): Tamanho da página (padrão A4).
+        - `margin` (`float`): Margem aplicada nos quatro lados, em pontos.
+        - `cache_size` (`int`): Quantidade de PDFs mantidos no cache (0 desativa).
+
+    ### 💡 Example
+    >>> renderer = get_renderer()
+    >>> pdf_bytes = renderer.render("# Título\\n\\nTexto do laudo")
+    """
+
+    def __init__(self, pagesize: tuple = A4, margin: float = 2*cm, cache_size: int = 32):
+        self.pagesize = pagesize
+        self.margin = margin
+        self.cache_size = cache_size
+        self._cache: OrderedDict[str, bytes] = OrderedDict()
+        self.styles = self._build_styles()
+        self.page_templates = self._build_templates()
+        # Os Frames dos templates guardam estado durante o build
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _build_styles() -> StyleSheet1:
+        """
+        ### 🎨 _build_styles
+        Cria a folha de estilos base acrescida dos estilos `Justified` e `CustomTitle`.
+        """
+        styles = getSampleStyleSheet()
+        styles.add(ParagraphStyle(
+            name='Justified',
+            parent=styles['Normal'],
+            alignment=TA_JUSTIFY,
+            fontSize=11,
+            leading=14,
+            spaceAfter=12
+        ))
+
+        styles.add(ParagraphStyle(
+            name='CustomTitle',
+            parent=styles['Heading1'],
+            alignment=TA_CENTER,
+            fontSize=16,
+            spaceAfter=20
+        ))
+
+        styles.add(ParagraphStyle(
+            name='TableCell',
+            parent=styles['Normal'],
+            fontSize=10,
+            leading=12
+        ))
+
+        styles.add(ParagraphStyle(
+            name='TableHeader',
+            parent=styles['TableCell'],
+            fontName='Helvetica-Bold'
+        ))
+        return styles
+
+    def _build_templates(self) -> list[PageTemplate]:
+        """
+        ### 📐 _build_templates
+        Cria o template de página com um único frame respeitando as margens.
+        """
+        width, height = self.pagesize
+        frame = Frame(
+            self.margin,
+            self.margin,
+            width - 2 * self.margin,
+            height - 2 * self.margin,
+            id='normal'
+        )
+        return [PageTemplate(id='Laudo', frames=[frame])]
+
+    def build_story(self, md_content: str) -> list:
+        """
+        ### 📝 build_story
+        Converte o conteúdo markdown na lista de flowables do ReportLab a partir
+        dos blocos produzidos por `parse_markdown`.
+
+        ### 🖥️ Parameters
+            - `md_content` (`str`): Texto markdown do laudo.
+
+        ### 🔄 Returns
+            - `list`: Flowables prontos para o `build` do documento.
+        """
+        styles = self.styles
+        story = []
+
+        for block in parse_markdown(md_content):
+            if block.kind == 'heading':
+                if block.level == 1:
+                    # Título principal
+                    story.append(Paragraph(block.text, styles['CustomTitle']))
+                    story.append(Spacer(1, 12))
+                else:
+                    style = styles['Heading2'] if block.level == 2 else styles['Heading3']
+                    story.append(Paragraph(block.text, style))
+                    story.append(Spacer(1, 6))
+            elif block.kind == 'paragraph':
+                story.append(Paragraph(block.text, styles['Justified']))
+                story.append(Spacer(1, 6))
+            elif block.kind in ('bullet_list', 'ordered_list'):
+                story.append(ListFlowable(
+                    [ListItem(Paragraph(item, styles['Normal'])) for item in block.items],
+                    bulletType='bullet' if block.kind == 'bullet_list' else '1',
+                    start='•' if block.kind == 'bullet_list' else None,
+                    leftIndent=18
+                ))
+                story.append(Spacer(1, 6))
+            elif block.kind == 'table':
+                story.append(self._table(block.rows))
+                story.append(Spacer(1, 12))
+            elif block.kind == 'rule':
+                story.append(HRFlowable(width='100%', thickness=0.5, color=colors.grey, spaceAfter=6))
+
+        return story
+
+    def _table(self, rows: list[list[str]]) -> Table:
+        """
+        ### 📊 _table
+        Monta uma tabela com cabeçalho em negrito e grade fina.
+        """
+        n_cols = max(len(row) for row in rows)
+        data = []
+        for r, row in enumerate(rows):
+            style = self.styles['TableHeader'] if r == 0 else self.styles['TableCell']
+            cells = row + [''] * (n_cols - len(row))
+            data.append([Paragraph(cell, style) for cell in cells])
+
+        table = Table(data, colWidths=[(self.pagesize[0] - 2 * self.margin) / n_cols] * n_cols, repeatRows=1)
+        table.setStyle(TableStyle([
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+            ('BACKGROUND', (0, 0), (-1, 0), colors.whitesmoke),
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ]))
+        return table
+
+    def render(self, md_content: str) -> bytes:
+        """
+        ### 📦 render
+        Renderiza o markdown diretamente em memória.
+
+        ### 🖥️ Parameters
+            - `md_content` (`str`): Texto markdown do laudo.
+
+        ### 🔄 Returns
+            - `bytes`: Conteúdo do PDF gerado.
+        """
+        key = hashlib.sha256(md_content.encode('utf-8')).hexdigest()
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        buffer = io.BytesIO()
+        story = self.build_story(md_content)
+        with self._lock:
+            doc = BaseDocTemplate(
+                buffer,
+                pagesize=self.pagesize,
+                rightMargin=self.margin,
+                leftMargin=self.margin,
+                topMargin=self.margin,
+                bottomMargin=self.margin,
+                pageTemplates=self.page_templates
+            )
+            doc.build(story)
+            pdf_bytes = buffer.getvalue()
+            if self.cache_size > 0:
+                self._cache[key] = pdf_bytes
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return pdf_bytes
+
+    def render_file(self, markdown_file: Path, pdf_file: Path) -> None:
+        """
+        ### 💾 render_file
+        Lê um arquivo markdown e grava o PDF correspondente.
+
+        ### 🖥️ Parameters
+            - `markdown_file` (`Path`): Arquivo markdown de entrada.
+            - `pdf_file` (`Path`): Caminho do PDF de saída.
+        """
+        with open(markdown_file, 'r', encoding='utf-8') as f:
+            md_content = f.read()
+        pdf_bytes = self.render(md_content)
+        # Troca atômica: um leitor do PDF antigo nunca vê o novo pela metade
+        tmp_file = f"{pdf_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_file, 'wb') as f:
+            f.write(pdf_bytes)
+        os.replace(tmp_file, pdf_file)
+
+
+_renderer: ReportRenderer | None = None
+_renderer_lock = threading.Lock()
+
+
+def get_renderer() -> ReportRenderer:
+    """
+    ### ♻️ get_renderer
+    Retorna o `ReportRenderer` compartilhado do processo, criando-o na primeira chamada.
+    """
+    global _renderer
+    if _renderer is None:
+        with _renderer_lock:
+            if _renderer is None:
+                _renderer = ReportRenderer()
+    return _renderer
+
 
 def markdown_to_pdf(markdown_file: Path, pdf_file: Path):
     """
     Converte um arquivo markdown em PDF formatado
     """
-    # Ler o conteúdo markdown
-    with open(markdown_file, 'r', encoding='utf-8') as f:
-        md_content = f.read()
-
-    # Converter markdown para HTML
-    html_content = markdown2.markdown(md_content)
-
-    # Criar o PDF
-    doc = SimpleDocTemplate(
-        str(pdf_file),
-        pagesize=A4,
-        rightMargin=2*cm,
-        leftMargin=2*cm,
-        topMargin=2*cm,
-        bottomMargin=2*cm
-    )
-
-    # Estilos
-    styles = getSampleStyleSheet()
-    styles.add(ParagraphStyle(
-        name='Justified',
-        parent=styles['Normal'],
-        alignment=TA_JUSTIFY,
-        fontSize=11,
-        leading=14,
-        spaceAfter=12
-    ))
-
-    styles.add(ParagraphStyle(
-        name='CustomTitle',
-        parent=styles['Heading1'],
-        alignment=TA_CENTER,
-        fontSize=16,
-        spaceAfter=20
-    ))
-
-    # Processar o conteúdo
-    story = []
-    lines = md_content.split('\n')
-
-    for line in lines:
-        line = line.strip()
-
-        if line.startswith('# '):
-            # Título principal
-            story.append(Paragraph(line[2:], styles['CustomTitle']))
-            story.append(Spacer(1, 12))
-        elif line.startswith('## '):
-            # Subtítulo
-            story.append(Paragraph(line[3:], styles['Heading2']))
-            story.append(Spacer(1, 6))
-        elif line.startswith('### '):
-            # Sub-subtítulo
-            story.append(Paragraph(line[4:], styles['Heading3']))
-            story.append(Spacer(1, 6))
-        elif line.startswith('**') and line.endswith('**'):
-            # Texto em negrito
-            story.append(Paragraph(f"<b>{line[2:-2]}</b>", styles['Normal']))
-            story.append(Spacer(1, 6))
-        elif line:
-            # Texto normal
-            # Converter markdown inline para tags HTML
-            line = line.replace('**', '<b>', 1).replace('**', '</b>', 1)
-            line = line.replace('*', '<i>', 1).replace('*', '</i>', 1)
-            story.append(Paragraph(line, styles['Justified']))
-            story.append(Spacer(1, 6))
-
-    # Gerar o PDF
-    doc.build(story)
+    get_renderer().render_file(markdown_file, pdf_file)
     print(f"PDF do laudo gerado: {pdf_file}")
-    os.remove(markdown_file)
\ No newline at end of file
+    os.remove(markdown_file)
@@ -0,0 +1,339 @@
+"""
+🚦 OpenAI Request Scheduler
+Agendador compartilhado para todas as chamadas aos modelos da OpenAI. Combina limites
+de requisições e tokens por minuto (token bucket), novas tentativas com backoff
+exponencial com jitter que respeitam o cabeçalho `Retry-After`, prazos por paciente e
+métricas de uso.
+
+### 💡 Example
+>>> scheduler = get_scheduler()
+>>> response = scheduler.call(lambda: client.chat.completions.create(...), estimated_tokens=2000)
+>>> scheduler.metrics()["retries"]
+"""
+
+from __future__ import annotations
+
+import datetime
+import email.utils
+import math
+import os
+import random
+import threading
+import time
+from typing import Any, Callable
+
+import openai
+
+
+class ModelCallError(Exception):
+    """Falha definitiva de uma chamada ao modelo após esgotar as novas tentativas."""
+
+
+class DeadlineExceeded(ModelCallError):
+    """O prazo do paciente terminou antes que a chamada pudesse ser concluída."""
+
+
+class TokenBucket:
+    """
+    ### 🪣 TokenBucket
+    Balde de fichas reabastecido continuamente a `per_minute / 60` fichas por segundo.
+
+    ### 🖥️ Parameters
+        - `per_minute` (`float`): Taxa de reabastecimento por minuto (0 ou menos desativa o limite).
+        - `capacity` (`float | None`): Tamanho máximo do balde (padrão: uma taxa por minuto).
+    """
+
+    def __init__(self, per_minute: float, capacity: float | None = None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity if capacity is not None else per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount: float, deadline: float | None = None) -> float:
+        """
+        ### ⏳ acquire
+        Bloqueia até haver `amount` fichas disponíveis e as consome.
+
+        ### 🖥️ Parameters
+            - `amount` (`float`): Fichas necessárias (limitadas à capacidade do balde).
+            - `deadline` (`float | None`): Instante limite em `time.monotonic()`.
+
+        ### 🔄 Returns
+            - `float`: Tempo total de espera, em segundos.
+
+        ### ⚠️ Raises
+            - `DeadlineExceeded`: Se as fichas só estariam disponíveis depois do prazo.
+        """
+        if not self.enabled:
+            return 0.0
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return waited
+                wait = (amount - self.tokens) / self.rate
+            if deadline is not None and time.monotonic() + wait > deadline:
+                raise DeadlineExceeded("Limite de taxa não libera a chamada antes do prazo")
+            time.sleep(wait)
+            waited += wait
+
+    def adjust(self, delta: float) -> None:
+        """Debita (`delta` > 0) ou devolve (`delta` < 0) fichas após conhecer o consumo real."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens - delta)
+
+
+def _retry_after(error: Exception) -> float | None:
+    """Extrai o atraso sugerido pelo servidor (`retry-after-ms` ou `Retry-After`)."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            seconds = float(value) / 1000.0
+            if math.isfinite(seconds):
+                return max(0.0, seconds)
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+        return max(0.0, seconds) if math.isfinite(seconds) else None
+    except ValueError:
+        pass
+    # Formato HTTP-date; um cabeçalho malformado é ignorado (vale o backoff exponencial)
+    try:
+        parsed = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+    return max(0.0, parsed.timestamp() - time.time())
+
+
+def _consumed_nothing(error: Exception) -> bool:
+    # Respostas de erro e conexões que não chegaram à API não consomem tokens; um timeout
+    # pode ter sido processado pelo servidor e mantém a reserva
+    if isinstance(error, openai.APITimeoutError):
+        return False
+    return isinstance(error, (openai.APIStatusError, openai.APIConnectionError))
+
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, (openai.RateLimitError, openai.APIConnectionError, openai.APITimeoutError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in (408, 409, 429) or error.status_code >= 500
+    return False
+
+
+class RequestScheduler:
+    """
+    ### 🚦 RequestScheduler
+    Executa chamadas aos modelos respeitando limites de taxa e repetindo falhas transitórias.
+
+    Erros 429, 408, 409, 5xx, de conexão e de timeout são repetidos com backoff
+    exponencial com jitter completo; quando o servidor envia `Retry-After`, o atraso
+    nunca é menor que o indicado. Se o servidor pedir mais que `max_delay` (ou o prazo não
+    comportar a espera), as tentativas terminam em vez de repetir antes da hora. Os demais
+    erros falham imediatamente.
+
+    ### 🖥️ Parameters
+        - `requests_per_minute` (`float`): Limite de requisições por minuto (0 desativa).
+        - `tokens_per_minute` (`float`): Limite de tokens por minuto (0 desativa).
+        - `max_retries` (`int`): Novas tentativas após a primeira falha transitória.
+        - `base_delay` (`float`): Atraso base do backoff, em segundos.
+        - `max_delay` (`float`): Atraso máximo entre tentativas, em segundos; um `Retry-After`
+          maior encerra as tentativas.
+
+    ### ⚠️ Raises
+        - `ModelCallError`: Quando a chamada falha de forma definitiva.
+        - `DeadlineExceeded`: Quando o prazo termina antes da conclusão.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float = 0,
+        tokens_per_minute: float = 0,
+        max_retries: int = 6,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+    ):
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._lock = threading.Lock()
+        self._metrics = {
+            "requests": 0,
+            "successes": 0,
+            "failures": 0,
+            "retries": 0,
+            "rate_limited": 0,
+            "server_errors": 0,
+            "connection_errors": 0,
+            "deadline_exceeded": 0,
+            "tokens": 0,
+            "throttle_wait_s": 0.0,
+            "backoff_wait_s": 0.0,
+            "latency_s": 0.0,
+        }
+
+    def _count(self, key: str, value: float = 1) -> None:
+        with self._lock:
+            self._metrics[key] += value
+
+    def metrics(self) -> dict:
+        """
+        ### 📊 metrics
+        Retorna uma cópia dos contadores acumulados desde a criação do agendador.
+        """
+        with self._lock:
+            return dict(self._metrics)
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        server_delay = _retry_after(error)
+        if server_delay is not None:
+            # Nunca antes do que o servidor pediu; acima de max_delay, `call` desiste
+            delay = max(delay, server_delay)
+        return delay
+
+    def call(self, func: Callable[[], Any], estimated_tokens: int = 0, deadline: float | None = None) -> Any:
+        """
+        ### 📡 call
+        Executa `func` sob os limites de taxa, repetindo falhas transitórias.
+
+        ### 🖥️ Parameters
+            - `func` (`Callable[[], Any]`): Chamada à API (ex.: `client.chat.completions.create`).
+            - `estimated_tokens` (`int`): Estimativa de tokens reservada antes de cada tentativa e
+              devolvida quando a tentativa falha sem consumir tokens (429, 5xx, conexão recusada).
+            - `deadline` (`float | None`): Instante limite em `time.monotonic()`.
+
+        ### 🔄 Returns
+            - `Any`: Resposta devolvida por `func`.
+        """
+        attempt = 0
+        reserved = min(estimated_tokens, self.token_bucket.capacity)
+        while True:
+            try:
+                # Tokens antes da vaga de requisição: uma vaga nunca fica presa esperando tokens
+                waited = self.token_bucket.acquire(estimated_tokens, deadline)
+                try:
+                    waited += self.request_bucket.acquire(1, deadline)
+                except DeadlineExceeded:
+                    self.token_bucket.adjust(-reserved)
+                    raise
+            except DeadlineExceeded:
+                self._count("deadline_exceeded")
+                raise
+            self._count("throttle_wait_s", waited)
+            self._count("requests")
+
+            start = time.monotonic()
+            try:
+                response = func()
+            except Exception as e:
+                self._count("latency_s", time.monotonic() - start)
+                if isinstance(e, openai.RateLimitError):
+                    self._count("rate_limited")
+                elif isinstance(e, openai.APIStatusError) and e.status_code >= 500:
+                    self._count("server_errors")
+                elif isinstance(e, (openai.APIConnectionError, openai.APITimeoutError)):
+                    self._count("connection_errors")
+                if _consumed_nothing(e):
+                    # Reserva devolvida: uma rajada de 429 não esgota o TPM dos demais chamadores
+                    self.token_bucket.adjust(-reserved)
+
+                if not _is_retryable(e) or attempt >= self.max_retries:
+                    self._count("failures")
+                    raise ModelCallError(f"Chamada ao modelo falhou após {attempt + 1} tentativa(s): {e}") from e
+
+                delay = self._backoff(attempt, e)
+                if delay > self.max_delay:
+                    self._count("failures")
+                    raise ModelCallError(
+                        f"Servidor pediu {delay:.0f}s de espera (máximo {self.max_delay:.0f}s) após "
+                        f"{attempt + 1} tentativa(s): {e}"
+                    ) from e
+                if deadline is not None and time.monotonic() + delay > deadline:
+                    self._count("deadline_exceeded")
+                    raise DeadlineExceeded(f"Prazo esgotado aguardando nova tentativa: {e}") from e
+                print(f"[AVISO] Falha transitória ({e.__class__.__name__}), nova tentativa em {delay:.1f}s")
+                self._count("retries")
+                self._count("backoff_wait_s", delay)
+                time.sleep(delay)
+                attempt += 1
+                continue
+
+            self._count("latency_s", time.monotonic() - start)
+            self._count("successes")
+            usage = getattr(response, "usage", None)
+            used = getattr(usage, "total_tokens", None) if usage else None
+            if used is not None:
+                self._count("tokens", used)
+                self.token_bucket.adjust(used - min(estimated_tokens, self.token_bucket.capacity))
+            return response
+
+
+def estimate_tokens(messages: list[dict], tokens_per_image: int = 1100) -> int:
+    """
+    ### 🧮 estimate_tokens
+    Estima os tokens de entrada de uma conversa: ~4 caracteres por token de texto e um
+    custo fixo por imagem (valor próximo ao de uma imagem em alta resolução).
+    """
+    total = 0
+    for message in messages:
+        content = message.get("content", "")
+        if isinstance(content, str):
+            total += len(content) // 4
+            continue
+        for part in content:
+            if part.get("type") == "image_url":
+                total += tokens_per_image
+            else:
+                total += len(part.get("text", "")) // 4
+    return total
+
+
+_scheduler: RequestScheduler | None = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> RequestScheduler:
+    """
+    ### ♻️ get_scheduler
+    Retorna o agendador compartilhado do processo, configurado pelas variáveis
+    `OPENAI_RPM`, `OPENAI_TPM` e `OPENAI_MAX_RETRIES`.
+    """
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = RequestScheduler(
+                    requests_per_minute=float(os.getenv("OPENAI_RPM", "0")),
+                    tokens_per_minute=float(os.getenv("OPENAI_TPM", "0")),
+                    max_retries=int(os.getenv("OPENAI_MAX_RETRIES", "6")),
+                )
+    return _scheduler
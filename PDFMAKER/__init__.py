@@ -1,3 +1,18 @@
-from .pdfmaker import MkPDF
+from importlib import import_module
 
-__all__ = ["MkPDF"]
\ No newline at end of file
+# Carregamento sob demanda: o reportlab só é importado quando `MkPDF` é usado
+_EXPORTS = {"MkPDF": ".pdfmaker"}
+
+__all__ = ["MkPDF"]
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
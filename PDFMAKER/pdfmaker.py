@@ -1,16 +1,29 @@
 import os
+import threading
 from PIL import Image
 from reportlab.lib.pagesizes import A4
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle
 from reportlab.platypus import Image as rlImage
 from reportlab.lib import colors
 #
-def MkPDF(user: str, name: str) -> None:
+def MkPDF(
+    user: str, name: str, dedup: bool | None = None, previews: bool | None = None, users_dir: str | None = None
+) -> None:
     """Function to create a PDF file with images. The images will be added to the PDF without resizing, but their display size will be adjusted to fit the page.
     #### Parametros:
     - name: str
         Nome do arquivo PDF que conterá as imagens.
+    - dedup: bool | None
+        Mantém apenas um quadro de cada grupo de quadros quase idênticos. Padrão: variável `PDF_DEDUP` (desligado).
+    - previews: bool | None
+        Usa a prévia de 800 px de `Previews/` (gerada na conversão) no lugar da imagem completa, quando existir. Padrão: variável `PDF_PREVIEWS` (desligado).
+    - users_dir: str | None
+        Pasta `Users` de onde as imagens são lidas e onde o PDF é gravado. Padrão: `Users/` na raiz do projeto.
     """
+    if dedup is None:
+        dedup = os.getenv("PDF_DEDUP", "0") == "1"
+    if previews is None:
+        previews = os.getenv("PDF_PREVIEWS", "0") == "1"
 
     # Margens do documento
     doc_margin = 20
@@ -18,17 +31,23 @@ def MkPDF(user: str, name: str) -> None:
     # Inicializar o PDF
     # Usar caminho absoluto baseado no diretório atual
     project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    pdf_path = os.path.join(project_root, "Users", user, "Patients", name, "Report", f"{name}.pdf")
+    users_dir = users_dir or os.path.join(project_root, "Users")
+    pdf_path = os.path.join(users_dir, user, "Patients", name, "Report", f"{name}.pdf")
+
+    # Gerado em um arquivo temporário e renomeado ao fim, para que quem lê o PDF enquanto
+    # ele é refeito (o ReportServer, por exemplo) nunca receba um arquivo pela metade
+    tmp_path = f"{pdf_path}.{os.getpid()}.{threading.get_ident()}.tmp"
 
     pdf = SimpleDocTemplate(
-        pdf_path,
+        tmp_path,
         pagesize=A4,
         rightMargin=doc_margin,
         leftMargin=doc_margin,
         topMargin=20,
         bottomMargin=doc_margin,
     )
-    folder = os.path.join(project_root, "Users", user, "Patients", name, "Images")
+    folder = os.path.join(users_dir, user, "Patients", name, "Images")
+    previews_folder = os.path.join(users_dir, user, "Patients", name, "Previews")
      # Table settings
     num_rows = 4
     num_cols = 2
@@ -55,6 +74,12 @@ def MkPDF(user: str, name: str) -> None:
             or f.endswith(".JPG")
             or f.endswith(".bmp")
         ]
+        if dedup and images:
+            from DicomManager.dedup import FrameDeduplicator
+            images.sort()
+            kept, report = FrameDeduplicator.from_env().deduplicate([os.path.join(folder, f) for f in images])
+            images = [os.path.basename(f) for f in kept]
+            print(f"🪞 Dedup PDF: {report['frames']} quadros -> {report['clusters']}")
         data = []
         data2 = []
         # Start table data list
@@ -73,7 +98,8 @@ def MkPDF(user: str, name: str) -> None:
                 for j in range(num_cols):
                     try:
                         img_path = images.pop(0)
-                        img_path = os.path.join(folder, img_path)
+                        preview_path = os.path.join(previews_folder, os.path.splitext(img_path)[0] + ".preview.jpeg")
+                        img_path = preview_path if previews and os.path.exists(preview_path) else os.path.join(folder, img_path)
                     except IndexError:
                         row.append("")  # No more images to add
                         continue
@@ -137,4 +163,9 @@ def MkPDF(user: str, name: str) -> None:
             pdf.build([table, table2])
             print(f"PDF criado com sucesso")
 
-    T()
+    try:
+        T()
+        os.replace(tmp_path, pdf_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
@@ -0,0 +1,49 @@
+from importlib import import_module
+
+# Carregamento sob demanda: métricas e perfil (usados pelas etapas de conversão) não
+# importam pyorthanc/httpx, que só são carregados com `OrthancPool`
+_EXPORTS = {
+    "StudyEventQueue": ".webhook",
+    "WebhookServer": ".webhook",
+    "IngestState": ".state",
+    "OrthancPool": ".orthanc_client",
+    "StudyIngestor": ".ingest",
+    "METRICS": ".metrics",
+    "MetricsRegistry": ".metrics",
+    "MetricsServer": ".metrics",
+    "stage": ".metrics",
+    "trace": ".metrics",
+    "PROFILER": ".profiling",
+    "Profiler": ".profiling",
+    "ProfileSession": ".profiling",
+    "BacklogProcessor": ".backlog",
+    "archive_patient": ".backlog",
+    "is_complete": ".backlog",
+    "ArchiveLedger": ".backlog",
+    "FolderWatcher": ".watch",
+    "ResourceGovernor": ".governor",
+    "StorageSweeper": ".retention",
+    "load_policies": ".retention",
+    "CATALOG": ".catalog",
+    "PatientCatalog": ".catalog",
+    "ReportServer": ".report_server",
+}
+
+__all__ = [
+    "StudyEventQueue", "WebhookServer", "IngestState", "OrthancPool", "StudyIngestor",
+    "METRICS", "MetricsRegistry", "MetricsServer", "stage", "trace", "PROFILER", "Profiler", "ProfileSession",
+    "BacklogProcessor", "archive_patient", "is_complete", "ArchiveLedger", "FolderWatcher",
+    "ResourceGovernor", "StorageSweeper", "load_policies", "CATALOG", "PatientCatalog", "ReportServer",
+]
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
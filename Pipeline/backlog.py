@@ -0,0 +1,405 @@
+"""
+🗃️ Backlog Processing
+Processamento em lote de uma pasta de arquivos ZIP (por exemplo, as centenas de exames
+acumulados em `ZIPS/` depois de uma queda do monitor), com vários workers em paralelo.
+Cada arquivo é extraído em sua própria pasta de trabalho; arquivos já processados (pelo
+registro de ZIPs, `ArchiveLedger`) são pulados, de modo que uma execução interrompida pode
+ser simplesmente repetida.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import gc
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import traceback
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable
+
+from .governor import ResourceGovernor, peak_rss, reset_peak_rss
+from .metrics import rss_bytes
+
+
+def archive_patient(path: str) -> str:
+    """
+    ### 👤 archive_patient
+    Nome do paciente de um ZIP exportado pelo Orthanc (pasta raiz `"<timestamp> <nome>"`),
+    lido do índice do arquivo sem extraí-lo — o mesmo nome usado por `Extract_Convert_Img`.
+    """
+    with zipfile.ZipFile(path) as archive:
+        return archive.namelist()[0].split("/")[0][15:]
+
+
+class ArchiveLedger:
+    """
+    ### 📒 ArchiveLedger
+    Registro dos ZIPs já processados: caminho do arquivo → tamanho, `mtime_ns`, usuário e
+    PDF gerado. Um ZIP está completo quando tem registro com o mesmo tamanho e data (um ZIP
+    reexportado, ou outro arquivo do mesmo paciente, não conta) e o PDF ainda existe. O
+    nome do paciente não é usado: dois ZIPs do mesmo paciente são independentes.
+
+    O arquivo é relido quando outro processo o altera (backlog, pasta observada e a
+    varredura de retenção o compartilham) e cada alteração é gravada de forma atômica.
+
+    ### 🖥️ Parameters
+        - `path` (`str | None`): Arquivo JSON (padrão `ARCHIVES_PATH` ou `Users/archives.json`;
+          vazio mantém o registro só em memória).
+
+    ### 💡 Example
+    >>> ledger = ArchiveLedger()
+    >>> ledger.is_complete("ZIPS/PACIENTE.zip", "Anders")
+    False
+    """
+
+    def __init__(self, path: str | None = None):
+        if path is None:
+            path = os.getenv("ARCHIVES_PATH", os.path.join("Users", "archives.json"))
+        self.path = path or None
+        self._lock = threading.Lock()
+        self._data: dict[str, dict] = {}
+        self._mtime = None
+
+    @staticmethod
+    def fingerprint(path: str) -> dict:
+        st = os.stat(path)
+        return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+    def _refresh(self) -> None:
+        if not self.path:
+            return
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime == self._mtime:
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._data = json.load(f)
+            self._mtime = mtime
+        except (OSError, ValueError) as e:
+            print(f"[AVISO] Registro de ZIPs ilegível ({self.path}): {e}")
+
+    def _save(self) -> None:
+        if not self.path:
+            return
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self._data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+        self._mtime = os.stat(self.path).st_mtime_ns
+
+    def record(self, path: str, user: str, pdf_path: str, fingerprint: dict | None = None) -> None:
+        """
+        ### 📝 record
+        Registra o ZIP como processado. `fingerprint` deve ser o tirado antes do
+        processamento, para que um arquivo alterado durante a execução não conte como completo.
+        """
+        with self._lock:
+            self._refresh()
+            self._data[os.path.realpath(path)] = {
+                **(fingerprint or self.fingerprint(path)),
+                "user": user,
+                "pdf": os.path.abspath(pdf_path),
+                "completed_at": time.time(),
+            }
+            self._save()
+
+    def is_complete(self, path: str, user: str, require_report: bool = False) -> bool:
+        """
+        ### ✅ is_complete
+        Indica se o ZIP foi processado para `user`, sem alterações desde então, e se o PDF
+        de imagens (e, com `require_report`, o do laudo) ainda existe.
+        """
+        with self._lock:
+            self._refresh()
+            entry = self._data.get(os.path.realpath(path))
+        if not entry or entry.get("user") != user:
+            return False
+        try:
+            if self.fingerprint(path) != {"size": entry["size"], "mtime_ns": entry["mtime_ns"]}:
+                return False
+        except OSError:
+            return False
+        pdf_path = entry["pdf"]
+        if not os.path.exists(pdf_path):
+            return False
+        return not require_report or os.path.exists(f"{os.path.splitext(pdf_path)[0]}_laudo.pdf")
+
+
+LEDGER = ArchiveLedger()
+
+
+def is_complete(path: str, user: str, require_report: bool = False) -> bool:
+    """
+    ### ✅ is_complete
+    Indica se o ZIP já foi processado, pelo registro compartilhado (`LEDGER`, ver `ArchiveLedger`).
+    """
+    return LEDGER.is_complete(path, user, require_report)
+
+
+def _run_job(process: Callable, file: str, user: str, zip_dir: str, work_dir: str) -> dict:
+    # Executado no processo worker: a saída de cada arquivo é devolvida para o log
+    output = io.StringIO()
+    start = time.perf_counter()
+    # Relógio de parede, comparado ao mtime do PDF (arredondado para baixo: sistemas de arquivos
+    # com mtime em segundos inteiros)
+    started = int(time.time())
+    result = {"file": file, "ok": False, "images": 0, "error": None, "pdf": None}
+    # Pico de memória deste job, informado ao ResourceGovernor
+    reset_peak_rss()
+    try:
+        with contextlib.redirect_stdout(output):
+            pdf_path = process(file, user, zip_dir=zip_dir, work_dir=work_dir)
+        if pdf_path and os.path.exists(pdf_path) and os.path.getmtime(pdf_path) < started:
+            # PDF de uma execução anterior: nada foi gerado por este job
+            result["error"] = "PDF não atualizado"
+        elif pdf_path and os.path.exists(pdf_path):
+            images_dir = os.path.join(os.path.dirname(os.path.dirname(pdf_path)), "Images")
+            result["images"] = sum(1 for f in os.listdir(images_dir) if f.lower().endswith((".jpeg", ".jpg")))
+            result["ok"] = True
+            result["pdf"] = pdf_path
+        else:
+            result["error"] = "PDF não gerado"
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+        output.write(traceback.format_exc())
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    result["seconds"] = time.perf_counter() - start
+    result["log"] = output.getvalue()
+    gc.collect()
+    result["peak_rss"] = peak_rss()
+    result["retained_rss"] = rss_bytes()
+    return result
+
+
+def _failed(file: str, error: str) -> dict:
+    # Resultado de um job que não devolveu nada (worker encerrado ou erro ao submeter)
+    return {"file": file, "ok": False, "images": 0, "error": error, "pdf": None, "seconds": 0.0,
+            "log": "", "peak_rss": None, "retained_rss": None}
+
+
+class BacklogProcessor:
+    """
+    ### 🗃️ BacklogProcessor
+    Descobre os ZIPs de `zip_dir`, pula os já processados e processa os demais com
+    `workers` processos em paralelo, chamando `process(file, user, zip_dir=..., work_dir=...)`
+    (normalmente `main.Extract_Convert_Img`) com uma pasta de trabalho exclusiva por arquivo.
+
+    A cada momento, quantos jobs rodam juntos é decidido por um `ResourceGovernor`. Ele
+    estima a memória de cada ZIP pelos cabeçalhos DICOM e respeita o teto de memória,
+    usando `workers` como limite de jobs simultâneos. Quando o próximo ZIP (do maior
+    para o menor) não cabe, um menor que caiba começa antes dele.
+
+    Um arquivo está completo quando o `ArchiveLedger` tem o registro do próprio ZIP (mesmo
+    tamanho e data) e o PDF gerado ainda existe e, com `require_report`, também o laudo.
+    Dois ZIPs do mesmo paciente nunca rodam ao mesmo tempo, pois gravam na mesma pasta.
+
+    A falha de um job não interrompe o lote: o ZIP entra na lista de falhas. Se um worker
+    morrer (`BrokenProcessPool`, por exemplo morto por falta de memória), o pool é recriado
+    e os ZIPs que estavam em andamento são repetidos um de cada vez; o que derrubar o
+    worker de novo, sozinho, é dado como falha.
+
+    ### 🖥️ Parameters
+        - `process` (`Callable`): Função de processamento de um ZIP (de nível de módulo, para os workers).
+        - `user` (`str`): Usuário dono dos pacientes.
+        - `zip_dir` (`str`): Pasta com os arquivos ZIP.
+        - `workers` (`int | None`): Máximo de processos em paralelo (padrão `BACKLOG_WORKERS` ou metade das CPUs).
+        - `work_root` (`str`): Pasta base das pastas de trabalho de cada arquivo.
+        - `require_report` (`bool`): Exige o laudo com IA para considerar um arquivo completo.
+        - `force` (`bool`): Reprocessa também os arquivos completos.
+        - `log_path` (`str | None`): Arquivo que recebe a saída de cada processamento (None descarta).
+        - `memory_limit` (`int | None`): Teto de memória em bytes (padrão `GOVERNOR_MEMORY_LIMIT` ou 80% da disponível).
+        - `governor` (`ResourceGovernor | None`): Governador já configurado (ignora `memory_limit`).
+        - `ledger` (`ArchiveLedger | None`): Registro dos ZIPs processados (padrão `LEDGER`).
+
+    ### 💡 Example
+    >>> from main import Extract_Convert_Img
+    >>> summary = BacklogProcessor(Extract_Convert_Img, "Anders", workers=4).run()
+    >>> summary["failed"]
+    []
+    """
+
+    def __init__(
+        self,
+        process: Callable,
+        user: str,
+        zip_dir: str = "ZIPS",
+        workers: int | None = None,
+        work_root: str = "Dicoms",
+        require_report: bool = False,
+        force: bool = False,
+        log_path: str | None = os.path.join("Users", "backlog.log"),
+        memory_limit: int | None = None,
+        governor: ResourceGovernor | None = None,
+        ledger: ArchiveLedger | None = None,
+    ):
+        self.process = process
+        self.user = user
+        self.zip_dir = zip_dir
+        self.workers = workers or int(os.getenv("BACKLOG_WORKERS", "0")) or max(1, (os.cpu_count() or 2) // 2)
+        self.work_root = work_root
+        self.require_report = require_report
+        self.force = force
+        self.log_path = log_path
+        self.governor = governor or ResourceGovernor(memory_limit, max_workers=self.workers)
+        self.ledger = ledger or LEDGER
+
+    def discover(self) -> list[str]:
+        """
+        ### 🔍 discover
+        Lista os arquivos `.zip` de `zip_dir`, do maior para o menor (os mais longos começam
+        primeiro, equilibrando o fim do lote entre os workers).
+        """
+        files = [f for f in os.listdir(self.zip_dir) if f.lower().endswith(".zip")]
+        return sorted(files, key=lambda f: os.path.getsize(os.path.join(self.zip_dir, f)), reverse=True)
+
+    def is_complete(self, file: str) -> bool:
+        """
+        ### ✅ is_complete
+        Indica se o arquivo, tal como está, já foi processado e suas saídas ainda existem.
+        """
+        return self.ledger.is_complete(os.path.join(self.zip_dir, file), self.user, self.require_report)
+
+    def _log(self, result: dict) -> None:
+        if not self.log_path:
+            return
+        status = "OK" if result["ok"] else f"ERRO {result['error']}"
+        with open(self.log_path, "a", encoding="utf-8") as f:
+            f.write(f"===== {time.strftime('%Y-%m-%d %H:%M:%S')} {result['file']} [{status}] "
+                    f"{result['seconds']:.1f}s\n{result['log']}\n")
+
+    def _finish(self, result: dict, estimate: int, fingerprint: dict | None, results: list, total: int) -> None:
+        # Contabiliza um job encerrado: governador, registro de ZIPs, log e progresso
+        self.governor.release(estimate, result["peak_rss"], result["retained_rss"])
+        if result["ok"] and fingerprint:
+            self.ledger.record(os.path.join(self.zip_dir, result["file"]), self.user, result["pdf"], fingerprint)
+        results.append(result)
+        self._log(result)
+        mark = "✅" if result["ok"] else "❌"
+        print(f"{mark} [{len(results)}/{total}] {result['file']}: {result['images']} imagens "
+              f"em {result['seconds']:.1f}s" + (f" — {result['error']}" if result["error"] else ""))
+
+    def run(self) -> dict:
+        """
+        ### 🚀 run
+        Processa o lote e imprime o resumo de throughput.
+
+        ### 🔄 Returns
+            - `dict`: Contagens (`total`, `skipped`, `processed`), `failed` (lista de
+              `{"file", "error"}`), `images`, `seconds`, `archives_per_min` e `images_per_s`.
+        """
+        files = self.discover()
+        pending = files if self.force else [f for f in files if not self.is_complete(f)]
+        skipped = len(files) - len(pending)
+        limit = self.governor.memory_limit
+        print(f"🗃️ Backlog: {len(files)} arquivos em {self.zip_dir}/, {skipped} já completos, "
+              f"{len(pending)} a processar com até {self.governor.max_workers} workers"
+              + (f" e {limit / 1024**2:.0f} MB" if limit else ""))
+
+        results = []
+        start = time.perf_counter()
+        if pending:
+            os.makedirs(self.work_root, exist_ok=True)
+            estimates, fingerprints, patients = {}, {}, {}
+            queue = list(pending)
+            running = {}
+            # ZIPs que estavam em andamento quando um worker morreu: repetidos um de cada vez
+            suspects = set()
+            index = 0
+            executor = ProcessPoolExecutor(max_workers=min(self.governor.max_workers, len(pending)))
+            try:
+                while queue or running:
+                    # Admite os jobs que cabem no orçamento, na ordem da fila
+                    for file in list(queue):
+                        if not self.governor.has_slot():
+                            break
+                        if running and (file in suspects or suspects & set(running.values())):
+                            break
+                        path = os.path.join(self.zip_dir, file)
+                        if file not in patients:
+                            try:
+                                patients[file] = archive_patient(path)
+                            except (OSError, zipfile.BadZipFile, IndexError):
+                                patients[file] = None
+                        # Dois ZIPs do mesmo paciente gravariam na mesma pasta ao mesmo tempo
+                        if patients[file] and patients[file] in {patients[f] for f in running.values()}:
+                            continue
+                        if file not in estimates:
+                            estimates[file] = self.governor.estimate(path)
+                        if not self.governor.admit(estimates[file]):
+                            continue
+                        try:
+                            fingerprints[file] = self.ledger.fingerprint(path)
+                        except OSError:
+                            fingerprints[file] = None
+                        work_dir = os.path.join(self.work_root, f"backlog-{index:05d}")
+                        future = executor.submit(_run_job, self.process, file, self.user, self.zip_dir, work_dir)
+                        running[future] = file
+                        queue.remove(file)
+                        index += 1
+                    done, _ = wait(running, timeout=self.governor.interval, return_when=FIRST_COMPLETED)
+                    crashed = []
+                    for future in done:
+                        file = running.pop(future)
+                        try:
+                            result = future.result()
+                        except BrokenProcessPool:
+                            crashed.append(file)
+                            continue
+                        except Exception as e:
+                            result = _failed(file, f"{type(e).__name__}: {e}")
+                        self._finish(result, estimates[file], fingerprints.get(file), results, len(pending))
+                    if crashed:
+                        # Os demais jobs do pool quebrado falham juntos
+                        rest = wait(running)[0]
+                        crashed += [running.pop(future) for future in rest]
+                        executor.shutdown(wait=True)
+                        executor = ProcessPoolExecutor(max_workers=min(self.governor.max_workers, len(pending)))
+                        alone = len(crashed) == 1
+                        for file in crashed:
+                            if alone or file in suspects:
+                                self._finish(_failed(file, "worker encerrado inesperadamente (BrokenProcessPool)"),
+                                             estimates[file], None, results, len(pending))
+                            else:
+                                self.governor.release(estimates[file])
+                                suspects.add(file)
+                                queue.insert(0, file)
+                        if not alone:
+                            print(f"⚠️ Worker encerrado com {len(crashed)} jobs em andamento; repetindo um de cada vez")
+                    self.governor.adapt(len(queue))
+            except KeyboardInterrupt:
+                print("\n🛑 Interrompido: os arquivos restantes serão processados na próxima execução")
+                executor.shutdown(wait=True, cancel_futures=True)
+            finally:
+                executor.shutdown(wait=True)
+        elapsed = time.perf_counter() - start
+
+        images = sum(r["images"] for r in results)
+        summary = {
+            "total": len(files),
+            "skipped": skipped,
+            "processed": sum(1 for r in results if r["ok"]),
+            "failed": [{"file": r["file"], "error": r["error"]} for r in results if not r["ok"]],
+            "images": images,
+            "seconds": round(elapsed, 2),
+            "archives_per_min": round(len(results) / elapsed * 60, 2) if results else 0.0,
+            "images_per_s": round(images / elapsed, 2) if results else 0.0,
+            "governor": self.governor.summary(),
+        }
+        print(f"\n📊 {summary['processed']} processados, {len(summary['failed'])} falhas, {skipped} pulados "
+              f"em {elapsed:.1f}s — {summary['archives_per_min']} arquivos/min, {summary['images_per_s']} imagens/s")
+        for failure in summary["failed"]:
+            print(f"   ❌ {failure['file']}: {failure['error']}")
+        return summary
@@ -0,0 +1,328 @@
+"""
+📇 Patient Catalog
+Catálogo indexado (SQLite, `Users/catalog.db`) das pastas de paciente geradas pelo
+pipeline: paciente, estudo (StudyInstanceUID, data, descrição), PDF de imagens, laudo com
+IA, número de imagens e horários de processamento. É alimentado por `Convert_Report` a
+cada processamento e responde às buscas por prefixo do nome, StudyInstanceUID, intervalo
+de datas e usuário pelos índices, sem percorrer `Users/<usuário>/Patients`.
+
+Uma pasta já existente (de antes do catálogo) entra com `backfill()`, que lê o
+`findings.json` de cada pasta e os arquivos de `Report/` e `Images/`.
+
+O banco usa WAL e `busy_timeout`, de modo que os workers do backlog (processos separados)
+gravam no mesmo arquivo; cada processo abre sua própria conexão.
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS studies (
+    id INTEGER PRIMARY KEY,
+    user TEXT NOT NULL,
+    folder TEXT NOT NULL,
+    patient TEXT NOT NULL,
+    name_key TEXT NOT NULL,
+    study_uid TEXT,
+    study_date TEXT,
+    exam TEXT,
+    images INTEGER NOT NULL DEFAULT 0,
+    pdf TEXT,
+    report_pdf TEXT,
+    created_at REAL NOT NULL,
+    processed_at REAL NOT NULL,
+    UNIQUE (user, folder)
+);
+CREATE INDEX IF NOT EXISTS studies_name ON studies (name_key, study_date DESC);
+CREATE INDEX IF NOT EXISTS studies_user_name ON studies (user, name_key, study_date DESC);
+CREATE INDEX IF NOT EXISTS studies_uid ON studies (study_uid);
+CREATE INDEX IF NOT EXISTS studies_date ON studies (study_date);
+CREATE INDEX IF NOT EXISTS studies_user_date ON studies (user, study_date);
+"""
+
+COLUMNS = ("user", "folder", "patient", "name_key", "study_uid", "study_date", "exam",
+           "images", "pdf", "report_pdf", "created_at", "processed_at")
+
+_UPSERT = f"""
+INSERT INTO studies ({", ".join(COLUMNS)}) VALUES ({", ".join("?" * len(COLUMNS))})
+ON CONFLICT (user, folder) DO UPDATE SET
+    patient = excluded.patient, name_key = excluded.name_key,
+    study_uid = COALESCE(excluded.study_uid, studies.study_uid),
+    study_date = COALESCE(excluded.study_date, studies.study_date),
+    exam = COALESCE(excluded.exam, studies.exam),
+    images = excluded.images, pdf = excluded.pdf, report_pdf = excluded.report_pdf,
+    processed_at = excluded.processed_at
+"""
+
+
+def name_key(name: str) -> str:
+    """
+    ### 🔤 name_key
+    Chave de busca do nome: maiúsculas, sem acentos, `^` e espaços repetidos
+    (`"José^da  Silva"` → `"JOSE DA SILVA"`).
+    """
+    text = unicodedata.normalize("NFKD", str(name).replace("^", " "))
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join(text.upper().split())
+
+
+def _date(value) -> str | None:
+    # Datas no formato DICOM (AAAAMMDD), aceitando date/datetime e "AAAA-MM-DD"
+    if value is None or value == "":
+        return None
+    if isinstance(value, (dt.date, dt.datetime)):
+        return value.strftime("%Y%m%d")
+    text = str(value).strip().replace("-", "")
+    if len(text) != 8 or not text.isdigit():
+        raise ValueError(f"Data inválida: {value!r} (use AAAAMMDD ou AAAA-MM-DD)")
+    return text
+
+
+class PatientCatalog:
+    """
+    ### 📇 PatientCatalog
+    Catálogo de pastas de paciente em SQLite. A conexão é aberta no primeiro uso (e reaberta
+    em um processo filho), e o arquivo só é criado quando algo é gravado ou consultado.
+
+    ### 🖥️ Parameters
+        - `path` (`str | None`): Arquivo do banco (padrão `CATALOG_PATH` ou `Users/catalog.db`;
+          `CATALOG_PATH=""` desativa a gravação pelo pipeline).
+
+    ### 💡 Example
+    >>> CATALOG.search(name="JOSE DA", date_from="2025-01-01")
+    [{'user': 'Anders', 'folder': 'JOSE DA SILVA', 'study_date': '20250604', ...}]
+    """
+
+    def __init__(self, path: str | None = None):
+        if path is None:
+            path = os.getenv("CATALOG_PATH", os.path.join("Users", "catalog.db"))
+        self.path = path or None
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        self._pid: int | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.path is not None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is not None and self._pid == os.getpid():
+            return self._conn
+        if not self.enabled:
+            raise RuntimeError("Catálogo desativado (CATALOG_PATH vazio)")
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        self._conn, self._pid = conn, os.getpid()
+        return conn
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None and self._pid == os.getpid():
+                self._conn.close()
+            self._conn = None
+
+    # ── Gravação ──────────────────────────────────────────────────────────────
+
+    @staticmethod
+    def _row(user: str, folder: str, patient: str | None = None, study_uid: str | None = None,
+             study_date=None, exam: str | None = None, images: int = 0, pdf: str | None = None,
+             report_pdf: str | None = None, processed_at: float | None = None) -> tuple:
+        processed_at = processed_at or time.time()
+        patient = patient or folder
+        try:
+            study_date = _date(study_date)
+        except ValueError:
+            study_date = None
+        return (user, folder, patient, name_key(patient), study_uid or None, study_date, exam or None,
+                int(images), pdf, report_pdf, processed_at, processed_at)
+
+    def record(self, user: str, folder: str, **fields) -> None:
+        """
+        ### 📝 record
+        Insere ou atualiza a pasta `folder` do usuário `user`. Campos aceitos: `patient`,
+        `study_uid`, `study_date`, `exam`, `images`, `pdf`, `report_pdf`, `processed_at`.
+        Campos do estudo omitidos mantêm o valor já catalogado.
+        """
+        row = self._row(user, folder, **fields)
+        with self._lock:
+            self._connect().execute(_UPSERT, row)
+
+    def record_folder(self, user: str, folder: str, users_dir: str = "Users") -> dict:
+        """
+        ### 📂 record_folder
+        Cataloga uma pasta de paciente a partir do que está em disco: `Report/findings.json`
+        (nome, data e UID do estudo), os PDFs de `Report/` e a contagem de `Images/`.
+
+        ### 🔄 Returns
+        - `dict`: Campos gravados.
+        """
+        fields = self._scan_folder(os.path.join(users_dir, user, "Patients", folder), folder)
+        self.record(user, folder, **fields)
+        return fields
+
+    @staticmethod
+    def _scan_folder(patient_dir: str, folder: str) -> dict:
+        reports_dir = os.path.join(patient_dir, "Report")
+        images_dir = os.path.join(patient_dir, "Images")
+        study = {}
+        try:
+            with open(os.path.join(reports_dir, "findings.json"), "r", encoding="utf-8") as f:
+                study = json.load(f).get("study", {})
+        except (OSError, ValueError):
+            pass
+        pdf = os.path.join(reports_dir, f"{folder}.pdf")
+        report_pdf = os.path.join(reports_dir, f"{folder}_laudo.pdf")
+        images = 0
+        if os.path.isdir(images_dir):
+            with os.scandir(images_dir) as entries:
+                images = sum(1 for e in entries if e.name.lower().endswith((".jpeg", ".jpg")))
+        stamps = [os.path.getmtime(p) for p in (pdf, report_pdf) if os.path.exists(p)]
+        return {
+            "patient": study.get("patient") or folder,
+            "study_uid": study.get("study_uid"),
+            "study_date": study.get("date"),
+            "exam": study.get("exam"),
+            "images": images,
+            "pdf": pdf if os.path.exists(pdf) else None,
+            "report_pdf": report_pdf if os.path.exists(report_pdf) else None,
+            "processed_at": max(stamps) if stamps else os.path.getmtime(patient_dir),
+        }
+
+    def record_many(self, records) -> int:
+        """
+        ### 📥 record_many
+        Grava vários registros `{"user", "folder", **campos}` (os campos de `record`) em uma
+        única transação.
+
+        ### 🔄 Returns
+        - `int`: Número de registros gravados.
+        """
+        rows = [self._row(**record) for record in records]
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN")
+            try:
+                conn.executemany(_UPSERT, rows)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return len(rows)
+
+    def backfill(self, users_dir: str = "Users", batch: int = 5000) -> int:
+        """
+        ### 🗂️ backfill
+        Cataloga todas as pastas `Users/<usuário>/Patients/<pasta>` existentes, em transações
+        de `batch` pastas. Pode ser repetido: pastas já catalogadas são atualizadas.
+
+        ### 🔄 Returns
+        - `int`: Número de pastas catalogadas.
+        """
+        if not os.path.isdir(users_dir):
+            return 0
+        records, total = [], 0
+        for user in sorted(os.listdir(users_dir)):
+            patients = os.path.join(users_dir, user, "Patients")
+            if not os.path.isdir(patients):
+                continue
+            with os.scandir(patients) as entries:
+                folders = [e.name for e in entries if e.is_dir()]
+            for folder in folders:
+                records.append({"user": user, "folder": folder,
+                                **self._scan_folder(os.path.join(patients, folder), folder)})
+                if len(records) >= batch:
+                    total += self.record_many(records)
+                    records.clear()
+        if records:
+            total += self.record_many(records)
+        return total
+
+    def remove(self, user: str, folder: str) -> None:
+        with self._lock:
+            self._connect().execute("DELETE FROM studies WHERE user = ? AND folder = ?", (user, folder))
+
+    # ── Consulta ──────────────────────────────────────────────────────────────
+
+    def search(
+        self,
+        name: str | None = None,
+        study_uid: str | None = None,
+        date_from=None,
+        date_to=None,
+        user: str | None = None,
+        limit: int = 100,
+    ) -> list[dict]:
+        """
+        ### 🔎 search
+        Busca pastas catalogadas. Com `name`, em ordem alfabética (e, para o mesmo nome, do
+        estudo mais recente ao mais antigo); sem ele, do estudo mais recente ao mais antigo.
+        Em ambos os casos a ordem vem do índice, e a busca para em `limit` linhas.
+        Todos os critérios são opcionais e combinados com E.
+
+        ### 🖥️ Parameters
+            - `name` (`str | None`): Prefixo do nome do paciente (sem diferenciar maiúsculas ou acentos).
+            - `study_uid` (`str | None`): StudyInstanceUID exato.
+            - `date_from`, `date_to` (`str | date | None`): Intervalo fechado da data do estudo
+              (`AAAAMMDD`, `AAAA-MM-DD` ou `date`).
+            - `user` (`str | None`): Usuário dono.
+            - `limit` (`int`): Máximo de resultados.
+
+        ### 🔄 Returns
+        - `list[dict]`: Linhas do catálogo.
+        """
+        where, params = [], []
+        if name:
+            key = name_key(name)
+            # Intervalo no índice em vez de LIKE (que não usa índice sem case_sensitive_like)
+            where.append("name_key >= ? AND name_key < ?")
+            params += [key, key + "\uffff"]
+        if study_uid:
+            where.append("study_uid = ?")
+            params.append(study_uid)
+        if date_from:
+            where.append("study_date >= ?")
+            params.append(_date(date_from))
+        if date_to:
+            where.append("study_date <= ?")
+            params.append(_date(date_to))
+        if user:
+            where.append("user = ?")
+            params.append(user)
+        sql = "SELECT * FROM studies"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY name_key, study_date DESC LIMIT ?" if name else " ORDER BY study_date DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            return [dict(row) for row in self._connect().execute(sql, params)]
+
+    def get(self, user: str, folder: str) -> dict | None:
+        """
+        ### 📄 get
+        Linha de uma pasta de paciente, ou None.
+        """
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT * FROM studies WHERE user = ? AND folder = ?", (user, folder)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def count(self) -> int:
+        with self._lock:
+            return self._connect().execute("SELECT COUNT(*) FROM studies").fetchone()[0]
+
+
+# Catálogo compartilhado pelo processo (CATALOG_PATH)
+CATALOG = PatientCatalog()
@@ -0,0 +1,374 @@
+"""
+🚦 Resource Governor
+Controle de admissão dos jobs paralelos (um ZIP por worker do `BacklogProcessor`) por
+orçamento de memória e de CPU. O consumo de um estudo varia muito: algumas imagens de
+ultrassom comprimidas ocupam poucos MB, enquanto quadros grandes sem compressão são
+normalizados em `float64` por `DICOM2JPEG._dicom_to_pil`.
+
+- Antes de admitir um job, o pico de memória é estimado pelos cabeçalhos DICOM dentro do
+  ZIP (Rows × Columns × SamplesPerPixel × frames × bytes por amostra, mais as cópias da
+  conversão), sem extrair o arquivo.
+- Um job só é admitido se a memória projetada (workers ociosos + picos dos jobs em
+  execução + o novo) e a medida (RSS do processo e dos workers) couberem no teto
+  `GOVERNOR_MEMORY_LIMIT`. Um job sozinho é sempre admitido, para o lote não travar.
+- Cada worker informa o próprio pico (`VmHWM`, zerado antes de cada job) e o RSS que
+  permanece ao final: a razão pico transitório / estimado corrige as próximas estimativas
+  e o RSS retido passa a ser o custo de um worker ocioso.
+- O número de jobs simultâneos varia entre 1 e o teto de workers: sobe enquanto há fila,
+  memória (< 75% do teto) e CPU livres (carga < número de CPUs) e desce sob pressão de
+  memória (> 90%) ou de CPU (carga > 1,5 × CPUs).
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import threading
+import time
+import zipfile
+
+from .metrics import rss_bytes
+
+# Cópias de um quadro na conversão (ver DICOM2JPEG._dicom_to_pil): temporários float64 da
+# normalização (2 × 8 bytes por amostra, só para dados que não são uint8) e imagens RGB de
+# 8 bits (pilha NumPy, PIL e a cópia de cada realce)
+FLOAT_TEMPORARIES = 2
+RGB_COPIES = 3
+# Parte fixa de um job: buffers da extração, montagem do PDF (ReportLab) e objetos do pipeline
+JOB_BYTES = 8 * 1024**2
+# Jobs estimados abaixo disso não recalibram a escala: o pico deles é dominado por ruído
+CALIBRATION_MIN_BYTES = 64 * 1024**2
+DEFAULT_WORKER_BYTES = 150 * 1024**2
+
+_SIZE = re.compile(r"^\s*([\d.]+)\s*([KMGT]?)i?B?\s*$", re.IGNORECASE)
+
+
+def parse_size(value: str | int | None) -> int | None:
+    """
+    ### 📏 parse_size
+    Converte `"4G"`, `"512M"`, `"1.5GB"` ou um número de bytes em bytes.
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, int):
+        return value
+    match = _SIZE.match(str(value))
+    if not match:
+        raise ValueError(f"Tamanho inválido: {value!r}")
+    number, unit = match.groups()
+    return int(float(number) * 1024 ** "_KMGT".index(unit.upper() or "_"))
+
+
+def _meminfo(key: str) -> int | None:
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith(key + ":"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def reset_peak_rss() -> bool:
+    """
+    ### 🔁 reset_peak_rss
+    Zera o pico de RSS (`VmHWM`) do processo corrente (Linux ≥ 4.0).
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss() -> int | None:
+    """
+    ### 📈 peak_rss
+    Pico de RSS do processo desde a partida ou o último `reset_peak_rss()`.
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def tree_rss(pid: int | None = None) -> int | None:
+    """
+    ### 🌳 tree_rss
+    RSS somado do processo `pid` (padrão, o corrente) e de todos os seus descendentes.
+    """
+    usage = tree_usage(pid)
+    return usage[0] if usage else None
+
+
+def tree_usage(pid: int | None = None) -> tuple[int, int] | None:
+    """
+    ### 🌳 tree_usage
+    RSS somado do processo `pid` (padrão, o corrente) e de todos os seus descendentes
+    (os pools de conversão `DICOM_WORKERS` dos workers, por exemplo), e o número de filhos
+    diretos (os workers do pool, inclusive os ociosos).
+    """
+    pid = pid or os.getpid()
+    page = os.sysconf("SC_PAGE_SIZE")
+    try:
+        entries = os.listdir("/proc")
+    except OSError:
+        return None
+    # Uma leitura de cada /proc/<pid>/stat; a árvore é montada pelos ppid
+    rss: dict[int, int] = {}
+    kids: dict[int, list[int]] = {}
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # O nome do processo (2º campo) pode conter espaços: campos depois do ')'
+                fields = f.read().rsplit(")", 1)[1].split()
+            rss[int(entry)] = int(fields[21]) * page
+            kids.setdefault(int(fields[1]), []).append(int(entry))
+        except (OSError, ValueError, IndexError):
+            continue
+    total = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        total += rss.get(current, 0)
+        pending.extend(kids.get(current, ()))
+    return total, len(kids.get(pid, ()))
+
+
+def frame_bytes(header) -> int:
+    """
+    ### 🖼️ frame_bytes
+    Bytes do pixel data decodificado: Rows × Columns × SamplesPerPixel × frames × bytes por amostra.
+    """
+    rows = int(header.get("Rows", 0) or 0)
+    cols = int(header.get("Columns", 0) or 0)
+    samples = int(header.get("SamplesPerPixel", 1) or 1)
+    frames = int(header.get("NumberOfFrames", 1) or 1)
+    bits = int(header.get("BitsAllocated", 8) or 8)
+    return rows * cols * samples * frames * max(1, bits // 8)
+
+
+def conversion_bytes(header) -> int:
+    """
+    ### 🧮 conversion_bytes
+    Pico estimado da conversão de uma instância para JPEG: pixel data decodificado mais o
+    maior entre os temporários `float64` da normalização (dados de mais de 8 bits ou com
+    LUT de modalidade) e as cópias RGB de 8 bits. Multiframes e objetos sem imagem são pulados
+    pelo `DICOM2JPEG` e contam zero.
+    """
+    if "PixelData" not in header and not header.get("Rows"):
+        return 0
+    if int(header.get("NumberOfFrames", 1) or 1) > 1:
+        return 0
+    raw = frame_bytes(header)
+    pixels = int(header.get("Rows", 0) or 0) * int(header.get("Columns", 0) or 0)
+    samples = int(header.get("SamplesPerPixel", 1) or 1)
+    wide = int(header.get("BitsAllocated", 8) or 8) > 8 or "RescaleSlope" in header
+    # Os temporários float64 são liberados antes das cópias RGB: vale o maior dos dois
+    normalize = FLOAT_TEMPORARIES * 8 * pixels * samples if wide else 0
+    return raw + max(normalize, RGB_COPIES * 3 * pixels)
+
+
+def estimate_zip(path: str) -> int:
+    """
+    ### 🔍 estimate_zip
+    Pico de memória estimado para processar um ZIP: `JOB_BYTES` mais o maior pico entre as
+    instâncias, que são convertidas uma de cada vez. Lê apenas os cabeçalhos (sem pixel data).
+    """
+    import pydicom
+
+    peak = 0
+    with zipfile.ZipFile(path) as archive:
+        for info in archive.infolist():
+            if info.is_dir() or not info.filename.lower().endswith(".dcm"):
+                continue
+            try:
+                with archive.open(info) as member:
+                    header = pydicom.dcmread(member, stop_before_pixels=True, force=True)
+            except Exception:
+                # Cabeçalho ilegível: estima pelo tamanho do arquivo, como pixel data nativo
+                peak = max(peak, info.file_size * (1 + RGB_COPIES))
+                continue
+            peak = max(peak, conversion_bytes(header))
+    return JOB_BYTES + peak
+
+
+class ResourceGovernor:
+    """
+    ### 🚦 ResourceGovernor
+    Decide quando um novo job pode começar, a partir da estimativa de memória do job,
+    do teto de memória e do número de jobs simultâneos permitido no momento (`target`).
+
+    ### 🖥️ Parameters
+        - `memory_limit` (`int | None`): Teto de RSS do processo e dos workers, em bytes
+          (padrão `GOVERNOR_MEMORY_LIMIT`, ou 80% da memória disponível na partida).
+        - `max_workers` (`int | None`): Teto de jobs simultâneos (padrão `GOVERNOR_MAX_WORKERS` ou o número de CPUs).
+        - `worker_bytes` (`int`): RSS de um worker ocioso até a primeira medição.
+        - `interval` (`float`): Intervalo mínimo entre medições e ajustes, em segundos.
+
+    ### 💡 Example
+    >>> governor = ResourceGovernor(memory_limit=parse_size("2G"), max_workers=4)
+    >>> estimate = governor.estimate("ZIPS/PACIENTE.zip")
+    >>> if governor.admit(estimate):
+    ...     ...  # iniciar o job; ao terminar, governor.release(estimate, peak, retained)
+    """
+
+    def __init__(
+        self,
+        memory_limit: int | None = None,
+        max_workers: int | None = None,
+        worker_bytes: int = DEFAULT_WORKER_BYTES,
+        interval: float = 0.5,
+    ):
+        if memory_limit is None:
+            memory_limit = parse_size(os.getenv("GOVERNOR_MEMORY_LIMIT"))
+        if memory_limit is None:
+            available = _meminfo("MemAvailable")
+            memory_limit = int(available * 0.8) + (rss_bytes() or 0) if available else None
+        self.memory_limit = memory_limit
+        self.cpus = os.cpu_count() or 1
+        self.max_workers = max(1, max_workers or int(os.getenv("GOVERNOR_MAX_WORKERS", "0")) or self.cpus)
+        self.target = self.max_workers
+        self.worker_bytes = worker_bytes
+        self.interval = interval
+        self.scale = 1.0
+        self._calibrated = False
+        self.running: list[int] = []
+        self.workers = 0
+        self.peak_concurrency = 0
+        self.peak_measured = 0
+        self._measured = 0
+        self._measured_at = 0.0
+        self._adjusted_at = 0.0
+        self._lock = threading.Lock()
+
+    def estimate(self, path: str) -> int:
+        """
+        ### 🔍 estimate
+        Pico de memória estimado do job (ver `estimate_zip`); 0 se o ZIP não puder ser lido.
+        """
+        try:
+            return estimate_zip(path)
+        except (OSError, zipfile.BadZipFile):
+            return 0
+
+    def measure(self) -> int | None:
+        """
+        ### 📏 measure
+        RSS atual do processo e dos workers (no máximo uma leitura por `interval`). Os
+        workers vivos também entram na contagem de `workers`: com `fork`, o
+        `ProcessPoolExecutor` cria todos de uma vez, antes de haver um job para cada um.
+        """
+        now = time.monotonic()
+        if now - self._measured_at >= self.interval:
+            usage = tree_usage()
+            if usage is not None:
+                self._measured = usage[0]
+                self.peak_measured = max(self.peak_measured, usage[0])
+                self.workers = max(self.workers, usage[1])
+            self._measured_at = now
+        return self._measured or None
+
+    def projected(self, estimate: int = 0) -> int:
+        """
+        ### 🧮 projected
+        Memória projetada com mais um job de pico `estimate`: processo principal,
+        workers ociosos e picos corrigidos dos jobs em execução.
+        """
+        workers = max(self.workers, len(self.running) + (1 if estimate else 0))
+        jobs = sum(self.running) + estimate
+        return (rss_bytes() or 0) + workers * self.worker_bytes + int(jobs * self.scale)
+
+    def has_slot(self) -> bool:
+        """
+        ### 🎟️ has_slot
+        Indica se há vaga para mais um job (antes de considerar a memória).
+        """
+        return len(self.running) < self.target
+
+    def admit(self, estimate: int) -> bool:
+        """
+        ### 🚪 admit
+        Reserva espaço para um job se houver vaga (`target`) e memória; um job sozinho é
+        sempre admitido.
+
+        ### 🔄 Returns
+            - `bool`: True se o job pode começar (chamar `release` ao terminar).
+        """
+        with self._lock:
+            if len(self.running) >= self.target:
+                return False
+            if self.running and self.memory_limit:
+                measured = self.measure() or 0
+                extra = int(estimate * self.scale) + (self.worker_bytes if len(self.running) >= self.workers else 0)
+                if max(self.projected(estimate), measured + extra) > self.memory_limit:
+                    return False
+            elif self.memory_limit and self.projected(estimate) > self.memory_limit:
+                print(f"[AVISO] Job estimado em {estimate / 1024**2:.0f} MB excede sozinho o teto de "
+                      f"{self.memory_limit / 1024**2:.0f} MB; executando sem paralelismo")
+            self.running.append(estimate)
+            self.workers = max(self.workers, len(self.running))
+            self.peak_concurrency = max(self.peak_concurrency, len(self.running))
+            return True
+
+    def release(self, estimate: int, peak: int | None = None, retained: int | None = None) -> None:
+        """
+        ### ✅ release
+        Libera a reserva de um job. Com as medições do worker — pico de RSS durante o job
+        (`peak`) e RSS que permaneceu ao final (`retained`: módulos e memória não devolvida) —
+        atualiza o RSS de um worker ocioso e, para jobs de pelo menos `CALIBRATION_MIN_BYTES`,
+        a escala das estimativas (pico transitório / estimado; sobe de imediato e desce
+        devagar, até a metade).
+        """
+        with self._lock:
+            if estimate in self.running:
+                self.running.remove(estimate)
+            if retained:
+                self.worker_bytes = retained if not self._calibrated else max(self.worker_bytes, retained)
+                self._calibrated = True
+            if peak and retained and estimate >= CALIBRATION_MIN_BYTES:
+                ratio = max(peak - retained, 0) / estimate
+                self.scale = max(ratio, 0.8 * self.scale + 0.2 * ratio, 0.5)
+
+    def adapt(self, queued: int) -> int:
+        """
+        ### 🎚️ adapt
+        Ajusta `target` (jobs simultâneos) pela fila, memória medida e carga de CPU.
+
+        ### 🔄 Returns
+            - `int`: Novo `target`.
+        """
+        now = time.monotonic()
+        if now - self._adjusted_at < self.interval:
+            return self.target
+        self._adjusted_at = now
+        measured = self.measure() or 0
+        try:
+            load = os.getloadavg()[0]
+        except (OSError, AttributeError):
+            load = 0.0
+        with self._lock:
+            usage = measured / self.memory_limit if self.memory_limit else 0.0
+            if usage > 0.9 or load > 1.5 * self.cpus:
+                self.target = max(1, self.target - 1)
+            elif queued and len(self.running) >= self.target and usage < 0.75 and load < self.cpus:
+                self.target = min(self.max_workers, self.target + 1)
+            return self.target
+
+    def summary(self) -> dict:
+        return {
+            "memory_limit": self.memory_limit,
+            "peak_measured": self.peak_measured,
+            "peak_concurrency": self.peak_concurrency,
+            "target": self.target,
+            "scale": round(self.scale, 2),
+            "worker_bytes": self.worker_bytes,
+        }
@@ -0,0 +1,305 @@
+"""
+📥 Study Ingestion
+Decide quais estudos do Orthanc têm dados novos para cada usuário (pelo AET gravado em
+`InstitutionName`), baixa apenas as instâncias ainda não vistas e dispara o processamento.
+Os estudos chegam pela fila alimentada pelo `WebhookServer` assim que ficam estáveis; a
+listagem completa do PACS é feita apenas como reconciliação periódica, para recuperar
+notificações perdidas.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from typing import TYPE_CHECKING, Callable
+
+from .metrics import stage, trace
+from .state import IngestState
+from .webhook import StudyEventQueue
+
+if TYPE_CHECKING:
+    # Apenas para anotações: o pool (httpx/pyorthanc) é criado por quem chama
+    from .orthanc_client import OrthancPool
+
+
+def _safe_folder(text: str, fallback: str) -> str:
+    # O nome vem do PACS: só letras, dígitos, `.`, `-`, `_` e espaço viram componente de caminho
+    name = " ".join(re.sub(r"[^\w.\- ]", "_", str(text).replace("^", " ")).split())
+    if name.strip(".") == "":
+        name = re.sub(r"[^\w.\-]", "_", fallback)
+    return name
+
+
+class StudyIngestor:
+    """
+    ### 📥 StudyIngestor
+    Acompanha o estado de cada estudo e instância (`IngestState`). Um novo exame de um
+    paciente conhecido gera uma nova pasta de saída; instâncias que chegam depois do
+    primeiro processamento são baixadas sozinhas e acrescentadas à pasta do estudo.
+
+    Para cada estudo com instâncias novas, elas são gravadas em uma pasta própria dentro de
+    `work_dir` e `process(user, name, paths)` é chamado, onde `name` é a pasta do estudo em
+    `Users/<user>/Patients/`. A pasta é removida ao fim, com ou sem erro, para que restos de
+    um download interrompido nunca sejam convertidos junto com outro paciente.
+
+    ### 🖥️ Parameters
+        - `orthanc` (`pyorthanc.Orthanc`): Cliente do Orthanc.
+        - `users` (`dict`): Conteúdo de `users.json` (AET de cada usuário). As listas `patients`
+          de instalações antigas são lidas uma vez; os donos dos pacientes novos ficam no
+          `IngestState` e os nomes no catálogo (`Pipeline.catalog`).
+        - `process` (`Callable[[str, str, list], object]`): Converte as instâncias baixadas e
+          regenera o PDF do estudo.
+        - `state` (`IngestState | None`): Estado por estudo/instância (None mantém em memória).
+        - `work_dir` (`str`): Pasta onde as instâncias novas são gravadas (uma subpasta por estudo).
+        - `reconcile_interval` (`float`): Segundos entre as listagens completas do PACS.
+        - `error_delay` (`float`): Espera antes de repetir uma reconciliação que falhou.
+        - `max_consecutive_errors` (`int`): Falhas seguidas de reconciliação que encerram o monitoramento.
+        - `pool` (`OrthancPool | None`): Cliente concorrente usado para baixar as instâncias e buscar
+          as tags dos pacientes novos em paralelo (None faz as requisições uma a uma).
+
+    ### 💡 Example
+    >>> events = StudyEventQueue()
+    >>> ingestor = StudyIngestor(orthanc, users, process_study, IngestState("Users/state.json"))
+    >>> with WebhookServer(events):
+    ...     ingestor.run(events)
+    """
+
+    def __init__(
+        self,
+        orthanc,
+        users: dict,
+        process: Callable[[str, str, list], object],
+        state: IngestState | None = None,
+        work_dir: str = "Dicoms",
+        reconcile_interval: float = 300.0,
+        error_delay: float = 30.0,
+        max_consecutive_errors: int = 5,
+        pool: OrthancPool | None = None,
+    ):
+        self.orthanc = orthanc
+        self.users = users
+        self.process = process
+        self.state = state or IngestState(None)
+        self.work_dir = work_dir
+        self.reconcile_interval = reconcile_interval
+        self.error_delay = error_delay
+        self.max_consecutive_errors = max_consecutive_errors
+        self.pool = pool
+        self.bytes_downloaded = 0
+        self._prefetched_tags: dict[str, dict] = {}
+        self._lock = threading.Lock()
+        # Pacientes processados antes do estado por estudo (listas `patients` do users.json)
+        self._legacy_owners = {
+            patient: user for user, data in users.items() for patient in data.get("patients", [])
+        }
+
+    def _legacy_owner(self, patient: str) -> str | None:
+        return self._legacy_owners.get(patient)
+
+    def owner(self, patient: str) -> str | None:
+        """
+        ### 🏷️ owner
+        Retorna o usuário dono do paciente. Na primeira vez que o paciente é visto, ele é
+        associado ao usuário cujo AET corresponde ao `InstitutionName` (0008,0080) e
+        registrado no `IngestState`.
+
+        ### 🔄 Returns
+            - `str | None`: Usuário dono do paciente, ou None se ele pertence a outro AET.
+        """
+        user = self.state.owner(patient, default=False)
+        if user is not False:
+            return user
+
+        user = self._legacy_owner(patient)
+        if user is None:
+            tags = self._prefetched_tags.pop(patient, None)
+            if tags is None:
+                with stage("tag_fetch", items=1):
+                    tags = self.orthanc.get_patients_id_shared_tags(patient)
+            institution = tags.get("0008,0080", {}).get("Value")
+            for candidate, data in self.users.items():
+                if institution == data["AET"]:
+                    user = candidate
+                    break
+        self.state.set_owner(patient, user)
+        return user
+
+    def _patient_folder(self, patient: str, study: dict) -> str:
+        # Pasta do primeiro estudo: o nome do paciente, ou o nome e o ID do paciente se outro
+        # paciente (homônimo) já usa essa pasta, para que imagens e achados nunca se misturem
+        base = _safe_folder(study.get("PatientMainDicomTags", {}).get("PatientName") or "", patient)
+        if base in self.state.folders() - self.state.folders(patient):
+            return f"{base} {patient[:8]}"
+        return base
+
+    def _folder_name(self, patient: str, study: dict) -> str:
+        study_tags = study.get("MainDicomTags", {})
+        base = self._patient_folder(patient, study)
+
+        used = self.state.folders(patient)
+        # O primeiro estudo usa o nome do paciente; os seguintes recebem a data do exame
+        if not used:
+            return base
+        name = f"{base} {_safe_folder(study_tags.get('StudyDate') or '', '')}".strip()
+        if name in self.state.folders() or name == base:
+            name = f"{name} {study['ID'][:8]}"
+        return name
+
+    def sync_study(self, study: dict) -> bool:
+        """
+        ### 🔄 sync_study
+        Baixa as instâncias ainda não vistas de um estudo e o processa.
+
+        ### 🖥️ Parameters
+            - `study` (`dict`): Estudo como retornado por `GET /studies/{id}`.
+
+        ### 🔄 Returns
+            - `bool`: True se havia instâncias novas e o estudo foi processado.
+        """
+        with self._lock, trace(study=study["ID"], patient_id=study["ParentPatient"]) as record_trace:
+            study_id, patient = study["ID"], study["ParentPatient"]
+            user = self.owner(patient)
+            if user is None:
+                record_trace.discard()
+                return False
+
+            record = self.state.study(study_id)
+            if record and record["last_update"] and record["last_update"] == study.get("LastUpdate"):
+                record_trace.discard()
+                return False
+
+            known = set(record["instances"]) if record else set()
+            instances = self.orthanc.get_studies_id_instances(study_id)
+            new = [instance["ID"] for instance in instances if instance["ID"] not in known]
+            name = record["name"] if record else self._folder_name(patient, study)
+            if not new:
+                # Estudos sem dados novos não geram linha de trace
+                record_trace.discard()
+                self.state.record(study_id, user, patient, name, known, study.get("LastUpdate"))
+                return False
+
+            record_trace.set(user=user, patient=name, instances=len(new))
+            print(f"\n📥 {name} ({user}): {len(new)} instâncias novas de {len(instances)} no estudo {study_id}")
+            os.makedirs(self.work_dir, exist_ok=True)
+            study_dir = tempfile.mkdtemp(prefix="study-", dir=self.work_dir)
+            try:
+                paths = [os.path.join(study_dir, f"IM{len(known) + k:05d}.dcm") for k in range(len(new))]
+                with stage("download", items=len(new)) as span:
+                    if self.pool:
+                        span["bytes"] = self.pool.download_instances(new, paths)
+                    else:
+                        for instance_id, path in zip(new, paths):
+                            data = self.orthanc.get_instances_id_file(instance_id)
+                            span["bytes"] += len(data)
+                            with open(path, "wb") as f:
+                                f.write(data)
+                self.bytes_downloaded += span["bytes"]
+
+                try:
+                    self.process(user, name, paths)
+                except Exception as e:
+                    # Sem registro: as instâncias serão baixadas de novo na próxima reconciliação
+                    print(f"❌ Erro ao processar o estudo {study_id}: {e}")
+                    record_trace.set(error=str(e))
+                    return False
+            finally:
+                shutil.rmtree(study_dir, ignore_errors=True)
+            self.state.record(study_id, user, patient, name, known | set(new), study.get("LastUpdate"))
+            return True
+
+    def handle_study(self, study_id: str) -> bool:
+        """
+        ### 📨 handle_study
+        Sincroniza um estudo notificado pelo webhook.
+        """
+        return self.sync_study(self.orthanc.get_studies_id(study_id))
+
+    def _migrate(self, studies: list) -> None:
+        # Estudos de pacientes processados pela versão por paciente entram como já vistos
+        for study in studies:
+            user = self._legacy_owner(study["ParentPatient"])
+            if user and self.state.study(study["ID"]) is None:
+                instances = {i["ID"] for i in self.orthanc.get_studies_id_instances(study["ID"])}
+                # Mesma normalização dos estudos novos, para que instâncias tardias caiam na pasta antiga;
+                # todos os estudos de um paciente antigo ficavam na mesma pasta
+                used = self.state.folders(study["ParentPatient"])
+                name = min(used) if used else self._patient_folder(study["ParentPatient"], study)
+                self.state.record(study["ID"], user, study["ParentPatient"], name, instances, study.get("LastUpdate"))
+        self.state.mark_migrated()
+
+    def reconcile(self) -> int:
+        """
+        ### 🔍 reconcile
+        Lista os estudos do PACS (com `expand`, em uma única requisição) e sincroniza os
+        que mudaram desde o último processamento.
+
+        ### 🔄 Returns
+            - `int`: Número de estudos processados.
+        """
+        with stage("poll") as span:
+            studies = self.orthanc.get_studies(params={"expand": True})
+            span["items"] = len(studies)
+        if not self.state.migrated:
+            self._migrate(studies)
+
+        if self.pool:
+            # Tags dos pacientes nunca vistos buscadas de uma vez, em paralelo
+            unseen = {
+                study["ParentPatient"] for study in studies
+                if self.state.owner(study["ParentPatient"], default=False) is False
+                and self._legacy_owner(study["ParentPatient"]) is None
+            }
+            if unseen:
+                with stage("tag_fetch", items=len(unseen)):
+                    self._prefetched_tags.update(self.pool.shared_tags(sorted(unseen)))
+
+        processed = sum(1 for study in studies if self.sync_study(study))
+        if not processed:
+            print("ℹ️ Reconciliação: nenhum estudo novo ou atualizado")
+        return processed
+
+    def run(self, events: StudyEventQueue | None = None, stop: threading.Event | None = None) -> None:
+        """
+        ### 🔁 run
+        Laço principal: processa os estudos da fila assim que chegam e reconcilia a cada
+        `reconcile_interval` segundos. Sem fila, apenas a reconciliação é feita.
+
+        ### 🖥️ Parameters
+            - `events` (`StudyEventQueue | None`): Fila alimentada pelo webhook.
+            - `stop` (`threading.Event | None`): Encerra o laço quando sinalizado.
+        """
+        stop = stop or threading.Event()
+        consecutive_errors = 0
+        next_reconcile = time.monotonic()
+
+        while not stop.is_set():
+            wait = max(0.0, next_reconcile - time.monotonic())
+            if events is not None:
+                # Espera curta o bastante para perceber o sinal de parada
+                study_id = events.get(timeout=min(wait, 1.0))
+                if study_id:
+                    try:
+                        self.handle_study(study_id)
+                    except Exception as e:
+                        print(f"❌ Erro ao tratar o estudo {study_id}: {e}")
+                    continue
+            else:
+                stop.wait(min(wait, 1.0))
+
+            if time.monotonic() < next_reconcile:
+                continue
+            try:
+                self.reconcile()
+                consecutive_errors = 0
+                next_reconcile = time.monotonic() + self.reconcile_interval
+            except Exception as e:
+                consecutive_errors += 1
+                print(f"❌ Erro na reconciliação (tentativa {consecutive_errors}/{self.max_consecutive_errors}): {e}")
+                if consecutive_errors >= self.max_consecutive_errors:
+                    print(f"🚨 Muitos erros consecutivos ({consecutive_errors}). Encerrando monitoramento.")
+                    break
+                next_reconcile = time.monotonic() + self.error_delay
@@ -0,0 +1,404 @@
+"""
+📊 Pipeline Metrics
+Instrumentação das etapas do pipeline (consulta ao PACS, tags, download, descompactação,
+conversão de cada imagem, PDF de imagens, lotes de OCR, laudo e PDF do laudo): cada etapa
+registra duração, bytes e itens em histogramas expostos no formato de texto do Prometheus
+(`GET /metrics` do `MetricsServer`), e cada paciente processado gera um registro de trace
+em JSON lines (`METRICS_TRACE_PATH`, padrão `Users/traces.jsonl`) para análise posterior.
+O arquivo de trace é rotacionado ao passar de `METRICS_TRACE_MAX_BYTES` (padrão 50 MB),
+mantendo `METRICS_TRACE_BACKUPS` arquivos anteriores (`traces.jsonl.1`, `.2`...; padrão 3).
+
+### 💡 Example
+>>> from Pipeline.metrics import stage, trace
+>>> with trace(user="Anders", patient="PACIENTE"):
+...     with stage("convert") as span:
+...         span["bytes"] = os.path.getsize(output_path)
+"""
+
+from __future__ import annotations
+
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+from .profiling import PROFILER, ProfileSession
+
+try:
+    import fcntl
+except ImportError:  # Windows: a rotação fica protegida apenas dentro do processo
+    fcntl = None
+
+# Limites dos buckets (segundos): de uma imagem (ms) a um laudo completo (minutos)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+_current_trace: contextvars.ContextVar["PatientTrace | None"] = contextvars.ContextVar("patient_trace", default=None)
+
+
+def rss_bytes() -> int | None:
+    """
+    ### 🧠 rss_bytes
+    Memória residente deste processo, em bytes (None fora do Linux).
+    """
+    # /proc só existe no Linux; nas demais plataformas a memória não é reportada
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class MetricsRegistry:
+    """
+    ### 📊 MetricsRegistry
+    Histogramas de duração e contadores de bytes, itens e erros por etapa, além de
+    indicadores (gauges) calculados no momento da coleta. Thread-safe.
+
+    ### 🖥️ Parameters
+        - `prefix` (`str`): Prefixo dos nomes das métricas.
+        - `buckets` (`tuple`): Limites superiores dos buckets do histograma, em segundos.
+    """
+
+    def __init__(self, prefix: str = "dicompdf", buckets: tuple = DEFAULT_BUCKETS):
+        self.prefix = prefix
+        self.buckets = tuple(sorted(buckets))
+        self.started = time.time()
+        self._stages: dict[str, dict] = {}
+        self._gauges: dict[str, tuple[str, Callable[[], float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float, bytes: int = 0, items: int = 0, error: bool = False) -> None:
+        """
+        ### ⏱️ observe
+        Registra uma execução da etapa `stage`.
+        """
+        with self._lock:
+            data = self._stages.get(stage)
+            if data is None:
+                data = self._stages[stage] = {
+                    "buckets": [0] * len(self.buckets), "count": 0, "sum": 0.0,
+                    "bytes": 0, "items": 0, "errors": 0,
+                }
+            for i, limit in enumerate(self.buckets):
+                if seconds <= limit:
+                    data["buckets"][i] += 1
+                    break
+            data["count"] += 1
+            data["sum"] += seconds
+            data["bytes"] += bytes
+            data["items"] += items
+            data["errors"] += int(error)
+
+    @contextmanager
+    def stage(self, name: str, **fields) -> Iterator[dict]:
+        """
+        ### 🧭 stage
+        Mede o bloco como uma execução da etapa `name`. O dicionário retornado aceita
+        `bytes`, `items` e campos extras, que vão para o histograma e para o trace do
+        paciente corrente; uma exceção conta como erro da etapa e é propagada. Se o
+        paciente estiver selecionado para perfil (`Pipeline.profiling`), o bloco é perfilado.
+        """
+        current = _current_trace.get()
+        session = current.profile_session() if current is not None and PROFILER.enabled else None
+        span = {"bytes": 0, "items": 0, **fields}
+        error = False
+        start = time.perf_counter()
+        try:
+            if session is None:
+                yield span
+            else:
+                with session.span(name):
+                    yield span
+        except BaseException:
+            error = True
+            raise
+        finally:
+            seconds = time.perf_counter() - start
+            self.observe(name, seconds, bytes=span["bytes"], items=span["items"], error=error)
+            if current is not None:
+                current.add(name, seconds, span, error)
+
+    def record(self, name: str, seconds: float, error: bool = False, **fields) -> None:
+        """
+        ### 📝 record
+        Registra uma execução de `name` medida fora deste processo (por exemplo, em um worker
+        de conversão), no histograma e no trace do paciente corrente, como faria `stage`.
+        """
+        span = {"bytes": 0, "items": 0, **fields}
+        self.observe(name, seconds, bytes=span["bytes"], items=span["items"], error=error)
+        current = _current_trace.get()
+        if current is not None:
+            current.add(name, seconds, span, error)
+
+    def gauge(self, name: str, func: Callable[[], float], help: str = "") -> None:
+        """
+        ### 📈 gauge
+        Registra um indicador lido a cada coleta (por exemplo, o tamanho da fila de estudos).
+        """
+        with self._lock:
+            self._gauges[name] = (help, func)
+
+    def snapshot(self) -> dict:
+        """
+        ### 📸 snapshot
+        Retorna as contagens, somas, bytes, itens e erros acumulados por etapa.
+        """
+        with self._lock:
+            return {
+                name: {k: (list(v) if k == "buckets" else v) for k, v in data.items()}
+                for name, data in self._stages.items()
+            }
+
+    def render(self) -> str:
+        """
+        ### 🧾 render
+        Gera o texto no formato de exposição do Prometheus (versão 0.0.4).
+        """
+        p = self.prefix
+        stages = self.snapshot()
+        lines = [
+            f"# HELP {p}_stage_seconds Duração de cada etapa do pipeline.",
+            f"# TYPE {p}_stage_seconds histogram",
+        ]
+        for name, data in sorted(stages.items()):
+            cumulative = 0
+            for limit, count in zip(self.buckets, data["buckets"]):
+                cumulative += count
+                lines.append(f'{p}_stage_seconds_bucket{{stage="{name}",le="{limit:g}"}} {cumulative}')
+            lines.append(f'{p}_stage_seconds_bucket{{stage="{name}",le="+Inf"}} {data["count"]}')
+            lines.append(f'{p}_stage_seconds_sum{{stage="{name}"}} {data["sum"]:.6f}')
+            lines.append(f'{p}_stage_seconds_count{{stage="{name}"}} {data["count"]}')
+        for key, help in (("bytes", "Bytes lidos ou gravados por etapa."),
+                          ("items", "Itens (imagens, instâncias, pacientes) tratados por etapa."),
+                          ("errors", "Execuções da etapa que terminaram em exceção.")):
+            lines += [f"# HELP {p}_stage_{key}_total {help}", f"# TYPE {p}_stage_{key}_total counter"]
+            lines += [f'{p}_stage_{key}_total{{stage="{name}"}} {data[key]}' for name, data in sorted(stages.items())]
+
+        gauges = {
+            "process_resident_memory_bytes": ("Memória residente do processo.", rss_bytes),
+            "process_cpu_seconds_total": ("Tempo de CPU do processo.", time.process_time),
+            "uptime_seconds": ("Segundos desde o início do processo.", lambda: time.time() - self.started),
+        }
+        with self._lock:
+            gauges.update(self._gauges)
+        for name, (help, func) in gauges.items():
+            try:
+                value = func()
+            except Exception:
+                value = None
+            if value is None:
+                continue
+            # Valores acumulados (sufixo `_total`, como o tempo de CPU) são contadores
+            kind = "counter" if name.endswith("_total") else "gauge"
+            lines += [f"# HELP {p}_{name} {help}", f"# TYPE {p}_{name} {kind}", f"{p}_{name} {value:g}"]
+        return "\n".join(lines) + "\n"
+
+
+class PatientTrace:
+    """
+    ### 🧵 PatientTrace
+    Registro das etapas de um paciente/estudo, gravado como uma linha JSON ao final.
+    Use `set(...)` para completar os campos e `discard()` quando não houve processamento.
+    """
+
+    def __init__(self, **fields):
+        self.fields = fields
+        self.stages: list[dict] = []
+        self.discarded = False
+        self.profile: ProfileSession | None = None
+        self._start = time.perf_counter()
+        self._cpu = time.process_time()
+        self._lock = threading.Lock()
+
+    def set(self, **fields) -> None:
+        self.fields.update(fields)
+
+    def discard(self) -> None:
+        self.discarded = True
+
+    def profile_session(self) -> ProfileSession | None:
+        # Decidido na primeira etapa em que o paciente já é identificável e está selecionado
+        with self._lock:
+            if self.profile is None and PROFILER.wants(self.fields):
+                self.profile = PROFILER.session(self.fields)
+            return self.profile
+
+    def add(self, stage: str, seconds: float, span: dict, error: bool) -> None:
+        entry = {"stage": stage, "seconds": round(seconds, 6)}
+        entry.update({k: v for k, v in span.items() if v or k not in ("bytes", "items")})
+        if error:
+            entry["error"] = True
+        with self._lock:
+            self.stages.append(entry)
+
+    def record(self) -> dict:
+        totals: dict[str, float] = {}
+        for entry in self.stages:
+            totals[entry["stage"]] = round(totals.get(entry["stage"], 0.0) + entry["seconds"], 6)
+        return {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            **self.fields,
+            "seconds": round(time.perf_counter() - self._start, 6),
+            "cpu_seconds": round(time.process_time() - self._cpu, 6),
+            "rss_bytes": rss_bytes(),
+            "totals": totals,
+            "stages": self.stages,
+        }
+
+
+_trace_lock = threading.Lock()
+
+
+def _append_trace(path: str, line: str) -> None:
+    # Rotação por tamanho, como o RotatingFileHandler: traces.jsonl → .1 → .2 ... (o mais antigo é apagado)
+    max_bytes = int(os.getenv("METRICS_TRACE_MAX_BYTES", str(50 * 1024**2)))
+    backups = int(os.getenv("METRICS_TRACE_BACKUPS", "3"))
+    with _trace_lock:
+        # Os workers do backlog gravam o mesmo arquivo: a verificação do tamanho e a rotação
+        # ficam sob um flock na pasta do arquivo (o arquivo em si é trocado pela rotação)
+        lock_fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY) if fcntl else None
+        try:
+            if lock_fd is not None:
+                fcntl.flock(lock_fd, fcntl.LOCK_EX)
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                size = 0
+            if max_bytes > 0 and size and size + len(line) > max_bytes:
+                if backups > 0:
+                    for n in range(backups - 1, 0, -1):
+                        if os.path.exists(f"{path}.{n}"):
+                            os.replace(f"{path}.{n}", f"{path}.{n + 1}")
+                    os.replace(path, f"{path}.1")
+                else:
+                    os.remove(path)
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(line)
+        finally:
+            if lock_fd is not None:
+                os.close(lock_fd)
+
+
+@contextmanager
+def trace(path: str | None = None, **fields) -> Iterator[PatientTrace]:
+    """
+    ### 🧵 trace
+    Abre o trace de um paciente para as etapas executadas no bloco (na mesma thread, ou
+    em threads iniciadas com `contextvars.copy_context()`). Se já houver um trace aberto,
+    ele é reaproveitado e recebe os campos; a linha é gravada apenas pelo mais externo.
+
+    ### 🖥️ Parameters
+        - `path` (`str | None`): Arquivo JSON lines (padrão `METRICS_TRACE_PATH` ou `Users/traces.jsonl`;
+          `METRICS_TRACE_PATH=""` desativa a gravação).
+        - `**fields`: Campos do registro (usuário, paciente, estudo...).
+    """
+    current = _current_trace.get()
+    if current is not None:
+        current.set(**{k: v for k, v in fields.items() if k not in current.fields})
+        yield current
+        return
+
+    current = PatientTrace(**fields)
+    token = _current_trace.set(current)
+    try:
+        yield current
+    finally:
+        _current_trace.reset(token)
+        if current.profile is not None:
+            files = current.profile.save()
+            current.fields["profiles"] = files
+            print(f"🔬 Perfil de {current.profile.key}: {len(files)} arquivos em {os.path.dirname(files[0]) if files else '-'}")
+        if path is None:
+            path = os.getenv("METRICS_TRACE_PATH", os.path.join("Users", "traces.jsonl"))
+        if path and not current.discarded:
+            try:
+                _append_trace(path, json.dumps(current.record(), ensure_ascii=False, default=str) + "\n")
+            except OSError as e:
+                print(f"[AVISO] Não foi possível gravar o trace em {path}: {e}")
+
+
+METRICS = MetricsRegistry()
+
+
+def stage(name: str, **fields):
+    """
+    ### 🧭 stage
+    Atalho para `METRICS.stage(...)`, o registro compartilhado pelo processo.
+    """
+    return METRICS.stage(name, **fields)
+
+
+class MetricsServer:
+    """
+    ### 📡 MetricsServer
+    Expõe `GET /metrics` (formato Prometheus) e `GET /health` de um `MetricsRegistry`.
+
+    ### 🖥️ Parameters
+        - `registry` (`MetricsRegistry`): Registro a expor (padrão `METRICS`).
+        - `host` (`str`): Interface de escuta.
+        - `port` (`int`): Porta de escuta (0 escolhe uma porta livre).
+
+    ### 💡 Example
+    >>> with MetricsServer(port=8766) as server:
+    ...     print(server.url)
+    http://127.0.0.1:8766/metrics
+    """
+
+    def __init__(self, registry: MetricsRegistry | None = None, host: str = "127.0.0.1", port: int = 8766):
+        # http.server só é importado quando o endpoint é usado (o monitor), não pelas etapas
+        from http.server import ThreadingHTTPServer
+
+        self.registry = registry or METRICS
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/metrics"
+
+    def _handler(self):
+        from http.server import BaseHTTPRequestHandler
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.split("?")[0] == "/metrics":
+                    status, content_type = 200, "text/plain; version=0.0.4; charset=utf-8"
+                    data = server.registry.render().encode("utf-8")
+                elif self.path == "/health":
+                    status, content_type, data = 200, "application/json", b'{"status": "ok"}'
+                else:
+                    status, content_type, data = 404, "application/json", b'{"error": "not found"}'
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+    def start(self) -> "MetricsServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> "MetricsServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
@@ -0,0 +1,150 @@
+"""
+🔌 Pooled Orthanc Client
+Cliente assíncrono do Orthanc (`pyorthanc.AsyncOrthanc`, sobre `httpx.AsyncClient`) com
+conexões keep-alive reaproveitadas e concorrência limitada, para buscar tags de muitos
+pacientes e baixar muitas instâncias em paralelo em vez de uma requisição por vez.
+
+O laço de eventos roda em uma thread própria, de modo que o `StudyIngestor` (síncrono)
+usa o cliente por métodos comuns, e as conexões persistem entre as chamadas.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+from pathlib import Path
+
+import httpx
+from pyorthanc import AsyncOrthanc
+
+
+class OrthancPool:
+    """
+    ### 🔌 OrthancPool
+    Pool de conexões HTTP com o Orthanc com até `max_concurrency` requisições simultâneas.
+
+    ### 🖥️ Parameters
+        - `url` (`str`): Endereço do Orthanc.
+        - `username` (`str | None`): Usuário.
+        - `password` (`str | None`): Senha.
+        - `max_concurrency` (`int`): Requisições simultâneas (e conexões mantidas abertas).
+        - `timeout` (`float`): Tempo limite de cada requisição, em segundos.
+
+    ### 💡 Example
+    >>> with OrthancPool("http://localhost:8042", "admin", "admin", max_concurrency=16) as pool:
+    ...     tags = pool.shared_tags(patient_ids)
+    ...     total = pool.download_instances(instance_ids, paths)
+    """
+
+    def __init__(
+        self,
+        url: str,
+        username: str | None = None,
+        password: str | None = None,
+        max_concurrency: int = 8,
+        timeout: float = 60.0,
+    ):
+        self.url = url
+        self.max_concurrency = max_concurrency
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+
+        async def setup():
+            client = AsyncOrthanc(
+                url,
+                username,
+                password,
+                timeout=timeout,
+                limits=httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency),
+            )
+            return client, asyncio.Semaphore(max_concurrency)
+
+        self.client, self._semaphore = self._submit(setup())
+
+    @classmethod
+    def from_env(cls, url: str, username: str | None = None, password: str | None = None) -> "OrthancPool":
+        """
+        ### ⚙️ from_env
+        Cria o pool com a concorrência de `ORTHANC_MAX_CONCURRENCY` (padrão 8).
+        """
+        return cls(url, username, password, max_concurrency=int(os.getenv("ORTHANC_MAX_CONCURRENCY", "8")))
+
+    def _submit(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    async def _bounded(self, coro):
+        async with self._semaphore:
+            return await coro
+
+    async def _gather(self, coros: list):
+        tasks = [asyncio.ensure_future(self._bounded(coro)) for coro in coros]
+        try:
+            return await asyncio.gather(*tasks)
+        except BaseException:
+            # gather não cancela as demais: sem isto, downloads continuariam gravando após o erro
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            for coro in coros:
+                coro.close()  # as que nem chegaram a começar
+            raise
+
+    def map(self, method: str, ids: list, **kwargs) -> list:
+        """
+        ### 🗺️ map
+        Chama um método do `AsyncOrthanc` (por exemplo `get_studies_id_instances`) para
+        cada ID, concorrentemente, e retorna os resultados na ordem dos IDs.
+        """
+        func = getattr(self.client, method)
+        return self._submit(self._gather([func(id_, **kwargs) for id_ in ids]))
+
+    def shared_tags(self, patient_ids: list) -> dict:
+        """
+        ### 🏷️ shared_tags
+        Busca as tags compartilhadas de vários pacientes em paralelo.
+
+        ### 🔄 Returns
+            - `dict`: ID do paciente → tags (`"gggg,eeee"` → `{"Name", "Type", "Value"}`).
+        """
+        return dict(zip(patient_ids, self.map("get_patients_id_shared_tags", list(patient_ids))))
+
+    def download_instances(self, instance_ids: list, paths: list) -> int:
+        """
+        ### 📥 download_instances
+        Baixa várias instâncias em paralelo, gravando cada uma em seu caminho assim que chega.
+        Se um download falhar, os demais são cancelados e a exceção só é propagada depois
+        que nenhuma gravação estiver em andamento.
+
+        ### 🖥️ Parameters
+            - `instance_ids` (`list`): IDs Orthanc das instâncias.
+            - `paths` (`list`): Arquivo de destino de cada instância.
+
+        ### 🔄 Returns
+            - `int`: Total de bytes baixados.
+        """
+        async def fetch(instance_id: str, path) -> int:
+            data = await self.client.get_instances_id_file(instance_id)
+            write = asyncio.ensure_future(asyncio.to_thread(Path(path).write_bytes, data))
+            try:
+                await asyncio.shield(write)
+            except asyncio.CancelledError:
+                # A thread não pode ser interrompida: espera a gravação terminar antes de ceder
+                await asyncio.wait([write])
+                raise
+            return len(data)
+
+        return sum(self._submit(self._gather([fetch(i, p) for i, p in zip(instance_ids, paths)])))
+
+    def close(self) -> None:
+        self._submit(self.client.aclose())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    def __enter__(self) -> "OrthancPool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,30 @@
+-- 📡 Dicom-PDF: notifica o receptor de webhook quando um estudo fica estável.
+--
+-- Instalação: acrescente este arquivo à opção "LuaScripts" do orthanc.json e ajuste
+-- WEBHOOK_URL / WEBHOOK_TOKEN para o endereço do Dicom-PDF (variáveis
+-- ORTHANC_WEBHOOK_HOST, ORTHANC_WEBHOOK_PORT e ORTHANC_WEBHOOK_TOKEN; o token é
+-- obrigatório quando o receptor escuta fora do loopback). O tempo até o estudo ser considerado
+-- estável é controlado por "StableAge" no orthanc.json.
+
+local WEBHOOK_URL = 'http://127.0.0.1:8765/orthanc/stable-study'
+local WEBHOOK_TOKEN = ''
+
+function OnStableStudy(studyId, tags, metadata)
+   local body = DumpJson({
+      ID = studyId,
+      StudyInstanceUID = tags['StudyInstanceUID'],
+      StudyDate = tags['StudyDate'],
+   }, true)
+
+   local headers = { ['Content-Type'] = 'application/json' }
+   if WEBHOOK_TOKEN ~= '' then
+      headers['X-Webhook-Token'] = WEBHOOK_TOKEN
+   end
+
+   -- Uma falha de entrega não deve interromper o Orthanc; a reconciliação
+   -- periódica do Dicom-PDF recupera o estudo mais tarde
+   local ok, err = pcall(HttpPost, WEBHOOK_URL, body, headers)
+   if not ok then
+      print('Dicom-PDF webhook falhou para ' .. studyId .. ': ' .. tostring(err))
+   end
+end
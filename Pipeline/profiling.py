@@ -0,0 +1,264 @@
+"""
+🔬 On-demand Profiling
+Perfis de CPU das etapas do pipeline, ligados sob demanda no monitor em execução — por
+paciente ou por janela de tempo — sem reiniciar o processo:
+
+- `PROFILE_PATIENTS`: pacientes a perfilar (IDs Orthanc, nomes ou arquivos ZIP separados
+  por vírgula; `*` perfila todos);
+- `SIGUSR1`: abre uma janela de `PROFILE_WINDOW` segundos (padrão 300) em que todos os
+  pacientes são perfilados; `SIGUSR2` fecha a janela;
+- arquivo de controle `PROFILE_CONTROL` (padrão `Users/profile.json`), relido quando muda:
+  `{"patients": ["..."], "window": 600}` (janela contada a partir da gravação do arquivo).
+
+Cada etapa medida por `Pipeline.metrics.stage` dentro do trace de um paciente perfilado é
+executada sob `cProfile` e amostrada por um perfilador de pilhas; ao fim do trace são
+gravados `PROFILE_DIR/<paciente>/<data>-<etapa>.pstats` (um por etapa, somando as
+execuções) e `<data>.folded` (pilhas no formato "collapsed", com a etapa na raiz, para
+flamegraph.pl ou speedscope). Desligado, o custo é uma comparação por etapa.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import queue
+import re
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Iterator
+
+if TYPE_CHECKING:
+    import pstats
+
+# Campos do trace usados para identificar o paciente, em ordem de preferência
+KEY_FIELDS = ("patient_id", "patient", "study", "zip")
+
+
+class ProfileSession:
+    """
+    ### 🔬 ProfileSession
+    Perfis de um paciente: um `pstats.Stats` por etapa e as pilhas amostradas de todas
+    as etapas, gravados juntos por `save()`.
+
+    ### 🖥️ Parameters
+        - `key` (`str`): Identificador do paciente (nome da pasta de saída).
+        - `output_dir` (`str`): Pasta base dos perfis.
+        - `interval` (`float`): Intervalo entre amostras de pilha, em segundos (0 desativa a amostragem).
+        - `cprofile` (`bool`): Executa as etapas sob `cProfile`.
+    """
+
+    def __init__(self, key: str, output_dir: str = "Profiles", interval: float = 0.005, cprofile: bool = True):
+        self.key = key
+        self.output_dir = output_dir
+        self.interval = interval
+        self.cprofile = cprofile
+        self.stats: dict[str, pstats.Stats] = {}
+        self.stacks: Counter[str] = Counter()
+        self._active: dict[int, str] = {}
+        self._lock = threading.Lock()
+        self._sampler: threading.Thread | None = None
+        self._closed = threading.Event()
+
+    def _sample(self) -> None:
+        while not self._closed.wait(self.interval):
+            with self._lock:
+                active = dict(self._active)
+            if not active:
+                continue
+            frames = sys._current_frames()
+            for thread_id, stage in active.items():
+                frame = frames.get(thread_id)
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{frame.f_globals.get('__name__', '?')}:{code.co_name}")
+                    frame = frame.f_back
+                if stack:
+                    line = ";".join([stage] + stack[::-1])
+                    with self._lock:
+                        self.stacks[line] += 1
+
+    @contextmanager
+    def span(self, stage: str) -> Iterator[None]:
+        """
+        ### ⏱️ span
+        Perfila o bloco como uma execução de `stage` na thread corrente.
+        """
+        import cProfile
+        import pstats
+
+        thread_id = threading.get_ident()
+        with self._lock:
+            self._active[thread_id] = stage
+            if self.interval and self._sampler is None:
+                self._sampler = threading.Thread(target=self._sample, daemon=True)
+                self._sampler.start()
+
+        profile = None
+        if self.cprofile:
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # Python 3.12+: só um perfilador ativo por vez (etapas em threads paralelas)
+                profile = None
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+            with self._lock:
+                self._active.pop(thread_id, None)
+                if profile is not None:
+                    if stage in self.stats:
+                        self.stats[stage].add(profile)
+                    else:
+                        self.stats[stage] = pstats.Stats(profile)
+
+    def save(self) -> list[str]:
+        """
+        ### 💾 save
+        Encerra a amostragem e grava os perfis coletados.
+
+        ### 🔄 Returns
+            - `list[str]`: Arquivos gravados.
+        """
+        self._closed.set()
+        if self._sampler is not None:
+            self._sampler.join()
+        folder = os.path.join(self.output_dir, re.sub(r"[^\w.\- ]", "_", self.key).strip() or "unknown")
+        os.makedirs(folder, exist_ok=True)
+        prefix = os.path.join(folder, time.strftime("%Y%m%d-%H%M%S"))
+        written = []
+        for stage, stats in self.stats.items():
+            stats.dump_stats(f"{prefix}-{stage}.pstats")
+            written.append(f"{prefix}-{stage}.pstats")
+        if self.stacks:
+            with open(f"{prefix}.folded", "w", encoding="utf-8") as f:
+                f.writelines(f"{stack} {count}\n" for stack, count in sorted(self.stacks.items()))
+            written.append(f"{prefix}.folded")
+        return written
+
+
+class Profiler:
+    """
+    ### 🎛️ Profiler
+    Decide quais pacientes são perfilados, a partir do ambiente, de sinais e do arquivo de
+    controle. `enabled` é consultado a cada etapa e só relê o arquivo de controle uma vez
+    por segundo.
+    """
+
+    def __init__(self):
+        self.output_dir = os.getenv("PROFILE_DIR", "Profiles")
+        self.interval = float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.005"))
+        self.cprofile = os.getenv("PROFILE_CPROFILE", "1") != "0"
+        self.window = float(os.getenv("PROFILE_WINDOW", "300"))
+        self.control_path = os.getenv("PROFILE_CONTROL", os.path.join("Users", "profile.json"))
+        self.patients = {p.strip() for p in os.getenv("PROFILE_PATIENTS", "").split(",") if p.strip()}
+        self.until = 0.0
+        self._control_patients: set[str] = set()
+        self._control_until = 0.0
+        self._control_mtime = None
+        self._next_check = 0.0
+        # Pedidos dos sinais, aplicados fora do handler (ver `install_signal_handlers`)
+        self._signals: queue.SimpleQueue[tuple[str, float]] = queue.SimpleQueue()
+        self._signal_thread: threading.Thread | None = None
+
+    def _read_control(self) -> None:
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + 1.0
+        try:
+            mtime = os.path.getmtime(self.control_path)
+        except OSError:
+            self._control_patients, self._control_until, self._control_mtime = set(), 0.0, None
+            return
+        if mtime == self._control_mtime:
+            return
+        self._control_mtime = mtime
+        try:
+            with open(self.control_path, encoding="utf-8") as f:
+                control = json.load(f)
+            self._control_patients = {str(p) for p in control.get("patients", [])}
+            window = float(control.get("window", 0))
+            self._control_until = mtime + window if window else 0.0
+            print(f"🔬 Controle de perfil atualizado: {len(self._control_patients)} pacientes, janela {window:.0f}s")
+        except (OSError, ValueError, AttributeError) as e:
+            print(f"[AVISO] Arquivo de controle de perfil inválido ({self.control_path}): {e}")
+
+    @property
+    def enabled(self) -> bool:
+        if self.patients or time.time() < self.until:
+            return True
+        if not self.control_path:
+            return False
+        self._read_control()
+        return bool(self._control_patients) or time.time() < self._control_until
+
+    def wants(self, fields: dict) -> bool:
+        """
+        ### 🎯 wants
+        Indica se o paciente descrito pelos campos do trace deve ser perfilado.
+        """
+        if time.time() < max(self.until, self._control_until):
+            return True
+        selected = self.patients | self._control_patients
+        if "*" in selected:
+            return True
+        return any(str(fields.get(k)) in selected for k in KEY_FIELDS if fields.get(k) is not None)
+
+    def session(self, fields: dict) -> ProfileSession:
+        key = next((str(fields[k]) for k in KEY_FIELDS if fields.get(k)), "unknown")
+        return ProfileSession(key, self.output_dir, self.interval, self.cprofile)
+
+    def start_window(self, seconds: float | None = None, since: float | None = None) -> None:
+        """
+        ### ▶️ start_window
+        Perfila todos os pacientes pelos próximos `seconds` segundos (padrão `PROFILE_WINDOW`),
+        contados a partir de `since` (`time.time()`, padrão agora).
+        """
+        seconds = self.window if seconds is None else seconds
+        self.until = (time.time() if since is None else since) + seconds
+        print(f"🔬 Perfil ligado por {seconds:.0f}s (perfis em {self.output_dir}/)")
+
+    def stop_window(self) -> None:
+        self.until = 0.0
+        print("🔬 Janela de perfil encerrada")
+
+    def _handle_signals(self) -> None:
+        while True:
+            request, received = self._signals.get()
+            if request == "start":
+                self.start_window(since=received)
+            else:
+                self.stop_window()
+
+    def install_signal_handlers(self) -> bool:
+        """
+        ### 📶 install_signal_handlers
+        Liga a janela de perfil com `SIGUSR1` e a desliga com `SIGUSR2` (apenas em
+        sistemas POSIX, chamado da thread principal).
+
+        Os handlers só enfileiram o pedido (`SimpleQueue.put` é reentrante); a janela é
+        aplicada e registrada no log por uma thread própria, nunca dentro do handler, que
+        pode interromper a thread principal no meio de um `print` ou segurando um lock.
+
+        ### 🔄 Returns
+            - `bool`: True se os sinais foram instalados.
+        """
+        if not hasattr(signal, "SIGUSR1"):
+            return False
+        if self._signal_thread is None:
+            self._signal_thread = threading.Thread(target=self._handle_signals, name="profile-signals", daemon=True)
+            self._signal_thread.start()
+        signal.signal(signal.SIGUSR1, lambda *_: self._signals.put(("start", time.time())))
+        signal.signal(signal.SIGUSR2, lambda *_: self._signals.put(("stop", time.time())))
+        return True
+
+
+PROFILER = Profiler()
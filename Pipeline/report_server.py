@@ -0,0 +1,478 @@
+"""
+🩺 Report Server
+Serviço HTTP local (asyncio, sem dependências externas) na frente de `Users/`, para que os
+médicos busquem PDFs e imagens sem navegar pelo sistema de arquivos:
+
+- `GET|HEAD /files/<usuário>/<pasta>/<Report|Images|Previews>/<arquivo>`: arquivo com `ETag`
+  (`If-None-Match` → 304), `Last-Modified` e `Range` (206, `If-Range`), enviado em
+  blocos com `sendfile` — nunca carregado inteiro em memória;
+- `GET /patients/<usuário>/<pasta>`: arquivos da pasta (tamanho, ETag, URL) e a
+  regeneração em andamento, se houver;
+- `POST /patients/<usuário>/<pasta>/regenerate[?report=1][&wait=0]`: refaz o PDF de
+  imagens (e, com `report=1`, o laudo com IA) pelo pipeline. Pedidos simultâneos para a
+  mesma pasta compartilham um único job; um pedido com `report=1` durante um job sem laudo
+  agenda uma execução com laudo logo depois dele;
+- `GET /search?name=&uid=&from=&to=&user=`: busca no catálogo (`Pipeline.catalog`);
+- `GET /health`.
+
+Os PDFs são gravados com troca atômica (`os.replace`) por `MkPDF` e `markdown_to_pdf`, de
+modo que um download em andamento continua lendo o arquivo antigo até o fim.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import email.utils
+import hmac
+import json
+import mimetypes
+import os
+import threading
+import time
+from http import HTTPStatus
+from typing import Callable
+from urllib.parse import parse_qs, quote, unquote, urlsplit
+
+from .metrics import METRICS
+from .retention import PrunedFolderError, is_pruned
+from .webhook import _is_loopback
+
+# Subpastas e extensões servidas de cada pasta de paciente
+SUBDIRS = ("Report", "Images", "Previews")
+EXTENSIONS = {".pdf", ".jpeg", ".jpg", ".png", ".json", ".md", ".txt"}
+MAX_LINE = 8192
+MAX_HEADERS = 100
+MAX_BODY = 1 << 20
+IDLE_TIMEOUT = 15.0
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str = "", headers: dict | None = None):
+        super().__init__(message or HTTPStatus(status).phrase)
+        self.status = status
+        self.headers = headers or {}
+
+
+def etag(st: os.stat_result) -> str:
+    """
+    ### 🏷️ etag
+    ETag forte de um arquivo: inode, tamanho e data de modificação em nanossegundos (uma
+    troca atômica gera um novo inode, mesmo dentro da mesma resolução de relógio).
+    """
+    return f'"{st.st_ino:x}-{st.st_size:x}-{st.st_mtime_ns:x}"'
+
+
+def _matches(header: str, tag: str) -> bool:
+    # If-None-Match usa comparação fraca: W/"x" equivale a "x"
+    candidates = [c.strip() for c in header.split(",")]
+    return "*" in candidates or any(c.removeprefix("W/") == tag for c in candidates)
+
+
+def parse_range(header: str, size: int) -> tuple[int, int] | None:
+    """
+    ### 📏 parse_range
+    Interpreta um cabeçalho `Range` de um único intervalo (`bytes=a-b`, `bytes=a-` ou
+    `bytes=-n`) e retorna `(início, fim)` inclusivos. Retorna None para cabeçalhos que
+    devem ser ignorados (outra unidade, vários intervalos ou sintaxe inválida).
+
+    ### ⚠️ Raises
+    - `HTTPError`: 416 se o intervalo estiver fora do arquivo.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, sep, last = spec.strip().partition("-")
+    if not sep:
+        return None
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+        else:
+            length = int(last)
+            if length == 0:
+                raise HTTPError(416, headers={"Content-Range": f"bytes */{size}"})
+            start, end = max(0, size - length), size - 1
+    except ValueError:
+        return None
+    if start < 0 or (last and start > end):
+        return None
+    if start >= size:
+        raise HTTPError(416, headers={"Content-Range": f"bytes */{size}"})
+    return start, min(end, size - 1)
+
+
+class ReportServer:
+    """
+    ### 🩺 ReportServer
+    Servidor HTTP assíncrono dos arquivos de `users_dir`, com laço de eventos em uma thread
+    própria (como o `OrthancPool`).
+
+    ### 🖥️ Parameters
+        - `regenerate` (`Callable[[str, str, bool], object] | None`): `regenerate(user, pasta, report)`,
+          executado em uma thread (normalmente `main.rebuild_patient`). None desativa a regeneração.
+        - `users_dir` (`str`): Pasta servida.
+        - `host` (`str`): Interface de escuta.
+        - `port` (`int`): Porta de escuta (0 escolhe uma porta livre).
+        - `token` (`str | None`): Exige `Authorization: Bearer <token>` em todas as rotas exceto `/health`.
+        - `max_jobs` (`int`): Regenerações simultâneas (de pacientes diferentes).
+        - `catalog` (`PatientCatalog | None`): Catálogo usado por `/search` (padrão `CATALOG`).
+
+    ### ⚠️ Raises
+        - `ValueError`: Se `host` não for loopback e não houver `token`.
+
+    ### 💡 Example
+    >>> with ReportServer(rebuild_patient, port=8767) as server:
+    ...     print(server.url)
+    http://127.0.0.1:8767
+    """
+
+    def __init__(
+        self,
+        regenerate: Callable[[str, str, bool], object] | None = None,
+        users_dir: str = "Users",
+        host: str = "127.0.0.1",
+        port: int = 8767,
+        token: str | None = None,
+        max_jobs: int = 1,
+        catalog=None,
+    ):
+        if not token and not _is_loopback(host):
+            raise ValueError(f"Servidor de laudos em {host} exige um token (REPORT_SERVER_TOKEN) fora do loopback")
+        self.regenerate = regenerate
+        self.users_dir = os.path.realpath(users_dir)
+        self.host = host
+        self.port = port
+        self.token = token
+        self.max_jobs = max_jobs
+        self.catalog = catalog
+        self.jobs_started = 0
+        self.requests = 0
+        # (usuário, pasta) → (job mais recente, se ele inclui o laudo)
+        self._jobs: dict[tuple[str, str], tuple[asyncio.Task, bool]] = {}
+        self._clients: set[asyncio.Task] = set()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+        self._server: asyncio.AbstractServer | None = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    # ── Ciclo de vida ─────────────────────────────────────────────────────────
+
+    def start(self) -> "ReportServer":
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="report-server", daemon=True)
+        self._thread.start()
+
+        async def setup():
+            self._semaphore = asyncio.Semaphore(self.max_jobs)
+            self._server = await asyncio.start_server(self._client, self.host, self.port, limit=MAX_LINE)
+            self.port = self._server.sockets[0].getsockname()[1]
+
+        asyncio.run_coroutine_threadsafe(setup(), self._loop).result()
+        METRICS.gauge("report_jobs", lambda: len(self._jobs), "Regenerações de PDF em andamento.")
+        return self
+
+    def stop(self) -> None:
+        if self._loop is None:
+            return
+
+        async def shutdown():
+            self._server.close()
+            # Conexões keep-alive ociosas não terminam sozinhas
+            for task in list(self._clients) + [job for job, _ in self._jobs.values()]:
+                task.cancel()
+            await asyncio.gather(*self._clients, return_exceptions=True)
+            await self._server.wait_closed()
+
+        try:
+            asyncio.run_coroutine_threadsafe(shutdown(), self._loop).result(timeout=10)
+        except Exception:
+            pass
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        self._loop.close()
+        self._loop = None
+
+    def __enter__(self) -> "ReportServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    # ── HTTP ──────────────────────────────────────────────────────────────────
+
+    async def _read_request(self, reader: asyncio.StreamReader):
+        try:
+            line = await asyncio.wait_for(reader.readline(), IDLE_TIMEOUT)
+        except (asyncio.TimeoutError, asyncio.LimitOverrunError, ValueError):
+            return None
+        if not line:
+            return None
+        parts = line.decode("latin-1").split()
+        if len(parts) != 3 or not parts[2].startswith("HTTP/1."):
+            raise HTTPError(400, "Linha de requisição inválida")
+        headers = {}
+        for _ in range(MAX_HEADERS + 1):
+            try:
+                raw = await asyncio.wait_for(reader.readline(), IDLE_TIMEOUT)
+            except asyncio.TimeoutError:
+                # Cliente parado no meio dos cabeçalhos
+                raise HTTPError(408)
+            except (asyncio.LimitOverrunError, ValueError):
+                raise HTTPError(431)
+            if raw in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = raw.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        else:
+            raise HTTPError(431)
+        try:
+            length = int(headers.get("content-length", "0") or 0)
+        except ValueError:
+            raise HTTPError(400, "Content-Length inválido")
+        if length < 0:
+            raise HTTPError(400, "Content-Length inválido")
+        if length > MAX_BODY:
+            # Corpo não lido: o erro fecha a conexão, para que o resto não vire outra requisição
+            raise HTTPError(413)
+        if length:
+            # Nenhuma rota usa corpo; é lido apenas para manter a conexão utilizável
+            try:
+                await asyncio.wait_for(reader.readexactly(length), IDLE_TIMEOUT)
+            except asyncio.TimeoutError:
+                raise HTTPError(408)
+        return parts[0].upper(), parts[1], parts[2], headers
+
+    async def _send(self, writer, status: int, headers: dict | None = None, body: bytes = b"",
+                    head: bool = False) -> None:
+        lines = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}"]
+        headers = {"Content-Length": str(len(body)), **(headers or {})}
+        lines += [f"{k}: {v}" for k, v in headers.items()]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+        if body and not head:
+            writer.write(body)
+        await writer.drain()
+
+    async def _json(self, writer, status: int, payload, head: bool = False) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        await self._send(writer, status, {"Content-Type": "application/json; charset=utf-8"}, body, head)
+
+    async def _client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        task = asyncio.current_task()
+        self._clients.add(task)
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                    if request is None:
+                        break
+                    method, target, version, headers = request
+                    keep_alive = (headers.get("connection", "").lower() != "close"
+                                  and (version == "HTTP/1.1" or headers.get("connection", "").lower() == "keep-alive"))
+                    self.requests += 1
+                    await self._dispatch(writer, method, target, headers)
+                except HTTPError as e:
+                    keep_alive = e.status == 416
+                    if e.status == 416:
+                        await self._send(writer, 416, e.headers)
+                    else:
+                        await self._json(writer, e.status, {"error": str(e)})
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            self._clients.discard(task)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+
+    def _authorized(self, headers: dict) -> bool:
+        if not self.token:
+            return True
+        received = headers.get("authorization", "")
+        return hmac.compare_digest(received.encode(), f"Bearer {self.token}".encode())
+
+    async def _dispatch(self, writer, method: str, target: str, headers: dict) -> None:
+        url = urlsplit(target)
+        segments = [unquote(s) for s in url.path.split("/")[1:]]
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        head = method == "HEAD"
+
+        if segments == ["health"]:
+            await self._json(writer, 200, {"status": "ok", "jobs": len(self._jobs)}, head)
+            return
+        if not self._authorized(headers):
+            await self._send(writer, 401, {"WWW-Authenticate": "Bearer"})
+            return
+
+        route = segments[0] if segments else ""
+        if route == "files" and len(segments) == 5:
+            if method not in ("GET", "HEAD"):
+                raise HTTPError(405)
+            await self._file(writer, segments[1:], headers, head)
+        elif route == "patients" and len(segments) == 3:
+            if method not in ("GET", "HEAD"):
+                raise HTTPError(405)
+            await self._json(writer, 200, self._listing(*segments[1:]), head)
+        elif route == "patients" and len(segments) == 4 and segments[3] == "regenerate":
+            if method != "POST":
+                raise HTTPError(405)
+            await self._regenerate(writer, segments[1], segments[2], query)
+        elif route == "search" and len(segments) == 1:
+            await self._json(writer, 200, self._search(query), head)
+        else:
+            raise HTTPError(404)
+
+    # ── Arquivos ──────────────────────────────────────────────────────────────
+
+    def _patient_dir(self, user: str, folder: str) -> str:
+        for segment in (user, folder):
+            if segment in ("", ".", "..") or any(c in segment for c in "/\\\0"):
+                raise HTTPError(400, "Caminho inválido")
+        path = os.path.join(self.users_dir, user, "Patients", folder)
+        if not os.path.isdir(path):
+            raise HTTPError(404, "Paciente não encontrado")
+        return path
+
+    def _resolve(self, user: str, folder: str, subdir: str, name: str) -> str:
+        if subdir not in SUBDIRS or os.path.splitext(name)[1].lower() not in EXTENSIONS:
+            raise HTTPError(404)
+        if name in ("", ".", "..") or any(c in name for c in "/\\\0"):
+            raise HTTPError(400, "Caminho inválido")
+        path = os.path.realpath(os.path.join(self._patient_dir(user, folder), subdir, name))
+        if not path.startswith(self.users_dir + os.sep):
+            raise HTTPError(400, "Caminho inválido")
+        return path
+
+    async def _file(self, writer, parts: list[str], headers: dict, head: bool) -> None:
+        path = self._resolve(*parts)
+        try:
+            f = open(path, "rb")
+        except (FileNotFoundError, IsADirectoryError):
+            raise HTTPError(404)
+        with f:
+            st = os.fstat(f.fileno())
+            tag = etag(st)
+            common = {
+                "ETag": tag,
+                "Last-Modified": email.utils.formatdate(st.st_mtime, usegmt=True),
+                # Pode ser regenerado: o cliente sempre revalida (barato, com If-None-Match)
+                "Cache-Control": "no-cache",
+                "Accept-Ranges": "bytes",
+            }
+            if "if-none-match" in headers and _matches(headers["if-none-match"], tag):
+                await self._send(writer, 304, {**common, "Content-Length": "0"})
+                return
+
+            size, status, start, end = st.st_size, 200, 0, st.st_size - 1
+            if "range" in headers and headers.get("if-range", tag) == tag and size:
+                try:
+                    span = parse_range(headers["range"], size)
+                except HTTPError as e:
+                    e.headers.update(common)
+                    raise
+                if span:
+                    status, (start, end) = 206, span
+                    common["Content-Range"] = f"bytes {start}-{end}/{size}"
+            count = end - start + 1 if size else 0
+            content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+            await self._send(writer, status, {**common, "Content-Type": content_type, "Content-Length": str(count)})
+            if head or not count:
+                return
+            # Do disco para o socket em blocos (os.sendfile quando o transporte permite)
+            await asyncio.get_running_loop().sendfile(writer.transport, f, start, count)
+
+    def _listing(self, user: str, folder: str) -> dict:
+        patient_dir = self._patient_dir(user, folder)
+        files = {}
+        for subdir in SUBDIRS:
+            directory = os.path.join(patient_dir, subdir)
+            if not os.path.isdir(directory):
+                continue
+            with os.scandir(directory) as entries:
+                files[subdir] = sorted(
+                    (
+                        {"name": e.name, "bytes": st.st_size, "etag": etag(st), "modified": st.st_mtime,
+                         "url": f"/files/{quote(user)}/{quote(folder)}/{subdir}/{quote(e.name)}"}
+                        for e in entries
+                        if os.path.splitext(e.name)[1].lower() in EXTENSIONS and not e.name.endswith(".tmp")
+                        for st in (e.stat(),)
+                    ),
+                    key=lambda item: item["name"],
+                )
+        job = self._jobs.get((user, folder))
+        jobs = [{"report": job[1]}] if job else []
+        return {"user": user, "folder": folder, "files": files, "pruned": is_pruned(patient_dir), "regenerating": jobs}
+
+    def _search(self, query: dict) -> list[dict]:
+        catalog = self.catalog
+        if catalog is None:
+            from .catalog import CATALOG as catalog
+        if not catalog.enabled:
+            raise HTTPError(404, "Catálogo desativado")
+        try:
+            rows = catalog.search(name=query.get("name"), study_uid=query.get("uid"), date_from=query.get("from"),
+                                  date_to=query.get("to"), user=query.get("user"),
+                                  limit=max(1, min(int(query.get("limit", "100")), 1000)))
+        except ValueError as e:
+            raise HTTPError(400, str(e))
+        for row in rows:
+            row["url"] = f"/patients/{quote(row['user'])}/{quote(row['folder'])}"
+        return rows
+
+    # ── Regeneração ───────────────────────────────────────────────────────────
+
+    async def _job(self, user: str, folder: str, report: bool) -> dict:
+        async with self._semaphore:
+            self.jobs_started += 1
+            start = time.perf_counter()
+            await asyncio.to_thread(self.regenerate, user, folder, report)
+            return {"seconds": round(time.perf_counter() - start, 3)}
+
+    async def _job_after(self, previous: asyncio.Task, user: str, folder: str, report: bool) -> dict:
+        # Espera o job anterior da pasta terminar (com ou sem erro) sem propagar seu cancelamento
+        await asyncio.wait([previous])
+        return await self._job(user, folder, report)
+
+    async def _regenerate(self, writer, user: str, folder: str, query: dict) -> None:
+        if self.regenerate is None:
+            raise HTTPError(404, "Regeneração desativada")
+        self._patient_dir(user, folder)
+        report = query.get("report", "0") == "1"
+        key = (user, folder)
+        task, covers = self._jobs.get(key, (None, False))
+        # O job com laudo também refaz o PDF de imagens: serve a qualquer pedido da pasta
+        shared = task is not None and (covers or not report)
+        if not shared:
+            if task is None:
+                task = asyncio.ensure_future(self._job(user, folder, report))
+            else:
+                task = asyncio.ensure_future(self._job_after(task, user, folder, report))
+            self._jobs[key] = (task, report)
+            task.add_done_callback(lambda t: self._jobs.pop(key, None) if self._jobs.get(key, (None,))[0] is t else None)
+        if query.get("wait", "1") == "0":
+            await self._json(writer, 202, {"status": "running", "shared": shared})
+            return
+        try:
+            # shield: um cliente que desconecta não cancela o job dos demais
+            result = await asyncio.shield(task)
+        except ValueError as e:
+            await self._json(writer, 400, {"error": str(e)})
+            return
+        except PrunedFolderError as e:
+            await self._json(writer, 409, {"error": str(e)})
+            return
+        except FileNotFoundError as e:
+            await self._json(writer, 404, {"error": str(e)})
+            return
+        except Exception as e:
+            await self._json(writer, 500, {"error": f"{type(e).__name__}: {e}"})
+            return
+        listing = self._listing(user, folder)
+        await self._json(writer, 200, {"status": "done", "shared": shared, **result, "files": listing["files"]})
@@ -0,0 +1,444 @@
+"""
+🧺 Storage Retention
+Políticas de retenção para os artefatos que o pipeline acumula em disco:
+
+- `zips`: arquivos de `ZIPS/`. Com `delete_processed`, um ZIP é apagado assim que o registro
+  de ZIPs processados (`ArchiveLedger`, ver `is_complete`) o dá como completo; ZIPs ainda não
+  processados nunca são apagados, nem por idade nem por tamanho.
+- `dicoms`: DICOMs esquecidos em `Dicoms/` (e nas pastas de trabalho do backlog e da pasta
+  observada) por processamentos interrompidos.
+- `images`: JPEGs das pastas `Users/<usuário>/Patients/<paciente>/Images`. A unidade de
+  remoção é a pasta de imagens do paciente inteira (os PDFs e o laudo são mantidos), e os
+  JPEGs antigos podem ser recomprimidos com qualidade menor. A pasta do paciente recebe o
+  marcador `.pruned` (`is_pruned`), e o PDF existente deixa de ser refeito a partir do que
+  restar em `Images/` até que o estudo completo seja processado de novo.
+
+Cada artefato aceita `max_age_days` (remove o que não é modificado há mais tempo) e
+`max_bytes` (remove do mais antigo para o mais novo até caber). Um índice compacto
+(`Users/storage_index.json`) guarda tamanho e data de cada arquivo e quais imagens já
+foram recomprimidas; o `StorageSweeper` o atualiza a cada varredura, em segundo plano, e
+gera o relatório de uso do disco.
+"""
+
+from __future__ import annotations
+
+import copy
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from .backlog import is_complete
+from .metrics import METRICS, stage
+
+DAY = 86400
+KINDS = ("zips", "dicoms", "images")
+IMAGE_EXTENSIONS = (".jpeg", ".jpg")
+PRUNED_MARKER = ".pruned"
+
+DEFAULT_POLICIES = {
+    "zips": {"delete_processed": False, "max_age_days": None, "max_bytes": None},
+    # DICOMs só ficam em disco durante a conversão; um dia sem modificação é sobra de falha
+    "dicoms": {"max_age_days": 1, "max_bytes": None},
+    "images": {"max_age_days": None, "max_bytes": None, "recompress_after_days": None, "recompress_quality": 85},
+}
+
+
+def load_policies(path: str | None = None) -> dict:
+    """
+    ### 📜 load_policies
+    Políticas padrão sobrepostas pelo arquivo JSON `path` (padrão: variável `RETENTION_POLICY`),
+    no formato `{"zips": {"delete_processed": true}, "images": {"recompress_after_days": 90}}`.
+    Tamanhos aceitam sufixos (`"50G"`).
+
+    ### ⚠️ Raises
+    - `ValueError`: Artefato ou opção desconhecidos.
+    """
+    from .governor import parse_size
+
+    policies = copy.deepcopy(DEFAULT_POLICIES)
+    path = path if path is not None else os.getenv("RETENTION_POLICY")
+    if not path:
+        return policies
+    with open(path, "r", encoding="utf-8") as f:
+        overrides = json.load(f)
+    for kind, options in overrides.items():
+        if kind not in policies:
+            raise ValueError(f"Artefato desconhecido na política de retenção: {kind!r}")
+        unknown = set(options) - set(policies[kind])
+        if unknown:
+            raise ValueError(f"Opções desconhecidas para {kind}: {', '.join(sorted(unknown))}")
+        policies[kind].update(options)
+        if isinstance(policies[kind].get("max_bytes"), str):
+            policies[kind]["max_bytes"] = parse_size(policies[kind]["max_bytes"])
+    return policies
+
+
+class PrunedFolderError(FileNotFoundError):
+    """Imagens do paciente removidas pela retenção: o PDF não pode ser refeito a partir delas."""
+
+
+def is_pruned(patient_dir: str) -> bool:
+    """
+    ### ✂️ is_pruned
+    Indica se as imagens da pasta do paciente foram removidas pela retenção.
+    """
+    return os.path.exists(os.path.join(patient_dir, PRUNED_MARKER))
+
+
+def has_images(images_dir: str) -> bool:
+    """
+    ### 🖼️ has_images
+    Indica se `images_dir` tem ao menos uma imagem para o PDF.
+    """
+    try:
+        with os.scandir(images_dir) as entries:
+            return any(e.name.lower().endswith(IMAGE_EXTENSIONS + (".png", ".bmp")) for e in entries)
+    except FileNotFoundError:
+        return False
+
+
+def _size(n: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(n) < 1024:
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} TB"
+
+
+class StorageSweeper:
+    """
+    ### 🧺 StorageSweeper
+    Aplica as políticas de retenção a `ZIPS/`, `Dicoms/` e às imagens dos pacientes, mantém
+    o índice de artefatos e, com `start()`, repete a varredura a cada `interval` segundos
+    em uma thread.
+
+    ### 🖥️ Parameters
+        - `policies` (`dict | None`): Políticas por artefato (padrão `load_policies()`).
+        - `zip_dir` (`str`): Pasta dos ZIPs.
+        - `dcm_dir` (`str`): Pasta dos DICOMs temporários (inclui subpastas de trabalho).
+        - `users_dir` (`str`): Pasta dos usuários (`<usuário>/Patients/<paciente>/Images`).
+        - `index_path` (`str | None`): Índice de artefatos (None mantém só em memória).
+        - `interval` (`float`): Intervalo entre varreduras em segundo plano, em segundos.
+        - `require_report` (`bool`): Um ZIP só conta como processado se o laudo também existir.
+
+    ### 💡 Example
+    >>> sweeper = StorageSweeper(load_policies())
+    >>> report = sweeper.sweep(dry_run=True)
+    >>> print(sweeper.format_report(report))
+    """
+
+    def __init__(
+        self,
+        policies: dict | None = None,
+        zip_dir: str = "ZIPS",
+        dcm_dir: str = "Dicoms",
+        users_dir: str = "Users",
+        index_path: str | None = os.path.join("Users", "storage_index.json"),
+        interval: float = 3600.0,
+        require_report: bool = False,
+    ):
+        self.policies = policies if policies is not None else load_policies()
+        self.zip_dir = zip_dir
+        self.dcm_dir = dcm_dir
+        self.users_dir = users_dir
+        self.index_path = index_path
+        self.interval = interval
+        self.require_report = require_report
+        self.last_report: dict | None = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._index = {"updated": None, "artifacts": {kind: {} for kind in KINDS}, "recompressed": {}}
+        if index_path and os.path.exists(index_path):
+            try:
+                with open(index_path, "r", encoding="utf-8") as f:
+                    self._index.update(json.load(f))
+            except (OSError, ValueError) as e:
+                print(f"[AVISO] Índice de armazenamento ilegível, será recriado: {e}")
+
+    # ── Inventário ────────────────────────────────────────────────────────────
+
+    @staticmethod
+    def _stat(path: str) -> tuple[int, float] | None:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_size, st.st_mtime
+
+    def _files(self, kind: str) -> list[str]:
+        if kind == "zips":
+            if not os.path.isdir(self.zip_dir):
+                return []
+            with os.scandir(self.zip_dir) as entries:
+                return [e.path for e in entries if e.is_file() and e.name.lower().endswith(".zip")]
+        if kind == "dicoms":
+            return [
+                os.path.join(folder, name)
+                for folder, _, names in os.walk(self.dcm_dir)
+                for name in names if name.lower().endswith(".dcm")
+            ]
+        files = []
+        if not os.path.isdir(self.users_dir):
+            return files
+        for user in os.listdir(self.users_dir):
+            patients = os.path.join(self.users_dir, user, "Patients")
+            if not os.path.isdir(patients):
+                continue
+            for patient in os.listdir(patients):
+                images = os.path.join(patients, patient, "Images")
+                if os.path.isdir(images):
+                    with os.scandir(images) as entries:
+                        files += [e.path for e in entries if e.name.lower().endswith(IMAGE_EXTENSIONS)]
+        return files
+
+    def scan(self) -> dict:
+        """
+        ### 🔎 scan
+        Atualiza o índice com o tamanho e a data de modificação de cada artefato e retorna
+        `{artefato: {caminho: [bytes, mtime]}}`.
+        """
+        artifacts = {}
+        for kind in KINDS:
+            entries = {}
+            for path in self._files(kind):
+                st = self._stat(path)
+                if st is not None:
+                    entries[path] = list(st)
+            artifacts[kind] = entries
+        with self._lock:
+            recompressed = self._index["recompressed"]
+            images = artifacts["images"]
+            # Uma imagem substituída (outro tamanho) volta a ser candidata à recompressão
+            self._index["recompressed"] = {p: n for p, n in recompressed.items() if p in images and images[p][0] == n}
+            self._index["artifacts"] = artifacts
+            self._index["updated"] = time.time()
+            self._save()
+        return artifacts
+
+    def _save(self) -> None:
+        if not self.index_path:
+            return
+        directory = os.path.dirname(os.path.abspath(self.index_path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self._index, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, self.index_path)
+
+    def usage(self) -> dict:
+        """
+        ### 📊 usage
+        Arquivos e bytes por artefato segundo o índice (sem varrer o disco), e o uso do disco.
+        """
+        with self._lock:
+            artifacts = self._index["artifacts"]
+            usage = {
+                kind: {"files": len(artifacts.get(kind, {})), "bytes": sum(v[0] for v in artifacts.get(kind, {}).values())}
+                for kind in KINDS
+            }
+        disk = shutil.disk_usage(self.users_dir if os.path.isdir(self.users_dir) else ".")
+        usage["disk"] = {"total": disk.total, "used": disk.used, "free": disk.free}
+        return usage
+
+    # ── Políticas ─────────────────────────────────────────────────────────────
+
+    def _units(self, kind: str, files: dict) -> list[tuple[str, list[str], int, float]]:
+        # Unidades de remoção: (chave, arquivos, bytes, mtime mais recente)
+        if kind != "images":
+            return [(path, [path], size, mtime) for path, (size, mtime) in files.items()]
+        groups: dict[str, list[str]] = {}
+        for path in files:
+            groups.setdefault(os.path.dirname(path), []).append(path)
+        return [
+            (folder, paths, sum(files[p][0] for p in paths), max(files[p][1] for p in paths))
+            for folder, paths in groups.items()
+        ]
+
+    def _processed(self, path: str) -> bool:
+        if not os.path.isdir(self.users_dir):
+            return False
+        return any(
+            is_complete(path, user, self.require_report)
+            for user in os.listdir(self.users_dir)
+            if os.path.isdir(os.path.join(self.users_dir, user, "Patients"))
+        )
+
+    def _select(self, kind: str, files: dict, now: float) -> list[tuple[str, list[str], int, str]]:
+        # Unidades a remover segundo a política, com o motivo
+        policy = self.policies.get(kind, {})
+        units = self._units(kind, files)
+        if kind == "zips":
+            # ZIPs não processados nunca são removidos
+            units = [u for u in units if self._processed(u[0])]
+        selected, remaining = [], []
+        max_age = policy.get("max_age_days")
+        for key, paths, size, mtime in units:
+            if kind == "zips" and policy.get("delete_processed"):
+                selected.append((key, paths, size, "processado"))
+            elif max_age is not None and now - mtime > max_age * DAY:
+                selected.append((key, paths, size, f"mais de {max_age:g} dias"))
+            else:
+                remaining.append((key, paths, size, mtime))
+        max_bytes = policy.get("max_bytes")
+        if max_bytes is not None:
+            total = sum(v[0] for v in files.values()) - sum(u[2] for u in selected)
+            for key, paths, size, _ in sorted(remaining, key=lambda u: u[3]):
+                if total <= max_bytes:
+                    break
+                selected.append((key, paths, size, f"acima de {_size(max_bytes)}"))
+                total -= size
+        return selected
+
+    def recompress(self, path: str, quality: int) -> int:
+        """
+        ### 🗜️ recompress
+        Regrava um JPEG com `quality` se o resultado for menor, preservando a data de
+        modificação (a idade do arquivo não muda). Retorna os bytes economizados.
+        """
+        from PIL import Image
+
+        size = os.path.getsize(path)
+        stat = os.stat(path)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        os.close(fd)
+        try:
+            with Image.open(path) as img:
+                img.save(tmp_path, "JPEG", quality=quality, optimize=True)
+            new_size = os.path.getsize(tmp_path)
+            if new_size >= size:
+                return 0
+            os.replace(tmp_path, path)
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+            return size - new_size
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def sweep(self, dry_run: bool = False) -> dict:
+        """
+        ### 🧹 sweep
+        Varre os artefatos, remove o que as políticas mandam, recomprime as imagens antigas e
+        retorna o relatório (removidos, bytes liberados, recomprimidas e uso por artefato).
+        Com `dry_run`, apenas relata o que seria feito.
+        """
+        start = time.perf_counter()
+        now = time.time()
+        report = {
+            "dry_run": dry_run, "removed": {k: 0 for k in KINDS}, "freed": {k: 0 for k in KINDS},
+            "recompressed": 0, "recompress_saved": 0, "errors": 0, "actions": [],
+        }
+        with stage("retention_sweep") as span:
+            artifacts = self.scan()
+            for kind in KINDS:
+                for key, paths, size, reason in self._select(kind, artifacts[kind], now):
+                    report["actions"].append((kind, key, size, reason))
+                    if not dry_run:
+                        try:
+                            if kind == "images":
+                                # Marcado antes de remover: um PDF nunca é refeito de uma pasta pela metade
+                                with open(os.path.join(os.path.dirname(key), PRUNED_MARKER), "w", encoding="utf-8") as f:
+                                    json.dump({"pruned_at": now, "files": len(paths), "bytes": size, "reason": reason}, f)
+                            for path in paths:
+                                os.remove(path)
+                        except OSError as e:
+                            print(f"[ERRO] Não foi possível remover {key}: {e}")
+                            report["errors"] += 1
+                            continue
+                    report["removed"][kind] += 1
+                    report["freed"][kind] += size
+
+            policy = self.policies.get("images", {})
+            after = policy.get("recompress_after_days")
+            if after is not None:
+                removed = {a[1] for a in report["actions"] if a[0] == "images"}
+                done = self._index["recompressed"]
+                for path, (size, mtime) in artifacts["images"].items():
+                    if os.path.dirname(path) in removed or path in done or now - mtime <= after * DAY:
+                        continue
+                    if dry_run:
+                        report["recompressed"] += 1
+                        continue
+                    try:
+                        saved = self.recompress(path, policy.get("recompress_quality", 85))
+                    except (OSError, ValueError) as e:
+                        print(f"[ERRO] Não foi possível recomprimir {path}: {e}")
+                        report["errors"] += 1
+                        continue
+                    report["recompressed"] += 1
+                    report["recompress_saved"] += saved
+                    # Mesmo sem ganho, não tenta de novo
+                    done[path] = os.path.getsize(path)
+
+            span["bytes"] = sum(report["freed"].values()) + report["recompress_saved"]
+            span["items"] = sum(report["removed"].values()) + report["recompressed"]
+            if not dry_run:
+                self.scan()
+        report["usage"] = self.usage()
+        report["seconds"] = time.perf_counter() - start
+        self.last_report = report
+        return report
+
+    @staticmethod
+    def format_report(report: dict) -> str:
+        """
+        ### 🧾 format_report
+        Relatório de uso do disco em texto: arquivos e bytes por artefato, o que a varredura
+        removeu (ou removeria) e o espaço livre.
+        """
+        usage = report["usage"]
+        lines = [f"{'artefato':<10}{'arquivos':>10}{'tamanho':>12}{'removidos':>11}{'liberado':>12}"]
+        for kind in KINDS:
+            lines.append(f"{kind:<10}{usage[kind]['files']:>10}{_size(usage[kind]['bytes']):>12}"
+                         f"{report['removed'][kind]:>11}{_size(report['freed'][kind]):>12}")
+        if report["recompressed"]:
+            lines.append(f"imagens recomprimidas: {report['recompressed']} ({_size(report['recompress_saved'])} economizados)")
+        disk = usage["disk"]
+        lines.append(f"disco: {_size(disk['used'])} usados de {_size(disk['total'])}, {_size(disk['free'])} livres")
+        if report["dry_run"]:
+            lines.append("(simulação: nada foi apagado)")
+        return "\n".join(lines)
+
+    def register_gauges(self, registry=METRICS) -> None:
+        """
+        ### 📈 register_gauges
+        Expõe os bytes de cada artefato (do índice) e o espaço livre em `GET /metrics`.
+        """
+        for kind in KINDS:
+            registry.gauge(f"storage_{kind}_bytes", lambda kind=kind: self.usage()[kind]["bytes"],
+                           f"Bytes ocupados por {kind} (última varredura).")
+        registry.gauge("storage_free_bytes", lambda: self.usage()["disk"]["free"], "Espaço livre no disco dos usuários.")
+
+    # ── Varredura em segundo plano ───────────────────────────────────────────
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                report = self.sweep()
+                removed = sum(report["removed"].values())
+                if removed or report["recompressed"]:
+                    print(f"🧺 Retenção: {removed} removidos, {report['recompressed']} recomprimidas, "
+                          f"{_size(sum(report['freed'].values()) + report['recompress_saved'])} liberados")
+            except Exception as e:
+                print(f"[ERRO] Varredura de retenção falhou: {e}")
+            self._stop.wait(self.interval)
+
+    def start(self) -> "StorageSweeper":
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="storage-sweeper", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=30)
+
+    def __enter__(self) -> "StorageSweeper":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
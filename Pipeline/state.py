@@ -0,0 +1,131 @@
+"""
+🗂️ Ingestion State
+Estado persistente da ingestão por estudo e por instância: a que usuário pertence cada
+paciente do Orthanc, em que pasta cada estudo foi gerado e quais instâncias já foram
+baixadas. Permite processar um novo exame de um paciente conhecido, ou instâncias que
+chegaram depois do primeiro download, baixando apenas o que é novo.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+import threading
+
+_MISSING = object()
+
+
+class IngestState:
+    """
+    ### 🗂️ IngestState
+    Arquivo JSON com as chaves `owners` (paciente → usuário, ou null para outros AETs),
+    `studies` (estudo → usuário, paciente, pasta, instâncias e `LastUpdate`) e `migrated`.
+    Cada alteração é gravada de forma atômica.
+
+    ### 🖥️ Parameters
+        - `path` (`str | None`): Arquivo de estado (None mantém o estado só em memória).
+
+    ### 💡 Example
+    >>> state = IngestState("Users/state.json")
+    >>> state.instances("2d5c1b0e-...")
+    set()
+    """
+
+    def __init__(self, path: str | None = "Users/state.json"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._data = {"owners": {}, "studies": {}, "migrated": False}
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self._data.update(json.load(f))
+
+    def _save(self) -> None:
+        if not self.path:
+            return
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self._data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def owner(self, patient: str, default=_MISSING):
+        """
+        ### 👤 owner
+        Usuário dono do paciente (None para outro AET); `default` se o paciente nunca foi visto.
+        """
+        with self._lock:
+            if patient in self._data["owners"]:
+                return self._data["owners"][patient]
+        return None if default is _MISSING else default
+
+    def set_owner(self, patient: str, user: str | None) -> None:
+        """
+        ### 🏷️ set_owner
+        Registra o dono de um paciente (None para pacientes de outros AETs).
+        """
+        with self._lock:
+            self._data["owners"][patient] = user
+            self._save()
+
+    def study(self, study_id: str) -> dict | None:
+        """
+        ### 📄 study
+        Registro de um estudo já processado, ou None.
+        """
+        with self._lock:
+            record = self._data["studies"].get(study_id)
+            return dict(record) if record else None
+
+    def instances(self, study_id: str) -> set[str]:
+        """
+        ### 🧾 instances
+        IDs das instâncias do estudo que já foram baixadas.
+        """
+        record = self.study(study_id)
+        return set(record["instances"]) if record else set()
+
+    def folders(self, patient: str | None = None) -> set[str]:
+        """
+        ### 📁 folders
+        Pastas de saída já usadas pelos estudos do paciente (de todos os pacientes, com None).
+        """
+        with self._lock:
+            return {r["name"] for r in self._data["studies"].values() if patient is None or r["patient"] == patient}
+
+    def record(
+        self,
+        study_id: str,
+        user: str,
+        patient: str,
+        name: str,
+        instances: set[str] | list[str],
+        last_update: str | None,
+    ) -> None:
+        """
+        ### 💾 record
+        Grava (ou atualiza) o estado de um estudo.
+        """
+        with self._lock:
+            self._data["studies"][study_id] = {
+                "user": user,
+                "patient": patient,
+                "name": name,
+                "instances": sorted(instances),
+                "last_update": last_update,
+            }
+            self._save()
+
+    @property
+    def migrated(self) -> bool:
+        return bool(self._data.get("migrated"))
+
+    def mark_migrated(self) -> None:
+        """
+        ### ✅ mark_migrated
+        Marca que os pacientes processados antes do estado por estudo já foram registrados.
+        """
+        with self._lock:
+            self._data["migrated"] = True
+            self._save()
@@ -0,0 +1,263 @@
+"""
+📂 Watch-folder Ingestion
+Ingestão de arquivos ZIP depositados em uma pasta (por exemplo, um compartilhamento SMB
+das unidades que não enviam pelo Orthanc). Um arquivo só é processado depois de
+completamente gravado:
+
+- com inotify (Linux), quando chega o evento `IN_CLOSE_WRITE` (cópia direta) ou
+  `IN_MOVED_TO` (gravado com outro nome e renomeado para `.zip`);
+- sem inotify (outros sistemas, ou pastas montadas via rede, em que o kernel local não vê
+  as gravações remotas), por consulta periódica: quando o tamanho e a data de modificação
+  se repetem em duas consultas seguidas.
+
+Em ambos os casos o arquivo também precisa ser um ZIP válido (o diretório central fica no
+fim do arquivo, então uma cópia parcial é rejeitada) — um fechamento intermediário apenas
+adia o processamento até o próximo evento.
+"""
+
+from __future__ import annotations
+
+import os
+import select
+import struct
+import threading
+import time
+import zipfile
+from typing import Callable
+
+from .backlog import LEDGER, is_complete
+from .metrics import METRICS, trace
+from .webhook import StudyEventQueue
+
+# Constantes de <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = getattr(os, "O_CLOEXEC", 0o2000000)
+_EVENT = struct.Struct("iIII")
+
+
+def _inotify_libc():
+    # inotify não tem binding na biblioteca padrão; usa a libc via ctypes quando existe
+    import ctypes
+    import ctypes.util
+
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        libc.inotify_init1, libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+class FolderWatcher:
+    """
+    ### 📂 FolderWatcher
+    Observa `folder` em uma thread e coloca em `events` o nome de cada ZIP completamente
+    gravado, guardando o instante em que a gravação terminou (`closed_at`) para medir a
+    latência até o PDF. Na partida, os ZIPs já presentes também são enfileirados.
+
+    ### 🖥️ Parameters
+        - `folder` (`str`): Pasta observada.
+        - `events` (`StudyEventQueue | None`): Fila de arquivos prontos (criada se omitida).
+        - `poll_interval` (`float`): Intervalo da consulta periódica, em segundos.
+        - `use_inotify` (`bool | None`): Força (True) ou desliga (False) o inotify; None usa quando disponível.
+
+    ### 💡 Example
+    >>> with FolderWatcher("ZIPS") as watcher:
+    ...     file = watcher.events.get(timeout=60)
+    """
+
+    def __init__(
+        self,
+        folder: str,
+        events: StudyEventQueue | None = None,
+        poll_interval: float = 2.0,
+        use_inotify: bool | None = None,
+    ):
+        self.folder = folder
+        self.events = events or StudyEventQueue()
+        self.poll_interval = poll_interval
+        self.closed_at: dict[str, float] = {}
+        self._libc = _inotify_libc() if use_inotify is not False else None
+        if use_inotify and self._libc is None:
+            raise OSError("inotify não disponível neste sistema")
+        self.backend = "inotify" if self._libc is not None else "polling"
+        self._queued: dict[str, tuple] = {}
+        self._seen: dict[str, tuple[tuple, float]] = {}
+        self._last_scan = 0.0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @staticmethod
+    def _signature(path: str) -> tuple | None:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_size, st.st_mtime_ns
+
+    def _offer(self, name: str, closed_at: float) -> bool:
+        # Enfileira um arquivo fechado, se for um ZIP válido ainda não enfileirado nesta versão
+        if not name.lower().endswith(".zip"):
+            return False
+        path = os.path.join(self.folder, name)
+        signature = self._signature(path)
+        if signature is None or self._queued.get(name) == signature or not zipfile.is_zipfile(path):
+            return False
+        self._queued[name] = signature
+        self.closed_at[name] = closed_at
+        self.events.put(name)
+        return True
+
+    def scan(self, stable_only: bool = True) -> int:
+        """
+        ### 🔍 scan
+        Consulta a pasta e enfileira os ZIPs prontos. Com `stable_only`, um arquivo só está
+        pronto quando o tamanho e a data de modificação não mudaram desde a consulta anterior.
+        O fechamento é estimado pela data de modificação, limitada ao intervalo entre a
+        consulta que ainda não via a versão final e a que a viu (cópias que preservam a
+        data original não contam tempo de fila antes da chegada).
+
+        ### 🔄 Returns
+            - `int`: Arquivos enfileirados.
+        """
+        now = time.time()
+        queued = 0
+        current = {}
+        for entry in os.scandir(self.folder):
+            if not entry.is_file() or not entry.name.lower().endswith(".zip"):
+                continue
+            signature = self._signature(entry.path)
+            if signature is None:
+                continue
+            previous = self._seen.get(entry.name)
+            if previous and previous[0] == signature:
+                current[entry.name] = previous
+                queued += self._offer(entry.name, previous[1])
+                continue
+            closed_at = min(now, max(signature[1] / 1e9, self._last_scan))
+            current[entry.name] = (signature, closed_at)
+            if not stable_only:
+                queued += self._offer(entry.name, closed_at)
+        self._seen = current
+        self._last_scan = now
+        return queued
+
+    def _watch_inotify(self) -> None:
+        fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0 or self._libc.inotify_add_watch(fd, os.fsencode(self.folder), IN_CLOSE_WRITE | IN_MOVED_TO) < 0:
+            print(f"[AVISO] inotify indisponível para {self.folder}; usando consulta periódica")
+            if fd >= 0:
+                os.close(fd)
+            self.backend = "polling"
+            return self._watch_polling()
+        try:
+            # Arquivos gravados antes da partida (ou enquanto o monitor estava parado)
+            self.scan(stable_only=False)
+            while not self._stop.is_set():
+                ready, _, _ = select.select([fd], [], [], 1.0)
+                if not ready:
+                    continue
+                now = time.time()
+                data = os.read(fd, 64 * 1024)
+                offset = 0
+                while offset < len(data):
+                    _, mask, _, length = _EVENT.unpack_from(data, offset)
+                    name = data[offset + _EVENT.size:offset + _EVENT.size + length].rstrip(b"\0")
+                    offset += _EVENT.size + length
+                    if mask & IN_Q_OVERFLOW:
+                        # Eventos perdidos: uma consulta completa recupera os arquivos prontos
+                        self.scan(stable_only=False)
+                    elif mask & IN_IGNORED:
+                        print(f"[AVISO] Pasta observada removida: {self.folder}")
+                        self._stop.set()
+                    elif name:
+                        self._offer(os.fsdecode(name), now)
+        finally:
+            os.close(fd)
+
+    def _watch_polling(self) -> None:
+        self.scan(stable_only=False)
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.scan()
+            except OSError as e:
+                print(f"[AVISO] Erro ao consultar {self.folder}: {e}")
+
+    def start(self) -> "FolderWatcher":
+        os.makedirs(self.folder, exist_ok=True)
+        # Arquivos anteriores à partida contam a latência a partir dela
+        self._last_scan = time.time()
+        target = self._watch_inotify if self.backend == "inotify" else self._watch_polling
+        self._thread = threading.Thread(target=target, name="folder-watcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def __enter__(self) -> "FolderWatcher":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def run(
+        self,
+        process: Callable,
+        user: str,
+        work_dir: str = "Dicoms",
+        require_report: bool = False,
+        stop: threading.Event | None = None,
+    ) -> None:
+        """
+        ### 🔁 run
+        Processa os arquivos prontos, um por vez, com `process(file, user, zip_dir=...,
+        work_dir=...)` (normalmente `main.Extract_Convert_Img`), pulando os já completos.
+        A latência do fechamento do arquivo até o PDF gravado é registrada na etapa
+        `file_to_pdf` das métricas e no trace do paciente.
+
+        ### 🖥️ Parameters
+            - `process` (`Callable`): Função de processamento de um ZIP.
+            - `user` (`str`): Usuário dono dos pacientes.
+            - `work_dir` (`str`): Pasta de extração dos DICOMs.
+            - `require_report` (`bool`): Exige o laudo com IA para considerar um arquivo completo.
+            - `stop` (`threading.Event | None`): Encerra o laço quando sinalizado.
+        """
+        stop = stop or threading.Event()
+        while not stop.is_set() and not self._stop.is_set():
+            file = self.events.get(timeout=1.0)
+            if file is None:
+                continue
+            path = os.path.join(self.folder, file)
+            closed_at = self.closed_at.pop(file, time.time())
+            if is_complete(path, user, require_report):
+                print(f"⏭️ {file}: já processado")
+                continue
+            try:
+                fingerprint = LEDGER.fingerprint(path)
+            except OSError:
+                fingerprint = None
+            with trace(source="watch", zip=file) as record_trace:
+                try:
+                    pdf_path = process(file, user, zip_dir=self.folder, work_dir=work_dir)
+                except Exception as e:
+                    print(f"❌ Erro ao processar {file}: {e}")
+                    pdf_path = None
+                    record_trace.set(error=str(e))
+                ok = bool(pdf_path) and os.path.exists(pdf_path)
+                latency = (os.path.getmtime(pdf_path) if ok else time.time()) - closed_at
+                size = os.path.getsize(path) if os.path.exists(path) else 0
+                METRICS.observe("file_to_pdf", latency, bytes=size, items=1, error=not ok)
+                record_trace.set(file_to_pdf_seconds=round(latency, 3))
+            if ok:
+                if fingerprint:
+                    LEDGER.record(path, user, pdf_path, fingerprint)
+                print(f"✅ {file}: PDF gravado {latency:.1f}s após o fechamento do arquivo")
+            else:
+                print(f"⚠️ Falha no processamento de {file}")
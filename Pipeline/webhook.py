@@ -0,0 +1,217 @@
+"""
+📡 Orthanc Webhook Receiver
+Servidor HTTP local que recebe as notificações `OnStableStudy` do Orthanc (enviadas pelo
+script Lua `Pipeline/orthanc_stable_study.lua`) e coloca os estudos na fila de ingestão
+no momento em que ficam estáveis, sem esperar pelo próximo ciclo de consulta ao PACS.
+"""
+
+from __future__ import annotations
+
+import hmac
+import ipaddress
+import json
+import queue
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Identificadores do Orthanc: SHA-1 em cinco grupos de 8 dígitos hexadecimais
+ORTHANC_ID = re.compile(r"[0-9a-f]{8}(-[0-9a-f]{8}){4}")
+
+# O corpo enviado pelo script Lua tem só o ID, o StudyInstanceUID e a data do estudo
+MAX_BODY_BYTES = 4096
+
+
+class StudyEventQueue:
+    """
+    ### 📬 StudyEventQueue
+    Fila thread-safe de IDs de estudos do Orthanc. Um estudo já pendente não é
+    enfileirado de novo (o Orthanc pode repetir a notificação).
+
+    ### 💡 Example
+    >>> events = StudyEventQueue()
+    >>> events.put("6b9e1c04-...")
+    True
+    >>> events.get(timeout=1.0)
+    '6b9e1c04-...'
+    """
+
+    def __init__(self):
+        self._queue: queue.Queue[str] = queue.Queue()
+        self._pending: set[str] = set()
+        self._lock = threading.Lock()
+
+    def put(self, study_id: str) -> bool:
+        """
+        ### 📥 put
+        Enfileira um estudo; retorna False se ele já estava pendente.
+        """
+        with self._lock:
+            if study_id in self._pending:
+                return False
+            self._pending.add(study_id)
+        self._queue.put(study_id)
+        return True
+
+    def get(self, timeout: float | None = None) -> str | None:
+        """
+        ### 📤 get
+        Retorna o próximo estudo, ou None se nenhum chegar dentro de `timeout` segundos.
+        """
+        try:
+            study_id = self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        with self._lock:
+            self._pending.discard(study_id)
+        return study_id
+
+    def __len__(self) -> int:
+        return self._queue.qsize()
+
+
+def _study_id(body: bytes) -> str | None:
+    # O script Lua envia JSON ({"ID": ...}); aceita também o ID em texto puro. O ID vai para a
+    # URL do PACS (`/studies/{id}`): só identificadores no formato do Orthanc são aceitos
+    text = body.decode("utf-8", errors="replace").strip()
+    if not text:
+        return None
+    try:
+        payload = json.loads(text)
+    except json.JSONDecodeError:
+        payload = text
+    if isinstance(payload, dict):
+        payload = payload.get("ID") or payload.get("StudyID") or payload.get("id")
+    if isinstance(payload, str) and ORTHANC_ID.fullmatch(payload):
+        return payload
+    return None
+
+
+def _is_loopback(host: str) -> bool:
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+class WebhookServer:
+    """
+    ### 📡 WebhookServer
+    Recebe `POST <path>` com o ID do estudo estável e o coloca em `events`. Responde
+    `202` imediatamente, para não prender a thread Lua do Orthanc durante o processamento.
+    `GET /health` responde `200` para verificações de disponibilidade.
+
+    Fora da interface de loopback o token é obrigatório: sem ele, qualquer máquina da rede
+    poderia enfileirar estudos.
+
+    ### 🖥️ Parameters
+        - `events` (`StudyEventQueue`): Fila de estudos a processar.
+        - `host` (`str`): Interface de escuta.
+        - `port` (`int`): Porta de escuta (0 escolhe uma porta livre).
+        - `path` (`str`): Caminho do webhook.
+        - `token` (`str | None`): Segredo esperado no cabeçalho `X-Webhook-Token`.
+
+    ### ⚠️ Raises
+        - `ValueError`: Se `host` não for de loopback e não houver `token`.
+
+    ### 💡 Example
+    >>> events = StudyEventQueue()
+    >>> with WebhookServer(events, port=8765, token="segredo") as server:
+    ...     study_id = events.get(timeout=300)
+    """
+
+    def __init__(
+        self,
+        events: StudyEventQueue,
+        host: str = "127.0.0.1",
+        port: int = 8765,
+        path: str = "/orthanc/stable-study",
+        token: str | None = None,
+    ):
+        if not token and not _is_loopback(host):
+            raise ValueError(f"Webhook em {host} exige um token (ORTHANC_WEBHOOK_TOKEN) fora do loopback")
+        self.events = events
+        self.path = path
+        self.token = token
+        self.received = 0
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}{self.path}"
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, status: int, payload: dict, close: bool = False) -> None:
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                if close:
+                    # Corpo não lido: a conexão não pode ser reaproveitada
+                    self.send_header("Connection", "close")
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if self.path == "/health":
+                    self._reply(200, {"status": "ok", "pending": len(server.events)})
+                else:
+                    self._reply(404, {"error": "not found"})
+
+            def do_POST(self):
+                # Caminho, token e tamanho são conferidos antes de ler qualquer byte do corpo
+                if self.path != server.path:
+                    self._reply(404, {"error": "not found"}, close=True)
+                    return
+                received = self.headers.get("X-Webhook-Token") or ""
+                if server.token and not hmac.compare_digest(received.encode(), server.token.encode()):
+                    self._reply(403, {"error": "invalid token"}, close=True)
+                    return
+                try:
+                    length = int(self.headers.get("Content-Length", 0))
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    self._reply(400, {"error": "invalid Content-Length"}, close=True)
+                    return
+                if length > MAX_BODY_BYTES:
+                    self._reply(413, {"error": "body too large"}, close=True)
+                    return
+                study_id = _study_id(self.rfile.read(length))
+                if not study_id:
+                    self._reply(400, {"error": "missing or invalid study ID"})
+                    return
+                server.received += 1
+                queued = server.events.put(study_id)
+                print(f"📡 Estudo estável recebido: {study_id}{'' if queued else ' (já na fila)'}")
+                self._reply(202, {"queued": queued, "ID": study_id})
+
+        return Handler
+
+    def start(self) -> "WebhookServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> "WebhookServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
@@ -0,0 +1,226 @@
+"""
+🧰 Dicom-PDF Command Line
+Pontos de entrada separados para cada tarefa do pipeline. Cada comando importa apenas os
+subsistemas que usa: converter um ZIP não carrega pyorthanc nem openai (sem chave de API),
+e gerar um PDF de imagens não carrega pydicom.
+
+Comandos:
+- `monitor`: monitora o Orthanc PACS (webhook + reconciliação), como `python main.py`.
+- `convert-zip <arquivo>`: extrai um ZIP de `ZIPS/`, converte as imagens e gera os PDFs.
+- `build-pdf <paciente>`: regenera o PDF de imagens de uma pasta de paciente.
+- `ai-report <paciente>`: gera o laudo com IA (OCR + laudo + PDF) de uma pasta de paciente.
+- `backlog`: processa em paralelo todos os ZIPs de uma pasta, pulando os já completos.
+- `watch`: observa uma pasta (inotify, ou consulta periódica) e processa cada ZIP assim que é gravado.
+- `storage`: relatório de uso do disco e aplicação das políticas de retenção (`--sweep`).
+- `catalog`: busca no catálogo de pacientes e laudos (`--backfill` cataloga as pastas existentes).
+- `serve`: serviço HTTP local de laudos e imagens, com cache (ETag/Range) e regeneração sob demanda.
+
+### 💡 Example
+```bash
+python cli.py convert-zip "20250604101010 PACIENTE.zip" --user Anders
+python cli.py build-pdf "PACIENTE" --user Anders
+```
+"""
+
+import argparse
+import os
+import sys
+
+
+def _monitor(args) -> int:
+    from main import orthanc
+
+    orthanc()
+    return 0
+
+
+def _convert_zip(args) -> int:
+    from main import Extract_Convert_Img
+    from Pipeline.backlog import LEDGER
+
+    # Extract_Convert_Img recebe o nome do arquivo dentro de ZIPS/
+    file = os.path.relpath(args.file, "ZIPS") if os.path.dirname(args.file) else args.file
+    path = os.path.join("ZIPS", file)
+    if file.startswith("..") or not os.path.exists(path):
+        print(f"❌ Arquivo não encontrado em ZIPS/: {args.file}")
+        return 1
+    fingerprint = LEDGER.fingerprint(path)
+    pdf_path = Extract_Convert_Img(file, args.user)
+    if not pdf_path:
+        return 1
+    # Registrado para que backlog, pasta observada e retenção o reconheçam como processado
+    LEDGER.record(path, args.user, pdf_path, fingerprint)
+    return 0
+
+
+def _build_pdf(args) -> int:
+    from PDFMAKER import MkPDF
+
+    MkPDF(args.user, args.name)
+    print(f"✅ PDF gerado: {os.path.join('Users', args.user, 'Patients', args.name, 'Report', args.name + '.pdf')}")
+    return 0
+
+
+def _ai_report(args) -> int:
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        print("❌ Defina OPENAI_API_KEY para gerar o laudo com IA")
+        return 1
+    from OCR import markdown_to_pdf, process_patient_with_ai
+
+    process_patient_with_ai(user=args.user, patient_name=args.name, api_key=api_key)
+    reports_dir = os.path.join("Users", args.user, "Patients", args.name, "Report")
+    pdf_path = os.path.join(reports_dir, f"{args.name}_laudo.pdf")
+    markdown_to_pdf(os.path.join(reports_dir, f"{args.name}.md"), pdf_path)
+    print(f"✅ Laudo IA gerado: {pdf_path}")
+    return 0
+
+
+def _backlog(args) -> int:
+    from main import OPENAI_API_KEY, Extract_Convert_Img
+    from Pipeline import BacklogProcessor
+    from Pipeline.governor import parse_size
+
+    if not os.path.isdir(args.zip_dir):
+        print(f"❌ Pasta não encontrada: {args.zip_dir}")
+        return 1
+    summary = BacklogProcessor(
+        Extract_Convert_Img,
+        args.user,
+        zip_dir=args.zip_dir,
+        workers=args.workers,
+        # Com chave de API, um arquivo só está completo quando o laudo também existe
+        require_report=bool(OPENAI_API_KEY),
+        force=args.force,
+        memory_limit=parse_size(args.memory_limit),
+    ).run()
+    return 1 if summary["failed"] else 0
+
+
+def _watch(args) -> int:
+    from main import watch_folder
+
+    watch_folder(args.dir, args.user, use_inotify=False if args.poll else None)
+    return 0
+
+
+def _storage(args) -> int:
+    from Pipeline.retention import StorageSweeper, load_policies
+
+    try:
+        policies = load_policies(args.policy)
+    except (OSError, ValueError) as e:
+        print(f"❌ Política de retenção inválida: {e}")
+        return 1
+    sweeper = StorageSweeper(policies, require_report=bool(os.getenv("OPENAI_API_KEY")))
+    # Sem --sweep, apenas relata o que as políticas removeriam
+    report = sweeper.sweep(dry_run=not args.sweep)
+    for kind, key, size, reason in report["actions"]:
+        print(f"{'🗑️' if args.sweep else '·'} {kind}: {key} ({size / 1024**2:.1f} MB, {reason})")
+    print(sweeper.format_report(report))
+    return 1 if report["errors"] else 0
+
+
+def _catalog(args) -> int:
+    from Pipeline.catalog import PatientCatalog
+
+    catalog = PatientCatalog(args.db)
+    if not catalog.enabled:
+        print("❌ Catálogo desativado (CATALOG_PATH vazio)")
+        return 1
+    if args.backfill:
+        print(f"🗂️ {catalog.backfill()} pastas catalogadas")
+        return 0
+    try:
+        rows = catalog.search(name=args.name, study_uid=args.uid, date_from=args.date_from,
+                              date_to=args.date_to, user=args.user, limit=args.limit)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+    for row in rows:
+        date = row["study_date"] or "--------"
+        report = "laudo" if row["report_pdf"] else "-"
+        print(f"{date}  {row['user']:<12} {row['folder']:<40} {row['images']:>4} imagens  {report:<5}  {row['pdf'] or ''}")
+    print(f"{len(rows)} resultado(s)")
+    return 0
+
+
+def _serve(args) -> int:
+    if args.port is not None:
+        os.environ["REPORT_SERVER_PORT"] = str(args.port)
+    if args.host is not None:
+        os.environ["REPORT_SERVER_HOST"] = args.host
+    from main import serve_reports
+
+    serve_reports()
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="cli.py", description="Dicom-PDF: DICOM → JPEG → PDF e laudo com IA")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    monitor = commands.add_parser("monitor", help="monitora o Orthanc PACS e processa os estudos estáveis")
+    monitor.set_defaults(func=_monitor)
+
+    convert = commands.add_parser("convert-zip", help="processa um arquivo ZIP de ZIPS/")
+    convert.add_argument("file", help="nome (ou caminho) do ZIP dentro de ZIPS/")
+    convert.add_argument("--user", default="Anders", help="usuário dono do paciente")
+    convert.set_defaults(func=_convert_zip)
+
+    build = commands.add_parser("build-pdf", help="regenera o PDF de imagens de um paciente")
+    build.add_argument("name", help="pasta do paciente em Users/<user>/Patients")
+    build.add_argument("--user", default="Anders", help="usuário dono do paciente")
+    build.set_defaults(func=_build_pdf)
+
+    report = commands.add_parser("ai-report", help="gera o laudo com IA de um paciente (requer OPENAI_API_KEY)")
+    report.add_argument("name", help="pasta do paciente em Users/<user>/Patients")
+    report.add_argument("--user", default="Anders", help="usuário dono do paciente")
+    report.set_defaults(func=_ai_report)
+
+    backlog = commands.add_parser("backlog", help="processa em lote todos os ZIPs de uma pasta (retomável)")
+    backlog.add_argument("--zip-dir", default="ZIPS", help="pasta com os arquivos ZIP")
+    backlog.add_argument("--user", default="Anders", help="usuário dono dos pacientes")
+    backlog.add_argument("--workers", type=int, default=None,
+                         help="máximo de processos em paralelo (padrão BACKLOG_WORKERS ou metade das CPUs)")
+    backlog.add_argument("--memory-limit", default=None,
+                         help="teto de memória dos workers, ex. 4G (padrão GOVERNOR_MEMORY_LIMIT ou 80%% da livre)")
+    backlog.add_argument("--force", action="store_true", help="reprocessa também os arquivos já completos")
+    backlog.set_defaults(func=_backlog)
+
+    watch = commands.add_parser("watch", help="processa os ZIPs depositados em uma pasta assim que são gravados")
+    watch.add_argument("--dir", default=None, help="pasta observada (padrão WATCH_DIR ou ZIPS)")
+    watch.add_argument("--user", default=None, help="usuário dono dos pacientes (padrão WATCH_USER ou Anders)")
+    watch.add_argument("--poll", action="store_true", help="usa consulta periódica em vez de inotify (pastas de rede)")
+    watch.set_defaults(func=_watch)
+
+    storage = commands.add_parser("storage", help="uso do disco e políticas de retenção de ZIPs, DICOMs e imagens")
+    storage.add_argument("--policy", default=None, help="arquivo JSON de políticas (padrão RETENTION_POLICY)")
+    storage.add_argument("--sweep", action="store_true", help="aplica as políticas (sem ele, apenas simula)")
+    storage.set_defaults(func=_storage)
+
+    catalog = commands.add_parser("catalog", help="busca pacientes e laudos no catálogo indexado")
+    catalog.add_argument("--name", default=None, help="prefixo do nome do paciente")
+    catalog.add_argument("--uid", default=None, help="StudyInstanceUID")
+    catalog.add_argument("--from", dest="date_from", default=None, help="data inicial do estudo (AAAA-MM-DD)")
+    catalog.add_argument("--to", dest="date_to", default=None, help="data final do estudo (AAAA-MM-DD)")
+    catalog.add_argument("--user", default=None, help="usuário dono")
+    catalog.add_argument("--limit", type=int, default=50)
+    catalog.add_argument("--db", default=None, help="arquivo do catálogo (padrão CATALOG_PATH ou Users/catalog.db)")
+    catalog.add_argument("--backfill", action="store_true", help="cataloga as pastas de paciente já existentes")
+    catalog.set_defaults(func=_catalog)
+
+    serve = commands.add_parser("serve", help="serve laudos e imagens por HTTP, com regeneração sob demanda")
+    serve.add_argument("--host", default=None, help="interface de escuta (padrão REPORT_SERVER_HOST ou 127.0.0.1)")
+    serve.add_argument("--port", type=int, default=None, help="porta (padrão REPORT_SERVER_PORT ou 8767)")
+    serve.set_defaults(func=_serve)
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,7 +6,11 @@ Este módulo automatiza o processo de extração, conversão e geração de rela
 - `sleep_with_while(seconds)`: Exibe uma contagem regressiva enquanto aguarda o tempo especificado.
 - `imprimir_arquivo(path_arquivo, nome_impressora)`: Envia um arquivo para impressão em uma impressora específica no Windows.
 - `Extract_Convert_Img(file)`: Extrai imagens DICOM de um arquivo ZIP, converte-as para JPEG e gera um relatório em PDF.
-- `orthanc()`: Integra-se ao Orthanc PACS para monitorar e processar novos pacientes.
+- `Convert_Report(name, user)`: Converte os DICOMs de `Dicoms/`, regenera o PDF e gera o laudo com IA.
+- `process_study(user, name, paths)`: Processa as instâncias novas de um estudo baixadas pelo `StudyIngestor`.
+- `load_users()`: Lê o cadastro de usuários (`Users/users.json`), usado apenas pelo monitor.
+- `watch_folder(folder, user)`: Processa os ZIPs depositados em uma pasta assim que terminam de ser gravados.
+- `orthanc()`: Integra-se ao Orthanc PACS para monitorar e processar novos pacientes (webhook `OnStableStudy` + reconciliação periódica).
 - Este módulo utiliza parâmetros internos e funções auxiliares para realizar suas operações. Consulte as docstrings individuais para detalhes.
 📤 Retornos:
 - O módulo retorna caminhos de arquivos gerados, como PDFs, e mensagens de status para o usuário.
@@ -18,32 +22,22 @@ Este módulo automatiza o processo de extração, conversão e geração de rela
 
 import os
 import time
-from pyorthanc import Orthanc
-from DicomManager import Unzipper, DICOM2JPEG
-from PDFMAKER import MkPDF
-from OCR import process_patient_with_ai, markdown_to_pdf
+from Pipeline.metrics import stage, trace
 import json
 
-users = json.load(open("Users/users.json"))
-user_dir = os.path.join(os.getcwd(), "Users")
-
-def sorting_patients(user, orthanc):
-    patients = users[user]["patients"]
-    new_patients = []
-    patients_uids = [patient for patient in orthanc.get_patients()]
-    for patient in patients_uids:
-        if orthanc.get_patients_id_shared_tags(patient)["0008,0080"]["Value"] == users[user]["AET"] and patient not in patients:
-            patients.append(patient)
-            new_patients.append(patient)
-            users[user]["patients_names"].append((orthanc.get_patients_id_shared_tags(patient)["0010,0010"]["Value"], orthanc.get_patients_id_shared_tags(patient)["0020,000d"]["Value"]))
-    users[user]["patients"] = patients
-    json.dump(users, open("Users/users.json", "w"))
-    return new_patients
-
+# Os subsistemas pesados (pyorthanc, openai, reportlab, pydicom, NumPy, PIL) são importados
+# dentro das funções que os usam, para que cada comando de `cli.py` carregue só o necessário.
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
-users = json.load(open("Users/users.json"))
+
+def load_users(path: str = os.path.join("Users", "users.json")) -> dict:
+    """
+    ### 👥 load_users
+    Lê o cadastro de usuários (`Users/users.json`): AET e pacientes de cada usuário.
+    """
+    with open(path) as f:
+        return json.load(f)
 
 ###############################################################################
 #                         WINDOWS-SPECIFIC IMPORTS                            #
@@ -152,16 +146,20 @@ sleep_with_while(10)
     #    print(f"Erro ao imprimir o arquivo: {e}")
 
 
-def Extract_Convert_Img(file: str, user: str):
+def Extract_Convert_Img(file: str, user: str, zip_dir: str = "ZIPS", work_dir: str = "Dicoms"):
     """
     🖼️ Extract_Convert_Img
     Extracts DICOM images from a ZIP file, converts them to JPEG format, and generates a PDF report. This function is part of a medical imaging workflow, facilitating the conversion and compilation of DICOM images for further analysis and reporting.
 
     ### 🖥️ Parameters
-    - `file` (`str`): The name of the ZIP file containing DICOM images. The file should be located in the current working directory.
+    - `file` (`str`): The name of the ZIP file containing DICOM images, located in `zip_dir`.
+    - `user` (`str`): Owner of the patient.
+    - `zip_dir` (`str`): Folder containing the ZIP files.
+    - `work_dir` (`str`): Folder the DICOMs are extracted to; parallel jobs each need their own.
 
     ### 🔄 Returns
-    - `str`: The path to the created PDF file. After its generation, an OCR process can be executed to create the corresponding text file.
+    - `str | None`: The path to the created PDF file, or None when extraction failed or nothing was converted. After its generation, an
+      OCR process can be executed to create the corresponding text file.
 
     ### ⚠️ Raises
     - `FileNotFoundError`: If the specified ZIP file does not exist.
@@ -172,95 +170,186 @@ def Extract_Convert_Img(file: str, user: str):
     >>> Extract_Convert_Img("patient_data.zip")
     'Users/Anders/Patients/PATIENT_NAME/Report/PATIENT_NAME.pdf'
     """
+    from DicomManager import Unzipper
+
     print(f"🔄 Processando arquivo: {file}")
 
-    # Extract the file
-    unzipper = None
-    try:
-        unzipper = Unzipper(f"ZIPS/{file}")
-        # Unzip the file
-        unzipper.unzipper()
-        # Get the name of the patient (remove timestamp if present)
-        name = unzipper.name
-        name = name[15:]
-        print(f"👤 Paciente: {name}")
+    with trace(user=user, zip=file) as patient_trace:
+        # Extract the file
+        unzipper = None
+        try:
+            with stage("unzip") as span:
+                zip_path = os.path.join(zip_dir, file)
+                unzipper = Unzipper(zip_path, dst_dir=work_dir)
+                span["bytes"] = os.path.getsize(zip_path)
+                # Unzip the file
+                unzipper.unzipper()
+            # Get the name of the patient (remove timestamp if present)
+            name = unzipper.name
+            name = name[15:]
+            patient_trace.set(patient=name)
+            print(f"👤 Paciente: {name}")
 
-    except Exception as e:
-        print(f"❌ Erro na extração: {e}")
-        return None
-    finally:
-        # Garantir que o arquivo ZIP seja fechado
-        if unzipper and hasattr(unzipper, 'path'):
-            try:
-                unzipper.path.close()
-            except:
-                pass
-
-    # Create patient folders
-    base_dir = os.path.join(os.getcwd(), "Users", user, "Patients")
-    patient_dir = os.path.join(base_dir, name)
-    os.makedirs(patient_dir, exist_ok=True)
-    images_dir = os.path.join(patient_dir, "Images")
-    reports_dir = os.path.join(patient_dir, "Report")
-    dcm_dir = os.path.join(".", "Dicoms")
-    os.makedirs(images_dir, exist_ok=True)
-    os.makedirs(reports_dir, exist_ok=True)
+        except Exception as e:
+            print(f"❌ Erro na extração: {e}")
+            patient_trace.set(error=str(e))
+            return None
+        finally:
+            # Garantir que o arquivo ZIP seja fechado
+            if unzipper and hasattr(unzipper, 'path'):
+                try:
+                    unzipper.path.close()
+                except:
+                    pass
 
-    # Convert DICOM to JPEG
-    try:
-        print(f"🖼️ Convertendo imagens DICOM para JPEG...")
-        dicom2jpeg = DICOM2JPEG(dcm_dir, images_dir)
-        conversion_success = dicom2jpeg.converter()
+        return Convert_Report(name, user, work_dir=work_dir)
 
-        if not conversion_success:
-            print(f"⚠️ Nenhuma imagem foi convertida para {name}")
 
-    except Exception as e:
-        print(f"❌ Erro na conversão DICOM→JPEG: {e}")
+def Convert_Report(name: str, user: str, work_dir: str = "Dicoms", incremental: bool = False):
+    """
+    🖼️ Convert_Report
+    Converts the DICOM files currently in `work_dir` (default `Dicoms/`) into JPEGs inside the patient folder, regenerates the image PDF from every
+    image in that folder, harvests SR findings, removes the DICOMs and, when an API key is configured, generates the AI report.
+    The folder is then recorded in the patient catalog (`Pipeline.catalog`, `CATALOG_PATH`).
+    Images from earlier runs stay in the folder, so calling it with only newly received instances updates the existing PDF.
+    If retention pruned the folder's images (`Pipeline.retention.is_pruned`), an incremental run keeps the existing PDF and
+    AI report instead of rebuilding them from the few new images; a full run (the whole study) restores them and clears the marker.
 
-    # Generate the PDF
-    try:
-        print(f"📄 Gerando PDF para {name}...")
-        MkPDF(user, name)
-        print(f"✅ PDF gerado com sucesso")
-    except Exception as e:
-        print(f"❌ Erro na geração do PDF: {e}")
+    ### 🖥️ Parameters
+    - `name` (`str`): Patient (or study) folder name inside `Users/<user>/Patients`.
+    - `user` (`str`): Owner of the patient.
+    - `work_dir` (`str`): Folder holding the DICOMs to convert (removed from it afterwards).
+    - `incremental` (`bool`): `work_dir` holds only part of the study (late instances from Orthanc).
 
-    # Clean up DICOM files
-    try:
-        dicom2jpeg.eliminate_dcm()
-        print(f"🧹 Arquivos DICOM temporários removidos")
-    except Exception as e:
-        print(f"⚠️ Erro ao limpar arquivos DICOM: {e}")
+    ### 🔄 Returns
+    - `str | None`: The path to the image PDF, or None when this run produced nothing (no JPEG converted, no PDF written and
+      no SR harvested), e.g. when every DICOM in `work_dir` is corrupt.
+
+    ### 💡 Example
 
-    # Generate AI-powered report if API key is available
-    if OPENAI_API_KEY:
+    >>> Convert_Report("PATIENT_NAME", "Anders")
+    'Users/Anders/Patients/PATIENT_NAME/Report/PATIENT_NAME.pdf'
+    """
+    from DicomManager import DICOM2JPEG, SRHarvester
+    from PDFMAKER import MkPDF
+    from Pipeline.retention import PRUNED_MARKER, has_images, is_pruned
+
+    with trace(user=user, patient=name):
+        # Create patient folders
+        base_dir = os.path.join(os.getcwd(), "Users", user, "Patients")
+        patient_dir = os.path.join(base_dir, name)
+        os.makedirs(patient_dir, exist_ok=True)
+        images_dir = os.path.join(patient_dir, "Images")
+        reports_dir = os.path.join(patient_dir, "Report")
+        dcm_dir = work_dir
+        os.makedirs(images_dir, exist_ok=True)
+        os.makedirs(reports_dir, exist_ok=True)
+
+        # Anything written by this run: converted JPEGs, the image PDF or SR findings
+        produced = False
+
+        # Convert DICOM to JPEG
         try:
-            print(f"🤖 Gerando laudo com IA para {name}...")
-            process_patient_with_ai(
-                user=user,
-                patient_name=name,
-                api_key=OPENAI_API_KEY,
-            )
-
-            # Convert markdown to PDF
-            md_path = os.path.join(reports_dir, f"{name}.md")
-            pdf_path = os.path.join(reports_dir, f"{name}_laudo.pdf")
-
-            if os.path.exists(md_path):
-                markdown_to_pdf(md_path, pdf_path)
-                print(f"✅ Laudo IA gerado: {name}_laudo.pdf")
-            else:
-                print(f"⚠️ Arquivo markdown não encontrado: {md_path}")
+            print(f"🖼️ Convertendo imagens DICOM para JPEG...")
+            # Miniatura, prévia e folha de contato na mesma decodificação (PREVIEWS=0 desativa)
+            previews_dir = os.path.join(patient_dir, "Previews") if os.getenv("PREVIEWS", "1") != "0" else None
+            dicom2jpeg = DICOM2JPEG(dcm_dir, images_dir, profile=os.getenv("DICOM_PROFILE"), previews_path=previews_dir)
+            conversion_success = dicom2jpeg.converter()
+            produced = conversion_success
+
+            if not conversion_success:
+                print(f"⚠️ Nenhuma imagem foi convertida para {name}")
 
         except Exception as e:
-            print(f"❌ Erro ao gerar laudo com IA: {e}")
-    else:
-        print("ℹ️ Chave da API OpenAI não configurada. Pulando geração de laudo com IA.")
+            print(f"❌ Erro na conversão DICOM→JPEG: {e}")
+
+        # A pruned folder only holds the images received since then: never rebuild from them
+        keep_existing = incremental and is_pruned(patient_dir)
+        if is_pruned(patient_dir) and not incremental:
+            os.remove(os.path.join(patient_dir, PRUNED_MARKER))
+
+        # Generate the PDF
+        if keep_existing:
+            print(f"⚠️ Imagens de {name} removidas pela retenção; PDF e laudo existentes mantidos")
+        elif not has_images(images_dir):
+            print(f"⚠️ Nenhuma imagem em {images_dir}; PDF não gerado")
+        else:
+            try:
+                print(f"📄 Gerando PDF para {name}...")
+                with stage("images_pdf") as span:
+                    MkPDF(user, name)
+                    span["bytes"] = os.path.getsize(os.path.join(reports_dir, f"{name}.pdf"))
+                produced = True
+                print(f"✅ PDF gerado com sucesso")
+            except Exception as e:
+                print(f"❌ Erro na geração do PDF: {e}")
+
+        # Harvest SR measurements and header data before the DICOMs are removed; on incremental
+        # runs `work_dir` only holds the new instances, so they are merged into the saved findings
+        try:
+            with stage("sr_harvest") as span:
+                findings = SRHarvester(dcm_dir).harvest()
+                span["items"] = len(findings["measurements"])
+            produced = produced or findings["sr_instances"] > 0
+            findings = SRHarvester.update(findings, os.path.join(reports_dir, "findings.json"))
+            print(f"🧾 Achados estruturados: {len(findings['measurements'])} medidas em {findings['sr_instances']} SR")
+        except Exception as e:
+            print(f"⚠️ Erro ao extrair achados estruturados: {e}")
 
-    final_pdf_path = os.path.join(reports_dir, f"{name}.pdf")
-    print(f"✅ Processamento concluído para {name}")
-    return final_pdf_path
+        # Clean up DICOM files
+        try:
+            dicom2jpeg.eliminate_dcm(dcm_dir)
+            print(f"🧹 Arquivos DICOM temporários removidos")
+        except Exception as e:
+            print(f"⚠️ Erro ao limpar arquivos DICOM: {e}")
+
+        # Generate AI-powered report if API key is available
+        if keep_existing:
+            pass
+        elif OPENAI_API_KEY:
+            try:
+                from OCR import markdown_to_pdf, process_patient_with_ai
+
+                print(f"🤖 Gerando laudo com IA para {name}...")
+                process_patient_with_ai(
+                    user=user,
+                    patient_name=name,
+                    api_key=OPENAI_API_KEY,
+                )
+
+                # Convert markdown to PDF
+                md_path = os.path.join(reports_dir, f"{name}.md")
+                pdf_path = os.path.join(reports_dir, f"{name}_laudo.pdf")
+
+                if os.path.exists(md_path):
+                    with stage("report_pdf") as span:
+                        markdown_to_pdf(md_path, pdf_path)
+                        span["bytes"] = os.path.getsize(pdf_path)
+                    print(f"✅ Laudo IA gerado: {name}_laudo.pdf")
+                else:
+                    print(f"⚠️ Arquivo markdown não encontrado: {md_path}")
+
+            except Exception as e:
+                print(f"❌ Erro ao gerar laudo com IA: {e}")
+        else:
+            print("ℹ️ Chave da API OpenAI não configurada. Pulando geração de laudo com IA.")
+
+        # Catalog the folder: patient, study, PDFs, image count and processing time
+        try:
+            from Pipeline.catalog import CATALOG
+
+            if CATALOG.enabled:
+                CATALOG.record_folder(user, name)
+        except Exception as e:
+            print(f"⚠️ Erro ao atualizar o catálogo: {e}")
+
+        if not produced:
+            print(f"❌ Nada foi gerado para {name} nesta execução")
+            return None
+
+        final_pdf_path = os.path.join(reports_dir, f"{name}.pdf")
+        print(f"✅ Processamento concluído para {name}")
+        return final_pdf_path
 
 
 
@@ -268,109 +357,320 @@ def Extract_Convert_Img(file: str, user: str):
 
 # ORTHANC
 
-def orthanc():
+def process_study(user: str, name: str, paths: list):
     """
-    ### 🏥 Função Principal do Orthanc PACS
+    ### 📥 Processa as instâncias novas de um estudo
 
-    Conecta ao servidor Orthanc PACS e monitora continuamente por novos pacientes.
-    Quando encontra novos pacientes, baixa os arquivos ZIP e processa automaticamente.
+    Chamado pelo `StudyIngestor` depois de gravar, na pasta de trabalho do estudo (dentro de
+    `Dicoms/`), apenas as instâncias ainda não vistas: converte somente essas e regenera o
+    PDF da pasta do estudo.
 
-    ### 🔄 Fluxo de Trabalho
-    1. Conecta ao servidor Orthanc
-    2. Compara pacientes locais (ZIPS) com pacientes no servidor
-    3. Baixa novos pacientes como arquivos ZIP
-    4. Processa cada novo paciente (extração, conversão, PDF)
-    5. Aguarda intervalo antes de verificar novamente
+    ### 🖥️ Parameters
+    - `user` (`str`): Usuário dono do paciente.
+    - `name` (`str`): Pasta do estudo em `Users/<user>/Patients`.
+    - `paths` (`list`): Instâncias DICOM baixadas (todas na mesma pasta de trabalho).
+
+    ### 🔄 Returns
+    - `str`: Caminho do PDF do estudo.
 
     ### ⚠️ Raises
-    - `ConnectionError`: Se não conseguir conectar ao servidor Orthanc
-    - `Exception`: Para outros erros durante o processamento
+    - `RuntimeError`: Se nenhuma imagem, PDF ou SR foi gerado a partir das instâncias; o
+      `StudyIngestor` não as registra e elas são baixadas de novo na próxima reconciliação.
     """
-    print("🏥 Iniciando monitoramento do Orthanc PACS...")
-    print("🔗 Conectando ao servidor: http://ultrassom.ai:8042")
+    print(f"🔄 Processando {len(paths)} instâncias de {name}")
+    result = Convert_Report(name, user, work_dir=os.path.dirname(paths[0]) if paths else "Dicoms", incremental=True)
+    if not result:
+        print(f"⚠️ Falha no processamento do estudo {name}")
+        raise RuntimeError(f"nenhuma imagem ou PDF gerado a partir de {len(paths)} instâncias")
+    print(f"✅ Estudo {name} processado com sucesso")
+    return result
+
 
+def start_storage_sweeper():
+    """
+    ### 🧺 Varredura de retenção em segundo plano
+
+    Inicia o `StorageSweeper` com as políticas de `RETENTION_POLICY` (arquivo JSON; sem ele,
+    apenas DICOMs esquecidos há mais de um dia são removidos) a cada `RETENTION_INTERVAL`
+    segundos (padrão 3600; 0 desativa) e expõe o uso do disco em `GET /metrics`.
+
+    ### 🔄 Returns
+    - `StorageSweeper | None`: A varredura iniciada, ou None se desativada.
+    """
+    from Pipeline.retention import StorageSweeper
+
+    interval = float(os.getenv("RETENTION_INTERVAL", "3600"))
+    if not interval:
+        return None
     try:
-        orthanc = Orthanc("http://ultrassom.ai:8042", "admin", "admin")
-        print("✅ Conexão estabelecida com sucesso")
-    except Exception as e:
-        print(f"❌ Erro ao conectar ao Orthanc: {e}")
-        return
+        sweeper = StorageSweeper(interval=interval, require_report=bool(OPENAI_API_KEY))
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Política de retenção inválida, varredura desativada: {e}")
+        return None
+    sweeper.register_gauges()
+    print(f"🧺 Retenção de armazenamento a cada {interval:.0f}s")
+    return sweeper.start()
 
-    # Garantir que o diretório ZIPS existe
-    os.makedirs("ZIPS", exist_ok=True)
 
-    consecutive_errors = 0
-    max_consecutive_errors = 5
+def rebuild_patient(user: str, name: str, report: bool = False, users_dir: str = "Users") -> str:
+    """
+    ### 🔁 Regenera os PDFs de uma pasta de paciente
 
+    Usado pelo `ReportServer` (`POST /patients/<user>/<pasta>/regenerate`): refaz o PDF de
+    imagens a partir das imagens já convertidas e, com `report=True`, o laudo com IA. Os
+    PDFs são trocados atomicamente, então downloads em andamento não são afetados.
 
+    ### 🖥️ Parameters
+    - `user` (`str`): Usuário dono do paciente.
+    - `name` (`str`): Pasta do paciente em `Users/<user>/Patients`.
+    - `report` (`bool`): Regenera também o laudo com IA (requer `OPENAI_API_KEY`).
+    - `users_dir` (`str`): Pasta `Users` conferida e regenerada (a mesma servida pelo `ReportServer`).
 
-    def main_loop():
-            while True:
-                try:
-                    #Sorting patients
-                    for user in users.keys():
+    ### 🔄 Returns
+    - `str`: Caminho do PDF de imagens.
+
+    ### ⚠️ Raises
+    - `PrunedFolderError`: Se as imagens foram removidas pela retenção (o PDF atual é mantido).
+    - `FileNotFoundError`: Se a pasta de imagens não existir ou estiver vazia.
+    - `ValueError`: Se `report=True` sem chave de API configurada.
+    """
+    from PDFMAKER import MkPDF
+    from Pipeline.retention import PrunedFolderError, has_images, is_pruned
+
+    patient_dir = os.path.join(users_dir, user, "Patients", name)
+    reports_dir = os.path.join(patient_dir, "Report")
+    if is_pruned(patient_dir):
+        raise PrunedFolderError(f"Imagens de {name} removidas pela retenção; o PDF atual foi mantido")
+    if not has_images(os.path.join(patient_dir, "Images")):
+        raise FileNotFoundError(f"Nenhuma imagem em {name}/Images")
+    if report and not OPENAI_API_KEY:
+        raise ValueError("Defina OPENAI_API_KEY para regenerar o laudo com IA")
+    os.makedirs(reports_dir, exist_ok=True)
+
+    with trace(user=user, patient=name):
+        print(f"🔁 Regenerando PDF de {name}...")
+        with stage("images_pdf") as span:
+            MkPDF(user, name, users_dir=users_dir)
+            pdf_path = os.path.join(reports_dir, f"{name}.pdf")
+            span["bytes"] = os.path.getsize(pdf_path)
+
+        if report:
+            from OCR import markdown_to_pdf, process_patient_with_ai
+
+            process_patient_with_ai(user=user, patient_name=name, api_key=OPENAI_API_KEY, users_dir=users_dir)
+            with stage("report_pdf") as span:
+                report_path = os.path.join(reports_dir, f"{name}_laudo.pdf")
+                markdown_to_pdf(os.path.join(reports_dir, f"{name}.md"), report_path)
+                span["bytes"] = os.path.getsize(report_path)
+
+        try:
+            from Pipeline.catalog import CATALOG
+
+            if CATALOG.enabled:
+                CATALOG.record_folder(user, name, users_dir)
+        except Exception as e:
+            print(f"⚠️ Erro ao atualizar o catálogo: {e}")
+    print(f"✅ PDFs de {name} regenerados")
+    return pdf_path
+
+
+def serve_reports():
+    """
+    ### 🩺 Serviço de laudos
+
+    Serve os PDFs e imagens de `Users/` por HTTP (`Pipeline.report_server`) até Ctrl+C, com
+    regeneração sob demanda por `rebuild_patient`. Configuração por ambiente:
+    `REPORT_SERVER_HOST` (padrão 127.0.0.1), `REPORT_SERVER_PORT` (padrão 8767),
+    `REPORT_SERVER_TOKEN` (exige `Authorization: Bearer`; obrigatório fora do loopback) e `REPORT_SERVER_JOBS`
+    (regenerações simultâneas, padrão 1).
+    """
+    from functools import partial
 
-                        print(f"🔍 Buscando pacientes para {user}...")
-                        new_patients = sorting_patients(user, orthanc)
+    from Pipeline.report_server import ReportServer
 
-                        if  new_patients == []:
-                            print(f"ℹ️ Nenhum novo paciente encontrado para {user}.... ")
-                            consecutive_errors = 0  # Reset error counter on success
-                        else:
-                            print(f"🚀 Processando {len(new_patients)} novos pacientes...")
+    # Um único caminho absoluto para o que é servido e o que é regenerado
+    users_dir = os.path.realpath("Users")
+    try:
+        server = ReportServer(
+            partial(rebuild_patient, users_dir=users_dir),
+            users_dir=users_dir,
+            host=os.getenv("REPORT_SERVER_HOST", "127.0.0.1"),
+            port=int(os.getenv("REPORT_SERVER_PORT", "8767")),
+            token=os.getenv("REPORT_SERVER_TOKEN") or None,
+            max_jobs=int(os.getenv("REPORT_SERVER_JOBS", "1")),
+        ).start()
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
+    print(f"🩺 Laudos em {server.url}" + (" (token exigido)" if server.token else ""))
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        print("\n🛑 Serviço de laudos interrompido pelo usuário")
+    finally:
+        server.stop()
 
-                            for i, patient in enumerate(new_patients, 1):
-                                try:
-                                    print(f"\n📥 [{i}/{len(new_patients)}] Baixando paciente: {patient}")
 
-                                    # Download patient archive
-                                    response = orthanc.get_patients_id_archive(str(patient))
-                                    zip_path = f"ZIPS/{patient}.zip"
+def watch_folder(folder: str | None = None, user: str | None = None, use_inotify: bool | None = None):
+    """
+    ### 📂 Ingestão por pasta observada
 
-                                    with open(zip_path, "wb") as f:
-                                        f.write(response)
+    Processa os ZIPs depositados em `folder` (por exemplo, via SMB, pelas unidades que não
+    enviam ao Orthanc) assim que terminam de ser gravados — evento de fechamento ou
+    renomeação do inotify, ou tamanho estável na consulta periódica — em vez de esperar um
+    tempo fixo. Os ZIPs já presentes na partida e ainda não processados também entram na fila.
 
-                                    file_size = os.path.getsize(zip_path) / 1024  # KB
-                                    print(f"✅ Arquivo baixado: {zip_path} ({file_size:.1f} KB)")
+    ### 🖥️ Parameters
+    - `folder` (`str | None`): Pasta observada (padrão `WATCH_DIR` ou `ZIPS`).
+    - `user` (`str | None`): Usuário dono dos pacientes (padrão `WATCH_USER` ou `Anders`).
+    - `use_inotify` (`bool | None`): False força a consulta periódica (`WATCH_POLL_INTERVAL`, padrão 2s).
 
-                                    # Process patient
-                                    time.sleep(1)  # Small delay to ensure file is fully written
-                                    result = Extract_Convert_Img(f"{patient}.zip", user)
+    A latência do fechamento do arquivo até o PDF é exposta na etapa `file_to_pdf` de
+    `GET /metrics` (`METRICS_PORT`) e gravada no trace de cada paciente.
+    """
+    from Pipeline import METRICS, PROFILER, MetricsServer
+    from Pipeline.watch import FolderWatcher
+
+    folder = folder or os.getenv("WATCH_DIR", "ZIPS")
+    user = user or os.getenv("WATCH_USER", "Anders")
+    watcher = FolderWatcher(folder, poll_interval=float(os.getenv("WATCH_POLL_INTERVAL", "2")),
+                            use_inotify=use_inotify).start()
+    print(f"📂 Observando {folder}/ ({watcher.backend}) — pacientes do usuário {user}")
+
+    metrics_server = None
+    metrics_port = int(os.getenv("METRICS_PORT", "8766"))
+    METRICS.gauge("pending_files", lambda: len(watcher.events), "Arquivos prontos aguardando processamento.")
+    if metrics_port:
+        metrics_server = MetricsServer(host=os.getenv("METRICS_HOST", "127.0.0.1"), port=metrics_port).start()
+        print(f"📊 Métricas em {metrics_server.url}")
+    PROFILER.install_signal_handlers()
+    sweeper = start_storage_sweeper()
 
-                                    if result:
-                                        print(f"✅ Paciente {patient} processado com sucesso")
-                                        time.sleep(10)
-                                    else:
-                                        print(f"⚠️ Falha no processamento do paciente {patient}")
+    try:
+        # Pasta de extração própria: pode rodar ao lado do monitor do Orthanc
+        watcher.run(Extract_Convert_Img, user, work_dir=os.path.join("Dicoms", "watch"),
+                    require_report=bool(OPENAI_API_KEY))
+    except KeyboardInterrupt:
+        print("\n🛑 Observação da pasta interrompida pelo usuário")
+    finally:
+        watcher.stop()
+        if sweeper:
+            sweeper.stop()
+        if metrics_server:
+            metrics_server.stop()
 
-                                except Exception as e:
-                                    print(f"❌ Erro ao processar paciente {patient}: {e}")
-                                    continue
 
-                            print(f"\n🎉 Processamento concluído para {len(new_patients)} pacientes")
-                            consecutive_errors = 0  # Reset error counter on success
+def orthanc():
+    """
+    ### 🏥 Função Principal do Orthanc PACS
 
-                        # Wait before checking again
-                        sleep_with_while(10)
+    Conecta ao servidor Orthanc PACS e processa novos pacientes assim que seus estudos
+    ficam estáveis.
 
-                except Exception as e:
-                    consecutive_errors += 1
-                    print(f"❌ Erro no ciclo de monitoramento (tentativa {consecutive_errors}/{max_consecutive_errors}): {e}")
+    ### 🔄 Fluxo de Trabalho
+    1. Conecta ao servidor Orthanc (`ORTHANC_URL`, `ORTHANC_USERNAME`, `ORTHANC_PASSWORD`)
+    2. Inicia o receptor de webhook (`ORTHANC_WEBHOOK_PORT`, padrão 8765; 0 desativa), que
+       recebe as notificações `OnStableStudy` do script `Pipeline/orthanc_stable_study.lua`
+    3. Para cada estudo estável recebido, baixa apenas as instâncias ainda não vistas
+       (estado em `Users/state.json`), converte-as e regenera o PDF do estudo
+    4. A cada `ORTHANC_RECONCILE_INTERVAL` segundos (padrão 300 com webhook, 10 sem) lista
+       os pacientes do servidor para recuperar notificações perdidas
+    5. Expõe a duração, os bytes e as contagens de cada etapa em `GET /metrics`
+       (`METRICS_PORT`, padrão 8766; 0 desativa) e grava um trace por estudo em
+       `Users/traces.jsonl` (`METRICS_TRACE_PATH`)
+    6. Perfila sob demanda as etapas de pacientes selecionados (`PROFILE_PATIENTS`,
+       `SIGUSR1`/`SIGUSR2` ou `Users/profile.json`), gravando os perfis em `Profiles/`
+    7. Aplica as políticas de retenção de ZIPs, DICOMs e imagens em segundo plano
+       (`RETENTION_POLICY`, `RETENTION_INTERVAL`; ver `start_storage_sweeper`)
 
-                    if consecutive_errors >= max_consecutive_errors:
-                        print(f"🚨 Muitos erros consecutivos ({consecutive_errors}). Encerrando monitoramento.")
-                        break
+    ### ⚠️ Raises
+    - `ConnectionError`: Se não conseguir conectar ao servidor Orthanc
+    - `Exception`: Para outros erros durante o processamento
+    """
+    from pyorthanc import Orthanc
+    from Pipeline import (
+        METRICS, PROFILER, IngestState, MetricsServer, OrthancPool, StudyEventQueue, StudyIngestor, WebhookServer,
+    )
+
+    url = os.getenv("ORTHANC_URL", "http://ultrassom.ai:8042")
+    username = os.getenv("ORTHANC_USERNAME", "admin")
+    password = os.getenv("ORTHANC_PASSWORD", "admin")
+    print("🏥 Iniciando monitoramento do Orthanc PACS...")
+    print(f"🔗 Conectando ao servidor: {url}")
+
+    try:
+        orthanc = Orthanc(url, username, password)
+        # Downloads de instâncias e consultas de tags em paralelo, com conexões reaproveitadas
+        pool = OrthancPool.from_env(url, username, password)
+        print("✅ Conexão estabelecida com sucesso")
+    except Exception as e:
+        print(f"❌ Erro ao conectar ao Orthanc: {e}")
+        return
 
-                    print(f"⏳ Aguardando antes de tentar novamente...")
-                    sleep_with_while(30)  # Wait longer after error
+    # Garantir que o diretório ZIPS existe
+    os.makedirs("ZIPS", exist_ok=True)
 
-                except KeyboardInterrupt:
-                    print("\n🛑 Monitoramento interrompido pelo usuário")
-                finally:
-                     print("🔚 Encerrando monitoramento do Orthanc PACS")
+    webhook_port = int(os.getenv("ORTHANC_WEBHOOK_PORT", "8765"))
+    reconcile_interval = float(os.getenv("ORTHANC_RECONCILE_INTERVAL", "300" if webhook_port else "10"))
+    ingestor = StudyIngestor(
+        orthanc,
+        load_users(),
+        process_study,
+        IngestState(os.path.join("Users", "state.json")),
+        work_dir="Dicoms",
+        reconcile_interval=reconcile_interval,
+        pool=pool,
+    )
+
+    events = None
+    server = None
+    if webhook_port:
+        events = StudyEventQueue()
+        try:
+            # Só loopback por padrão; para o Orthanc em outra máquina, um host externo e um token
+            server = WebhookServer(
+                events,
+                host=os.getenv("ORTHANC_WEBHOOK_HOST", "127.0.0.1"),
+                port=webhook_port,
+                token=os.getenv("ORTHANC_WEBHOOK_TOKEN") or None,
+            ).start()
+        except ValueError as e:
+            print(f"❌ {e}")
+            pool.close()
+            return
+        print(f"📡 Aguardando notificações OnStableStudy em {server.url}")
+    print(f"🔍 Reconciliação com o PACS a cada {reconcile_interval:.0f}s")
+
+    # Métricas por etapa em formato Prometheus (METRICS_PORT, padrão 8766; 0 desativa)
+    metrics_server = None
+    metrics_port = int(os.getenv("METRICS_PORT", "8766"))
+    METRICS.gauge("orthanc_downloaded_bytes", lambda: ingestor.bytes_downloaded, "Bytes baixados do Orthanc.")
+    if events is not None:
+        METRICS.gauge("pending_studies", lambda: len(events), "Estudos estáveis aguardando processamento.")
+    if metrics_port:
+        metrics_server = MetricsServer(host=os.getenv("METRICS_HOST", "127.0.0.1"), port=metrics_port).start()
+        print(f"📊 Métricas em {metrics_server.url}")
+
+    # Perfil sob demanda: PROFILE_PATIENTS, SIGUSR1/SIGUSR2 ou o arquivo PROFILE_CONTROL
+    if PROFILER.install_signal_handlers():
+        print(f"🔬 Perfil sob demanda: kill -USR1 {os.getpid()} (janela de {PROFILER.window:.0f}s) "
+              f"ou {PROFILER.control_path}")
+    sweeper = start_storage_sweeper()
 
-    # Inicia o loop principal de monitoramento
-    main_loop()
+    try:
+        ingestor.run(events)
+    except KeyboardInterrupt:
+        print("\n🛑 Monitoramento interrompido pelo usuário")
+    finally:
+        if server:
+            server.stop()
+        if sweeper:
+            sweeper.stop()
+        if metrics_server:
+            metrics_server.stop()
+        pool.close()
+        print("🔚 Encerrando monitoramento do Orthanc PACS")
 
 if __name__ == "__main__":
-    orthanc()
\ No newline at end of file
+    orthanc()
@@ -0,0 +1,12 @@
+"""
+🧪 Configuração dos testes
+Os testes importam os pacotes do projeto (`OCR`, `Pipeline`, `DicomManager`, ...) a partir
+da raiz do repositório, tanto com `pytest` quanto com `python -m pytest`.
+"""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
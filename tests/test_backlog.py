@@ -0,0 +1,35 @@
+"""
+🧪 Testes do resultado de cada job do `BacklogProcessor` (`_run_job`).
+"""
+
+import os
+import time
+
+from Pipeline.backlog import _run_job
+
+
+def _process(pdf, stale):
+    def process(file, user, zip_dir, work_dir):
+        os.makedirs(pdf.parent.parent / "Images", exist_ok=True)
+        pdf.parent.mkdir(parents=True, exist_ok=True)
+        pdf.write_bytes(b"%PDF-1.4\n")
+        if stale:
+            old = time.time() - 3600
+            os.utime(pdf, (old, old))
+        return str(pdf)
+
+    return process
+
+
+def test_fresh_pdf_is_success(tmp_path):
+    pdf = tmp_path / "PACIENTE" / "Report" / "PACIENTE.pdf"
+    result = _run_job(_process(pdf, stale=False), "a.zip", "Teste", str(tmp_path), str(tmp_path / "work"))
+    assert result["ok"] and result["pdf"] == str(pdf)
+
+
+def test_pdf_from_previous_run_is_failure(tmp_path):
+    # Ex.: `Convert_Report` que não regenerou o PDF, mas devolveu o caminho de um já existente
+    pdf = tmp_path / "PACIENTE" / "Report" / "PACIENTE.pdf"
+    result = _run_job(_process(pdf, stale=True), "a.zip", "Teste", str(tmp_path), str(tmp_path / "work"))
+    assert not result["ok"]
+    assert result["error"] == "PDF não atualizado"
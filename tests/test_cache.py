@@ -0,0 +1,62 @@
+"""
+🧪 Testes do cache de respostas dos modelos (`ResultCache`): chaves e remoção das entradas
+usadas há mais tempo.
+"""
+
+import itertools
+from types import SimpleNamespace
+
+import pytest
+
+from OCR import cache as cache_module
+from OCR.cache import ResultCache, hash_files, make_key
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # Relógio que sempre avança: a ordem de uso não depende da resolução do sistema
+    ticks = itertools.count(1_000_000)
+    monkeypatch.setattr(cache_module, "time", SimpleNamespace(time=lambda: float(next(ticks))))
+
+
+def test_make_key_separates_parts():
+    assert make_key("ab", "c") != make_key("a", "bc")
+    assert make_key("ocr", b"x") == make_key("ocr", "x")
+
+
+def test_hash_files_depends_on_content_and_order(tmp_path):
+    a, b = tmp_path / "a", tmp_path / "b"
+    a.write_bytes(b"1")
+    b.write_bytes(b"2")
+    assert hash_files([a, b]) != hash_files([b, a])
+    assert hash_files([a]) == hash_files([a])
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, clock):
+    cache = ResultCache(str(tmp_path), max_bytes=300)
+    for key in "abc":
+        cache.put(key, key * 100)
+    assert cache.get("a") == "a" * 100
+
+    # 400 bytes: removidas as menos usadas até 90% do limite; "a" foi lida por último
+    cache.put("d", "d" * 100)
+    assert cache.get("b") is None and cache.get("c") is None
+    assert cache.get("a") == "a" * 100 and cache.get("d") == "d" * 100
+    stats = cache.stats()
+    assert (stats["entries"], stats["bytes"], stats["evictions"]) == (2, 200, 2)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["a.txt", "d.txt"]
+
+
+def test_overwrite_does_not_count_twice(tmp_path, clock):
+    cache = ResultCache(str(tmp_path), max_bytes=300)
+    cache.put("a", "x" * 200)
+    cache.put("a", "y" * 200)
+    assert cache.stats()["bytes"] == 200 and cache.stats()["evictions"] == 0
+    assert cache.get("a") == "y" * 200
+
+
+def test_index_is_rebuilt_from_disk(tmp_path):
+    ResultCache(str(tmp_path)).put("a", "texto")
+    reopened = ResultCache(str(tmp_path))
+    assert reopened.stats()["entries"] == 1 and reopened.stats()["bytes"] == 5
+    assert reopened.get("a") == "texto"
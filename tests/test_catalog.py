@@ -0,0 +1,74 @@
+"""
+🧪 Testes do catálogo de pacientes (`PatientCatalog`): busca por nome, UID e datas, e
+`backfill` das pastas já existentes.
+"""
+
+import json
+
+import pytest
+
+from Pipeline.catalog import PatientCatalog, name_key
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    catalog = PatientCatalog(str(tmp_path / "catalog.db"))
+    yield catalog
+    catalog.close()
+
+
+def test_name_key():
+    assert name_key("José^da  Silva") == "JOSE DA SILVA"
+
+
+def test_search_by_name_ignores_accents_and_case(catalog):
+    catalog.record("Anders", "JOSÉ DA SILVA", patient="José^da Silva", study_date="20250604")
+    catalog.record("Anders", "JOSE DA SILVA 20251020", patient="JOSE DA SILVA", study_date="20251020")
+    catalog.record("Anders", "JOSEFA", patient="Josefa", study_date="20250101")
+    catalog.record("Anders", "MARIA", patient="Maria", study_date="20250101")
+
+    assert [r["folder"] for r in catalog.search(name="josé da")] == ["JOSE DA SILVA 20251020", "JOSÉ DA SILVA"]
+    # Prefixo: "jose" também encontra "Josefa"; o mais recente primeiro para o mesmo nome
+    assert [r["folder"] for r in catalog.search(name="JOSE")] == [
+        "JOSE DA SILVA 20251020", "JOSÉ DA SILVA", "JOSEFA"]
+    assert catalog.search(name="silva") == []
+
+
+def test_search_respects_limit_and_filters(catalog):
+    catalog.record_many(
+        {"user": "Anders" if k % 2 else "Outro", "folder": f"PACIENTE {k:02d}", "patient": f"Paciente {k:02d}",
+         "study_uid": f"1.2.{k}", "study_date": f"202501{k + 1:02d}"}
+        for k in range(10)
+    )
+    assert len(catalog.search(name="paciente", limit=3)) == 3
+    assert len(catalog.search(limit=4)) == 4
+    assert [r["folder"] for r in catalog.search(study_uid="1.2.7")] == ["PACIENTE 07"]
+    assert [r["study_date"] for r in catalog.search(date_from="2025-01-03", date_to="20250105")] == [
+        "20250105", "20250104", "20250103"]
+    assert {r["user"] for r in catalog.search(user="Anders")} == {"Anders"}
+    with pytest.raises(ValueError):
+        catalog.search(date_from="ontem")
+
+
+def test_backfill_reads_existing_folders(tmp_path, catalog):
+    patient = tmp_path / "Users" / "Anders" / "Patients" / "JOSE DA SILVA"
+    (patient / "Report").mkdir(parents=True)
+    (patient / "Images").mkdir()
+    (patient / "Report" / "findings.json").write_text(json.dumps(
+        {"study": {"patient": "José da Silva", "date": "20250604", "study_uid": "1.2.3", "exam": "US"}}))
+    (patient / "Report" / "JOSE DA SILVA.pdf").write_bytes(b"%PDF-1.4\n")
+    for k in range(3):
+        (patient / "Images" / f"IM{k}.jpeg").write_bytes(b"")
+    # Pasta sem findings.json: o nome da pasta vira o nome do paciente
+    (tmp_path / "Users" / "Anders" / "Patients" / "MARIA").mkdir()
+    (tmp_path / "Users" / "storage_index.json").write_text("{}")
+
+    assert catalog.backfill(str(tmp_path / "Users"), batch=1) == 2
+    row = catalog.get("Anders", "JOSE DA SILVA")
+    assert (row["patient"], row["study_uid"], row["study_date"], row["images"]) == ("José da Silva", "1.2.3", "20250604", 3)
+    assert row["pdf"].endswith("JOSE DA SILVA.pdf") and row["report_pdf"] is None
+    assert catalog.get("Anders", "MARIA")["name_key"] == "MARIA"
+
+    # Repetir não duplica
+    assert catalog.backfill(str(tmp_path / "Users")) == 2
+    assert catalog.count() == 2
@@ -0,0 +1,38 @@
+"""
+🧪 Testes do filtro de quadros quase idênticos (`FrameDeduplicator`).
+"""
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from DicomManager.dedup import FrameDeduplicator
+
+
+def _frame(path, base, text, rng):
+    pixels = (base + rng.normal(0, 2, size=base.shape)).clip(0, 255).astype(np.uint8)
+    img = Image.fromarray(np.stack([pixels] * 3, axis=-1))
+    try:
+        font = ImageFont.load_default(size=10)
+    except TypeError:
+        font = ImageFont.load_default()
+    ImageDraw.Draw(img).text((16, 16), text, fill=(255, 255, 255), font=font)
+    img.save(path, "JPEG", quality=95)
+    return path
+
+
+def test_caliper_text_keeps_frames_apart(tmp_path):
+    rng = np.random.default_rng(7)
+    base = rng.gamma(1.5, 40, size=(768, 1024))
+    first = _frame(tmp_path / "1.jpeg", base, "D1 2.31 cm", rng)
+    other = _frame(tmp_path / "2.jpeg", base, "D1 2.81 cm", rng)
+    again = _frame(tmp_path / "3.jpeg", base, "D1 2.31 cm", rng)
+
+    clusters = FrameDeduplicator().cluster([first, other, again])
+    assert clusters == [[first, again], [other]]
+
+
+def test_detail_threshold_from_env(monkeypatch):
+    monkeypatch.delenv("DEDUP_MAX_DETAIL_DIFF", raising=False)
+    assert FrameDeduplicator.from_env().max_detail_diff == 32
+    monkeypatch.setenv("DEDUP_MAX_DETAIL_DIFF", "80")
+    assert FrameDeduplicator.from_env().max_detail_diff == 80
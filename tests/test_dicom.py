@@ -0,0 +1,62 @@
+"""
+🧪 Testes do mapeamento em memória do PixelData (`DICOM2JPEG.memmap_pixels`) e da
+conversão em processos quando um worker morre.
+"""
+
+import os
+
+import numpy as np
+import pydicom
+import pytest
+
+from Benchmarks.synthetic_dicom import make_study, make_us_image
+from DicomManager import DICOM as dicom_module
+from DicomManager.DICOM import DICOM2JPEG
+
+
+def _mono16(path, bits_stored):
+    make_us_image(path, rows=256, cols=256, rgb=False)
+    ds = pydicom.dcmread(path)
+    pixels = ds.pixel_array.astype(np.uint16)
+    # Lixo nos bits acima de BitsStored, como alguns equipamentos gravam
+    pixels |= 0xF000
+    ds.BitsAllocated, ds.BitsStored, ds.HighBit = 16, bits_stored, bits_stored - 1
+    ds.PixelData = pixels.tobytes()
+    ds.save_as(path, enforce_file_format=True)
+    return path
+
+
+def _deferred(path):
+    return pydicom.dcmread(path, defer_size=DICOM2JPEG.DEFER_SIZE)
+
+
+def test_full_width_pixels_are_mapped(tmp_path):
+    path = _mono16(tmp_path / "16.dcm", 16)
+    pixels = DICOM2JPEG.memmap_pixels(_deferred(path), path)
+    assert isinstance(pixels, np.memmap)
+    assert np.array_equal(pixels, pydicom.dcmread(path).pixel_array)
+
+
+def test_unsigned_bits_stored_below_allocated_falls_back(tmp_path):
+    path = _mono16(tmp_path / "12.dcm", 12)
+    assert DICOM2JPEG.memmap_pixels(_deferred(path), path) is None
+    assert pydicom.dcmread(path).pixel_array.max() < 4096
+
+
+_original_worker = dicom_module._convert_in_worker
+
+
+def _crashing_worker(file: str) -> dict:
+    # Um worker morto (como pelo OOM killer) no meio da conversão
+    if file == "IMG0002.dcm":
+        os._exit(1)
+    return _original_worker(file)
+
+
+@pytest.mark.parametrize("transport", ["shm", "pickle"])
+def test_broken_pool_falls_back_to_serial(tmp_path, monkeypatch, transport):
+    make_study(tmp_path / "dcm", n_images=6, rows=64, cols=80)
+    monkeypatch.setattr(dicom_module, "_convert_in_worker", _crashing_worker)
+    converter = DICOM2JPEG(str(tmp_path / "dcm"), str(tmp_path / "jpeg"), workers=2, transport=transport)
+    assert converter.converter()
+    assert sorted(os.listdir(tmp_path / "jpeg")) == [f"IMG{i:04d}.jpeg" for i in range(6)]
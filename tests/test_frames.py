@@ -0,0 +1,68 @@
+"""
+🧪 Testes do anel de quadros em memória compartilhada (`FrameRing`).
+"""
+
+import queue
+from multiprocessing import shared_memory
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from DicomManager.frames import FrameRing
+
+
+@pytest.fixture
+def ring():
+    ring = FrameRing.create(FrameRing.slot_size(48, 64), slots=2)
+    yield ring
+    if ring.shm.buf is not None:
+        ring.close()
+
+
+def _rgb(rows: int, cols: int, seed: int = 0) -> Image.Image:
+    pixels = np.random.default_rng(seed).integers(0, 256, (rows, cols, 3), dtype=np.uint8)
+    return Image.fromarray(pixels, "RGB")
+
+
+def test_frame_round_trip_through_an_attached_ring(ring):
+    worker = FrameRing.attach(*ring.spec)
+    slot = worker.acquire(timeout=1)
+    img = _rgb(40, 64)
+    size = worker.write(slot, img)
+    worker.close()
+    assert size == (40, 64)
+
+    view = ring.image(slot, size)
+    try:
+        assert view.mode == "RGBX" and view.size == (64, 40)
+        assert np.array_equal(np.asarray(view.convert("RGB")), np.asarray(img))
+    finally:
+        del view
+        ring.release(slot)
+
+
+def test_full_ring_blocks_until_a_slot_is_released(ring):
+    slots = {ring.acquire(timeout=1), ring.acquire(timeout=1)}
+    assert slots == {0, 1}
+    with pytest.raises(queue.Empty):
+        ring.acquire(timeout=0.1)
+    ring.release(1)
+    assert ring.acquire(timeout=1) == 1
+
+
+def test_frame_larger_than_the_slot_is_rejected(ring):
+    with pytest.raises(ValueError):
+        ring.write(0, _rgb(64, 64))
+
+
+def test_close_unlinks_even_with_an_open_view(ring):
+    name = ring.shm.name
+    view = ring.image(0, (48, 64))
+    # Visão ainda aberta: o `close` falha, mas o segmento é removido
+    with pytest.raises(BufferError):
+        ring.close()
+    del view
+    ring.shm.close()
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=name)
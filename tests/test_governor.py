@@ -0,0 +1,188 @@
+"""
+🧪 Testes do `ResourceGovernor`: estimativa de memória pelos cabeçalhos, admissão pelo teto
+e um teste de estresse do `BacklogProcessor` com jobs que alocam o próprio pico estimado.
+"""
+
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pydicom
+import pytest
+
+from Benchmarks.synthetic_dicom import make_study, make_us_image
+from Pipeline import governor as governor_module
+from Pipeline.backlog import ArchiveLedger, BacklogProcessor
+from Pipeline.governor import JOB_BYTES, ResourceGovernor, estimate_zip, parse_size, tree_rss, tree_usage
+from Pipeline.metrics import rss_bytes
+
+MB = 1024**2
+SIDE = 2560
+
+
+def _make_zip(path: Path, name: str, dicoms: list) -> Path:
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED, compresslevel=1) as archive:
+        for k, dicom in enumerate(dicoms):
+            archive.write(dicom, f"20250604101010 {name}/20250604/CT/IM{k:04d}.dcm")
+    return path
+
+
+def _large_dicom(path: Path) -> Path:
+    # Quadro monocromático de 12 bits em 16 bits alocados, sem compressão
+    make_us_image(path, rows=SIDE, cols=SIDE, rgb=False)
+    ds = pydicom.dcmread(path)
+    pixels = ds.pixel_array.astype(np.uint16) * 16
+    ds.BitsAllocated, ds.BitsStored, ds.HighBit = 16, 12, 11
+    ds.PixelData = pixels.tobytes()
+    ds.save_as(path, enforce_file_format=True)
+    return path
+
+
+def _allocate_estimate(file: str, user: str, zip_dir: str, work_dir: str) -> str:
+    # Job falso: ocupa exatamente o pico estimado do ZIP por um instante
+    block = np.ones(estimate_zip(os.path.join(zip_dir, file)) // 8)
+    time.sleep(0.4)
+    del block
+    out = Path(zip_dir).parent / "out" / file
+    (out / "Images").mkdir(parents=True, exist_ok=True)
+    (out / "Images" / "IM0000.jpeg").write_bytes(b"")
+    (out / "Report").mkdir(exist_ok=True)
+    pdf = out / "Report" / f"{file}.pdf"
+    pdf.write_bytes(b"%PDF-1.4\n")
+    return str(pdf)
+
+
+class _Sampler(threading.Thread):
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.peak = 0
+        self.done = threading.Event()
+
+    def run(self):
+        while not self.done.wait(0.01):
+            self.peak = max(self.peak, tree_rss() or 0)
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("4G", 4 * 1024**3), ("512M", 512 * MB), ("1.5GB", int(1.5 * 1024**3)), ("2048", 2048),
+    (1024, 1024), ("", None), (None, None),
+])
+def test_parse_size(value, expected):
+    assert parse_size(value) == expected
+
+
+def test_parse_size_invalid():
+    with pytest.raises(ValueError):
+        parse_size("muito")
+
+
+def test_tree_usage_counts_grandchildren():
+    # Worker → pool de conversão: o neto ocupa a memória, o filho direto quase nada
+    grandchild = "import time; block = b'x' * (96 * 1024**2); print(flush=True); time.sleep(30)"
+    child = (f"import subprocess, sys; p = subprocess.Popen([sys.executable, '-c', {grandchild!r}], "
+             "stdout=subprocess.PIPE); p.stdout.readline(); print(p.pid, flush=True); p.wait()")
+    before, children = tree_usage()
+    proc = subprocess.Popen([sys.executable, "-c", child], stdout=subprocess.PIPE, text=True)
+    try:
+        grandchild_pid = int(proc.stdout.readline())
+        try:
+            total, direct = tree_usage()
+            assert direct == children + 1
+            assert total - before >= 90 * MB
+        finally:
+            os.kill(grandchild_pid, signal.SIGKILL)
+    finally:
+        proc.wait(timeout=10)
+
+
+def test_estimate_from_headers(tmp_path):
+    large = _make_zip(tmp_path / "large.zip", "LARGE", [_large_dicom(tmp_path / "L.dcm")])
+    small = _make_zip(tmp_path / "small.zip", "SMALL",
+                      make_study(tmp_path / "small", n_images=2, rows=300, cols=400, compressed=True))
+    # 16 bits: pixel data (2 bytes) + dois temporários float64 (16 bytes) por amostra
+    assert estimate_zip(str(large)) == JOB_BYTES + SIDE * SIDE * (2 + 16)
+    assert estimate_zip(str(small)) < estimate_zip(str(large)) / 4
+    assert ResourceGovernor(memory_limit=0).estimate(str(tmp_path / "missing.zip")) == 0
+
+
+def test_admission_respects_limit(monkeypatch):
+    monkeypatch.setattr(governor_module, "rss_bytes", lambda: 0)
+    governor = ResourceGovernor(memory_limit=100 * MB, max_workers=4, worker_bytes=0)
+    governor.measure = lambda: 0
+
+    assert governor.admit(60 * MB)
+    assert not governor.admit(60 * MB)
+    assert governor.admit(30 * MB)
+    assert not governor.admit(20 * MB)
+    governor.release(60 * MB)
+    assert governor.admit(60 * MB)
+    assert governor.peak_concurrency == 2
+
+
+def test_lone_job_always_admitted(monkeypatch, capsys):
+    monkeypatch.setattr(governor_module, "rss_bytes", lambda: 0)
+    governor = ResourceGovernor(memory_limit=10 * MB, max_workers=2, worker_bytes=0)
+    assert governor.admit(50 * MB)
+    assert "excede sozinho o teto" in capsys.readouterr().out
+    assert not governor.admit(1)
+
+
+def test_max_workers_caps_concurrency():
+    governor = ResourceGovernor(memory_limit=0, max_workers=2)
+    assert governor.admit(MB) and governor.admit(MB)
+    assert not governor.has_slot()
+    assert not governor.admit(MB)
+
+
+@pytest.fixture(scope="module")
+def backlog(tmp_path_factory):
+    tmp = tmp_path_factory.mktemp("governor")
+    zip_dir = tmp / "ZIPS"
+    zip_dir.mkdir()
+    large = _large_dicom(tmp / "L.dcm")
+    for i in range(4):
+        _make_zip(zip_dir / f"LARGE {i:02d}.zip", f"LARGE {i:02d}", [large])
+    for i in range(4):
+        dicoms = make_study(tmp / f"s{i}", n_images=1, rows=200, cols=300, compressed=True, prefix=f"S{i}")
+        _make_zip(zip_dir / f"SMALL {i:02d}.zip", f"SMALL {i:02d}", dicoms)
+    return tmp
+
+
+def _run(tmp: Path, governor: ResourceGovernor) -> tuple[dict, int]:
+    sampler = _Sampler()
+    sampler.start()
+    summary = BacklogProcessor(_allocate_estimate, "Teste", zip_dir=str(tmp / "ZIPS"), work_root=str(tmp / "work"),
+                               force=True, log_path=None, governor=governor, ledger=ArchiveLedger("")).run()
+    sampler.done.set()
+    sampler.join()
+    return summary, sampler.peak
+
+
+def test_stress_peak_stays_under_limit(backlog, capsys):
+    estimate = estimate_zip(str(backlog / "ZIPS" / "LARGE 00.zip"))
+    with ProcessPoolExecutor(max_workers=1) as probe:
+        worker = probe.submit(rss_bytes).result()
+    # Cabem os quatro workers e dois jobs grandes, não os quatro jobs
+    limit = tree_rss() + 4 * worker + 5 * estimate // 2
+
+    ungoverned = ResourceGovernor(memory_limit=0, max_workers=4)
+    ungoverned.adapt = lambda queued: ungoverned.target
+    summary, ungoverned_peak = _run(backlog, ungoverned)
+    assert not summary["failed"]
+
+    governor = ResourceGovernor(memory_limit=limit, max_workers=4, interval=0.05)
+    summary, peak = _run(backlog, governor)
+    capsys.readouterr()
+    assert not summary["failed"]
+    assert summary["processed"] == 8
+    # Sem governador, os quatro jobs grandes juntos passam do teto; com ele, o pico fica abaixo
+    assert ungoverned_peak > limit
+    assert peak <= limit
+    assert governor.peak_concurrency >= 2
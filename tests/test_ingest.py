@@ -0,0 +1,246 @@
+"""
+🧪 Testes da ingestão incremental por estudo (`StudyIngestor`) contra o Orthanc simulado.
+"""
+
+import os
+import time
+from pathlib import Path
+
+import pytest
+from pyorthanc import Orthanc
+
+from Benchmarks.fake_orthanc import FakeOrthancServer
+from Benchmarks.synthetic_dicom import make_study
+from Pipeline.ingest import StudyIngestor
+from Pipeline.orthanc_client import OrthancPool
+from Pipeline.state import IngestState
+
+AET = "TEST_AET"
+USERS = {"Teste": {"AET": AET, "patients": [], "patients_names": []}}
+
+
+@pytest.fixture(autouse=True)
+def _no_traces(monkeypatch):
+    monkeypatch.setenv("METRICS_TRACE_PATH", "")
+
+
+@pytest.fixture
+def pacs():
+    with FakeOrthancServer() as server:
+        yield server
+
+
+def _wait_stable(pacs: FakeOrthancServer, study_id: str, since: float) -> None:
+    deadline = time.monotonic() + 10
+    while pacs.stable_at.get(study_id, 0) <= since:
+        assert time.monotonic() < deadline, "estudo não ficou estável"
+        time.sleep(0.01)
+
+
+class Recorder:
+    """Processamento falso: guarda o que recebeu e confere os arquivos no momento da chamada."""
+
+    def __init__(self, fail: bool = False):
+        self.calls = []
+        self.fail = fail
+
+    def __call__(self, user: str, name: str, paths: list) -> None:
+        assert all(os.path.exists(p) for p in paths)
+        assert len({os.path.dirname(p) for p in paths}) == 1
+        self.calls.append({"user": user, "name": name, "paths": list(paths),
+                           "sizes": sum(os.path.getsize(p) for p in paths),
+                           "dir": os.path.dirname(paths[0])})
+        if self.fail:
+            raise RuntimeError("falha simulada")
+
+
+@pytest.mark.parametrize("pooled", [False, True], ids=["serial", "pool"])
+def test_incremental_sync(tmp_path, pacs, pooled):
+    work_dir = tmp_path / "Dicoms"
+    first = make_study(tmp_path / "exam1", n_images=4, compressed=True, prefix="A")
+    extra = make_study(tmp_path / "extra", n_images=2, compressed=True, prefix="B")
+    follow_up = make_study(tmp_path / "exam2", n_images=3, compressed=True, prefix="C")
+    process = Recorder()
+    pool = OrthancPool(pacs.url, max_concurrency=4) if pooled else None
+    ingestor = StudyIngestor(Orthanc(pacs.url), USERS, process, IngestState(None),
+                             work_dir=str(work_dir), pool=pool)
+    try:
+        # 1º exame: todas as instâncias, na pasta com o nome do paciente
+        since = time.monotonic()
+        patient, study = pacs.add_study(first, "PACIENTE INCREMENTAL", aet=AET)
+        _wait_stable(pacs, study, since)
+        assert ingestor.reconcile() == 1
+        assert [(c["user"], c["name"], len(c["paths"])) for c in process.calls] == [
+            ("Teste", "PACIENTE INCREMENTAL", 4)]
+        assert ingestor.bytes_downloaded == sum(p.stat().st_size for p in first)
+
+        # Sem mudanças: nada é baixado
+        assert ingestor.reconcile() == 0
+        assert len(process.calls) == 1
+
+        # Instâncias tardias: só elas são baixadas, para a mesma pasta de saída
+        before = ingestor.bytes_downloaded
+        since = time.monotonic()
+        pacs.add_instances(study, extra)
+        _wait_stable(pacs, study, since)
+        assert ingestor.reconcile() == 1
+        late = process.calls[-1]
+        assert late["name"] == "PACIENTE INCREMENTAL" and len(late["paths"]) == 2
+        assert ingestor.bytes_downloaded - before == late["sizes"] == sum(p.stat().st_size for p in extra)
+
+        # Exame de retorno: nova pasta com a data do exame
+        since = time.monotonic()
+        _, study2 = pacs.add_study(follow_up, "PACIENTE INCREMENTAL", aet=AET,
+                                   patient_id=patient, study_date="20251020")
+        _wait_stable(pacs, study2, since)
+        assert ingestor.reconcile() == 1
+        assert process.calls[-1]["name"] == "PACIENTE INCREMENTAL 20251020"
+        assert len(process.calls[-1]["paths"]) == 3
+    finally:
+        if pool:
+            pool.close()
+
+    # Cada estudo baixado em sua própria pasta de trabalho, sempre removida
+    assert len({c["dir"] for c in process.calls}) == len(process.calls)
+    assert all(Path(c["dir"]).parent == work_dir for c in process.calls)
+    assert list(work_dir.iterdir()) == []
+
+
+def test_other_aet_is_ignored(tmp_path, pacs):
+    process = Recorder()
+    ingestor = StudyIngestor(Orthanc(pacs.url), USERS, process, IngestState(None), work_dir=str(tmp_path))
+    since = time.monotonic()
+    _, study = pacs.add_study(make_study(tmp_path / "other", n_images=1), "OUTRO", aet="OTHER_AET")
+    _wait_stable(pacs, study, since)
+    assert ingestor.reconcile() == 0
+    assert process.calls == []
+
+
+def test_failed_processing_is_retried(tmp_path, pacs):
+    work_dir = tmp_path / "Dicoms"
+    process = Recorder(fail=True)
+    ingestor = StudyIngestor(Orthanc(pacs.url), USERS, process, IngestState(None), work_dir=str(work_dir))
+    since = time.monotonic()
+    _, study = pacs.add_study(make_study(tmp_path / "exam", n_images=2), "PACIENTE FALHA", aet=AET)
+    _wait_stable(pacs, study, since)
+
+    assert ingestor.reconcile() == 0
+    assert list(work_dir.iterdir()) == []
+    # Sem registro do estudo: as mesmas instâncias são baixadas de novo
+    process.fail = False
+    assert ingestor.reconcile() == 1
+    assert [len(c["paths"]) for c in process.calls] == [2, 2]
+    assert list(work_dir.iterdir()) == []
+
+
+@pytest.fixture
+def pipeline_user(monkeypatch):
+    # `MkPDF` grava sempre em `Users/` na raiz do projeto: usuário descartável, removido ao fim
+    import shutil
+    import uuid
+
+    import main
+    from Pipeline.catalog import CATALOG
+
+    monkeypatch.chdir(Path(main.__file__).parent)
+    monkeypatch.setattr(main, "OPENAI_API_KEY", None)
+    monkeypatch.setattr(CATALOG, "path", None)
+    user = f"pytest-{uuid.uuid4().hex[:8]}"
+    yield user
+    shutil.rmtree(Path("Users", user), ignore_errors=True)
+
+
+def test_corrupt_instances_are_not_recorded(tmp_path, pacs, pipeline_user):
+    # Caminho real: `main.process_study` → `Convert_Report` na pasta de trabalho do estudo
+    import main
+
+    corrupt = tmp_path / "corrupt.dcm"
+    corrupt.write_bytes(b"\0" * 128 + b"DICM" + b"lixo" * 64)
+    state = IngestState(None)
+    users = {pipeline_user: {"AET": AET, "patients": [], "patients_names": []}}
+    ingestor = StudyIngestor(Orthanc(pacs.url), users, main.process_study, state, work_dir=str(tmp_path / "Dicoms"))
+    reports = Path("Users", pipeline_user, "Patients")
+    since = time.monotonic()
+    _, study = pacs.add_study([corrupt], "PACIENTE CORROMPIDO", aet=AET)
+    _wait_stable(pacs, study, since)
+
+    assert ingestor.reconcile() == 0
+    assert state.study(study) is None
+    assert not list(reports.glob("*/Report/*.pdf"))
+
+    # Uma instância válida no mesmo estudo: convertida e registrada junto com a corrompida
+    since = time.monotonic()
+    pacs.add_instances(study, make_study(tmp_path / "exam", n_images=1, rows=120, cols=160))
+    _wait_stable(pacs, study, since)
+    assert ingestor.reconcile() == 1
+    assert len(state.study(study)["instances"]) == 2
+    assert len(list(reports.glob("*/Report/*.pdf"))) == 1
+
+
+class _FakeOrthanc:
+    """Só o que `_migrate` consulta: as instâncias de cada estudo."""
+
+    def get_studies_id_instances(self, study_id):
+        return [{"ID": f"{study_id}-1"}]
+
+
+@pytest.mark.parametrize("patient_name, expected", [
+    ("DOE^JOHN", "DOE JOHN"),
+    ("..", "patient-1"),
+    (".", "patient-1"),
+    ("", "patient-1"),
+    ("../../etc", ".._.._etc"),
+    ("A\\B/C\x00D\tE", "A_B_C_D_E"),
+    ("JOSÉ^DA SILVA", "JOSÉ DA SILVA"),
+])
+def test_folder_name_is_a_safe_path_component(patient_name, expected):
+    ingestor = StudyIngestor(None, USERS, Recorder(), IngestState(None))
+    study = {"ID": "study-1", "PatientMainDicomTags": {"PatientName": patient_name}, "MainDicomTags": {}}
+    assert ingestor._folder_name("patient-1", study) == expected
+
+
+def test_migrated_study_keeps_the_legacy_folder():
+    users = {"Teste": {"AET": AET, "patients": ["patient-1"], "patients_names": []}}
+    state = IngestState(None)
+    ingestor = StudyIngestor(_FakeOrthanc(), users, Recorder(), state)
+    study = {"ID": "study-1", "ParentPatient": "patient-1", "LastUpdate": "20250101T000000",
+             "PatientMainDicomTags": {"PatientName": "DOE^JOHN"}, "MainDicomTags": {}}
+    ingestor._migrate([study])
+    # Mesmo nome que um estudo novo receberia: instâncias tardias não criam uma segunda pasta
+    assert state.study("study-1")["name"] == "DOE JOHN"
+
+
+def _study(study_id: str, patient: str, name: str, date: str = "") -> dict:
+    return {"ID": study_id, "ParentPatient": patient, "LastUpdate": "20250101T000000",
+            "PatientMainDicomTags": {"PatientName": name}, "MainDicomTags": {"StudyDate": date}}
+
+
+def test_same_name_patients_get_separate_folders():
+    state = IngestState(None)
+    ingestor = StudyIngestor(None, USERS, Recorder(), state)
+    first = _study("study-1", "pat-1aaaaaa", "MARIA^SILVA", "20250101")
+    assert ingestor._folder_name("pat-1aaaaaa", first) == "MARIA SILVA"
+    state.record("study-1", "Teste", "pat-1aaaaaa", "MARIA SILVA", {"i1"}, None)
+
+    # Homônimo: nunca a pasta (nem as imagens e achados) do outro paciente
+    other = _study("study-2", "pat-2bbbbbb", "MARIA^SILVA", "20250101")
+    assert ingestor._folder_name("pat-2bbbbbb", other) == "MARIA SILVA pat-2bbb"
+    state.record("study-2", "Teste", "pat-2bbbbbb", "MARIA SILVA pat-2bbb", {"i2"}, None)
+
+    # Retorno do primeiro paciente na mesma data já usada pelo homônimo: continua único
+    follow_up = _study("study-3", "pat-1aaaaaa", "MARIA^SILVA", "20250101")
+    assert ingestor._folder_name("pat-1aaaaaa", follow_up) == "MARIA SILVA 20250101"
+    assert len(state.folders()) == 2
+
+
+def test_migrated_same_name_patients_get_separate_folders():
+    users = {"Teste": {"AET": AET, "patients": ["pat-1aaaaaa", "pat-2bbbbbb"], "patients_names": []}}
+    state = IngestState(None)
+    ingestor = StudyIngestor(_FakeOrthanc(), users, Recorder(), state)
+    ingestor._migrate([
+        _study("study-1", "pat-1aaaaaa", "MARIA^SILVA"),
+        _study("study-2", "pat-2bbbbbb", "MARIA^SILVA"),
+        _study("study-3", "pat-1aaaaaa", "MARIA^SILVA", "20250601"),
+    ])
+    assert state.study("study-1")["name"] == state.study("study-3")["name"] == "MARIA SILVA"
+    assert state.study("study-2")["name"] == "MARIA SILVA pat-2bbb"
@@ -0,0 +1,76 @@
+"""
+🧪 Testes do markdown inline (`render_inline`) e do parser de blocos (`parse_markdown`).
+"""
+
+import pytest
+
+from OCR.markdown_ast import parse_markdown, render_inline
+
+GOLDEN = [
+    # Ênfases simples e aninhadas
+    ("**Fígado:** *normal* e **baço** normal", "<b>Fígado:</b> <i>normal</i> e <b>baço</b> normal"),
+    ("__negrito__ e _itálico_", "<b>negrito</b> e <i>itálico</i>"),
+    ("***ambos***", "<b><i>ambos</i></b>"),
+    ("*a **b***", "<i>a <b>b</b></i>"),
+    ("**a *b***", "<b>a <i>b</i></b>"),
+    ("_a __b___", "<i>a <b>b</b></i>"),
+    ("**a** **b**", "<b>a</b> <b>b</b>"),
+    # Ênfases sobrepostas: a primeira que fecha vence, a outra volta a ser texto
+    ("*a **b* c**", "<i>a **b</i> c**"),
+    ("**bold *ital** rest*", "<b>bold *ital</b> rest*"),
+    # Delimitadores sem par são texto literal
+    ("**sem fechamento", "**sem fechamento"),
+    ("*a**", "<i>a</i>*"),
+    ("a * b * c", "a * b * c"),
+    ("5 * 3 ** 2", "5 * 3 ** 2"),
+    ("***", "***"),
+    ("nome_de_arquivo e __init__.py", "nome_de_arquivo e <b>init</b>.py"),
+    # Código inline não interpreta ênfases e escapa HTML
+    ("`a *b*` *c*", '<font face="Courier">a *b*</font> <i>c</i>'),
+    ("`sem fim *x*", "`sem fim <i>x</i>"),
+    ("x < y & *z*", "x &lt; y &amp; <i>z</i>"),
+]
+
+
+@pytest.mark.parametrize("text, expected", GOLDEN)
+def test_render_inline(text, expected):
+    assert render_inline(text) == expected
+
+
+@pytest.mark.parametrize("text", [t for t, _ in GOLDEN])
+def test_render_inline_tags_balanced(text):
+    html = render_inline(text)
+    stack = []
+    for i in range(len(html)):
+        for tag in ("b", "i", "font"):
+            if html.startswith(f"<{tag}>", i) or html.startswith(f"<{tag} ", i):
+                stack.append(tag)
+            elif html.startswith(f"</{tag}>", i):
+                assert stack and stack.pop() == tag, html
+    assert not stack, html
+
+
+def test_parse_markdown_blocks():
+    md = (
+        "# Laudo\n"
+        "Paciente: **FULANO**\n"
+        "Exame: US\n"
+        "\n"
+        "- Fígado *normal*\n"
+        "  com contornos regulares\n"
+        "- Baço normal\n"
+        "\n"
+        "| Órgão | Medida |\n"
+        "|---|---|\n"
+        "| Rim | **10** cm |\n"
+        "\n"
+        "---\n"
+        "1. Conclusão\n"
+    )
+    blocks = parse_markdown(md)
+    assert [b.kind for b in blocks] == ["heading", "paragraph", "bullet_list", "table", "rule", "ordered_list"]
+    assert blocks[0].text == "Laudo" and blocks[0].level == 1
+    assert blocks[1].text == "Paciente: <b>FULANO</b><br/>Exame: US"
+    assert blocks[2].items == ["Fígado <i>normal</i> com contornos regulares", "Baço normal"]
+    assert blocks[3].rows == [["Órgão", "Medida"], ["Rim", "<b>10</b> cm"]]
+    assert blocks[5].items == ["Conclusão"]
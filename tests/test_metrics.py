@@ -0,0 +1,71 @@
+"""
+🧪 Testes das métricas: exposição Prometheus e rotação do arquivo de trace.
+"""
+
+import json
+
+from Pipeline.metrics import MetricsRegistry, trace
+
+
+def test_render_types():
+    registry = MetricsRegistry(prefix="t")
+    with registry.stage("convert") as span:
+        span["bytes"] = 10
+    text = registry.render()
+    assert "# TYPE t_stage_seconds histogram" in text
+    assert "# TYPE t_stage_bytes_total counter" in text
+    assert 't_stage_bytes_total{stage="convert"} 10' in text
+    assert "# TYPE t_process_cpu_seconds_total counter" in text
+    assert "# TYPE t_uptime_seconds gauge" in text
+
+
+def test_trace_rotation(tmp_path, monkeypatch):
+    path = tmp_path / "traces.jsonl"
+    monkeypatch.setenv("METRICS_TRACE_MAX_BYTES", "2000")
+    monkeypatch.setenv("METRICS_TRACE_BACKUPS", "2")
+    for i in range(60):
+        with trace(str(path), patient=f"P{i:03d}", padding="x" * 100):
+            pass
+
+    files = sorted(p.name for p in tmp_path.iterdir())
+    assert files == ["traces.jsonl", "traces.jsonl.1", "traces.jsonl.2"]
+    assert all((tmp_path / name).stat().st_size <= 2000 for name in files)
+    # Linhas inteiras, a mais recente no arquivo corrente e as antigas descartadas
+    records = [json.loads(line) for name in reversed(files) for line in (tmp_path / name).read_text().splitlines()]
+    patients = [r["patient"] for r in records]
+    assert patients[-1] == "P059"
+    assert patients == sorted(patients)
+    assert "P000" not in patients
+
+
+def test_trace_rotation_without_backups(tmp_path, monkeypatch):
+    path = tmp_path / "traces.jsonl"
+    monkeypatch.setenv("METRICS_TRACE_MAX_BYTES", "1000")
+    monkeypatch.setenv("METRICS_TRACE_BACKUPS", "0")
+    for i in range(30):
+        with trace(str(path), patient=f"P{i:03d}"):
+            pass
+    assert [p.name for p in tmp_path.iterdir()] == ["traces.jsonl"]
+    assert path.stat().st_size <= 1000
+
+
+def _write_traces(path: str, worker: int) -> None:
+    for i in range(100):
+        with trace(path, patient=f"W{worker}-{i:03d}", padding="x" * 100):
+            pass
+
+
+def test_trace_rotation_across_processes(tmp_path, monkeypatch):
+    # Workers do backlog cruzando o limite juntos: nenhuma geração é deslocada duas vezes
+    from concurrent.futures import ProcessPoolExecutor
+
+    monkeypatch.setenv("METRICS_TRACE_MAX_BYTES", "3000")
+    monkeypatch.setenv("METRICS_TRACE_BACKUPS", "1000")
+    path = str(tmp_path / "traces.jsonl")
+    with ProcessPoolExecutor(4) as pool:
+        list(pool.map(_write_traces, [path] * 4, range(4)))
+
+    lines = [line for p in tmp_path.iterdir() for line in p.read_text().splitlines()]
+    assert len(lines) == 400
+    assert len({json.loads(line)["patient"] for line in lines}) == 400
+    assert all(p.stat().st_size <= 3000 for p in tmp_path.iterdir())
@@ -0,0 +1,128 @@
+"""
+🧪 Testes do serviço de laudos (`ReportServer`): token fora do loopback e regenerações
+agrupadas por pasta.
+"""
+
+import http.client
+import json
+import threading
+import time
+
+import pytest
+
+from Pipeline.report_server import ReportServer
+
+USER, FOLDER = "Teste", "PACIENTE"
+
+
+@pytest.fixture
+def users_dir(tmp_path):
+    (tmp_path / USER / "Patients" / FOLDER).mkdir(parents=True)
+    return tmp_path
+
+
+def _request(server: ReportServer, method: str, path: str, token: str | None = None) -> tuple[int, dict]:
+    conn = http.client.HTTPConnection("127.0.0.1", server.port, timeout=10)
+    headers = {"Authorization": f"Bearer {token}"} if token is not None else {}
+    conn.request(method, path, headers=headers)
+    response = conn.getresponse()
+    body = response.read()
+    conn.close()
+    return response.status, json.loads(body) if body else {}
+
+
+@pytest.mark.parametrize("host", ["0.0.0.0", "::"])
+def test_external_host_requires_token(users_dir, host):
+    with pytest.raises(ValueError):
+        ReportServer(users_dir=str(users_dir), host=host, port=0)
+
+
+def test_token_is_checked(users_dir):
+    with ReportServer(users_dir=str(users_dir), port=0, token="segredo") as server:
+        assert _request(server, "GET", "/health")[0] == 200
+        assert _request(server, "GET", f"/patients/{USER}/{FOLDER}")[0] == 401
+        assert _request(server, "GET", f"/patients/{USER}/{FOLDER}", token="errado")[0] == 401
+        assert _request(server, "GET", f"/patients/{USER}/{FOLDER}", token="segredo")[0] == 200
+
+
+def test_report_request_follows_running_job(users_dir):
+    release = threading.Event()
+    calls = []
+
+    def regenerate(user, folder, report):
+        calls.append(report)
+        release.wait(10)
+
+    path = f"/patients/{USER}/{FOLDER}/regenerate?wait=0"
+    with ReportServer(regenerate, users_dir=str(users_dir), port=0, max_jobs=2) as server:
+        assert _request(server, "POST", path)[1]["shared"] is False
+        deadline = time.monotonic() + 5
+        while not calls:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+        # Com laudo durante um job sem laudo: agendado depois dele, nunca em paralelo
+        assert _request(server, "POST", path + "&report=1")[1]["shared"] is False
+        # Os dois pedidos seguintes são atendidos pelo job com laudo
+        assert _request(server, "POST", path)[1]["shared"] is True
+        assert _request(server, "POST", path + "&report=1")[1]["shared"] is True
+        time.sleep(0.1)
+        assert calls == [False]
+        assert _request(server, "GET", f"/patients/{USER}/{FOLDER}")[1]["regenerating"] == [{"report": True}]
+        release.set()
+        deadline = time.monotonic() + 5
+        while server._jobs:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+    assert calls == [False, True]
+
+
+def _raw(server: ReportServer, request: bytes) -> bytes:
+    import socket
+
+    with socket.create_connection(("127.0.0.1", server.port), timeout=5) as sock:
+        sock.sendall(request)
+        chunks = []
+        while chunk := sock.recv(65536):
+            chunks.append(chunk)
+    return b"".join(chunks)
+
+
+@pytest.mark.parametrize("length, status", [("abc", b"400"), ("-5", b"400"), (str(2 << 20), b"413")])
+def test_bad_content_length_closes_the_connection(users_dir, length, status):
+    # Um segundo pedido colado ao primeiro nunca é respondido: a conexão é fechada no erro
+    request = (f"POST /health HTTP/1.1\r\nHost: x\r\nContent-Length: {length}\r\n\r\n"
+               "GET /health HTTP/1.1\r\nHost: x\r\n\r\n").encode()
+    with ReportServer(users_dir=str(users_dir), port=0) as server:
+        response = _raw(server, request)
+    assert response.startswith(b"HTTP/1.1 " + status)
+    assert response.count(b"HTTP/1.1 ") == 1
+
+
+def test_stalled_headers_get_408(users_dir, monkeypatch):
+    import socket
+
+    from Pipeline import report_server
+
+    monkeypatch.setattr(report_server, "IDLE_TIMEOUT", 0.2)
+    with ReportServer(users_dir=str(users_dir), port=0) as server:
+        with socket.create_connection(("127.0.0.1", server.port), timeout=5) as sock:
+            # Linha de requisição e um cabeçalho, e nada mais
+            sock.sendall(b"GET /health HTTP/1.1\r\nHost: x\r\n")
+            response = b"".join(iter(lambda: sock.recv(65536), b""))
+        assert response.startswith(b"HTTP/1.1 408")
+        # O servidor continua atendendo
+        assert _request(server, "GET", "/health")[0] == 200
+
+
+def test_search_limit_is_clamped(users_dir, tmp_path):
+    from Pipeline.catalog import PatientCatalog
+
+    catalog = PatientCatalog(str(tmp_path / "catalog.db"))
+    for k in range(3):
+        catalog.record(USER, f"PACIENTE {k}", study_date=f"2025010{k + 1}")
+    with ReportServer(users_dir=str(users_dir), port=0, catalog=catalog) as server:
+        assert len(_request(server, "GET", "/search?limit=-1")[1]) == 1
+        assert len(_request(server, "GET", "/search?limit=0")[1]) == 1
+        assert len(_request(server, "GET", "/search?limit=2")[1]) == 2
+        assert _request(server, "GET", "/search?limit=abc")[0] == 400
+    catalog.close()
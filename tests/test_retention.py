@@ -0,0 +1,140 @@
+"""
+🧪 Testes da retenção de armazenamento (`StorageSweeper`): seleção por política, ZIPs não
+processados, marcador `.pruned` e recompressão das imagens antigas.
+"""
+
+import copy
+import os
+import time
+
+import pytest
+
+from Pipeline import backlog
+from Pipeline.backlog import ArchiveLedger
+from Pipeline.retention import DAY, DEFAULT_POLICIES, PRUNED_MARKER, PrunedFolderError, StorageSweeper, is_pruned
+
+USER = "Teste"
+
+
+def _policies(**overrides) -> dict:
+    policies = copy.deepcopy(DEFAULT_POLICIES)
+    for kind, options in overrides.items():
+        policies[kind].update(options)
+    return policies
+
+
+def _file(path, size: int, age_days: float = 0.0):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"\0" * size)
+    mtime = time.time() - age_days * DAY
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def _sweeper(tmp_path, policies: dict) -> StorageSweeper:
+    return StorageSweeper(policies, zip_dir=str(tmp_path / "ZIPS"), dcm_dir=str(tmp_path / "Dicoms"),
+                          users_dir=str(tmp_path / "Users"), index_path=None)
+
+
+@pytest.fixture
+def ledger(tmp_path, monkeypatch):
+    ledger = ArchiveLedger(str(tmp_path / "archives.json"))
+    monkeypatch.setattr(backlog, "LEDGER", ledger)
+    return ledger
+
+
+def test_unprocessed_zip_is_never_selected(tmp_path, ledger):
+    pdf = _file(tmp_path / "Users" / USER / "Patients" / "PACIENTE" / "Report" / "PACIENTE.pdf", 10)
+    done = _file(tmp_path / "ZIPS" / "done.zip", 100, age_days=30)
+    pending = _file(tmp_path / "ZIPS" / "pending.zip", 100, age_days=30)
+    ledger.record(str(done), USER, str(pdf))
+
+    # Nem por processado, nem por idade, nem por tamanho
+    sweeper = _sweeper(tmp_path, _policies(zips={"delete_processed": True, "max_age_days": 1, "max_bytes": 0}))
+    selected = sweeper._select("zips", sweeper.scan()["zips"], time.time())
+    assert [key for key, *_ in selected] == [str(done)]
+
+    report = sweeper.sweep()
+    assert report["removed"]["zips"] == 1
+    assert not done.exists() and pending.exists()
+
+
+def test_max_bytes_removes_oldest_first(tmp_path):
+    dicoms = tmp_path / "Dicoms"
+    files = [_file(dicoms / f"IM{k}.dcm", 100, age_days=0.1 * (4 - k)) for k in range(4)]
+    sweeper = _sweeper(tmp_path, _policies(dicoms={"max_age_days": None, "max_bytes": 150}))
+
+    selected = sweeper._select("dicoms", sweeper.scan()["dicoms"], time.time())
+    assert [key for key, *_ in selected] == [str(files[0]), str(files[1]), str(files[2])]
+    assert all(reason.startswith("acima de") for *_, reason in selected)
+
+
+def test_max_age_selects_only_old_files(tmp_path):
+    old = _file(tmp_path / "Dicoms" / "work" / "old.dcm", 10, age_days=2)
+    _file(tmp_path / "Dicoms" / "new.dcm", 10)
+    sweeper = _sweeper(tmp_path, _policies())
+
+    selected = sweeper._select("dicoms", sweeper.scan()["dicoms"], time.time())
+    assert [key for key, *_ in selected] == [str(old)]
+
+
+def test_pruned_images_keep_the_pdf_and_block_rebuilds(tmp_path):
+    import main
+
+    patient = tmp_path / "Users" / USER / "Patients" / "PACIENTE"
+    pdf = _file(patient / "Report" / "PACIENTE.pdf", 10)
+    images = [_file(patient / "Images" / f"IM{k}.jpeg", 100, age_days=10) for k in range(3)]
+    recent = tmp_path / "Users" / USER / "Patients" / "RECENTE"
+    _file(recent / "Images" / "IM0.jpeg", 100)
+
+    # A pasta de imagens inteira é a unidade de remoção; a mais antiga sai primeiro
+    report = _sweeper(tmp_path, _policies(images={"max_bytes": 200})).sweep()
+    assert report["removed"]["images"] == 1 and report["freed"]["images"] == 300
+    assert not any(p.exists() for p in images)
+    assert pdf.exists()
+    assert is_pruned(str(patient)) and not is_pruned(str(recent))
+    assert (patient / PRUNED_MARKER).exists()
+
+    # O PDF atual nunca é refeito a partir de uma pasta podada
+    with pytest.raises(PrunedFolderError):
+        main.rebuild_patient(USER, "PACIENTE", users_dir=str(tmp_path / "Users"))
+    assert pdf.exists()
+
+
+def test_dry_run_removes_nothing(tmp_path):
+    old = _file(tmp_path / "Dicoms" / "old.dcm", 10, age_days=2)
+    report = _sweeper(tmp_path, _policies()).sweep(dry_run=True)
+    assert report["removed"]["dicoms"] == 1
+    assert old.exists()
+
+
+def _noisy_jpeg(path, age_days: float):
+    import random
+
+    from PIL import Image
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(0)
+    Image.frombytes("RGB", (128, 128), bytes(rng.randrange(256) for _ in range(128 * 128 * 3))).save(
+        path, "JPEG", quality=100)
+    mtime = time.time() - age_days * DAY
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_old_images_are_recompressed_once(tmp_path):
+    images = tmp_path / "Users" / USER / "Patients" / "PACIENTE" / "Images"
+    old = _noisy_jpeg(images / "old.jpeg", age_days=100)
+    new = _noisy_jpeg(images / "new.jpeg", age_days=1)
+    old_size, old_mtime, new_size = old.stat().st_size, old.stat().st_mtime_ns, new.stat().st_size
+    sweeper = _sweeper(tmp_path, _policies(images={"recompress_after_days": 90, "recompress_quality": 50}))
+
+    report = sweeper.sweep()
+    assert report["recompressed"] == 1 and report["recompress_saved"] == old_size - old.stat().st_size > 0
+    # A idade do arquivo não muda com a recompressão; a imagem recente não é tocada
+    assert old.stat().st_mtime_ns == old_mtime
+    assert new.stat().st_size == new_size
+    assert not is_pruned(str(images.parent))
+
+    # Já recomprimida: a próxima varredura não a regrava
+    assert sweeper.sweep()["recompressed"] == 0
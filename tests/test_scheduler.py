@@ -0,0 +1,105 @@
+"""
+🧪 Testes do atraso sugerido pelo servidor (`Retry-After`) no `RequestScheduler`.
+"""
+
+import email.utils
+import time
+from types import SimpleNamespace
+
+import httpx
+import openai
+import pytest
+
+from OCR.scheduler import DeadlineExceeded, ModelCallError, RequestScheduler, _retry_after
+
+
+def _error(headers: dict) -> Exception:
+    error = Exception("429")
+    error.response = SimpleNamespace(headers=headers)
+    return error
+
+
+@pytest.mark.parametrize("headers, expected", [
+    ({"retry-after": "2"}, 2.0),
+    ({"retry-after-ms": "1500"}, 1.5),
+    ({"retry-after-ms": "abc", "retry-after": "3"}, 3.0),
+    ({"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"}, 0.0),
+    ({}, None),
+    # Cabeçalhos malformados não derrubam a repetição
+    ({"retry-after": "garbage"}, None),
+    ({"retry-after": "Mon, 99 Foo 2025 xx:yy"}, None),
+    ({"retry-after": "nan"}, None),
+])
+def test_retry_after(headers, expected):
+    assert _retry_after(_error(headers)) == expected
+
+
+def test_retry_after_http_date():
+    value = email.utils.formatdate(time.time() + 30, usegmt=True)
+    assert 25 < _retry_after(_error({"retry-after": value})) <= 30
+
+
+def test_retry_after_without_response():
+    assert _retry_after(ValueError("sem resposta")) is None
+
+
+def _rate_limited(seconds: str) -> openai.RateLimitError:
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    response = httpx.Response(429, headers={"retry-after": seconds}, request=request)
+    return openai.RateLimitError("429", response=response, body=None)
+
+
+def test_backoff_honors_retry_after_above_max_delay():
+    scheduler = RequestScheduler(base_delay=0.01, max_delay=1.0)
+    assert scheduler._backoff(0, _rate_limited("5")) >= 5.0
+
+
+def test_long_retry_after_gives_up_instead_of_retrying_early():
+    scheduler = RequestScheduler(base_delay=0.01, max_delay=1.0)
+    calls = []
+
+    def func():
+        calls.append(time.monotonic())
+        raise _rate_limited("5")
+
+    start = time.monotonic()
+    with pytest.raises(ModelCallError):
+        scheduler.call(func)
+    assert len(calls) == 1 and time.monotonic() - start < 1.0
+    assert scheduler.metrics()["failures"] == 1
+
+
+def test_retry_after_beyond_deadline():
+    scheduler = RequestScheduler(base_delay=0.01, max_delay=60.0)
+
+    def func():
+        raise _rate_limited("5")
+
+    with pytest.raises(DeadlineExceeded):
+        scheduler.call(func, deadline=time.monotonic() + 2.0)
+
+
+def test_failed_attempts_return_their_token_reservation():
+    scheduler = RequestScheduler(tokens_per_minute=1000, base_delay=0.0, max_delay=1.0)
+    calls = []
+
+    def func():
+        calls.append(1)
+        if len(calls) < 3:
+            raise _rate_limited("0")
+        return SimpleNamespace(usage=None)
+
+    start = time.monotonic()
+    scheduler.call(func, estimated_tokens=400)
+    # Sem devolução, a terceira tentativa esperaria ~12 s pelo reabastecimento
+    assert len(calls) == 3 and time.monotonic() - start < 1.0
+    assert 590 <= scheduler.token_bucket.tokens < 700
+
+
+def test_deadline_on_request_slot_returns_the_tokens():
+    scheduler = RequestScheduler(requests_per_minute=1, tokens_per_minute=1000)
+    scheduler.request_bucket.tokens = 0
+    with pytest.raises(DeadlineExceeded):
+        scheduler.call(lambda: None, estimated_tokens=400, deadline=time.monotonic() + 0.1)
+    scheduler.token_bucket._refill()
+    assert scheduler.token_bucket.tokens > 990
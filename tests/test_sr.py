@@ -0,0 +1,72 @@
+"""
+🧪 Testes da extração de medidas de Structured Reports (`SRHarvester`).
+"""
+
+import pydicom
+
+from Benchmarks.synthetic_dicom import make_sr
+from DicomManager.sr import SRHarvester
+
+STUDY = {"StudyInstanceUID": "1.2.3.4", "PatientName": "TESTE^SR"}
+
+
+def test_single_measurement_does_not_skip_ocr(tmp_path, monkeypatch):
+    monkeypatch.delenv("SR_MIN_MEASUREMENTS", raising=False)
+    monkeypatch.delenv("SR_REQUIRED_GROUPS", raising=False)
+    make_sr(tmp_path / "SR.dcm", STUDY, [("Nódulo - Comprimento", 0.57, "cm")])
+    findings = SRHarvester(tmp_path).harvest()
+    assert len(findings["measurements"]) == 1
+    assert not findings["complete"]
+
+
+def test_complete_with_minimum_measurements(tmp_path, monkeypatch):
+    monkeypatch.delenv("SR_MIN_MEASUREMENTS", raising=False)
+    monkeypatch.delenv("SR_REQUIRED_GROUPS", raising=False)
+    make_sr(tmp_path / "SR.dcm", STUDY)
+    findings = SRHarvester(tmp_path).harvest()
+    assert len(findings["measurements"]) == 3
+    assert findings["complete"]
+
+
+def test_required_groups(tmp_path):
+    make_sr(tmp_path / "SR.dcm", STUDY)
+    findings = SRHarvester(tmp_path).harvest()
+    assert SRHarvester.is_complete(findings, min_measurements=1, required_groups=["findings"])
+    assert not SRHarvester.is_complete(findings, min_measurements=1, required_groups=["Findings", "Fígado"])
+
+
+def test_malformed_numeric_value_is_skipped(tmp_path):
+    path = make_sr(tmp_path / "SR.dcm", STUDY)
+    ds = pydicom.dcmread(path)
+    items = ds.ContentSequence[0].ContentSequence
+    items[0].MeasuredValueSequence[0].NumericValue = "1.5"
+    del items[1].MeasuredValueSequence[0].NumericValue
+    ds.save_as(path)
+    # Valor malformado gravado sem validação (como vem de alguns equipamentos)
+    raw = path.read_bytes().replace(b"1.5 ", b"abc ")
+    path.write_bytes(raw)
+
+    findings = SRHarvester(tmp_path).harvest()
+    assert [m["name"] for m in findings["measurements"]] == ["Nódulo - Largura"]
+    assert findings["sr_instances"] == 1
+
+
+def test_incremental_findings_are_merged(tmp_path):
+    first, late = tmp_path / "first", tmp_path / "late"
+    first.mkdir()
+    late.mkdir()
+    make_sr(first / "SR1.dcm", STUDY)
+    json_path = tmp_path / "findings.json"
+    SRHarvester.update(SRHarvester(first).harvest(), json_path)
+
+    # Conversão incremental: só as instâncias novas (um segundo SR)
+    make_sr(late / "SR2.dcm", STUDY, [("Rim - Comprimento", 10.2, "cm")])
+    merged = SRHarvester.update(SRHarvester(late).harvest(), json_path)
+    assert merged["sr_instances"] == 2
+    assert len(merged["measurements"]) == 4
+    assert merged["complete"]
+
+    # O mesmo SR reenviado substitui o anterior em vez de duplicar as medidas
+    again = SRHarvester.update(SRHarvester(late).harvest(), json_path)
+    assert again["sr_instances"] == 2
+    assert len(again["measurements"]) == 4
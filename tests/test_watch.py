@@ -0,0 +1,68 @@
+"""
+🧪 Testes da pasta observada (`FolderWatcher`): um ZIP só é enfileirado depois de
+completamente gravado, pela consulta periódica e pelo inotify.
+"""
+
+import io
+import os
+import zipfile
+
+import pytest
+
+from Pipeline.watch import FolderWatcher, _inotify_libc
+
+
+def _zip_bytes(n_files: int = 3) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED) as archive:
+        for k in range(n_files):
+            archive.writestr(f"20250604101010 PACIENTE/20250604/US/IM{k:04d}.dcm", os.urandom(4096))
+    return buffer.getvalue()
+
+
+def test_half_written_zip_waits_for_a_stable_signature(tmp_path):
+    watcher = FolderWatcher(str(tmp_path), use_inotify=False)
+    data = _zip_bytes()
+    path = tmp_path / "PACIENTE.zip"
+
+    # Cópia em andamento: o tamanho muda a cada consulta
+    path.write_bytes(data[:4096])
+    assert watcher.scan() == 0
+    with open(path, "ab") as f:
+        f.write(data[4096:8192])
+    assert watcher.scan() == 0
+    # Parado, mas ainda sem o diretório central: não é um ZIP válido
+    assert watcher.scan() == 0
+    assert len(watcher.events) == 0
+
+    with open(path, "ab") as f:
+        f.write(data[8192:])
+    assert watcher.scan() == 0
+    assert watcher.scan() == 1
+    assert watcher.events.get(timeout=0) == "PACIENTE.zip"
+    assert "PACIENTE.zip" in watcher.closed_at
+
+    # A mesma versão não é enfileirada de novo; outros arquivos são ignorados
+    (tmp_path / "notas.txt").write_text("x")
+    assert watcher.scan() == 0
+
+
+def test_existing_zips_are_queued_at_startup(tmp_path):
+    (tmp_path / "A.zip").write_bytes(_zip_bytes(1))
+    (tmp_path / "parcial.zip").write_bytes(_zip_bytes(1)[:100])
+    watcher = FolderWatcher(str(tmp_path), use_inotify=False)
+    assert watcher.scan(stable_only=False) == 1
+    assert watcher.events.get(timeout=0) == "A.zip"
+
+
+@pytest.mark.skipif(_inotify_libc() is None, reason="inotify indisponível")
+def test_inotify_reports_closed_and_renamed_zips(tmp_path):
+    with FolderWatcher(str(tmp_path), use_inotify=True) as watcher:
+        assert watcher.backend == "inotify"
+        # Fechado pela metade: rejeitado até um novo fechamento com o arquivo completo
+        (tmp_path / "parcial.zip").write_bytes(_zip_bytes()[:4096])
+        # Gravado com outro nome e renomeado para .zip
+        (tmp_path / "copia.tmp").write_bytes(_zip_bytes())
+        os.rename(tmp_path / "copia.tmp", tmp_path / "PACIENTE.zip")
+        assert watcher.events.get(timeout=5) == "PACIENTE.zip"
+        assert watcher.events.get(timeout=0.5) is None
@@ -0,0 +1,103 @@
+"""
+🧪 Testes do receptor de notificações `OnStableStudy` (`WebhookServer`).
+"""
+
+import http.client
+import json
+
+import pytest
+
+from Pipeline.webhook import StudyEventQueue, WebhookServer
+
+
+def _post(server: WebhookServer, body: dict, token: str | None = None) -> tuple[int, dict]:
+    host, port = server.httpd.server_address[:2]
+    conn = http.client.HTTPConnection(host, port, timeout=5)
+    headers = {"Content-Type": "application/json"}
+    if token is not None:
+        headers["X-Webhook-Token"] = token
+    conn.request("POST", server.path, body=json.dumps(body), headers=headers)
+    response = conn.getresponse()
+    status, payload = response.status, json.loads(response.read())
+    conn.close()
+    return status, payload
+
+
+def test_default_host_is_loopback():
+    with WebhookServer(StudyEventQueue(), port=0) as server:
+        assert server.httpd.server_address[0] == "127.0.0.1"
+
+
+@pytest.mark.parametrize("host", ["0.0.0.0", "::"])
+def test_external_host_requires_token(host):
+    with pytest.raises(ValueError):
+        WebhookServer(StudyEventQueue(), host=host, port=0)
+
+
+def test_external_host_with_token():
+    with WebhookServer(StudyEventQueue(), host="0.0.0.0", port=0, token="segredo") as server:
+        assert server.token == "segredo"
+
+
+STUDY = "6b9e1c04-1f2a3b4c-5d6e7f80-91a2b3c4-d5e6f708"
+
+
+def test_token_is_checked():
+    events = StudyEventQueue()
+    with WebhookServer(events, port=0, token="segredo") as server:
+        assert _post(server, {"ID": STUDY})[0] == 403
+        assert _post(server, {"ID": STUDY}, token="errado")[0] == 403
+        status, payload = _post(server, {"ID": STUDY}, token="segredo")
+        assert status == 202 and payload["ID"] == STUDY
+    assert len(events) == 1
+
+
+@pytest.mark.parametrize("body", [
+    {"ID": "../patients"},
+    {"ID": "a"},
+    {"ID": STUDY.upper()},
+    {"ID": STUDY + "/archive"},
+    {"ID": 123},
+    "../patients",
+    {},
+])
+def test_invalid_study_id_is_rejected(body):
+    events = StudyEventQueue()
+    with WebhookServer(events, port=0) as server:
+        assert _post(server, body)[0] == 400
+    assert len(events) == 0
+
+
+def test_plain_text_study_id():
+    events = StudyEventQueue()
+    with WebhookServer(events, port=0) as server:
+        host, port = server.httpd.server_address[:2]
+        conn = http.client.HTTPConnection(host, port, timeout=5)
+        conn.request("POST", server.path, body=STUDY)
+        assert conn.getresponse().status == 202
+        conn.close()
+    assert events.get(timeout=0) == STUDY
+
+
+def _raw_post(server: WebhookServer, headers: dict, path: str | None = None) -> int:
+    host, port = server.httpd.server_address[:2]
+    conn = http.client.HTTPConnection(host, port, timeout=5)
+    conn.putrequest("POST", path or server.path, skip_accept_encoding=True)
+    for key, value in headers.items():
+        conn.putheader(key, value)
+    conn.endheaders()
+    status = conn.getresponse().status
+    conn.close()
+    return status
+
+
+def test_length_is_checked_before_reading_the_body():
+    events = StudyEventQueue()
+    with WebhookServer(events, port=0, token="segredo") as server:
+        # Nenhum corpo é enviado: respostas que lessem o Content-Length ficariam presas
+        assert _raw_post(server, {"Content-Length": "10000000"}) == 403
+        assert _raw_post(server, {"Content-Length": "10000000", "X-Webhook-Token": "segredo"}, path="/x") == 404
+        assert _raw_post(server, {"Content-Length": "10000000", "X-Webhook-Token": "segredo"}) == 413
+        assert _raw_post(server, {"Content-Length": "dez", "X-Webhook-Token": "segredo"}) == 400
+        assert _raw_post(server, {"Content-Length": "-1", "X-Webhook-Token": "segredo"}) == 400
+    assert len(events) == 0